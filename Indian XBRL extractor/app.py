@@ -1,8 +1,8 @@
 import logging
-import uvicorn
 from typing import List, Optional, Any
 from pathlib import Path
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
@@ -36,13 +36,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Extractor if available
-if EXTRACTOR_AVAILABLE:
-    config = ParserConfig()
-    extractor = BRSRExtractor(config)
-else:
+# The extractor is built on the first request rather than at import time so
+# that server start-up and ``--reload`` cycles stay fast.
+extractor = None
+if not EXTRACTOR_AVAILABLE:
     logger.error(f"Extractor not initialized due to import error: {IMPORT_ERROR}")
-    extractor = None
+
+
+def get_extractor():
+    """Return the shared extractor, constructing it on first use."""
+    global extractor
+    if extractor is None:
+        extractor = BRSRExtractor(ParserConfig())
+    return extractor
 
 class ExtractionResultResponse(BaseModel):
     company_id: str
@@ -72,7 +78,7 @@ async def extract_url(url: str = Form(...)):
         raise HTTPException(status_code=500, detail=f"Extractor not available: {IMPORT_ERROR}")
     
     try:
-        records = extractor.process_url(url)
+        records = get_extractor().process_url(url)
         return [asdict(r) for r in records]
     except Exception as e:
         logger.error("Error processing URL: %s", e)
@@ -86,15 +92,115 @@ async def extract_file(file: UploadFile = File(...)):
 
     try:
         content = await file.read()
-        records = extractor.process_content(content, source_name=file.filename)
+        records = get_extractor().process_content(content, source_name=file.filename)
         return [asdict(r) for r in records]
     except Exception as e:
         logger.error("Error processing file: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    if not EXTRACTOR_AVAILABLE:
+        raise HTTPException(status_code=500, detail=f"Extractor not available: {IMPORT_ERROR}")
+    return PlainTextResponse(
+        get_extractor().metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+@app.get("/api/metrics/summary")
+async def metrics_summary():
+    if not EXTRACTOR_AVAILABLE:
+        raise HTTPException(status_code=500, detail=f"Extractor not available: {IMPORT_ERROR}")
+    return get_extractor().metrics.summary()
+
+@app.get("/api/panel/series")
+async def panel_series(company_id: str, indicator: str):
+    """One company's indicator over time, from the cached panel of the latest export."""
+    if not EXTRACTOR_AVAILABLE:
+        raise HTTPException(status_code=500, detail=f"Extractor not available: {IMPORT_ERROR}")
+    from panel import load_panel
+
+    config = get_extractor().config
+    exports = [Path(config.output_dir) / f"brsr_esg_metrics.{ext}" for ext in ("parquet", "csv")]
+    export = next((p for p in exports if p.exists()), None)
+    if export is None:
+        raise HTTPException(status_code=404, detail="No exported metrics found")
+    panel = load_panel(str(export), config.cache_dir)
+    try:
+        years, values, mask = panel.series(company_id, indicator)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    delta, delta_mask = panel.yoy()
+    i = panel.indicator_pos(indicator)
+    c = panel.company_pos(company_id)
+    return {
+        "company_id": company_id,
+        "indicator": indicator,
+        "years": years[mask].tolist(),
+        "values": values[mask].tolist(),
+        "yoy": [float(d) if ok else None for d, ok in zip(delta[c, :, i][mask], delta_mask[c, :, i][mask])],
+    }
+
+@app.get("/api/peers/rank")
+async def peer_rank(company_id: str, indicator: str, level: str = "industry"):
+    """A company's percentile on one indicator among its CIN peer group."""
+    if not EXTRACTOR_AVAILABLE:
+        raise HTTPException(status_code=500, detail=f"Extractor not available: {IMPORT_ERROR}")
+    index = get_extractor().peer_index
+    if index is None:
+        raise HTTPException(status_code=404, detail="Peer benchmarks are disabled (peer_benchmarks)")
+    try:
+        rank = index.rank(company_id, indicator, level)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if rank is None:
+        raise HTTPException(status_code=404, detail=f"No {indicator} value for {company_id}")
+    return asdict(rank)
+
+@app.post("/api/diff")
+async def diff_filings(
+    old: Optional[str] = Form(None),
+    new: Optional[str] = Form(None),
+    old_file: Optional[UploadFile] = File(None),
+    new_file: Optional[UploadFile] = File(None),
+):
+    """Facts added, removed and changed between two submissions (URLs, stored filing IDs or uploads)."""
+    if not EXTRACTOR_AVAILABLE:
+        raise HTTPException(status_code=500, detail=f"Extractor not available: {IMPORT_ERROR}")
+    from brsr_xbrl_extractor import BRSRParserError
+    from revisions import diff_digests
+
+    ext = get_extractor()
+    digests = []
+    for source, upload in ((old, old_file), (new, new_file)):
+        try:
+            if upload is not None:
+                digests.append(ext.digest_content(await upload.read(), upload.filename or "upload.xml"))
+            elif source:
+                digests.append(ext.fact_digest(source, allow_files=False))
+            else:
+                raise HTTPException(status_code=400, detail="Give a URL, filing ID or file for both filings")
+        except BRSRParserError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return diff_digests(*digests).to_dict()
+
+@app.get("/api/search")
+async def search_text(q: str, company_id: Optional[str] = None, year: Optional[int] = None,
+                      concept: Optional[str] = None, limit: int = 20):
+    """Narrative disclosures matching a full-text query, best match first."""
+    if not EXTRACTOR_AVAILABLE:
+        raise HTTPException(status_code=500, detail=f"Extractor not available: {IMPORT_ERROR}")
+    index = get_extractor().text_index
+    if index is None:
+        raise HTTPException(status_code=404, detail="The full-text index is disabled (text_index)")
+    hits = index.search(q, company_id=company_id, year=year, concept=concept, limit=max(1, min(limit, 200)))
+    return [asdict(hit) for hit in hits]
+
 # Mount static files for the frontend
 app.mount("/", StaticFiles(directory="static", html=True), name="static")
 
 if __name__ == "__main__":
+    import uvicorn
+
     print("Starting server at http://localhost:8000")
     uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,96 @@
+"""
+Start-up latency benchmark for the extractor module and web app.
+
+Each scenario runs in a fresh interpreter so module caches do not hide
+import cost. Results are printed and appended as one JSON line to
+``output/benchmarks/startup.jsonl`` so regressions can be tracked over time.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5] [--arelle]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+FIXTURE = PROJECT_DIR / "tests" / "fixtures" / "sample_brsr.xml"
+
+# Each snippet prints the elapsed seconds of the phase it measures.
+SCENARIOS = {
+    "import_extractor": """
+import time
+t0 = time.perf_counter()
+import brsr_xbrl_extractor
+print(time.perf_counter() - t0)
+""",
+    "import_app": """
+import time
+t0 = time.perf_counter()
+import app
+print(time.perf_counter() - t0)
+""",
+    "first_request": """
+import logging, time
+t0 = time.perf_counter()
+import app
+logging.disable(logging.CRITICAL)
+app.extractor = app.BRSRExtractor(app.ParserConfig(enable_arelle={arelle}))
+content = open({fixture!r}, "rb").read()
+records = app.extractor.process_content(content, source_name="sample_brsr.xml")
+assert records
+print(time.perf_counter() - t0)
+""",
+}
+
+
+def run_scenario(code: str) -> float:
+    """Run a snippet in a fresh interpreter and return the seconds it reports."""
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per scenario (median is reported)")
+    parser.add_argument("--arelle", action="store_true", help="parse with Arelle in the first-request scenario")
+    parser.add_argument("--history", default=str(PROJECT_DIR / "output" / "benchmarks" / "startup.jsonl"))
+    args = parser.parse_args()
+
+    results = {}
+    for name, template in SCENARIOS.items():
+        code = template.format(arelle=args.arelle, fixture=str(FIXTURE))
+        samples = [run_scenario(code) for _ in range(args.repeat)]
+        results[name] = {
+            "median_s": round(statistics.median(samples), 4),
+            "min_s": round(min(samples), 4),
+            "max_s": round(max(samples), 4),
+        }
+        print(f"{name:<20} median {results[name]['median_s'] * 1000:8.1f} ms")
+
+    entry = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "arelle": args.arelle,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    history = Path(args.history)
+    history.parent.mkdir(parents=True, exist_ok=True)
+    with open(history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+    print(f"Appended results to {history}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,35 +9,90 @@ BRSR XBRL ESG metrics extractor for NSE filings.
 
 from __future__ import annotations
 
+import importlib
+import importlib.util
 import json
 import logging
+import os
 import sys
 import time
+from collections import deque
+from concurrent.futures import Future
 from dataclasses import dataclass, asdict
+from functools import cached_property
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Container, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from calculations import CalculationInconsistency, calculation_concepts, check_calculations
+from company_registry import CompanyRegistry, load_company_registry
+from facts import ConceptFilter, FactTable, as_fact_table
+from filing_header import FilingHeader, plan_filings, scan_header
+from flight_recorder import FlightRecorder, filing_id_for
+from instrumentation import ExtractorMetrics
+from tables import DisclosureTable, clean_label, dimension_label
+from taxonomy_registry import CompiledTaxonomy, TaxonomyRegistry, detect_namespace, is_sebi_namespace
+from public_esg import (
+    ESGDataProvider,
+    SustainabilityCache,
+    TickerIndex,
+    YFinanceProvider,
+    payload_to_facts,
+    yahoo_ticker,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from arelle.ModelXbrl import ModelXbrl  # type: ignore
+
+    from checkpoint import RunCheckpoint
+    from climate_risk import PhysicalRiskOverlay
+    from isolation import FilingResult
+    from local_filings import LocalFiling
+    from peers import PeerIndex
+    from revisions import FactDigest, FactHashStore, FilingDiff
+    from text_index import TextIndex
+    from quality import CorpusQualityChecker
+    from units import UnitNormalizer
+
+
+# Heavy and optional dependencies (pandas, requests, lxml, Arelle, yfinance,
+# pyarrow) are imported where they are used so that importing this module --
+# CLI one-shots, ``uvicorn --reload`` cycles -- stays cheap.
+_LAZY_MODULES = {
+    "pd": "pandas",
+    "requests": "requests",
+    "etree": "lxml.etree",
+    "yf": "yfinance",
+}
+
+
+def _module_available(name: str) -> bool:
+    """Check whether a module is installed without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
 
-import pandas as pd
-import requests
-from lxml import etree
 
 # Optional: arelle-release (pip install arelle-release)
-try:
-    from arelle.Cntlr import Cntlr  # type: ignore
-    from arelle.ModelManager import ModelManager  # type: ignore
-    from arelle.ModelXbrl import ModelXbrl  # type: ignore
-    ARELLE_AVAILABLE = True
-except ImportError:
-    ARELLE_AVAILABLE = False
-    logging.warning("Arelle not available. Install with: pip install arelle-release")
+ARELLE_AVAILABLE = _module_available("arelle")
 
 # Public ESG data fallback
-try:
-    import yfinance as yf
-    YFINANCE_AVAILABLE = True
-except ImportError:
-    YFINANCE_AVAILABLE = False
-    logging.warning("yfinance not available. Install with: pip install yfinance")
+YFINANCE_AVAILABLE = _module_available("yfinance")
+
+# Optional: h5py, for CLIMADA hazard files (physical_risk)
+H5PY_AVAILABLE = _module_available("h5py")
+
+
+def __getattr__(name: str) -> Any:
+    """Import ``pd``, ``requests``, ``etree`` and ``yf`` on first attribute access."""
+    module_name = _LAZY_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(module_name)
+    globals()[name] = module
+    return module
 
 
 # -------------------------------------------------------------------
@@ -51,13 +106,60 @@ class ParserConfig:
     max_retries: int = 3
     retry_backoff_factor: float = 2.0
     verify_ssl: bool = True
-    taxonomy_expected: str = "https://www.sebi.gov.in/xbrl/2025-05-31/in-capmkt"
+    taxonomy_expected: str = "https://www.sebi.gov.in/xbrl/2023-06-30/in-capmkt"  # Used when a filing's namespace is unknown
+    taxonomy_dirs: Tuple[str, ...] = ("Taxonomy_BRSR",)
+    taxonomy_cache_size: int = 4  # Compiled taxonomy versions kept in memory
+    header_scan_bytes: int = 65536  # Leading bytes read by the header pre-scan
+    plan_filings: bool = False  # Pre-scan URL batches: skip checkpointed filings, keep latest revisions
+    corpus_quality_checks: bool = False  # Score values against corpus-wide distributions
+    quality_stats_path: Optional[str] = None  # Defaults to <cache_dir>/quality_distributions.npz
+    quality_min_samples: int = 20  # Observations needed before an indicator is checked
+    calculation_checks: bool = True  # Check reported totals against the calculation linkbase
+    calculation_tolerance: float = 0.01  # Relative difference tolerated between a total and its items
+    reconstruct_tables: bool = False  # Write each filing's disclosure tables to <output_dir>/tables/
+    store_fact_hashes: bool = False  # Keep each filing's fact hashes for revision diffs (parses unmapped facts too)
+    fact_hash_dir: Optional[str] = None  # Defaults to <cache_dir>/fact_hashes
+    text_index: bool = False  # Index text-valued facts for full-text search (see text_index.py)
+    text_index_path: Optional[str] = None  # Defaults to <cache_dir>/text_index.sqlite
+    text_index_min_chars: int = 20  # Shorter text values (Yes/No, dates, codes) are not indexed
+    physical_risk: bool = False  # Add tropical-cyclone indicators from CLIMADA hazard data (see climate_risk.py)
+    climada_data_dir: str = "../climada/data"
+    hazard_path: Optional[str] = None  # Defaults to the first hazard file under <climada_data_dir>/hazard/tropical_cyclone
+    impact_function_path: Optional[str] = None  # Defaults to <climada_data_dir>/tc_impf_cal_v01_RMSF.csv
+    impact_function_region: str = "NI"  # Calibration region (NI: North Indian Ocean)
+    company_locations_path: Optional[str] = None  # CSV of geocoded sites: company_id,lat,lon[,weight]
+    snap_max_km: float = 50.0  # Farthest hazard centroid a location snaps to
+    normalize_units: bool = True  # Add canonical_value/canonical_unit (GJ, m3, t, tCO2e, INR) to records
+    peer_benchmarks: bool = False  # Maintain per-indicator percentile ranks within CIN peer groups
+    peer_index_path: Optional[str] = None  # Defaults to <cache_dir>/peer_index.pkl
+    queue_visibility_timeout: float = 600.0  # Seconds a leased filing stays hidden from other workers
+    queue_max_attempts: int = 3  # Leases per filing before it is marked failed
+    stream_lookahead: int = 2  # Filings fetched ahead of parsing by iter_records
+    checkpoint_dir: Optional[str] = None  # Checkpoint batch runs here (per-filing outcomes + record shards)
+    isolation_workers: int = 0  # >0: run filings in this many worker processes under the limits below
+    filing_timeout: Optional[float] = None  # Wall-clock seconds per filing before its worker is killed
+    filing_max_rss_mb: Optional[float] = None  # Worker resident memory cap per filing (Linux /proc)
+    quarantine_path: Optional[str] = None  # Defaults to <cache_dir>/quarantine.ndjson
     data_quality_base: int = 80
     enable_arelle: bool = ARELLE_AVAILABLE
     arelle_log_level: str = "ERROR"
     taxonomy_mapping_path: str = "brsr_taxonomy_mapping.json"
     enable_public_data_fallback: bool = True
+    mapping_sources: Tuple[str, ...] = ("curated", "taxonomy", "partial")
+    prune_unmapped_facts: bool = True  # Skip unmappable facts while parsing; "taxonomy" maps most concepts
     output_dir: str = "./output"
+    export_formats: Tuple[str, ...] = ("csv", "parquet", "json")
+    export_compression: Optional[str] = None  # None, 'gzip' or 'zstd'
+    company_db_path: str = "Insider_Trading.csv"
+    cache_dir: str = ".cache"
+    ticker_index_path: str = "ticker_index.csv"
+    public_data_cache_ttl: int = 7 * 24 * 3600  # seconds
+    profile_slow_filings: bool = False  # Opt-in flight recorder
+    profile_latency_threshold: float = 10.0  # seconds
+    profile_memory_threshold_mb: float = 256.0
+    profile_sample_interval: float = 0.005  # seconds
+    profile_trace_memory: bool = True
+    profile_dir: Optional[str] = None  # Defaults to <output_dir>/profiles
 
 
 # -------------------------------------------------------------------
@@ -116,6 +218,9 @@ class ESGRecord:
     data_quality_score: int
     data_source: str  # 'xbrl', 'public_api', 'manual'
     extraction_timestamp: str
+    canonical_value: Optional[float] = None  # indicator_value in canonical_unit (see units.py)
+    canonical_unit: Optional[str] = None
+    dimensions: Optional[str] = None  # Axis=member labels of dimensional facts (see tables.py)
 
 
 # -------------------------------------------------------------------
@@ -125,11 +230,15 @@ class ESGRecord:
 class XbrlFetcher:
     """Fetches and validates XBRL instance documents from URLs."""
 
+    USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
     def __init__(self, config: ParserConfig) -> None:
         self.config = config
 
     def fetch(self, url: str) -> bytes:
         """Fetch XBRL content from a URL with exponential backoff retries."""
+        import requests
+
         self._validate_url(url)
         
         for attempt in range(self.config.max_retries + 1):
@@ -137,9 +246,7 @@ class XbrlFetcher:
                 logger.info("Fetching XBRL from %s (attempt %d/%d)", 
                            url, attempt + 1, self.config.max_retries + 1)
                 
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                }
+                headers = {'User-Agent': self.USER_AGENT}
                 
                 resp = requests.get(
                     url,
@@ -177,6 +284,47 @@ class XbrlFetcher:
         
         raise FetchError(f"Failed to fetch {url} after all retries")
 
+    def fetch_head(self, url: str, max_bytes: int = 65536) -> Tuple[bytes, Optional[int]]:
+        """Fetch only the first ``max_bytes`` of a document via an HTTP range request.
+
+        Servers that ignore ``Range`` answer 200 with the full body; the
+        response is streamed and closed after ``max_bytes``. Returns the bytes
+        and the full content length when the server reports it.
+        """
+        import requests
+
+        self._validate_url(url)
+        headers = {'User-Agent': self.USER_AGENT, 'Range': f'bytes=0-{max_bytes - 1}'}
+        try:
+            resp = requests.get(
+                url,
+                timeout=self.config.request_timeout,
+                verify=self.config.verify_ssl,
+                headers=headers,
+                stream=True,
+            )
+        except requests.exceptions.RequestException as exc:
+            raise FetchError(f"Header fetch failed for {url}: {exc}") from exc
+
+        try:
+            if resp.status_code not in (200, 206):
+                raise FetchError(f"HTTP {resp.status_code} for {url}")
+            total: Optional[int] = None
+            content_range = resp.headers.get("Content-Range", "")
+            if resp.status_code == 206 and "/" in content_range:
+                size = content_range.rsplit("/", 1)[1]
+                total = int(size) if size.isdigit() else None
+            elif resp.headers.get("Content-Length", "").isdigit():
+                total = int(resp.headers["Content-Length"])
+            head = bytearray()
+            for chunk in resp.iter_content(chunk_size=8192):
+                head += chunk
+                if len(head) >= max_bytes:
+                    break
+            return bytes(head[:max_bytes]), total
+        finally:
+            resp.close()
+
     @staticmethod
     def _validate_url(url: str) -> None:
         """Validate URL format and host."""
@@ -186,6 +334,38 @@ class XbrlFetcher:
             raise ValidationError(f"Expected .xml XBRL instance: {url}")
 
 
+# -------------------------------------------------------------------
+# Contexts
+# -------------------------------------------------------------------
+
+XBRLI_NS = "http://www.xbrl.org/2003/instance"
+XBRLDI_NS = "http://xbrl.org/2006/xbrldi"
+
+
+def read_context(ctx: Any, xbrli: str = XBRLI_NS) -> Tuple[Optional[str], List[Tuple[str, str]]]:
+    """Return a context element's period end (or instant) and its (axis, member) local names.
+
+    Works on plain lxml elements and on Arelle's ``ModelContext`` (an lxml
+    element subclass). Typed members are returned as their text content.
+    """
+    period = None
+    for tag in ("endDate", "instant"):
+        text = ctx.findtext(f".//{{{xbrli}}}{tag}")
+        if text:
+            period = text.strip()
+            break
+    dimensions: List[Tuple[str, str]] = []
+    for member in ctx.iter(f"{{{XBRLDI_NS}}}explicitMember", f"{{{XBRLDI_NS}}}typedMember"):
+        axis = (member.get("dimension") or "").rpartition(":")[2]
+        if member.tag.endswith("explicitMember"):
+            value = (member.text or "").strip().rpartition(":")[2]
+        else:
+            value = "".join(member.itertext()).strip()
+        if axis:
+            dimensions.append((axis, value))
+    return period, dimensions
+
+
 # -------------------------------------------------------------------
 # Arelle-based parser
 # -------------------------------------------------------------------
@@ -195,8 +375,10 @@ class BRSRParserArelle:
 
     def __init__(self, config: ParserConfig) -> None:
         self.config = config
-        if not ARELLE_AVAILABLE:
-            raise ImportError("Arelle is not available. Install with: pip install arelle-release")
+        try:
+            from arelle.Cntlr import Cntlr  # type: ignore
+        except ImportError as exc:
+            raise ImportError("Arelle is not available. Install with: pip install arelle-release") from exc
         self.cntlr = Cntlr(logFileName=None, logFileMode="w")
         if hasattr(self.cntlr, "logger") and self.cntlr.logger is not None:
             self.cntlr.logger.logLevel = self.config.arelle_log_level
@@ -205,7 +387,9 @@ class BRSRParserArelle:
         """Load an XBRL instance from bytes into Arelle's ModelXbrl."""
         try:
             import io
-            model_manager: ModelManager = ModelManager.initialize(self.cntlr)
+            from arelle.ModelManager import ModelManager  # type: ignore
+
+            model_manager = ModelManager.initialize(self.cntlr)
             stream = io.BytesIO(content)
             model_xbrl = model_manager.load(stream=stream, openFileSource=True)
             
@@ -247,33 +431,29 @@ class BRSRParserArelle:
         
         return company_id, company_name, year
 
-    def extract_facts(self, model_xbrl: ModelXbrl) -> List[Dict[str, Any]]:
-        """Extract raw facts from a ModelXbrl instance."""
-        facts: List[Dict[str, Any]] = []
+    def extract_facts(self, model_xbrl: ModelXbrl, concepts: Optional[ConceptFilter] = None) -> FactTable:
+        """Extract raw facts from a ModelXbrl instance, optionally only concepts of interest."""
+        facts = FactTable()
+        for context in getattr(model_xbrl, "contexts", {}).values():
+            facts.set_context(context.id, *read_context(context))
         
         for fact in model_xbrl.facts:
-            if fact.isNil:
-                continue
-            
             qname = fact.qname
             if qname is None:
                 continue
+            if concepts is not None and not concepts.accepts(qname.localName):
+                facts.skipped += 1
+                continue
+            
+            if fact.isNil:
+                continue
             
             value = fact.value
             unit = None
             if fact.unit:
                 unit = str(fact.unit.measures[0][0]) if fact.unit.measures else None
             
-            context_id = fact.contextID
-            
-            facts.append({
-                "qname": f"{qname.namespaceURI}:{qname.localName}",
-                "local_name": qname.localName,
-                "namespace": qname.namespaceURI,
-                "value": value,
-                "unit": unit,
-                "context_id": context_id,
-            })
+            facts.append(qname.namespaceURI, qname.localName, value, unit, fact.contextID)
         
         logger.info("Extracted %d facts from XBRL", len(facts))
         return facts
@@ -289,8 +469,15 @@ class BRSRParserLxml:
     def __init__(self, config: ParserConfig) -> None:
         self.config = config
 
-    def extract_facts(self, content: bytes) -> Tuple[str, str, int, List[Dict[str, Any]]]:
-        """Minimal QName-based extraction using lxml as a fallback."""
+    def extract_facts(
+        self, content: bytes, concepts: Optional[ConceptFilter] = None
+    ) -> Tuple[str, str, int, FactTable]:
+        """Minimal QName-based extraction using lxml as a fallback.
+
+        With ``concepts``, elements whose local name cannot map are skipped.
+        """
+        from lxml import etree
+
         try:
             root = etree.fromstring(content)
             nsmap = root.nsmap or {}
@@ -300,8 +487,11 @@ class BRSRParserLxml:
             company_id = ""
             company_name = ""
             year = 0
+            facts = FactTable()
             
             for ctx in root.findall(f".//{{{xbrli}}}context"):
+                if ctx.get("id"):
+                    facts.set_context(ctx.get("id"), *read_context(ctx, xbrli))
                 ident = ctx.find(f".//{{{xbrli}}}identifier")
                 if ident is not None and ident.text:
                     company_id = ident.text
@@ -317,29 +507,27 @@ class BRSRParserLxml:
             if not year:
                 raise ValidationError("Could not determine reporting_year in lxml fallback")
 
-            # Extract all element facts in SEBI namespace
-            facts: List[Dict[str, Any]] = []
-            for el in root.iter():
-                if el.prefix and el.prefix in nsmap:
-                    ns = nsmap[el.prefix]
-                    if "sebi.gov.in/xbrl" not in ns:
-                        continue
-                    if len(el) == 0 and el.text not in (None, ""):
-                        local_name = el.tag.split('}', 1)[1] if '}' in el.tag else el.tag
-                        qname = f"{ns}:{local_name}"
-                        
-                        # Extract company name if found
-                        if "CompanyName" in local_name and not company_name:
-                            company_name = el.text.strip()
-                        
-                        facts.append({
-                            "qname": qname,
-                            "local_name": local_name,
-                            "namespace": ns,
-                            "value": el.text.strip(),
-                            "unit": None,
-                            "context_id": el.get("contextRef"),
-                        })
+            # Extract all element facts in SEBI namespaces (checked once per namespace)
+            sebi_namespaces: Dict[str, bool] = {}
+            for el in root.iter(etree.Element):
+                if len(el) or el.text in (None, "") or el.tag[0] != "{":
+                    continue
+                ns, _, local_name = el.tag[1:].partition("}")
+                is_sebi = sebi_namespaces.get(ns)
+                if is_sebi is None:
+                    is_sebi = sebi_namespaces[ns] = is_sebi_namespace(ns)
+                if not is_sebi:
+                    continue
+                
+                # Extract company name if found
+                if "CompanyName" in local_name and not company_name:
+                    company_name = el.text.strip()
+                
+                if concepts is not None and not concepts.accepts(local_name):
+                    facts.skipped += 1
+                    continue
+                
+                facts.append(ns, local_name, el.text.strip(), None, el.get("contextRef"))
             
             logger.info("Extracted %d facts using lxml fallback", len(facts))
             return company_id, company_name, year, facts
@@ -353,65 +541,113 @@ class BRSRParserLxml:
 # -------------------------------------------------------------------
 
 class PublicESGDataFetcher:
-    """Fetches ESG data from public sources when XBRL parsing fails."""
+    """Fetches ESG data from public sources when XBRL parsing fails.
+
+    Tickers are resolved through the local CIN/ISIN -> NSE symbol index and
+    payloads are served from a TTL disk cache; only cache misses reach the
+    provider, batched into a single ``fetch_many`` call.
+    """
     
-    def __init__(self, config: ParserConfig) -> None:
+    def __init__(
+        self,
+        config: ParserConfig,
+        provider: Optional[ESGDataProvider] = None,
+        ticker_index: Optional[TickerIndex] = None,
+        cache: Optional[SustainabilityCache] = None,
+        metrics: Optional[ExtractorMetrics] = None,
+    ) -> None:
         self.config = config
+        self.metrics = metrics or ExtractorMetrics()
+        self._provider = provider
+        self.ticker_index = ticker_index or TickerIndex.load(config.ticker_index_path)
+        self.cache = cache or SustainabilityCache(
+            str(Path(config.cache_dir) / "public_esg"), config.public_data_cache_ttl
+        )
+
+    @property
+    def provider(self) -> Optional[ESGDataProvider]:
+        """The configured provider, defaulting to Yahoo Finance when installed."""
+        if self._provider is None and YFINANCE_AVAILABLE:
+            self._provider = YFinanceProvider()
+        return self._provider
     
-    def fetch_esg_data(self, company_id: str, company_name: str = "") -> List[Dict[str, Any]]:
-        """Fetch ESG data from public sources (Yahoo Finance, etc.)."""
-        if not YFINANCE_AVAILABLE:
-            logger.warning("yfinance not available for public ESG data fallback")
-            return []
-        
-        try:
-            # Try to find ticker symbol from company name or CIN
-            ticker = self._find_ticker(company_id, company_name)
+    def fetch_esg_data(
+        self,
+        company_id: str,
+        company_name: str = "",
+        symbol: Optional[str] = None,
+        isin: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Fetch ESG data for one company from the cache or public sources."""
+        return self.fetch_many([(company_id, company_name, symbol, isin)]).get(company_id, [])
+
+    def fetch_many(
+        self,
+        companies: Iterable[Tuple[str, str, Optional[str], Optional[str]]],
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Fetch ESG facts for many (company_id, company_name, symbol, isin) tuples at once.
+
+        Returns a mapping of company_id to fact dicts; companies without a
+        known ticker or without public data map to an empty list.
+        """
+        tickers: Dict[str, Optional[str]] = {}
+        for company_id, company_name, symbol, isin in companies:
+            ticker = self._find_ticker(company_id, company_name, symbol, isin)
             if not ticker:
                 logger.warning("Could not find ticker for %s", company_id)
-                return []
-            
-            logger.info("Fetching public ESG data for ticker: %s", ticker)
-            stock = yf.Ticker(ticker)
-            
-            # Get sustainability data
-            sustainability = stock.sustainability
-            if sustainability is None or sustainability.empty:
+            tickers[company_id] = ticker
+
+        payloads: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        for ticker in dict.fromkeys(t for t in tickers.values() if t):
+            cached = self.cache.get(ticker)
+            if cached is None:
+                missing.append(ticker)
+                self.metrics.inc("brsr_cache_requests_total", cache="public_esg", result="miss")
+            else:
+                payloads[ticker] = cached
+                self.metrics.inc("brsr_cache_requests_total", cache="public_esg", result="hit")
+
+        source = "public_api"
+        if missing:
+            provider = self.provider
+            if provider is None:
+                logger.warning("yfinance not available for public ESG data fallback")
+            else:
+                source = provider.source
+                logger.info("Fetching public ESG data for %d ticker(s)", len(missing))
+                try:
+                    fetched = provider.fetch_many(missing)
+                except Exception as exc:  # noqa: BLE001
+                    logger.error("Failed to fetch public ESG data: %s", exc)
+                    fetched = {}
+                for ticker in missing:
+                    payload = fetched.get(ticker)
+                    if payload is None:
+                        continue  # Provider failure; don't cache so it is retried
+                    self.cache.put(ticker, payload)
+                    payloads[ticker] = payload
+
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        for company_id, ticker in tickers.items():
+            facts = payload_to_facts(payloads.get(ticker, {}), source) if ticker else []
+            if ticker and not facts:
                 logger.warning("No sustainability data available for %s", ticker)
-                return []
-            
-            # Convert to fact-like structure
-            facts = []
-            for index, value in sustainability.items():
-                if pd.notna(value):
-                    facts.append({
-                        "local_name": str(index),
-                        "value": str(value),
-                        "unit": None,
-                        "source": "yahoo_finance"
-                    })
-            
-            logger.info("Fetched %d ESG metrics from public sources", len(facts))
-            return facts
-            
-        except Exception as exc:
-            logger.error("Failed to fetch public ESG data: %s", exc)
-            return []
+            results[company_id] = facts
+        return results
     
-    @staticmethod
-    def _find_ticker(company_id: str, company_name: str) -> Optional[str]:
-        """Try to find NSE ticker from company info."""
-        # This is a simplified version - in production, you'd maintain a CIN-to-ticker mapping
-        # For now, we'll try common patterns
-        if company_name:
-            # Try searching by company name
-            try:
-                search_results = yf.Ticker(company_name.split()[0] + ".NS")
-                if search_results.info:
-                    return company_name.split()[0] + ".NS"
-            except:
-                pass
-        return None
+    def _find_ticker(
+        self,
+        company_id: str,
+        company_name: str = "",
+        symbol: Optional[str] = None,
+        isin: Optional[str] = None,
+    ) -> Optional[str]:
+        """Resolve a Yahoo Finance ticker from the local index (no network access)."""
+        symbol = symbol or self.ticker_index.resolve(
+            cin=company_id, isin=isin, company_name=company_name
+        )
+        return yahoo_ticker(symbol) if symbol else None
 
 
 # -------------------------------------------------------------------
@@ -425,9 +661,16 @@ class MetricMapper:
         self.config = config
         self.mapping: Dict[str, Dict[str, Any]] = {}
         self.alternative_names: Dict[str, str] = {}
-        self.taxonomy_labels: Dict[str, str] = {}
+        self.version_overrides: Dict[str, Dict[str, Any]] = {}
+        self.sources = frozenset(config.mapping_sources)
         self._load_mapping()
-        self._load_taxonomy_labels()
+        self.taxonomies = TaxonomyRegistry(
+            config.taxonomy_dirs,
+            cache_dir=config.cache_dir,
+            capacity=config.taxonomy_cache_size,
+            overrides=self.version_overrides,
+        )
+        self._concept_filters: Dict[Optional[str], ConceptFilter] = {}
 
     def _load_mapping(self) -> None:
         """Load taxonomy mapping from JSON file."""
@@ -447,119 +690,136 @@ class MetricMapper:
                     self.mapping[local_name] = details
             
             self.alternative_names = data.get("alternative_names", {})
+            # Per taxonomy version: local name -> curated name (or full details)
+            self.version_overrides = data.get("version_overrides", {})
             
             logger.info("Loaded %d curated mappings", len(self.mapping))
             
         except Exception as exc:
             logger.error("Failed to load taxonomy mapping: %s", exc)
 
-    def _load_taxonomy_labels(self) -> None:
-        """Load official taxonomy labels from the Taxonomy_BRSR folder."""
-        # Path determined from user request/file structure
-        # Taxonomy_BRSR/core/in-capmkt-lab.xml
-        lab_path = Path("Taxonomy_BRSR/core/in-capmkt-lab.xml")
-        
-        if not lab_path.exists():
-            logger.warning("Taxonomy label file not found: %s", lab_path)
-            return
-
-        try:
-            tree = etree.parse(str(lab_path))
-            root = tree.getroot()
-            
-            # Namespaces likely needed for finding elements, but lxml local-name() is easier
-            # XML Structure:
-            # <link:loc xlink:href="in-capmkt.xsd#in-capmkt_ScripCode" xlink:label="ScripCode" ... />
-            # <link:labelArc ... xlink:from="ScripCode" xlink:to="label_ScripCode" ... />
-            # <link:label ... xlink:label="label_ScripCode" ... >Scrip code</link:label>
-
-            # Map label_id -> Label Text
-            label_map = {}
-            ns = {"link": "http://www.xbrl.org/2003/linkbase"}
-            
-            # Extract all labels
-            for label_node in root.findall(".//link:label", ns):
-                label_id = label_node.get("{http://www.w3.org/1999/xlink}label")
-                text = label_node.text
-                if label_id and text:
-                    label_map[label_id] = text.strip()
-
-            # Map locators to labels via arcs
-            # 1. Map ConceptName (from loc) -> LabelID (from arc)
-            
-            # First, build local_name -> label_id map from arcs? 
-            # Actually, arcs map from "loc label" to "resource label".
-            # loc has: href="...#in-capmkt_ScripCode" label="ScripCode"
-            # arc has: from="ScripCode" to="label_ScripCode"
-            # label has: label="label_ScripCode" text="Scrip code"
-            
-            # Let's build map: ArcFrom -> ArcTo
-            arc_map = {}
-            for arc in root.findall(".//link:labelArc", ns):
-                frm = arc.get("{http://www.w3.org/1999/xlink}from")
-                to = arc.get("{http://www.w3.org/1999/xlink}to")
-                if frm and to:
-                    arc_map[frm] = to
-            
-            # Now iterate locators to connect ElementName -> LabelText
-            count = 0
-            for loc in root.findall(".//link:loc", ns):
-                href = loc.get("{http://www.w3.org/1999/xlink}href")
-                loc_label = loc.get("{http://www.w3.org/1999/xlink}label")
-                
-                if href and "#" in href:
-                    # Parse element name from href, e.g. "in-capmkt.xsd#in-capmkt_ScripCode"
-                    elem_id = href.split("#")[1]
-                    # Usually "Prefix_Name", we want "Name" if prefix matches standard
-                    # But extraction logic uses local_name. 
-                    # If href is "in-capmkt.xsd#in-capmkt_ScripCode", local_name is "ScripCode" (usually)
-                    
-                    # Remove "in-capmkt_" prefix if present to get clean local_name
-                    clean_name = elem_id.replace("in-capmkt_", "")
-                    
-                    if loc_label in arc_map:
-                        target_label_id = arc_map[loc_label]
-                        if target_label_id in label_map:
-                            self.taxonomy_labels[clean_name] = label_map[target_label_id]
-                            count += 1
-            
-            logger.info("Loaded %d taxonomy labels from %s", count, lab_path)
-            
-        except Exception as exc:
-            logger.error("Failed to parse taxonomy labels: %s", exc)
-
-    def map_fact(self, fact: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    @property
+    def default_taxonomy(self) -> Optional[CompiledTaxonomy]:
+        """Taxonomy used when a filing's namespace is unknown (``taxonomy_expected``)."""
+        return self.taxonomies.get(self.config.taxonomy_expected)
+
+    def taxonomy_for(self, content: bytes) -> Optional[CompiledTaxonomy]:
+        """Return the compiled taxonomy matching the namespace a filing declares."""
+        namespace = detect_namespace(content)
+        return self.taxonomies.get(namespace or self.config.taxonomy_expected)
+
+    @property
+    def taxonomy_labels(self) -> Dict[str, str]:
+        """Concept labels of the default taxonomy."""
+        taxonomy = self.default_taxonomy
+        return taxonomy.labels if taxonomy is not None else {}
+
+    def map_fact(
+        self, fact: Dict[str, Any], taxonomy: Optional[CompiledTaxonomy] = None
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
         """Return standardized indicator_name and metadata for a fact or None if not mapped."""
-        local_name = fact.get("local_name", "")
-        
-        # 1. Try curated JSON mapping (highest priority)
-        if local_name in self.mapping:
-            meta = self.mapping[local_name].copy()
-            meta["mapping_source"] = "curated"
-            return self.mapping[local_name]["indicator_name"], meta
-        
-        # 2. Try alternative names from JSON
-        if local_name in self.alternative_names:
-            canonical_name = self.alternative_names[local_name]
-            if canonical_name in self.mapping:
-                meta = self.mapping[canonical_name].copy()
+        return self.map_local_name(fact.get("local_name", ""), taxonomy)
+
+    def map_facts(
+        self, facts: FactTable, taxonomy: Optional[CompiledTaxonomy] = None
+    ) -> List[Optional[Tuple[str, Dict[str, Any]]]]:
+        """Map every distinct local name of a fact table once.
+
+        Returns a list indexed by ``facts.local_names`` symbol id.
+        """
+        taxonomy = taxonomy or self.default_taxonomy
+        return [self.map_local_name(name, taxonomy) for name in facts.local_names.symbols]
+
+    @property
+    def concept_filter(self) -> ConceptFilter:
+        """Concepts of interest for filings in the default taxonomy."""
+        return self.concept_filter_for(self.default_taxonomy)
+
+    def concept_filter_for(self, taxonomy: Optional[CompiledTaxonomy]) -> ConceptFilter:
+        """Concepts of interest for the parsers, compiled from the enabled mapping sources.
+
+        The "taxonomy" source maps every labelled concept of the release, so
+        with it enabled the filter only rejects concepts outside the taxonomy.
+        Parse-time pruning pays off in runs without it, e.g.
+        ``("curated", "partial")``.
+        """
+        key = taxonomy.version if taxonomy is not None else None
+        concepts = self._concept_filters.get(key)
+        if concepts is None:
+            exact: List[str] = []
+            if "curated" in self.sources:
+                exact.extend(self.mapping)
+                exact.extend(self.alternative_names)
+                if taxonomy is not None:
+                    exact.extend(taxonomy.overrides)
+            if "taxonomy" in self.sources and taxonomy is not None:
+                exact.extend(taxonomy.labels)
+            if self.config.calculation_checks and taxonomy is not None:
+                # Keep unmapped calculation items so their totals can be checked
+                exact.extend(calculation_concepts(taxonomy.calculations))
+            if self.config.reconstruct_tables and taxonomy is not None:
+                exact.extend(taxonomy.tables.concepts())
+            if self.config.text_index and taxonomy is not None:
+                exact.extend(name for name, data_type in taxonomy.types.items() if data_type == "string")
+            if self.config.physical_risk:
+                from climate_risk import ADDRESS_CONCEPTS
+
+                exact.extend(ADDRESS_CONCEPTS)
+            partial = list(self.mapping) if "partial" in self.sources else []
+            concepts = self._concept_filters[key] = ConceptFilter(exact, partial)
+        return concepts
+
+    def map_local_name(
+        self, local_name: str, taxonomy: Optional[CompiledTaxonomy] = None
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Return standardized indicator_name and metadata for a concept local name.
+
+        ``taxonomy`` supplies version-specific overrides, labels and data
+        types; it defaults to the ``taxonomy_expected`` release.
+        """
+        if taxonomy is None:
+            taxonomy = self.default_taxonomy
+        if "curated" in self.sources:
+            # 0. Version-specific overrides (concept renamed in this release)
+            override = taxonomy.overrides.get(local_name) if taxonomy is not None else None
+            if isinstance(override, str) and override in self.mapping:
+                meta = self.mapping[override].copy()
+                meta["mapping_source"] = "curated"
+                return meta["indicator_name"], meta
+            if isinstance(override, dict):
+                meta = dict(override, mapping_source="curated")
+                return meta["indicator_name"], meta
+
+            # 1. Try curated JSON mapping (highest priority)
+            if local_name in self.mapping:
+                meta = self.mapping[local_name].copy()
                 meta["mapping_source"] = "curated"
-                return self.mapping[canonical_name]["indicator_name"], meta
+                return self.mapping[local_name]["indicator_name"], meta
+            
+            # 2. Try alternative names from JSON
+            if local_name in self.alternative_names:
+                canonical_name = self.alternative_names[local_name]
+                if canonical_name in self.mapping:
+                    meta = self.mapping[canonical_name].copy()
+                    meta["mapping_source"] = "curated"
+                    return self.mapping[canonical_name]["indicator_name"], meta
 
         # 3. Try official taxonomy label (fallback)
-        if local_name in self.taxonomy_labels:
+        if "taxonomy" in self.sources and taxonomy is not None and local_name in taxonomy.labels:
             # Construct a minimal metadata dict
-            indicator_name = self.taxonomy_labels[local_name]
+            indicator_name = taxonomy.labels[local_name]
             # Heuristic: If indicator name sounds like a header/abstract, we might want to skip or mark it
             # But for now we return it.
             return indicator_name, {
                 "indicator_name": indicator_name,
-                "data_type": "string", # Default to string as we don't know type from label linkbase
+                "data_type": taxonomy.data_type(local_name),  # From the concept's item type
                 "unit": None,
                 "mapping_source": "taxonomy"
             }
         
         # 4. Try partial matching for curated mapping (lowest priority)
+        if "partial" not in self.sources:
+            return None
         for mapped_name, details in self.mapping.items():
             if mapped_name.lower() in local_name.lower() or local_name.lower() in mapped_name.lower():
                 logger.debug("Partial match: %s -> %s", local_name, mapped_name)
@@ -647,6 +907,24 @@ class DataQualityScorer:
         
         return max(0, min(100, score))
 
+    # Corpus-level plausibility penalties (see quality.CorpusQualityChecker)
+    OUTLIER_PENALTY = 15
+    SECTOR_OUTLIER_PENALTY = 10
+    MAGNITUDE_PENALTY = 30
+    # Filing-level penalty for a total that disagrees with its calculation items
+    CALCULATION_PENALTY = 20
+
+    def apply_penalties(self, scores: Any, outlier: Any, sector_outlier: Any, magnitude: Any) -> Any:
+        """Fold corpus-level flags (boolean arrays) into a batch of scores, vectorized."""
+        import numpy as np
+
+        penalty = (
+            self.OUTLIER_PENALTY * np.asarray(outlier, dtype=np.int64)
+            + self.SECTOR_OUTLIER_PENALTY * np.asarray(sector_outlier, dtype=np.int64)
+            + self.MAGNITUDE_PENALTY * np.asarray(magnitude, dtype=np.int64)
+        )
+        return np.clip(np.asarray(scores, dtype=np.int64) - penalty, 0, 100)
+
 
 # -------------------------------------------------------------------
 # Main orchestrator
@@ -658,158 +936,558 @@ class BRSRExtractor:
     def __init__(self, config: Optional[ParserConfig] = None) -> None:
         self.config = config or ParserConfig()
         self.fetcher = XbrlFetcher(self.config)
-        self.mapper = MetricMapper(self.config)
         self.scorer = DataQualityScorer(self.config.data_quality_base)
-        
-        self.arelle_parser = None
-        if self.config.enable_arelle and ARELLE_AVAILABLE:
-            self.arelle_parser = BRSRParserArelle(self.config)
-        
         self.lxml_parser = BRSRParserLxml(self.config)
-        self.public_data_fetcher = PublicESGDataFetcher(self.config)
-        self._load_company_db()
+        self.metrics = ExtractorMetrics()
+        # The mapper, Arelle parser, public data fetcher and company registry
+        # are comparatively expensive and are built on first use.
+
+    @cached_property
+    def mapper(self) -> MetricMapper:
+        """Taxonomy mapper (loads the mapping JSON; taxonomies compile on first use)."""
+        mapper = MetricMapper(self.config)
+        mapper.taxonomies.metrics = self.metrics
+        return mapper
+
+    @cached_property
+    def arelle_parser(self) -> Optional[BRSRParserArelle]:
+        """Arelle parser, or None when disabled or unavailable."""
+        if not self.config.enable_arelle:
+            return None
+        if not ARELLE_AVAILABLE:
+            logger.warning("Arelle not available. Install with: pip install arelle-release")
+            return None
+        try:
+            return BRSRParserArelle(self.config)
+        except ImportError as exc:
+            logger.warning("%s", exc)
+            return None
+
+    @cached_property
+    def public_data_fetcher(self) -> PublicESGDataFetcher:
+        """Public ESG data fallback fetcher."""
+        return PublicESGDataFetcher(self.config, metrics=self.metrics)
+
+    @cached_property
+    def quality_checker(self) -> Optional[CorpusQualityChecker]:
+        """Corpus-level plausibility checker, or None unless ``corpus_quality_checks`` is set."""
+        if not self.config.corpus_quality_checks:
+            return None
+        from quality import CorpusQualityChecker
+
+        return CorpusQualityChecker(
+            scorer=self.scorer,
+            path=self.config.quality_stats_path or str(Path(self.config.cache_dir) / "quality_distributions.npz"),
+            min_samples=self.config.quality_min_samples,
+            metrics=self.metrics,
+        )
 
-    def _load_company_db(self) -> None:
-        """Load company details from Insider_Trading.csv."""
-        self.company_url_map = {}
-        self.company_id_map = {}
+    @cached_property
+    def unit_normalizer(self) -> Optional[UnitNormalizer]:
+        """Canonical unit converter, or None unless ``normalize_units`` is set."""
+        if not self.config.normalize_units:
+            return None
+        from units import UnitNormalizer
+
+        expected_units = {
+            details["indicator_name"]: details.get("unit")
+            for details in self.mapper.mapping.values() if "indicator_name" in details
+        }
+        return UnitNormalizer(expected_units=expected_units, metrics=self.metrics)
+
+    @cached_property
+    def peer_index(self) -> Optional[PeerIndex]:
+        """Sector peer percentile index, or None unless ``peer_benchmarks`` is set."""
+        if not self.config.peer_benchmarks:
+            return None
+        from peers import PeerIndex
+
+        return PeerIndex.load(self.peer_index_path)
+
+    @property
+    def peer_index_path(self) -> str:
+        return self.config.peer_index_path or str(Path(self.config.cache_dir) / "peer_index.pkl")
+
+    @cached_property
+    def text_index(self) -> Optional[TextIndex]:
+        """Full-text index of narrative facts, or None unless ``text_index`` is set."""
+        if not self.config.text_index:
+            return None
+        from text_index import TextIndex
+
+        return TextIndex(self.config.text_index_path or str(Path(self.config.cache_dir) / "text_index.sqlite"))
+
+    @cached_property
+    def physical_risk(self) -> Optional[PhysicalRiskOverlay]:
+        """CLIMADA tropical-cyclone overlay, or None unless ``physical_risk`` is set and data is available."""
+        if not self.config.physical_risk:
+            return None
+        if not H5PY_AVAILABLE:
+            logger.warning("h5py not available; physical risk indicators disabled. Install with: pip install h5py")
+            return None
+        from climate_risk import PhysicalRiskOverlay
+
+        data_dir = Path(self.config.climada_data_dir)
+        hazard_path = self.config.hazard_path or next(
+            iter(sorted((data_dir / "hazard" / "tropical_cyclone").rglob("*.hdf5"))), None)
+        if hazard_path is None:
+            logger.warning("No tropical-cyclone hazard file under %s; physical risk indicators disabled", data_dir)
+            return None
         try:
-            csv_path = Path("Insider_Trading.csv")
-            if not csv_path.exists():
-                logger.warning("Insider_Trading.csv not found, company lookup disabled")
-                return
-            
-            df = pd.read_csv(csv_path)
-            # Map URL -> Company Name
-            if "XBRL" in df.columns and "COMPANY" in df.columns:
-                self.company_url_map = pd.Series(df.COMPANY.values, index=df.XBRL).to_dict()
-            
-            # Map Company ID (refined) -> Company Name
-            if "Company ID" in df.columns and "COMPANY" in df.columns:
-                self.company_id_map = pd.Series(df.COMPANY.values, index=df["Company ID"]).to_dict()
-                
-            logger.info("Loaded company database: %d URLs, %d IDs", 
-                       len(self.company_url_map), len(self.company_id_map))
-        except Exception as e:
-            logger.error("Failed to load company database: %s", e)
+            return PhysicalRiskOverlay(
+                str(hazard_path),
+                self.config.impact_function_path or str(data_dir / "tc_impf_cal_v01_RMSF.csv"),
+                region=self.config.impact_function_region,
+                cache_dir=self.config.cache_dir,
+                max_km=self.config.snap_max_km,
+                locations_path=self.config.company_locations_path,
+            )
+        except (OSError, ValueError) as exc:
+            logger.warning("Physical risk indicators disabled: %s", exc)
+            return None
+
+    @cached_property
+    def fact_hashes(self) -> FactHashStore:
+        """Per-filing fact digests; written only when ``store_fact_hashes`` is set."""
+        from revisions import FactHashStore
+
+        return FactHashStore(self.config.fact_hash_dir or str(Path(self.config.cache_dir) / "fact_hashes"))
 
-    def process_url(self, url: str) -> List[ESGRecord]:
-        """Process single XBRL URL and return ESG records."""
+    @cached_property
+    def flight_recorder(self) -> Optional[FlightRecorder]:
+        """Slow-filing profiler, or None unless ``profile_slow_filings`` is set."""
+        if not self.config.profile_slow_filings:
+            return None
+        return FlightRecorder(
+            self.config.profile_dir or str(Path(self.config.output_dir) / "profiles"),
+            latency_threshold=self.config.profile_latency_threshold,
+            memory_threshold_mb=self.config.profile_memory_threshold_mb,
+            sample_interval=self.config.profile_sample_interval,
+            trace_memory=self.config.profile_trace_memory,
+        )
+
+    @cached_property
+    def company_registry(self) -> CompanyRegistry:
+        """Shared, indexed company registry built from Insider_Trading.csv."""
+        return load_company_registry(self.config.company_db_path, self.config.cache_dir)
+
+    def process_url(self, url: str, raise_errors: bool = False) -> List[ESGRecord]:
+        """Process single XBRL URL and return ESG records.
+
+        Fetch and parse failures are logged and yield no records (after the
+        public data fallback); with ``raise_errors`` they raise ``FetchError``
+        / ``ParseError`` instead, so callers such as queue workers can retry.
+        """
         logger.info("=" * 80)
         logger.info("Processing XBRL URL: %s", url)
         logger.info("=" * 80)
         
         try:
-            content = self.fetcher.fetch(url)
+            with self.metrics.time("fetch"):
+                content = self.fetcher.fetch(url)
         except FetchError as exc:
             logger.error("Failed to fetch %s: %s", url, exc)
+            self.metrics.inc("brsr_filings_total", outcome="fetch_failed")
+            if raise_errors:
+                raise
             return []
 
-        return self.process_content(content, source_name=url, url=url)
+        self.metrics.inc("brsr_bytes_fetched_total", len(content))
+        return self.process_content(content, source_name=url, url=url, raise_errors=raise_errors)
+
+    def scan_header(self, url: str) -> Optional[FilingHeader]:
+        """Pre-scan a remote filing (CIN, period, taxonomy) without downloading all of it."""
+        try:
+            with self.metrics.time("prescan"):
+                head, total = self.fetcher.fetch_head(url, self.config.header_scan_bytes)
+        except (FetchError, ValidationError) as exc:
+            logger.warning("Header pre-scan failed for %s: %s", url, exc)
+            return None
+        self.metrics.inc("brsr_bytes_fetched_total", len(head), kind="header")
+        return scan_header(head, source=url, max_bytes=self.config.header_scan_bytes, content_length=total)
+
+    def plan_urls(self, urls: Iterable[str], processed: Container[str] = ()) -> List[str]:
+        """Pre-scan URLs and return the work queue: new filings only, latest revision
+        per company and period, grouped by taxonomy release.
+
+        ``processed`` holds ``FilingHeader.key`` values of filings already stored.
+        URLs whose header cannot be read are kept and queued last.
+        """
+        return self._plan(urls, processed)[0]
+
+    def _plan(self, urls: Iterable[str], processed: Container[str] = ()) -> Tuple[List[str], Dict[str, str]]:
+        """``plan_urls``, plus each planned URL's header key."""
+        headers: List[FilingHeader] = []
+        unscanned: List[str] = []
+        for url in urls:
+            header = self.scan_header(url)
+            if header is None:
+                unscanned.append(url)
+            else:
+                headers.append(header)
+        queue = plan_filings(headers, processed)
+        logger.info("Planned %d of %d filings (%d skipped or superseded)",
+                    len(queue) + len(unscanned), len(headers) + len(unscanned),
+                    len(headers) - len(queue))
+        keys = {header.source: header.key for header in queue if header.key}
+        return [header.source for header in queue] + unscanned, keys
+
+    def _planned(
+        self, sources: Iterable[Any], method: str, checkpoint: Optional[RunCheckpoint] = None
+    ) -> Tuple[Iterable[Any], Dict[str, str]]:
+        """Apply ``plan_filings`` to a URL batch: (sources to process, source -> header key).
+
+        Filings whose key a checkpoint already holds are skipped.
+        """
+        if not self.config.plan_filings or method != "process_url":
+            return sources, {}
+        return self._plan(sources, checkpoint.processed_keys() if checkpoint is not None else ())
+
+    def _run_checkpointed(
+        self, checkpoint: RunCheckpoint, sources: Iterable[Any], method: str, workers: Optional[int]
+    ) -> None:
+        """Process sources not yet in the checkpoint, committing each filing as it finishes."""
+        sources, keys = self._planned(sources, method, checkpoint)
+        for url, records, error in self.process_many(_skip_checkpointed(sources, checkpoint), method, workers):
+            if records is None:
+                checkpoint.fail(url, error or "")
+            else:
+                checkpoint.commit(url, records, key=keys.get(str(url)))
 
     def _resolve_company_name(self, current_name: str, url: Optional[str], source_name: str) -> str:
         """Resolve company name from CSV fallback if unknown."""
         if current_name and current_name.lower() != "unknown":
             return current_name
 
-        # Try URL match
-        if url and url in self.company_url_map:
-            logger.info("Found company name from URL mapping: %s", self.company_url_map[url])
-            return self.company_url_map[url]
-
-        # Try ID match from source_name/filename
-        # Logic: Extract filename stem -> check map
-        try:
-            filename = Path(source_name).stem
-            # Common pattern in CSV: BRSR_1467735_17062025071711
-            if filename in self.company_id_map:
-                logger.info("Found company name from ID mapping: %s", self.company_id_map[filename])
-                return self.company_id_map[filename]
-            
-            # Try partial match (sometimes filename has extra tags)
-            for cid, name in self.company_id_map.items():
-                if cid in filename:
-                    logger.info("Found company name from partial ID mapping: %s", name)
-                    return name
-        except Exception:
-            pass
+        # Exact URL match, then the BRSR_<filing>_<timestamp> ID embedded in the name
+        entry = None
+        if url:
+            entry = self.company_registry.lookup_url(url)
+        if entry is None:
+            entry = self.company_registry.lookup_source(source_name)
+        if entry is not None and entry.company_name:
+            self.metrics.inc("brsr_cache_requests_total", cache="company_registry", result="hit")
+            logger.info("Found company name from registry: %s", entry.company_name)
+            return entry.company_name
+        self.metrics.inc("brsr_cache_requests_total", cache="company_registry", result="miss")
 
         return current_name or "Unknown"
 
-    def process_content(self, content: bytes, source_name: str, url: Optional[str] = None) -> List[ESGRecord]:
+    def process_content(
+        self, content: bytes, source_name: str, url: Optional[str] = None, raise_errors: bool = False
+    ) -> List[ESGRecord]:
         """Process XBRL content (bytes) and return ESG records."""
-        company_id: str = ""
-        company_name: str = ""
-        year: int = 0
-        raw_facts: List[Dict[str, Any]]
-        data_source = "xbrl"
-
-        # Try Arelle first
+        recorder = self.flight_recorder
+        if recorder is None:
+            return self._process_content(content, source_name, url, raise_errors)
+        with recorder.record(source_name, url=url, content_bytes=len(content)):
+            return self._process_content(content, source_name, url, raise_errors)
+
+    def _parse(
+        self, content: bytes, concepts: Optional[ConceptFilter] = None
+    ) -> Tuple[str, str, int, FactTable]:
+        """Parse a filing with Arelle, falling back to lxml; raises the last parser's error."""
         if self.arelle_parser is not None:
             try:
-                model_xbrl = self.arelle_parser.parse_bytes(content)
-                company_id, company_name, year = self.arelle_parser.extract_company_and_year(model_xbrl)
-                raw_facts = self.arelle_parser.extract_facts(model_xbrl)
+                with self.metrics.time("parse", parser="arelle"):
+                    model_xbrl = self.arelle_parser.parse_bytes(content)
+                    company_id, company_name, year = self.arelle_parser.extract_company_and_year(model_xbrl)
+                    raw_facts = self.arelle_parser.extract_facts(model_xbrl, concepts)
                 logger.info("✓ Parsed with Arelle for %s (%d facts)", company_id, len(raw_facts))
+                return company_id, company_name, year, raw_facts
             except (ParseError, ValidationError) as exc:
                 logger.warning("Arelle parsing failed, trying lxml fallback: %s", exc)
-                try:
-                    company_id, company_name, year, raw_facts = self.lxml_parser.extract_facts(content)
-                    logger.info("✓ Parsed with lxml fallback for %s (%d facts)", company_id, len(raw_facts))
-                except (ParseError, ValidationError) as exc2:
-                    logger.error("Both Arelle and lxml parsing failed: %s", exc2)
-                    if self.config.enable_public_data_fallback and url:
-                        logger.info("Attempting public ESG data fallback...")
-                        return self._fallback_to_public_data(url)
-                    return []
-        else:
-            try:
-                company_id, company_name, year, raw_facts = self.lxml_parser.extract_facts(content)
-                logger.info("✓ Parsed with lxml for %s (%d facts)", company_id, len(raw_facts))
-            except (ParseError, ValidationError) as exc:
-                logger.error("lxml parsing failed: %s", exc)
-                if self.config.enable_public_data_fallback and url:
-                    logger.info("Attempting public ESG data fallback...")
-                    return self._fallback_to_public_data(url)
-                return []
+                self.metrics.inc("brsr_fallbacks_total", kind="lxml")
+        with self.metrics.time("parse", parser="lxml"):
+            company_id, company_name, year, raw_facts = self.lxml_parser.extract_facts(content, concepts)
+        logger.info("✓ Parsed with lxml for %s (%d facts)", company_id, len(raw_facts))
+        return company_id, company_name, year, raw_facts
+
+    def extract_tables(self, content: bytes, source_name: str = "") -> List[DisclosureTable]:
+        """Rebuild a filing's BRSR disclosure tables (see ``tables.py``)."""
+        taxonomy = self.mapper.taxonomy_for(content)
+        if taxonomy is None:
+            logger.warning("No taxonomy found for %s; cannot rebuild tables", source_name or "filing")
+            return []
+        _, _, _, facts = self._parse(content, ConceptFilter(taxonomy.tables.concepts()))
+        with self.metrics.time("tables"):
+            return taxonomy.tables.reconstruct(facts)
 
+    def _write_tables(self, facts: FactTable, taxonomy: Optional[CompiledTaxonomy], source_name: str) -> None:
+        if taxonomy is None:
+            return
+        with self.metrics.time("tables"):
+            tables = taxonomy.tables.reconstruct(facts)
+        out_dir = Path(self.config.output_dir) / "tables"
+        out_dir.mkdir(parents=True, exist_ok=True)
+        path = out_dir / f"{filing_id_for(source_name)}.json"
+        tmp = path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump([table.to_dict(taxonomy.labels) for table in tables], f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+        logger.info("Wrote %d disclosure tables to %s", len(tables), path)
+
+    def _store_digest(self, facts: FactTable, source_name: str) -> FactDigest:
+        from revisions import digest_facts
+
+        with self.metrics.time("digest"):
+            digest = digest_facts(facts, source_name)
+        self.fact_hashes.put(filing_id_for(source_name), digest)
+        return digest
+
+    def digest_content(self, content: bytes, source_name: str) -> FactDigest:
+        """Parse a filing and hash all of its facts (see ``revisions.py``)."""
+        from revisions import digest_facts
+
+        _, _, _, facts = self._parse(content)
+        if self.config.store_fact_hashes:
+            return self._store_digest(facts, source_name)
+        with self.metrics.time("digest"):
+            return digest_facts(facts, source_name)
+
+    def fact_digest(self, source: str, allow_files: bool = True) -> FactDigest:
+        """Fact digest of an instance file, a URL, or a filing ID in the fact hash store.
+
+        Stored digests are used for filing IDs and for URLs processed with
+        ``store_fact_hashes``, so those filings are not fetched or parsed again.
+        ``allow_files=False`` refuses local paths (for sources from the web app).
+        """
+        if allow_files and os.path.isfile(source):
+            return self.digest_content(Path(source).read_bytes(), source)
+        is_url = source.lower().startswith(("http://", "https://"))
+        stored = self.fact_hashes.get(filing_id_for(source))
+        if stored is not None and (stored.source == source or not is_url):
+            self.metrics.inc("brsr_cache_requests_total", cache="fact_hashes", result="hit")
+            return stored
+        self.metrics.inc("brsr_cache_requests_total", cache="fact_hashes", result="miss")
+        if not is_url:
+            raise ValidationError(f"Not a file, URL or stored filing ID: {source}")
+        with self.metrics.time("fetch"):
+            content = self.fetcher.fetch(source)
+        self.metrics.inc("brsr_bytes_fetched_total", len(content))
+        return self.digest_content(content, source)
+
+    def diff_filings(self, old: str, new: str) -> FilingDiff:
+        """Facts added, removed and changed between two submissions of a filing."""
+        from revisions import diff_digests
+
+        old_digest, new_digest = self.fact_digest(old), self.fact_digest(new)
+        with self.metrics.time("diff"):
+            return diff_digests(old_digest, new_digest)
+
+    def _process_content(
+        self, content: bytes, source_name: str, url: Optional[str] = None, raise_errors: bool = False
+    ) -> List[ESGRecord]:
+        """Parse, map and score one filing's content."""
+        data_source = "xbrl"
+        # Dispatch on the taxonomy release the filing declares
+        taxonomy = self.mapper.taxonomy_for(content)
+        prune = self.config.prune_unmapped_facts and not self.config.store_fact_hashes
+        concepts = self.mapper.concept_filter_for(taxonomy) if prune else None
+
+        try:
+            company_id, company_name, year, raw_facts = self._parse(content, concepts)
+        except (ParseError, ValidationError) as exc:
+            logger.error("Parsing failed for %s: %s", source_name, exc)
+            records = self._handle_parse_failure(url)
+            if raise_errors and not records:
+                raise
+            return records
+
+        self.metrics.observe("brsr_facts_per_filing", len(raw_facts) + raw_facts.skipped)
+        if raw_facts.skipped:
+            self.metrics.inc("brsr_facts_pruned_total", raw_facts.skipped)
+
+        inconsistencies = self._check_calculations(raw_facts, taxonomy, company_id)
+        if self.config.store_fact_hashes:
+            self._store_digest(raw_facts, source_name)
+        if self.config.reconstruct_tables:
+            self._write_tables(raw_facts, taxonomy, source_name)
+
+        # The entity identifier is the CIN; the registry CSV has no CIN column
+        self.company_registry.record_cin(url or source_name, company_id)
         # Resolve company name if missing or unknown
         company_name = self._resolve_company_name(company_name, url, source_name)
+        if self.text_index is not None:
+            self._index_text(raw_facts, company_id, company_name, year, taxonomy, source_name)
 
         # Transform facts to ESG records
         records = self._transform_facts_to_records(
-            raw_facts, company_id, company_name, year, data_source
+            raw_facts, company_id, company_name, year, data_source, taxonomy=taxonomy,
+            inconsistent={(item.concept, item.context_id) for item in inconsistencies},
         )
+        if self.physical_risk is not None:
+            records.extend(self._physical_risk_records(raw_facts, company_id, company_name, year))
         
         logger.info("✓ Extracted %d ESG records for %s (year %d)", len(records), company_id, year)
+        self.metrics.inc("brsr_filings_total", outcome="ok")
+        self.metrics.inc("brsr_records_total", len(records))
         return records
 
+    def _index_text(
+        self,
+        facts: FactTable,
+        company_id: str,
+        company_name: str,
+        year: int,
+        taxonomy: Optional[CompiledTaxonomy],
+        source_name: str,
+    ) -> None:
+        """Add a filing's narrative facts to the full-text index.
+
+        Rows are keyed by the filing's year, so only facts of the reporting
+        period (the latest context period end) are indexed; prior-year
+        comparatives would otherwise overwrite the current text.
+        """
+        from text_index import is_narrative, plain_text
+
+        labels = taxonomy.labels if taxonomy is not None else {}
+        min_chars = self.config.text_index_min_chars
+        names = facts.local_names.symbols
+        contexts = facts.contexts.symbols
+        reporting_end = max(filter(None, facts.periods.values()), default=None)
+        rows = []
+        with self.metrics.time("text_index"):
+            for name_id, context_id, value in zip(facts.local_name_ids, facts.context_ids, facts.values):
+                name = names[name_id]
+                if value is None or (taxonomy is not None and taxonomy.data_type(name) != "string"):
+                    continue
+                period = facts.periods.get(contexts[context_id]) if context_id >= 0 else None
+                if period and period != reporting_end:
+                    continue
+                text = plain_text(value)
+                if not is_narrative(text, min_chars):
+                    continue
+                dims = facts.dimensions.get(contexts[context_id], ()) if context_id >= 0 else ()
+                rows.append((company_id, company_name, year, name, dimension_label(dims, labels),
+                             clean_label(labels[name]) if name in labels else None, text))
+            written = self.text_index.add(rows, source=source_name)
+        self.metrics.inc("brsr_text_facts_indexed_total", written)
+
+    def _physical_risk_records(
+        self, facts: FactTable, company_id: str, company_name: str, year: int
+    ) -> List[ESGRecord]:
+        """Tropical-cyclone indicators for the company's located sites."""
+        from datetime import datetime
+
+        from climate_risk import ADDRESS_CONCEPTS
+
+        names = facts.local_names.symbols
+        addresses = {names[name_id]: value for name_id, value in zip(facts.local_name_ids, facts.values)
+                     if value and names[name_id] in ADDRESS_CONCEPTS}
+        with self.metrics.time("physical_risk"):
+            assessment = self.physical_risk.assess(
+                company_id, [addresses[name] for name in ADDRESS_CONCEPTS if name in addresses])
+        if assessment is None:
+            self.metrics.inc("brsr_physical_risk_assessments_total", outcome="unlocated")
+            return []
+        self.metrics.inc("brsr_physical_risk_assessments_total", outcome=assessment.location_source)
+        timestamp = datetime.now().isoformat()
+        # Modelled exposure, not reported data: score below the filing's own facts
+        score = max(0, self.config.data_quality_base - 20)
+        return [
+            ESGRecord(
+                company_id=company_id,
+                company_name=company_name or "Unknown",
+                reporting_year=year,
+                indicator_name=name,
+                indicator_value=value,
+                value_unit=unit,
+                data_quality_score=score,
+                data_source=f"climada ({assessment.location_source})",
+                extraction_timestamp=timestamp,
+            )
+            for name, value, unit in assessment.indicators()
+        ]
+
+    def _check_calculations(
+        self, facts: FactTable, taxonomy: Optional[CompiledTaxonomy], company_id: str
+    ) -> List[CalculationInconsistency]:
+        """Check reported totals against the taxonomy's calculation networks."""
+        if not self.config.calculation_checks or taxonomy is None or not taxonomy.calculations:
+            return []
+        with self.metrics.time("calculations"):
+            inconsistencies = check_calculations(
+                facts, taxonomy.calculations, self.config.calculation_tolerance
+            )
+        for item in inconsistencies:
+            logger.warning(
+                "Calculation inconsistency for %s: %s = %s in context %s, items sum to %s",
+                company_id, item.concept, item.reported, item.context_id, item.computed,
+            )
+        if inconsistencies:
+            self.metrics.inc("brsr_calculation_inconsistencies_total", len(inconsistencies))
+        return inconsistencies
+
+    def _handle_parse_failure(self, url: Optional[str]) -> List[ESGRecord]:
+        """Fall back to public data (if enabled) after both parsers failed."""
+        if self.config.enable_public_data_fallback and url:
+            logger.info("Attempting public ESG data fallback...")
+            self.metrics.inc("brsr_fallbacks_total", kind="public_data")
+            records = self._fallback_to_public_data(url)
+            self.metrics.inc("brsr_filings_total", outcome="public_data" if records else "failed")
+            self.metrics.inc("brsr_records_total", len(records))
+            return records
+        self.metrics.inc("brsr_filings_total", outcome="failed")
+        return []
+
     def _transform_facts_to_records(
         self,
-        raw_facts: List[Dict[str, Any]],
+        raw_facts: Union[FactTable, Iterable[Dict[str, Any]]],
         company_id: str,
         company_name: str,
         year: int,
-        data_source: str
+        data_source: str,
+        taxonomy: Optional[CompiledTaxonomy] = None,
+        inconsistent: Container[Tuple[str, str]] = (),
     ) -> List[ESGRecord]:
-        """Transform raw facts into ESG records."""
+        """Transform raw facts (a FactTable or legacy fact dicts) into ESG records.
+
+        Facts whose (local name, context id) is in ``inconsistent`` are totals
+        that failed a calculation check and lose ``CALCULATION_PENALTY``.
+        """
         from datetime import datetime
         
         records: List[ESGRecord] = []
         timestamp = datetime.now().isoformat()
+        facts = as_fact_table(raw_facts)
         
-        for fact in raw_facts:
-            mapping_result = self.mapper.map_fact(fact)
+        # Stage timings are accumulated per filing to keep per-fact overhead low
+        clock = time.perf_counter
+        t0 = clock()
+        # Each distinct concept is mapped once; facts refer to it by symbol id
+        mappings = self.mapper.map_facts(facts, taxonomy)
+        map_s = clock() - t0
+        normalize_s = score_s = 0.0
+        units = facts.units.symbols
+        contexts = facts.contexts.symbols
+        names = facts.local_names.symbols
+        labels = taxonomy.labels if taxonomy is not None else {}
+        context_labels = {
+            context: dimension_label(dims, labels) for context, dims in facts.dimensions.items() if dims
+        }
+        
+        for name_id, unit_id, context_id, value in zip(
+            facts.local_name_ids, facts.unit_ids, facts.context_ids, facts.values
+        ):
+            mapping_result = mappings[name_id]
             if not mapping_result:
                 continue  # Skip unmapped facts
             
+            t1 = clock()
             indicator_name, metadata = mapping_result
             expected_type = metadata.get("data_type", "string")
             expected_unit = metadata.get("unit")
             
-            norm_value = self.mapper.normalize_value(str(fact.get("value", "")), expected_type)
-            unit = fact.get("unit") or expected_unit
-            dq_score = self.scorer.score(norm_value, unit, fact.get("context_id"), data_source)
+            norm_value = self.mapper.normalize_value("" if value is None else value, expected_type)
+            unit = (units[unit_id] if unit_id >= 0 else None) or expected_unit
+            t2 = clock()
+            normalize_s += t2 - t1
+            context = contexts[context_id] if context_id >= 0 else None
+            dq_score = self.scorer.score(norm_value, unit, context, data_source)
+            if inconsistent and (names[name_id], context) in inconsistent:
+                dq_score = max(0, dq_score - self.scorer.CALCULATION_PENALTY)
+            score_s += clock() - t2
             
             # Enrich data source info with mapping type
             record_source = data_source
@@ -828,25 +1506,36 @@ class BRSRExtractor:
                 value_unit=unit,
                 data_quality_score=dq_score,
                 data_source=record_source,
-                extraction_timestamp=timestamp
+                extraction_timestamp=timestamp,
+                dimensions=context_labels.get(context),
             ))
         
+        self.metrics.observe_stage("map", map_s)
+        self.metrics.observe_stage("normalize", normalize_s)
+        self.metrics.observe_stage("score", score_s)
         return records
 
     def _fallback_to_public_data(self, url: str) -> List[ESGRecord]:
         """Fallback to public ESG data sources when XBRL parsing fails."""
         logger.info("Using public ESG data fallback for %s", url)
         
-        # Extract company identifier from URL if possible
-        # Example: BRSR_1467735_17062025071711_WEB.xml -> CIN might be in filename
+        # Identify the company from the filing registry (URL or BRSR_<filing>_<ts> ID)
         from datetime import datetime
         
-        company_id = "UNKNOWN"
-        company_name = ""
-        year = datetime.now().year - 1  # Assume previous year
+        entry = self.company_registry.lookup_source(url)
+        if entry is not None:
+            company_id = entry.cin or entry.filing_id
+            company_name = entry.company_name
+            year = entry.year or datetime.now().year - 1
+            symbol = entry.symbol
+        else:
+            company_id = "UNKNOWN"
+            company_name = ""
+            year = datetime.now().year - 1  # Assume previous year
+            symbol = None
         
         # Try to fetch public data
-        public_facts = self.public_data_fetcher.fetch_esg_data(company_id, company_name)
+        public_facts = self.public_data_fetcher.fetch_esg_data(company_id, company_name, symbol=symbol)
         
         if not public_facts:
             logger.warning("No public ESG data available")
@@ -859,23 +1548,184 @@ class BRSRExtractor:
         
         return records
 
-    def process_urls(self, urls: Iterable[str]) -> pd.DataFrame:
-        """Process multiple XBRL URLs and return combined DataFrame."""
-        all_records: List[ESGRecord] = []
-        
-        for i, url in enumerate(urls, 1):
-            logger.info("\n[%d] Processing: %s", i, url)
+    def process_local(self, filing: LocalFiling) -> List[ESGRecord]:
+        """Process one local file or archive member and return ESG records."""
+        logger.info("Processing local filing: %s", filing.name)
+        with filing.open() as content:
+            self.metrics.inc("brsr_bytes_fetched_total", len(content), kind="local")
+            return self.process_content(content, source_name=filing.name)
+
+    def process_many(
+        self, sources: Iterable[Any], method: str = "process_url", workers: Optional[int] = None
+    ) -> Iterator[FilingResult]:
+        """Run ``self.<method>`` over sources and yield ``(str(source), records, error)`` per filing.
+
+        With ``workers`` (default ``isolation_workers``) above zero, filings run
+        in worker processes under ``filing_timeout``/``filing_max_rss_mb`` (see
+        ``isolation.py``) and results arrive in completion order; otherwise
+        they run here, in order.
+        """
+        workers = self.config.isolation_workers if workers is None else workers
+        if workers > 0:
+            from isolation import IsolatedExtractor, Quarantine
+
+            pool = IsolatedExtractor(
+                self.config,
+                workers=workers,
+                timeout=self.config.filing_timeout,
+                max_rss_mb=self.config.filing_max_rss_mb,
+                quarantine=Quarantine(self.config.quarantine_path
+                                      or str(Path(self.config.cache_dir) / "quarantine.ndjson")),
+                metrics=self.metrics,
+            )
+            yield from pool.imap(sources, method)
+            return
+        process = getattr(self, method)
+        for i, source in enumerate(sources, 1):
+            logger.info("\n[%d] Processing: %s", i, source)
+            try:
+                yield str(source), process(source), None
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Unexpected error processing %s: %s", source, exc, exc_info=True)
+                yield str(source), None, f"{type(exc).__name__}: {exc}"
+
+    def iter_records(
+        self,
+        urls: Iterable[str],
+        lookahead: Optional[int] = None,
+        transform: bool = True,
+        method: str = "process_url",
+        workers: Optional[int] = None,
+    ) -> Iterator[ESGRecord]:
+        """Stream ESG records for URLs lazily, filing by filing, in constant memory.
+
+        Up to ``lookahead`` (default ``stream_lookahead``) filings ahead of the
+        consumer are fetched, parsed and mapped (``process_url``) in background
+        threads, so downloads overlap processing while at most that many
+        filings' records are buffered.
+        With ``transform``, records pass through the record-stream stages
+        (unit normalization, corpus quality checks, peer index) on the way
+        out. With worker processes (``workers``/``isolation_workers``) or a
+        ``method`` other than ``process_url``, filings go through
+        ``process_many`` instead, which bounds in-flight filings to the pool.
+        """
+        workers = self.config.isolation_workers if workers is None else workers
+        if workers > 0 or method != "process_url":
+            records = self._iter_many_records(urls, method, workers)
+        else:
+            records = self._iter_url_records(urls, lookahead)
+        return self.transform_records(records) if transform else records
+
+    def iter_record_batches(self, urls: Iterable[str], batch_size: int = 1000, **kwargs: Any) -> Iterator[List[ESGRecord]]:
+        """Like ``iter_records``, in lists of ``batch_size`` records (the last may be shorter)."""
+        records = self.iter_records(urls, **kwargs)
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def transform_records(self, records: Iterable[ESGRecord]) -> Iterator[ESGRecord]:
+        """Apply the enabled record-stream stages to a stream of records."""
+        if self.unit_normalizer is not None:
+            records = self.unit_normalizer.apply_records(records)
+        if self.quality_checker is not None:
+            records = self.quality_checker.apply_records(records)
+        if self.peer_index is not None:
+            records = self.peer_index.apply_records(records)
+        return iter(records)
+
+    def _iter_many_records(self, sources: Iterable[Any], method: str, workers: int) -> Iterator[ESGRecord]:
+        for _, records, _ in self.process_many(sources, method, workers):
+            if records:
+                yield from records
+
+    def _iter_url_records(self, urls: Iterable[str], lookahead: Optional[int]) -> Iterator[ESGRecord]:
+        for url, processed in self._run_ahead(urls, lookahead):
             try:
-                records = self.process_url(url)
-                all_records.extend(records)
+                records = processed.result()
             except Exception as exc:  # noqa: BLE001
                 logger.error("Unexpected error processing %s: %s", url, exc, exc_info=True)
+                continue
+            yield from records
+
+    def _run_ahead(self, urls: Iterable[str], lookahead: Optional[int]) -> Iterator[Tuple[str, Future]]:
+        """Yield ``(url, future records)`` in order, keeping ``lookahead`` filings in flight."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        lookahead = max(1, self.config.stream_lookahead if lookahead is None else lookahead)
+        url_iter = iter(urls)
+        pending: Deque[Tuple[str, Future]] = deque()
+        with ThreadPoolExecutor(max_workers=lookahead, thread_name_prefix="brsr-lookahead") as pool:
+            try:
+                for url in islice(url_iter, lookahead):
+                    pending.append((url, pool.submit(self.process_url, url)))
+                while pending:
+                    url, processed = pending.popleft()
+                    # Wait for the oldest filing first so the window never exceeds lookahead
+                    processed.exception()
+                    for next_url in islice(url_iter, 1):
+                        pending.append((next_url, pool.submit(self.process_url, next_url)))
+                    yield url, processed
+            finally:
+                for _, processed in pending:
+                    processed.cancel()
+
+    def process_urls(self, urls: Iterable[str], resume: bool = False) -> pd.DataFrame:
+        """Process multiple XBRL URLs and return combined DataFrame.
+
+        With ``checkpoint_dir`` set, every finished filing is checkpointed and
+        the DataFrame is assembled from the checkpoint; ``resume=True``
+        continues an interrupted run, skipping filings already checkpointed.
+        """
+        return self._process_sources(urls, "process_url", None, resume)
+
+    def process_path(self, path: str, workers: Optional[int] = None, resume: bool = False) -> pd.DataFrame:
+        """Process every XBRL instance in a directory, archive or file and return combined DataFrame.
+
+        Members run in parallel worker processes (``workers``, default
+        ``isolation_workers`` or the CPU count; 0 runs them here) with the
+        same checkpointing as ``process_urls``.
+        """
+        from local_filings import iter_local_filings
+
+        if workers is None:
+            workers = self.config.isolation_workers or os.cpu_count() or 1
+        return self._process_sources(iter_local_filings(path), "process_local", workers, resume)
+
+    def _process_sources(
+        self, sources: Iterable[Any], method: str, workers: Optional[int], resume: bool
+    ) -> pd.DataFrame:
+        import pandas as pd
+
+        checkpoint = None
+        if self.config.checkpoint_dir:
+            from checkpoint import RunCheckpoint
+
+            checkpoint = RunCheckpoint(self.config.checkpoint_dir, resume=resume)
+        if checkpoint is None:
+            # The DataFrame is the only thing held in memory
+            sources, _ = self._planned(sources, method)
+            df = pd.DataFrame(
+                asdict(r) for r in self.iter_records(sources, transform=False, method=method, workers=workers)
+            )
+        else:
+            with checkpoint:
+                self._run_checkpointed(checkpoint, sources, method, workers)
+                df = pd.DataFrame(checkpoint.iter_records())
         
-        if not all_records:
-            logger.warning("No ESG records extracted from any URL")
+        if df.empty:
+            logger.warning("No ESG records extracted from any filing")
             return pd.DataFrame()
         
-        df = pd.DataFrame([asdict(r) for r in all_records])
+        if self.unit_normalizer is not None:
+            df = self.unit_normalizer.apply(df)
+        if self.quality_checker is not None:
+            df = self.quality_checker.apply(df)
+            self.quality_checker.save()
+        if self.peer_index is not None:
+            self.peer_index.update_frame(df)
+            self.peer_index.save(self.peer_index_path)
         logger.info("\n" + "=" * 80)
         logger.info("EXTRACTION COMPLETE")
         logger.info("=" * 80)
@@ -887,6 +1737,14 @@ class BRSRExtractor:
         return df
 
 
+def _skip_checkpointed(sources: Iterable[Any], checkpoint: RunCheckpoint) -> Iterator[Any]:
+    for source in sources:
+        if checkpoint.is_complete(str(source)):
+            logger.info("Already checkpointed: %s", source)
+        else:
+            yield source
+
+
 # -------------------------------------------------------------------
 # Export helpers
 # -------------------------------------------------------------------
@@ -894,59 +1752,139 @@ class BRSRExtractor:
 def export_outputs(
     df: pd.DataFrame, 
     out_dir: Path, 
-    base_name: str = "brsr_esg_metrics"
-) -> None:
-    """Export DataFrame to CSV, Parquet, and JSON."""
-    out_dir.mkdir(parents=True, exist_ok=True)
-    
-    csv_path = out_dir / f"{base_name}.csv"
-    parquet_path = out_dir / f"{base_name}.parquet"
-    json_path = out_dir / f"{base_name}.json"
-
-    # Export CSV
-    df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-    logger.info("✓ Exported CSV to %s", csv_path)
-    
-    # Export Parquet (requires pyarrow or fastparquet)
-    try:
-        df.to_parquet(parquet_path, index=False)
-        logger.info("✓ Exported Parquet to %s", parquet_path)
-    except Exception as exc:
-        logger.warning("Could not export Parquet: %s", exc)
-    
-    # Export JSON
-    df.to_json(json_path, orient="records", indent=2, force_ascii=False)
-    logger.info("✓ Exported JSON to %s", json_path)
+    base_name: str = "brsr_esg_metrics",
+    formats: Optional[Sequence[str]] = None,
+    compression: Optional[str] = None,
+    batch_size: int = 5000,
+) -> Dict[str, Path]:
+    """Export a DataFrame to the requested formats (CSV, Parquet and JSON by default).
+
+    The frame is written in ``batch_size`` row slices through the streaming
+    writers in ``exporters``; use ``export_records`` directly to export
+    records as they are produced without building a DataFrame at all.
+    """
+    from exporters import DEFAULT_FORMATS, export_records
+
+    def _rows() -> Iterable[Dict[str, Any]]:
+        for start in range(0, len(df), batch_size):
+            yield from df.iloc[start:start + batch_size].to_dict(orient="records")
+
+    return export_records(
+        _rows(), out_dir, base_name=base_name, formats=formats or DEFAULT_FORMATS,
+        compression=compression, batch_size=batch_size,
+    )
 
 
 # -------------------------------------------------------------------
 # CLI entry point
 # -------------------------------------------------------------------
 
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> None:
     """Main entry point for CLI usage."""
+    import argparse
+
+    from checkpoint import RunCheckpoint
+
+    parser = argparse.ArgumentParser(description="BRSR XBRL ESG Metrics Extractor")
+    parser.add_argument("urls", nargs="*", help="XBRL URLs (default: two sample NSE filings)")
+    parser.add_argument("--path", default=None,
+                        help="process a local directory, .zip or .tar(.gz) of XBRL instances instead of URLs")
+    parser.add_argument("--resume", action="store_true", help="continue from the last checkpoint")
+    parser.add_argument("--no-checkpoint", action="store_true",
+                        help="stream records straight into the writers without checkpointing")
+    parser.add_argument("--checkpoint-dir", default=None,
+                        help="checkpoint directory (default: checkpoint_dir or <output_dir>/checkpoint)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="run filings in this many isolated worker processes (--path default: CPU count)")
+    parser.add_argument("--filing-timeout", type=float, default=None, help="seconds per filing (with --workers)")
+    parser.add_argument("--max-rss-mb", type=float, default=None, help="worker memory cap per filing (with --workers)")
+    parser.add_argument("--plan", action="store_true",
+                        help="pre-scan URL headers: skip filings already checkpointed, keep only latest revisions")
+    args = parser.parse_args(argv)
+
     setup_logging("INFO")
     
     logger.info("BRSR XBRL ESG Metrics Extractor")
     logger.info("=" * 80)
 
     # Sample NSE XBRL URLs
-    urls = [
+    sources: Iterable[Any] = args.urls or [
         "https://nsearchives.nseindia.com/corporate/xbrl/BRSR_1467735_17062025071711_WEB.xml",
         "https://nsearchives.nseindia.com/corporate/xbrl/BRSR_1467642_17062025052610_WEB.xml",
     ]
 
     config = ParserConfig()
+    if args.workers is not None:
+        config.isolation_workers = args.workers
+    if args.filing_timeout is not None:
+        config.filing_timeout = args.filing_timeout
+    if args.max_rss_mb is not None:
+        config.filing_max_rss_mb = args.max_rss_mb
+    if args.plan:
+        config.plan_filings = True
     extractor = BRSRExtractor(config)
-    df = extractor.process_urls(urls)
+    method, workers = "process_url", None
+    if args.path:
+        from local_filings import iter_local_filings
+
+        sources, method = iter_local_filings(args.path), "process_local"
+        workers = config.isolation_workers or os.cpu_count() or 1
+    if args.no_checkpoint:
+        sources, _ = extractor._planned(sources, method)
+        records = extractor.iter_records(sources, transform=False, method=method, workers=workers)
+        _finish_run(extractor, _export_stream(extractor, records))
+        return
+
+    checkpoint_dir = args.checkpoint_dir or config.checkpoint_dir or str(Path(config.output_dir) / "checkpoint")
+
+    # Each filing is checkpointed as it finishes; a resumed run skips those already done.
+    try:
+        checkpoint = RunCheckpoint(checkpoint_dir, resume=args.resume)
+    except ValueError as exc:
+        parser.error(f"--checkpoint-dir: {exc}")
+    with checkpoint:
+        extractor._run_checkpointed(checkpoint, sources, method, workers)
+        logger.info("Checkpoint outcomes: %s", checkpoint.outcomes())
+
+        # The export is assembled from the checkpoint shards and streamed into the writers.
+        records = (ESGRecord(**record) for record in checkpoint.iter_records())
+        written = _export_stream(extractor, records)
+    _finish_run(extractor, written)
+
+
+def _export_stream(extractor: BRSRExtractor, records: Iterable[ESGRecord]) -> Dict[str, Path]:
+    """Apply the record-stream stages and write every configured export format."""
+    from exporters import export_records
+
+    config = extractor.config
+    return export_records(
+        extractor.transform_records(records),
+        Path(config.output_dir),
+        formats=config.export_formats,
+        compression=config.export_compression,
+        metrics=extractor.metrics,
+    )
+
 
-    if df.empty:
+def _finish_run(extractor: BRSRExtractor, written: Dict[str, Path]) -> None:
+    """Write run metrics and persist corpus-level state after an export."""
+    config = extractor.config
+    summary = extractor.metrics.summary()
+    logger.info("Run metrics:\n%s", json.dumps(summary, indent=2))
+    if written:
+        with open(Path(config.output_dir) / "run_metrics.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+    if extractor.quality_checker is not None:
+        extractor.quality_checker.save()
+    if extractor.peer_index is not None:
+        extractor.peer_index.save(extractor.peer_index_path)
+
+    if not written:
         logger.warning("No ESG metrics extracted.")
         return
 
-    export_outputs(df, out_dir=Path(config.output_dir))
     logger.info("\n✓ Processing complete! Check the output directory for results.")
 
-
 if __name__ == "__main__":
     main()
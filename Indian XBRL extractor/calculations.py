@@ -0,0 +1,192 @@
+"""
+Calculation-linkbase consistency checks.
+
+Each calculation network (one extended link role of a ``*-cal-*.xml``
+linkbase) is compiled once into a sparse weight matrix in CSR form: one row
+per summation total, one column per concept, with the arc weights as values.
+A filing is checked by laying its numeric facts out as a dense
+contexts x concepts matrix and computing all totals with a single vectorized
+sparse matrix product per network.
+
+Following XBRL 2.1, a total is only checked in contexts where it and at least
+one of its contributing items are reported; missing items count as zero.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from facts import FactTable
+
+if TYPE_CHECKING:
+    import numpy as np
+
+XLINK = "{http://www.w3.org/1999/xlink}"
+LINK = "{http://www.xbrl.org/2003/linkbase}"
+SUMMATION_ITEM = "http://www.xbrl.org/2003/arcrole/summation-item"
+
+
+@dataclass
+class CalculationNetwork:
+    """Summation relationships of one extended link role as a CSR weight matrix."""
+    role: str
+    concepts: List[str]          # column -> concept local name
+    totals: np.ndarray           # row -> column of the total concept
+    indptr: np.ndarray           # CSR row pointers into indices/weights
+    indices: np.ndarray          # column of each contributing item
+    weights: np.ndarray          # arc weight of each contributing item
+
+    @property
+    def columns(self) -> Dict[str, int]:
+        return {name: i for i, name in enumerate(self.concepts)}
+
+    def matvec(self, values: np.ndarray, weights: Optional[Any] = None) -> np.ndarray:
+        """Return ``values @ W.T``: the computed totals for every row of ``values``.
+
+        ``weights`` replaces the arc weights (e.g. ``1.0`` to count items).
+        """
+        import numpy as np
+
+        contributions = values[:, self.indices] * (self.weights if weights is None else weights)
+        starts = self.indptr[:-1]
+        sums = np.zeros((values.shape[0], len(self.totals)))
+        nonempty = self.indptr[1:] > starts
+        if contributions.size:
+            sums[:, nonempty] = np.add.reduceat(contributions, starts[nonempty], axis=1)
+        return sums
+
+
+@dataclass(frozen=True)
+class CalculationInconsistency:
+    """A reported total that does not match the sum of its items."""
+    role: str
+    concept: str
+    context_id: str
+    reported: float
+    computed: float
+
+
+def compile_calculations(paths: Sequence[Path]) -> Dict[str, CalculationNetwork]:
+    """Compile calculation linkbases into one ``CalculationNetwork`` per role."""
+    import numpy as np
+    from lxml import etree
+
+    arcs_by_role: Dict[str, Dict[Tuple[str, str], float]] = {}
+    for path in paths:
+        root = etree.parse(str(path)).getroot()
+        for link in root.iter(f"{LINK}calculationLink"):
+            role = link.get(f"{XLINK}role", "")
+            # Locator labels -> concept local names
+            locs = {}
+            for loc in link.iter(f"{LINK}loc"):
+                href = loc.get(f"{XLINK}href", "")
+                locs[loc.get(f"{XLINK}label")] = href.split("#")[-1].replace("in-capmkt_", "")
+            arcs = arcs_by_role.setdefault(role, {})
+            for arc in link.iter(f"{LINK}calculationArc"):
+                if arc.get(f"{XLINK}arcrole") != SUMMATION_ITEM:
+                    continue
+                total = locs.get(arc.get(f"{XLINK}from"))
+                item = locs.get(arc.get(f"{XLINK}to"))
+                if total and item:
+                    arcs[(total, item)] = float(arc.get("weight", "1"))
+
+    networks: Dict[str, CalculationNetwork] = {}
+    for role, arcs in arcs_by_role.items():
+        if not arcs:
+            continue
+        concepts: List[str] = []
+        columns: Dict[str, int] = {}
+        for pair in arcs:
+            for name in pair:
+                if name not in columns:
+                    columns[name] = len(concepts)
+                    concepts.append(name)
+        totals = sorted({total for total, _ in arcs}, key=columns.__getitem__)
+        indptr, indices, weights = [0], [], []
+        for total in totals:
+            for (parent, item), weight in arcs.items():
+                if parent == total:
+                    indices.append(columns[item])
+                    weights.append(weight)
+            indptr.append(len(indices))
+        networks[role] = CalculationNetwork(
+            role=role,
+            concepts=concepts,
+            totals=np.array([columns[t] for t in totals], dtype=np.int64),
+            indptr=np.array(indptr, dtype=np.int64),
+            indices=np.array(indices, dtype=np.int64),
+            weights=np.array(weights, dtype=float),
+        )
+    return networks
+
+
+def calculation_concepts(networks: Dict[str, CalculationNetwork]) -> Set[str]:
+    """All concepts that take part in any network."""
+    return {name for network in networks.values() for name in network.concepts}
+
+
+def check_calculations(
+    facts: FactTable,
+    networks: Dict[str, CalculationNetwork],
+    tolerance: float = 0.01,
+) -> List[CalculationInconsistency]:
+    """Check a filing's numeric facts against every calculation network.
+
+    A total is inconsistent when it differs from the weighted sum of its
+    reported items by more than ``tolerance`` (relative to the larger of the
+    two, so rounding in either does not trip it).
+    """
+    inconsistencies: List[CalculationInconsistency] = []
+    if not networks or not len(facts):
+        return inconsistencies
+    import numpy as np
+
+    names = facts.local_names.symbols
+    name_ids = np.frombuffer(facts.local_name_ids, dtype=np.int32)
+    context_ids = np.frombuffer(facts.context_ids, dtype=np.int32)
+
+    for network in networks.values():
+        columns = network.columns
+        # Column of each distinct symbol (-1 when not in this network), then per fact
+        symbol_columns = np.array([columns.get(name, -1) for name in names], dtype=np.int64)
+        fact_columns = symbol_columns[name_ids]
+        rows = np.nonzero((fact_columns >= 0) & (context_ids >= 0))[0]
+        if not len(rows):
+            continue
+        values = np.array([_to_float(facts.values[i]) for i in rows])
+        numeric = ~np.isnan(values)
+        rows, values = rows[numeric], values[numeric]
+        if not len(rows):
+            continue
+
+        used_contexts, context_rows = np.unique(context_ids[rows], return_inverse=True)
+        matrix = np.zeros((len(used_contexts), len(network.concepts)))
+        present = np.zeros_like(matrix, dtype=bool)
+        matrix[context_rows, fact_columns[rows]] = values
+        present[context_rows, fact_columns[rows]] = True
+
+        computed = network.matvec(matrix)
+        reported = matrix[:, network.totals]
+        has_total = present[:, network.totals]
+        has_items = network.matvec(present.astype(float), weights=1.0) > 0
+        scale = np.maximum(np.maximum(np.abs(reported), np.abs(computed)), 1e-9)
+        bad = has_total & has_items & (np.abs(reported - computed) > tolerance * scale)
+
+        for ctx_row, total_row in zip(*np.nonzero(bad)):
+            inconsistencies.append(CalculationInconsistency(
+                role=network.role,
+                concept=network.concepts[network.totals[total_row]],
+                context_id=facts.contexts.symbols[used_contexts[ctx_row]],
+                reported=float(reported[ctx_row, total_row]),
+                computed=float(computed[ctx_row, total_row]),
+            ))
+    return inconsistencies
+
+
+def _to_float(value: Optional[str]) -> float:
+    try:
+        return float(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return float("nan")
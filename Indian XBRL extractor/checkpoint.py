@@ -0,0 +1,183 @@
+"""
+Checkpoints for resumable batch runs.
+
+A ``RunCheckpoint`` directory holds:
+
+- ``shard-NNNNN.ndjson``  the records of finished filings, appended filing by
+  filing (one JSON object per record, so value types survive);
+- ``manifest.ndjson``     one line per finished filing: its source, outcome,
+  record count, the byte range of its records in a shard and, for planned
+  runs, its header key (``CIN:period_end``).
+
+Each filing's records are written and flushed before its manifest line, and
+records are only ever read back through manifest byte ranges, so a crash at
+any point leaves a consistent checkpoint: a filing is either fully recorded
+or absent (and redone on resume). Every process that opens the checkpoint
+starts a new shard, so bytes left behind by a crashed writer are never read.
+
+A resumed run skips filings the manifest marks ``ok``; filings that failed or
+produced no records are retried. Final exports are assembled from the shards
+(``iter_records``) without re-processing anything. A fresh (not resumed) run
+removes only the manifest and shards, and refuses a non-empty directory that
+has no manifest.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+logger = logging.getLogger("brsr_parser")
+
+MANIFEST = "manifest.ndjson"
+OK, EMPTY, ERROR = "ok", "empty", "error"
+
+
+def _record_to_dict(record: Any) -> Dict[str, Any]:
+    return asdict(record) if is_dataclass(record) and not isinstance(record, type) else dict(record)
+
+
+class RunCheckpoint:
+    """Durable per-filing outcomes and records of one batch run."""
+
+    def __init__(self, path: str, resume: bool = True, shard_bytes: int = 64 << 20, fsync: bool = True) -> None:
+        self.path = Path(path)
+        self.shard_bytes = shard_bytes
+        self.fsync = fsync
+        if not resume:
+            self._reset()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        for entry in self._read_manifest():
+            self._entries[entry["source"]] = entry  # Later lines supersede earlier ones
+        existing = [int(p.stem.split("-")[1]) for p in self.path.glob("shard-*.ndjson")]
+        self._shard_no = max(existing, default=0)
+        self._shard: Optional[Any] = None
+        self._manifest = open(self.path / MANIFEST, "a+b")
+        if self._manifest.seek(0, os.SEEK_END):
+            self._manifest.seek(-1, os.SEEK_END)
+            if self._manifest.read(1) != b"\n":
+                self._manifest.write(b"\n")  # Terminate a line torn by a crash
+        if self._entries:
+            logger.info("Resuming from checkpoint %s: %d filings done", self.path, len(self.completed()))
+
+    def _reset(self) -> None:
+        """Remove a previous run's manifest and shards, and nothing else in the directory."""
+        manifest = self.path / MANIFEST
+        if not self.path.exists():
+            return
+        if not manifest.exists() and any(self.path.iterdir()):
+            raise ValueError(f"{self.path} is not empty and has no checkpoint manifest; refusing to reset it")
+        # Shards first: a reset interrupted before the manifest goes is simply repeated
+        for shard in self.path.glob("shard-*.ndjson"):
+            shard.unlink()
+        manifest.unlink(missing_ok=True)
+
+    def _read_manifest(self) -> Iterator[Dict[str, Any]]:
+        manifest = self.path / MANIFEST
+        if not manifest.exists():
+            return
+        with open(manifest, "rb") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logger.warning("Ignoring truncated checkpoint manifest line in %s", manifest)
+
+    # -- state ---------------------------------------------------------
+
+    def completed(self) -> Set[str]:
+        """Sources whose records are checkpointed."""
+        return {source for source, entry in self._entries.items() if entry["outcome"] == OK}
+
+    def processed_keys(self) -> Set[str]:
+        """Header keys (``CIN:period_end``) of checkpointed filings, for ``plan_filings``."""
+        return {entry["key"] for entry in self._entries.values() if entry["outcome"] == OK and entry.get("key")}
+
+    def is_complete(self, source: str) -> bool:
+        entry = self._entries.get(source)
+        return entry is not None and entry["outcome"] == OK
+
+    def outcomes(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for entry in self._entries.values():
+            counts[entry["outcome"]] = counts.get(entry["outcome"], 0) + 1
+        return counts
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # -- writing -------------------------------------------------------
+
+    def _open_shard(self) -> Any:
+        if self._shard is None or self._shard.tell() >= self.shard_bytes:
+            if self._shard is not None:
+                self._shard.close()
+            self._shard_no += 1
+            self._shard = open(self.path / f"shard-{self._shard_no:05d}.ndjson", "ab")
+        return self._shard
+
+    def _sync(self, f: Any) -> None:
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def commit(self, source: str, records: Iterable[Any], key: Optional[str] = None) -> None:
+        """Checkpoint a finished filing and its records; ``key`` is its ``FilingHeader.key``, if known."""
+        payload = b"".join(
+            json.dumps(_record_to_dict(r), default=str, ensure_ascii=False).encode("utf-8") + b"\n"
+            for r in records
+        )
+        entry: Dict[str, Any] = {"source": source, "outcome": OK if payload else EMPTY,
+                                 "records": payload.count(b"\n"), "at": time.time()}
+        if key:
+            entry["key"] = key
+        if payload:
+            shard = self._open_shard()
+            entry.update(shard=Path(shard.name).name, offset=shard.tell(), length=len(payload))
+            shard.write(payload)
+            self._sync(shard)
+        self._append(entry)
+
+    def fail(self, source: str, error: str) -> None:
+        """Record a filing that raised; it is retried on resume."""
+        self._append({"source": source, "outcome": ERROR, "records": 0, "error": error[:2000], "at": time.time()})
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        self._manifest.write(json.dumps(entry).encode("utf-8") + b"\n")
+        self._sync(self._manifest)
+        self._entries[entry["source"]] = entry
+
+    def close(self) -> None:
+        if self._shard is not None:
+            self._shard.close()
+            self._shard = None
+        self._manifest.close()
+
+    def __enter__(self) -> "RunCheckpoint":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # -- reading -------------------------------------------------------
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Yield the checkpointed records of every completed filing, shard by shard."""
+        if self._shard is not None:
+            self._shard.flush()
+        ranges: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in self._entries.values():
+            if entry["outcome"] == OK:
+                ranges.setdefault(entry["shard"], []).append(entry)
+        for shard_name in sorted(ranges):
+            with open(self.path / shard_name, "rb") as f:
+                for entry in sorted(ranges[shard_name], key=lambda e: e["offset"]):
+                    f.seek(entry["offset"])
+                    for line in f.read(entry["length"]).splitlines():
+                        yield json.loads(line)
@@ -0,0 +1,399 @@
+"""
+Physical climate-risk overlay from CLIMADA hazard data.
+
+Adds tropical-cyclone indicators per company, computed from a CLIMADA
+hazard file (``climada/data/hazard/tropical_cyclone/...hdf5``) and the
+calibrated regional impact functions (``tc_impf_cal_v01_*.csv``):
+
+- ``tc_expected_annual_damage_ratio``: sum over events of frequency times
+  mean damage ratio, with the Emanuel (2011) damage curve
+  ``v^3 / (1 + v^3)``, ``v = max(0, I - v_thresh) / (v_half - v_thresh)``;
+- ``tc_max_wind_speed``: the highest event intensity (m/s);
+- ``tc_damaging_event_frequency``: annual frequency of events above
+  ``v_thresh``.
+
+The statistics are computed for every centroid in one streaming pass over
+the event x centroid intensity matrix, which CLIMADA stores as CSR arrays
+(``intensity/data``, ``indices``, ``indptr``). Uncompressed datasets are
+memory-mapped straight from the file and others are read in slices, so the
+matrix is never loaded whole. The per-centroid results are cached as
+``.npz`` next to the other caches, keyed by the hazard file and curve
+parameters.
+
+Companies are located, in order of preference, from a CSV of geocoded
+plants and offices (``company_locations_path``: ``company_id,lat,lon[,weight]``),
+from the state named in the registered or corporate office address, or from
+the state code of the CIN (see ``states.py``). Locations are snapped to the
+nearest hazard centroid within ``max_km`` through a uniform grid index.
+Locations with no centroid in reach, such as a filing outside the hazard's
+coverage, produce no indicators.
+
+Reading hazard files requires ``h5py``.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import math
+import os
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from peers import decode_cin
+from states import state_in_text
+
+logger = logging.getLogger("brsr_parser")
+
+V_THRESH = 25.7  # m/s; threshold of the calibrated TC impact functions
+EARTH_KM_PER_DEG = 111.32
+STATS_CACHE_VERSION = 1
+
+# (indicator, unit) emitted per company
+INDICATORS: Tuple[Tuple[str, str], ...] = (
+    ("tc_expected_annual_damage_ratio", "ratio/year"),
+    ("tc_max_wind_speed", "m/s"),
+    ("tc_damaging_event_frequency", "events/year"),
+)
+
+ADDRESS_CONCEPTS: Tuple[str, ...] = ("AddressOfRegisteredOfficeOfCompany", "AddressOfCorporateOfficeOfCompany")
+
+
+def emanuel_mdr(intensity: Any, v_thresh: float, v_half: float, scale: float = 1.0) -> np.ndarray:
+    """Mean damage ratio of the Emanuel (2011) sigmoid, vectorized."""
+    v = np.maximum(np.asarray(intensity, dtype=np.float64) - v_thresh, 0.0) / (v_half - v_thresh)
+    v3 = v ** 3
+    return scale * v3 / (1.0 + v3)
+
+
+def load_v_half(path: str, region: str) -> float:
+    """Calibrated ``v_half`` of a region from a ``tc_impf_cal_v01`` summary CSV (RMSF or TDR)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row.get("cal_region2") == region:
+                return float(row["v_half"])
+    raise ValueError(f"No impact function for region {region!r} in {path}")
+
+
+# -------------------------------------------------------------------
+# Centroid snapping
+# -------------------------------------------------------------------
+
+class CentroidIndex:
+    """Nearest-centroid lookups within a radius, through a uniform lat/lon grid.
+
+    Cells are at least ``max_km`` wide at the highest centroid latitude, so
+    every centroid within reach of a point lies in the point's cell or one of
+    its eight neighbours. Queries are answered in bulk with array operations.
+    """
+
+    def __init__(self, lat: Any, lon: Any, max_km: float = 50.0) -> None:
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.max_km = max_km
+        top = float(np.abs(self.lat).max()) if self.lat.size else 0.0
+        self.cell_deg = max_km / (EARTH_KM_PER_DEG * math.cos(math.radians(min(top, 89.0))))
+        self._cols = int(math.ceil(360.0 / self.cell_deg)) + 3
+        keys = self._keys(self.lat, self.lon)
+        self._order = np.argsort(keys, kind="stable")
+        self._sorted_keys = keys[self._order]
+
+    def _cell(self, lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return (np.floor((lat + 90.0) / self.cell_deg).astype(np.int64),
+                np.floor((lon + 180.0) / self.cell_deg).astype(np.int64))
+
+    def _keys(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        row, col = self._cell(lat, lon)
+        return row * self._cols + col
+
+    def nearest(self, lat: Any, lon: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """Index of the nearest centroid (-1 if none within ``max_km``) and its distance in km."""
+        qlat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        qlon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        best = np.full(qlat.size, -1, dtype=np.int64)
+        best_km = np.full(qlat.size, np.inf)
+        if not self.lat.size or not qlat.size:
+            return best, best_km
+        row, col = self._cell(qlat, qlon)
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                keys = (row + dr) * self._cols + (col + dc)
+                starts = np.searchsorted(self._sorted_keys, keys, side="left")
+                counts = np.searchsorted(self._sorted_keys, keys, side="right") - starts
+                total = int(counts.sum())
+                if not total:
+                    continue
+                # Expand each query's run of candidates without a Python loop
+                query = np.repeat(np.arange(qlat.size), counts)
+                offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                candidate = self._order[np.repeat(starts, counts) + offsets]
+                km = _distance_km(qlat[query], qlon[query], self.lat[candidate], self.lon[candidate])
+                closer = km < best_km[query]
+                # Keep the closest candidate per query: sort by query, then distance, take each run's first
+                order = np.lexsort((km[closer], query[closer]))
+                q, c, d = query[closer][order], candidate[closer][order], km[closer][order]
+                first = np.r_[True, q[1:] != q[:-1]]
+                best[q[first]], best_km[q[first]] = c[first], d[first]
+        out_of_reach = best_km > self.max_km
+        best[out_of_reach] = -1
+        return best, best_km
+
+
+def _distance_km(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Equirectangular distance; accurate to well under 1% at snapping distances."""
+    x = np.radians(lon2 - lon1) * np.cos(np.radians((lat1 + lat2) / 2.0))
+    y = np.radians(lat2 - lat1)
+    return 6371.0 * np.hypot(x, y)
+
+
+# -------------------------------------------------------------------
+# Hazard statistics
+# -------------------------------------------------------------------
+
+@dataclass
+class HazardStats:
+    """Per-centroid tropical-cyclone statistics of one hazard set."""
+    lat: np.ndarray
+    lon: np.ndarray
+    expected_damage_ratio: np.ndarray
+    max_intensity: np.ndarray
+    exceedance_frequency: np.ndarray
+
+    def save(self, path: str, fingerprint: Dict[str, Any]) -> None:
+        """Write the statistics to an ``.npz`` file (atomically)."""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(f"{target.stem}.{os.getpid()}.tmp.npz")
+        np.savez_compressed(
+            tmp_path,
+            lat=self.lat, lon=self.lon,
+            expected_damage_ratio=self.expected_damage_ratio,
+            max_intensity=self.max_intensity,
+            exceedance_frequency=self.exceedance_frequency,
+            fingerprint=np.array(json.dumps(fingerprint, sort_keys=True)),
+        )
+        os.replace(tmp_path, target)
+
+    @classmethod
+    def load(cls, path: str, fingerprint: Dict[str, Any]) -> Optional["HazardStats"]:
+        """Load statistics saved by ``save`` for the same hazard and parameters, else None."""
+        if not Path(path).exists():
+            return None
+        try:
+            with np.load(path) as data:
+                if json.loads(str(data["fingerprint"])) != fingerprint:
+                    return None
+                return cls(**{name: data[name] for name in (
+                    "lat", "lon", "expected_damage_ratio", "max_intensity", "exceedance_frequency")})
+        except (OSError, KeyError, ValueError) as exc:
+            logger.warning("Ignoring unreadable hazard statistics %s: %s", path, exc)
+            return None
+
+
+def hazard_stats(
+    indptr: Any,
+    indices: Any,
+    data: Any,
+    frequency: Any,
+    n_centroids: int,
+    v_thresh: float = V_THRESH,
+    v_half: float = 74.7,
+    scale: float = 1.0,
+    chunk_size: int = 1 << 22,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Stream a CSR event x centroid intensity matrix into per-centroid statistics.
+
+    ``indices`` and ``data`` may be NumPy arrays, memory maps or h5py
+    datasets; they are read ``chunk_size`` stored values at a time.
+    Returns (expected damage ratio, max intensity, exceedance frequency).
+    """
+    indptr = np.asarray(indptr[:], dtype=np.int64)
+    frequency = np.asarray(frequency[:], dtype=np.float64)
+    expected = np.zeros(n_centroids)
+    exceedance = np.zeros(n_centroids)
+    peak = np.zeros(n_centroids)
+    nnz = int(indptr[-1]) if indptr.size else 0
+    for start in range(0, nnz, chunk_size):
+        stop = min(start + chunk_size, nnz)
+        cols = np.asarray(indices[start:stop], dtype=np.int64)
+        values = np.asarray(data[start:stop], dtype=np.float64)
+        rows = np.searchsorted(indptr, np.arange(start, stop), side="right") - 1
+        freq = frequency[rows]
+        expected += np.bincount(cols, weights=freq * emanuel_mdr(values, v_thresh, v_half, scale),
+                                minlength=n_centroids)
+        exceedance += np.bincount(cols, weights=freq * (values > v_thresh), minlength=n_centroids)
+        np.maximum.at(peak, cols, values)
+    return expected, peak, exceedance
+
+
+def _mapped(dataset: Any, path: str) -> Any:
+    """Memory-map an uncompressed, contiguous HDF5 dataset; otherwise return it for sliced reads."""
+    if dataset.chunks is None and dataset.compression is None and dataset.size:
+        offset = dataset.id.get_offset()
+        if offset is not None:
+            return np.memmap(path, dtype=dataset.dtype, mode="r", offset=offset, shape=dataset.shape)
+    return dataset
+
+
+class HazardFile:
+    """Lazy reader of a CLIMADA hazard HDF5 file (``Hazard.write_hdf5`` layout)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = str(path)
+
+    def centroids(self, hf: Any) -> Tuple[np.ndarray, np.ndarray]:
+        group = hf["centroids"]
+        for lat_name, lon_name in (("lat", "lon"), ("latitude", "longitude")):
+            if lat_name in group and group[lat_name].size:
+                return np.asarray(group[lat_name][:], dtype=np.float64), np.asarray(group[lon_name][:], dtype=np.float64)
+        # Raster centroids: pixel centres from the affine transform (a, b, c, d, e, f)
+        meta = group["meta"]
+        width, height = int(meta["width"][0]), int(meta["height"][0])
+        a, _, c, _, e, f = (float(v) for v in meta["transform"][:6])
+        lon = c + a * (np.arange(width) + 0.5)
+        lat = f + e * (np.arange(height) + 0.5)
+        grid_lat, grid_lon = np.meshgrid(lat, lon, indexing="ij")
+        return grid_lat.ravel(), grid_lon.ravel()
+
+    def stats(self, v_thresh: float, v_half: float, scale: float = 1.0) -> HazardStats:
+        import h5py
+
+        with h5py.File(self.path, "r") as hf:
+            lat, lon = self.centroids(hf)
+            intensity = hf["intensity"]
+            expected, peak, exceedance = hazard_stats(
+                intensity["indptr"],
+                _mapped(intensity["indices"], self.path),
+                _mapped(intensity["data"], self.path),
+                hf["frequency"],
+                lat.size,
+                v_thresh, v_half, scale,
+            )
+        return HazardStats(lat, lon, expected, peak, exceedance)
+
+
+# -------------------------------------------------------------------
+# Company overlay
+# -------------------------------------------------------------------
+
+@dataclass
+class RiskAssessment:
+    """Tropical-cyclone indicators of one company."""
+    company_id: str
+    location_source: str  # 'coordinates', 'address' or 'cin'
+    locations: int  # Locations snapped to a centroid
+    expected_damage_ratio: float
+    max_wind_speed: float
+    damaging_event_frequency: float
+
+    def indicators(self) -> List[Tuple[str, float, str]]:
+        values = (self.expected_damage_ratio, self.max_wind_speed, self.damaging_event_frequency)
+        return [(name, float(value), unit) for (name, unit), value in zip(INDICATORS, values)]
+
+
+class PhysicalRiskOverlay:
+    """Locates companies and reads their tropical-cyclone indicators off the hazard statistics."""
+
+    def __init__(
+        self,
+        hazard_path: str,
+        impact_function_path: str,
+        region: str = "NI",
+        cache_dir: Optional[str] = None,
+        max_km: float = 50.0,
+        locations_path: Optional[str] = None,
+    ) -> None:
+        self.hazard_path = hazard_path
+        self.region = region
+        self.v_half = load_v_half(impact_function_path, region)
+        self.cache_dir = cache_dir
+        self.max_km = max_km
+        self.locations = _read_locations(locations_path) if locations_path else {}
+
+    def _fingerprint(self) -> Dict[str, Any]:
+        stat = os.stat(self.hazard_path)
+        return {"version": STATS_CACHE_VERSION, "hazard": os.path.abspath(self.hazard_path),
+                "mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                "v_thresh": V_THRESH, "v_half": self.v_half}
+
+    @cached_property
+    def stats(self) -> HazardStats:
+        """Per-centroid statistics, from the cache or one pass over the hazard file."""
+        fingerprint = self._fingerprint()
+        cache_path = None
+        if self.cache_dir:
+            cache_path = str(Path(self.cache_dir) / f"climate_risk_{Path(self.hazard_path).stem}.npz")
+            stats = HazardStats.load(cache_path, fingerprint)
+            if stats is not None:
+                return stats
+        stats = HazardFile(self.hazard_path).stats(V_THRESH, self.v_half)
+        logger.info("Computed tropical-cyclone statistics for %d centroids from %s",
+                    stats.lat.size, self.hazard_path)
+        if cache_path:
+            try:
+                stats.save(cache_path, fingerprint)
+            except OSError as exc:
+                logger.warning("Could not write hazard statistics %s: %s", cache_path, exc)
+        return stats
+
+    @cached_property
+    def index(self) -> CentroidIndex:
+        return CentroidIndex(self.stats.lat, self.stats.lon, self.max_km)
+
+    def locate(self, company_id: str, addresses: Sequence[str] = ()) -> Tuple[str, List[Tuple[float, float, float]]]:
+        """(source, [(lat, lon, weight), ...]) for a company; empty if it cannot be placed."""
+        sites = self.locations.get(company_id.strip().upper())
+        if sites:
+            return "coordinates", sites
+        for address in addresses:
+            state = state_in_text(address)
+            if state is not None:
+                return "address", [(state.lat, state.lon, 1.0)]
+        cin = decode_cin(company_id)
+        if cin is not None:
+            from states import STATES
+
+            state = STATES.get(cin.state)
+            if state is not None:
+                return "cin", [(state.lat, state.lon, 1.0)]
+        return "none", []
+
+    def assess(self, company_id: str, addresses: Sequence[str] = ()) -> Optional[RiskAssessment]:
+        """Indicators for a company, or None if it cannot be located within the hazard's coverage."""
+        source, points = self.locate(company_id, addresses)
+        if not points:
+            return None
+        lat, lon, weight = (np.array(column, dtype=np.float64) for column in zip(*points))
+        centroid, _ = self.index.nearest(lat, lon)
+        found = centroid >= 0
+        if not found.any():
+            return None
+        stats = self.stats
+        c, w = centroid[found], weight[found]
+        w = w / w.sum()
+        return RiskAssessment(
+            company_id=company_id,
+            location_source=source,
+            locations=int(found.sum()),
+            expected_damage_ratio=float(np.dot(w, stats.expected_damage_ratio[c])),
+            max_wind_speed=float(stats.max_intensity[c].max()),
+            damaging_event_frequency=float(np.dot(w, stats.exceedance_frequency[c])),
+        )
+
+
+def _read_locations(path: str) -> Dict[str, List[Tuple[float, float, float]]]:
+    """company_id -> [(lat, lon, weight), ...] from a CSV of geocoded plants and offices."""
+    locations: Dict[str, List[Tuple[float, float, float]]] = {}
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            try:
+                point = (float(row["lat"]), float(row["lon"]), float(row.get("weight") or 1.0))
+            except (KeyError, TypeError, ValueError):
+                continue
+            locations.setdefault((row.get("company_id") or "").strip().upper(), []).append(point)
+    return locations
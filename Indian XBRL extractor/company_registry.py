@@ -0,0 +1,292 @@
+"""
+Indexed company registry built from Insider_Trading.csv.
+
+The registry is parsed once, pickled to a cache file keyed by the source
+CSV's size and modification time, and memoized per process. Lookups by XBRL
+URL, filing ID (``BRSR_<filing>_<timestamp>``), filing number, CIN and NSE
+symbol are dictionary lookups. Entries are immutable, so a loaded registry can
+be shared read-only by worker processes (forked workers inherit it, spawned
+workers load the same pickle).
+
+The NSE export has no CIN column, so the CIN index starts empty unless the CSV
+carries one; ``record_cin`` fills it in from the entity identifier of each
+parsed filing. Learned CINs are kept in the process's registry only.
+"""
+
+from __future__ import annotations
+
+import csv
+import logging
+import os
+import pickle
+import re
+import threading
+from dataclasses import dataclass, replace
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("brsr_parser")
+
+# Bump when the pickled layout changes so stale caches are rebuilt.
+REGISTRY_VERSION = 2
+
+FILING_ID_RE = re.compile(r"BRSR_(\d+)_(\d{14})")
+_SYMBOL_RE = re.compile(r"^[A-Z][A-Z0-9&-]*$")
+_CIN_RE = re.compile(r"^[LU]\d{5}[A-Z]{2}\d{4}[A-Z]{3}\d{6}$")
+
+# Guards CINs learned from parsed filings (a lock would not survive pickling)
+_LEARN_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class CompanyEntry:
+    """A single BRSR filing listed in the company database."""
+    company_name: str
+    filing_id: str
+    filing_number: str
+    filing_timestamp: Optional[datetime]
+    xbrl_url: str
+    attachment_url: str
+    from_year: Optional[int]
+    year: Optional[int]
+    submission_date: Optional[date]
+    symbol: Optional[str] = None
+    cin: Optional[str] = None
+
+
+def parse_filing_id(text: str) -> Optional[Tuple[str, str, Optional[datetime]]]:
+    """Extract (filing_id, filing_number, timestamp) from a filing ID, file name or URL."""
+    match = FILING_ID_RE.search(text or "")
+    if not match:
+        return None
+    number, stamp = match.groups()
+    try:
+        timestamp: Optional[datetime] = datetime.strptime(stamp, "%d%m%Y%H%M%S")
+    except ValueError:
+        timestamp = None
+    return match.group(0), number, timestamp
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    """Parse submission dates such as ``17-Jun-25``; Excel overflow cells become None."""
+    text = (value or "").strip()
+    for fmt in ("%d-%b-%y", "%d-%b-%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _symbol_from_row(row: Dict[str, str]) -> Optional[str]:
+    """Use an explicit SYMBOL column, else the attachment file name prefix if it looks like one."""
+    symbol = (row.get("SYMBOL") or "").strip().upper()
+    if symbol:
+        return symbol
+    attachment = (row.get("ATTACHMENT") or "").rsplit("/", 1)[-1]
+    prefix = attachment.split("_", 1)[0]
+    return prefix if prefix and _SYMBOL_RE.match(prefix) else None
+
+
+class CompanyRegistry:
+    """Read-only, dictionary-indexed view over the company database."""
+
+    def __init__(self, entries: List[CompanyEntry], source_fingerprint: Tuple[int, int] = (0, 0)) -> None:
+        self.entries: Tuple[CompanyEntry, ...] = tuple(entries)
+        self.source_fingerprint = source_fingerprint
+        self.version = REGISTRY_VERSION
+
+        self._by_url: Dict[str, int] = {}
+        self._by_filing_id: Dict[str, int] = {}
+        self._by_filing_number: Dict[str, int] = {}
+        self._by_cin: Dict[str, List[int]] = {}
+        self._by_symbol: Dict[str, List[int]] = {}
+        self._by_year: Dict[int, List[int]] = {}
+        # Entries re-issued with a CIN learned from the filing itself
+        self._learned: Dict[int, CompanyEntry] = {}
+
+        for idx, entry in enumerate(self.entries):
+            self._by_url.setdefault(entry.xbrl_url, idx)
+            self._by_filing_id.setdefault(entry.filing_id, idx)
+            self._by_filing_number.setdefault(entry.filing_number, idx)
+            if entry.cin:
+                self._by_cin.setdefault(entry.cin, []).append(idx)
+            if entry.symbol:
+                self._by_symbol.setdefault(entry.symbol, []).append(idx)
+            if entry.year is not None:
+                self._by_year.setdefault(entry.year, []).append(idx)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # -- construction ------------------------------------------------
+
+    @classmethod
+    def from_csv(cls, csv_path: Path) -> "CompanyRegistry":
+        """Parse the company CSV, de-duplicating repeated filing rows."""
+        entries: List[CompanyEntry] = []
+        seen = set()
+        with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                parsed = parse_filing_id(row.get("Company ID") or row.get("XBRL") or "")
+                if parsed is None:
+                    continue
+                filing_id, number, timestamp = parsed
+                if filing_id in seen:
+                    continue
+                seen.add(filing_id)
+                entries.append(CompanyEntry(
+                    company_name=(row.get("COMPANY") or "").strip(),
+                    filing_id=filing_id,
+                    filing_number=number,
+                    filing_timestamp=timestamp,
+                    xbrl_url=(row.get("XBRL") or "").strip(),
+                    attachment_url=(row.get("ATTACHMENT") or "").strip(),
+                    from_year=_parse_int(row.get("FROM YEAR")),
+                    year=_parse_int(row.get("YEAR")),
+                    submission_date=_parse_date(row.get("ORIGINAL SUBMISSION DATE")),
+                    symbol=_symbol_from_row(row),
+                    cin=(row.get("CIN") or "").strip().upper() or None,
+                ))
+        stat = csv_path.stat()
+        return cls(entries, source_fingerprint=(stat.st_mtime_ns, stat.st_size))
+
+    # -- lookups -----------------------------------------------------
+
+    def _entry(self, idx: Optional[int]) -> Optional[CompanyEntry]:
+        if idx is None:
+            return None
+        return self._learned.get(idx) or self.entries[idx]
+
+    def lookup_url(self, url: str) -> Optional[CompanyEntry]:
+        """Return the filing listed under an exact XBRL URL."""
+        return self._entry(self._by_url.get(url))
+
+    def lookup_filing_id(self, filing_id: str) -> Optional[CompanyEntry]:
+        """Return the filing for an exact ``BRSR_<filing>_<timestamp>`` ID."""
+        return self._entry(self._by_filing_id.get(filing_id))
+
+    def lookup_filing_number(self, filing_number: str) -> Optional[CompanyEntry]:
+        """Return the filing for the numeric component of a filing ID."""
+        return self._entry(self._by_filing_number.get(str(filing_number)))
+
+    def lookup_source(self, source: str) -> Optional[CompanyEntry]:
+        """Resolve a URL, file name or path by parsing the filing ID embedded in it."""
+        entry = self.lookup_url(source)
+        if entry is not None:
+            return entry
+        parsed = parse_filing_id(source)
+        if parsed is None:
+            return None
+        filing_id, number, _ = parsed
+        return self.lookup_filing_id(filing_id) or self.lookup_filing_number(number)
+
+    def lookup_cin(self, cin: str) -> List[CompanyEntry]:
+        """Return all filings for a CIN, in file order."""
+        return [self._entry(i) for i in self._by_cin.get(cin.upper(), ())]
+
+    def lookup_symbol(self, symbol: str) -> List[CompanyEntry]:
+        """Return all filings for an NSE symbol, in file order."""
+        return [self._entry(i) for i in self._by_symbol.get(symbol.upper(), ())]
+
+    def record_cin(self, source: str, cin: str) -> Optional[CompanyEntry]:
+        """Index the filing behind ``source`` under the CIN its instance reports.
+
+        Returns the (updated) entry, or None if the source is not a listed
+        filing or ``cin`` is not a CIN. A CIN already known for the filing is
+        kept.
+        """
+        cin = (cin or "").strip().upper()
+        entry = self.lookup_source(source) if _CIN_RE.match(cin) else None
+        if entry is None or entry.cin:
+            return entry
+        idx = self._by_filing_id[entry.filing_id]
+        with _LEARN_LOCK:
+            if idx not in self._learned:
+                self._learned[idx] = replace(entry, cin=cin)
+                self._by_cin.setdefault(cin, []).append(idx)
+        return self._learned[idx]
+
+    # -- scheduling metadata -----------------------------------------
+
+    def years(self) -> List[int]:
+        """Reporting years present in the registry."""
+        return sorted(self._by_year)
+
+    def filings_for_year(self, year: int) -> List[CompanyEntry]:
+        """Return filings whose reporting year (``YEAR`` column) matches."""
+        return [self._entry(i) for i in self._by_year.get(year, ())]
+
+    def iter_schedule(self, newest_first: bool = False) -> Iterator[CompanyEntry]:
+        """Iterate filings ordered by submission date, then filing timestamp."""
+        def _key(entry: CompanyEntry) -> Tuple[date, datetime]:
+            return (entry.submission_date or date.min, entry.filing_timestamp or datetime.min)
+        return iter(sorted(map(self._entry, range(len(self.entries))), key=_key, reverse=newest_first))
+
+
+# -------------------------------------------------------------------
+# Loading with on-disk and per-process caching
+# -------------------------------------------------------------------
+
+_PROCESS_CACHE: Dict[Tuple[str, str], CompanyRegistry] = {}
+
+
+def _cache_file(csv_path: Path, cache_dir: Path) -> Path:
+    return cache_dir / f"company_registry_{csv_path.stem}.pkl"
+
+
+def load_company_registry(csv_path: str = "Insider_Trading.csv", cache_dir: str = ".cache") -> CompanyRegistry:
+    """Return the registry for ``csv_path``, building and caching it if needed.
+
+    The pickle is reused while the CSV's mtime and size are unchanged. A
+    missing CSV yields an empty registry so company lookup is simply disabled.
+    """
+    source = Path(csv_path)
+    key = (str(source.resolve()), str(Path(cache_dir).resolve()))
+
+    if not source.exists():
+        logger.warning("%s not found, company lookup disabled", source)
+        return CompanyRegistry([])
+
+    stat = source.stat()
+    fingerprint = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _PROCESS_CACHE.get(key)
+    if cached is not None and cached.source_fingerprint == fingerprint:
+        return cached
+
+    cache_path = _cache_file(source, Path(cache_dir))
+    registry: Optional[CompanyRegistry] = None
+    if cache_path.exists():
+        try:
+            with open(cache_path, "rb") as f:
+                candidate = pickle.load(f)
+            if (isinstance(candidate, CompanyRegistry)
+                    and candidate.version == REGISTRY_VERSION
+                    and candidate.source_fingerprint == fingerprint):
+                registry = candidate
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Ignoring unreadable company registry cache %s: %s", cache_path, exc)
+
+    if registry is None:
+        registry = CompanyRegistry.from_csv(source)
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(registry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError as exc:
+            logger.warning("Could not write company registry cache %s: %s", cache_path, exc)
+        logger.info("Built company registry: %d filings from %s", len(registry), source)
+
+    _PROCESS_CACHE[key] = registry
+    return registry
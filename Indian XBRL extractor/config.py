@@ -41,12 +41,59 @@ class ConfigManager:
             "retry_backoff_factor": self.config.retry_backoff_factor,
             "verify_ssl": self.config.verify_ssl,
             "taxonomy_expected": self.config.taxonomy_expected,
+            "taxonomy_dirs": list(self.config.taxonomy_dirs),
+            "taxonomy_cache_size": self.config.taxonomy_cache_size,
+            "header_scan_bytes": self.config.header_scan_bytes,
+            "plan_filings": self.config.plan_filings,
+            "corpus_quality_checks": self.config.corpus_quality_checks,
+            "quality_stats_path": self.config.quality_stats_path,
+            "quality_min_samples": self.config.quality_min_samples,
+            "calculation_checks": self.config.calculation_checks,
+            "calculation_tolerance": self.config.calculation_tolerance,
+            "normalize_units": self.config.normalize_units,
+            "peer_benchmarks": self.config.peer_benchmarks,
+            "peer_index_path": self.config.peer_index_path,
+            "queue_visibility_timeout": self.config.queue_visibility_timeout,
+            "queue_max_attempts": self.config.queue_max_attempts,
+            "stream_lookahead": self.config.stream_lookahead,
+            "checkpoint_dir": self.config.checkpoint_dir,
+            "isolation_workers": self.config.isolation_workers,
+            "filing_timeout": self.config.filing_timeout,
+            "filing_max_rss_mb": self.config.filing_max_rss_mb,
+            "quarantine_path": self.config.quarantine_path,
             "data_quality_base": self.config.data_quality_base,
             "enable_arelle": self.config.enable_arelle,
             "arelle_log_level": self.config.arelle_log_level,
             "taxonomy_mapping_path": self.config.taxonomy_mapping_path,
             "enable_public_data_fallback": self.config.enable_public_data_fallback,
-            "output_dir": self.config.output_dir
+            "mapping_sources": list(self.config.mapping_sources),
+            "prune_unmapped_facts": self.config.prune_unmapped_facts,
+            "reconstruct_tables": self.config.reconstruct_tables,
+            "store_fact_hashes": self.config.store_fact_hashes,
+            "fact_hash_dir": self.config.fact_hash_dir,
+            "text_index": self.config.text_index,
+            "text_index_path": self.config.text_index_path,
+            "text_index_min_chars": self.config.text_index_min_chars,
+            "physical_risk": self.config.physical_risk,
+            "climada_data_dir": self.config.climada_data_dir,
+            "hazard_path": self.config.hazard_path,
+            "impact_function_path": self.config.impact_function_path,
+            "impact_function_region": self.config.impact_function_region,
+            "company_locations_path": self.config.company_locations_path,
+            "snap_max_km": self.config.snap_max_km,
+            "output_dir": self.config.output_dir,
+            "export_formats": list(self.config.export_formats),
+            "export_compression": self.config.export_compression,
+            "company_db_path": self.config.company_db_path,
+            "cache_dir": self.config.cache_dir,
+            "ticker_index_path": self.config.ticker_index_path,
+            "public_data_cache_ttl": self.config.public_data_cache_ttl,
+            "profile_slow_filings": self.config.profile_slow_filings,
+            "profile_latency_threshold": self.config.profile_latency_threshold,
+            "profile_memory_threshold_mb": self.config.profile_memory_threshold_mb,
+            "profile_sample_interval": self.config.profile_sample_interval,
+            "profile_trace_memory": self.config.profile_trace_memory,
+            "profile_dir": self.config.profile_dir
         }
         
         with open(path, 'w', encoding='utf-8') as f:
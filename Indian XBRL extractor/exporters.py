@@ -0,0 +1,388 @@
+"""
+Streaming record exporters for BRSR ESG metrics.
+
+Writers consume records batch by batch, so an export never needs the full
+result set (or a DataFrame of it) in memory. Supported formats:
+
+- ``csv``     Excel-compatible CSV (utf-8 with BOM)
+- ``json``    compact JSON array
+- ``ndjson``  newline-delimited JSON, one record per line
+- ``parquet`` Parquet written row group by row group
+- ``arrow``   Arrow IPC stream
+
+Text and Arrow outputs can optionally be compressed with ``gzip`` or ``zstd``.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import itertools
+import json
+import logging
+import time
+from dataclasses import asdict, fields, is_dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import pyarrow as pa
+
+logger = logging.getLogger("brsr_parser")
+
+EXPORT_FORMATS = ("csv", "json", "ndjson", "parquet", "arrow")
+DEFAULT_FORMATS = ("csv", "parquet", "json")
+COMPRESSIONS = ("gzip", "zstd")
+
+_EXTENSIONS = {
+    "csv": ".csv",
+    "json": ".json",
+    "ndjson": ".ndjson",
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+}
+_COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+# Arrow types of ESGRecord field annotations. ``Any`` (indicator_value mixes
+# numbers, booleans and narrative text) is stored as strings.
+_ARROW_TYPES = {"str": pa.string(), "int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(), "Any": pa.string()}
+# Columns CorpusQualityChecker.apply adds to a DataFrame export
+_FRAME_COLUMNS = {"robust_z": pa.float64(), "sector_percentile": pa.float64(), "quality_flags": pa.string()}
+
+
+# -------------------------------------------------------------------
+# Helpers
+# -------------------------------------------------------------------
+
+def _record_to_dict(record: Any) -> Dict[str, Any]:
+    """Convert an ESGRecord (or any dataclass / mapping) into a plain dict."""
+    if is_dataclass(record) and not isinstance(record, type):
+        return asdict(record)
+    return dict(record)
+
+
+def _clean_value(value: Any) -> Any:
+    """Replace NaN with None so that JSON output stays valid."""
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def iter_batches(records: Iterable[Any], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group records into lists of plain dicts of at most ``batch_size`` rows."""
+    batch: List[Dict[str, Any]] = []
+    for record in records:
+        batch.append(_record_to_dict(record))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def output_path(out_dir: Path, base_name: str, fmt: str, compression: Optional[str] = None) -> Path:
+    """Return the path a format is written to, including any compression suffix."""
+    suffix = _EXTENSIONS[fmt]
+    # Parquet column chunks and zstd Arrow IPC buffers are compressed inside an
+    # otherwise plain file, so the file name is unchanged.
+    internal = fmt == "parquet" or (fmt == "arrow" and compression == "zstd")
+    if compression and not internal:
+        suffix += _COMPRESSION_SUFFIXES[compression]
+    return out_dir / f"{base_name}{suffix}"
+
+
+def _open_sink(path: Path, compression: Optional[str]) -> Any:
+    """Open a binary sink, transparently compressing when requested."""
+    if compression:
+        return pa.output_stream(str(path), compression=compression)
+    return open(path, "wb")
+
+
+def _record_fields() -> List[pa.Field]:
+    """Arrow fields of the ESGRecord columns, from the dataclass annotations."""
+    from brsr_xbrl_extractor import ESGRecord
+
+    result = []
+    for field in fields(ESGRecord):
+        annotation = str(field.type)
+        if annotation.startswith("Optional["):
+            annotation = annotation[len("Optional["):-1]
+        result.append(pa.field(field.name, _ARROW_TYPES.get(annotation, pa.string())))
+    return result
+
+
+def _columns_schema(rows: List[Dict[str, Any]]) -> pa.Schema:
+    """Schema for an export: ESGRecord fields, then any extra columns of the first batch.
+
+    Record and quality columns have fixed types, so a column that is empty or
+    differently typed in the first batch cannot break a later one. Other
+    extra columns are inferred; an all-empty or mixed one is stored as strings.
+    """
+    schema_fields = _record_fields()
+    known = {field.name for field in schema_fields}
+    for name in rows[0].keys():
+        if name in known:
+            continue
+        if name in _FRAME_COLUMNS:
+            schema_fields.append(pa.field(name, _FRAME_COLUMNS[name]))
+            continue
+        values = [_clean_value(row.get(name)) for row in rows]
+        try:
+            data_type = pa.array(values).type
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            data_type = pa.string()
+        schema_fields.append(pa.field(name, pa.string() if pa.types.is_null(data_type) else data_type))
+    return pa.schema(schema_fields)
+
+
+def _to_arrow_table(rows: List[Dict[str, Any]], schema: pa.Schema) -> pa.Table:
+    """Build an Arrow table from dict rows, coercing values to the export schema."""
+    columns: Dict[str, List[Any]] = {}
+    for field in schema:
+        values = [_clean_value(row.get(field.name)) for row in rows]
+        if pa.types.is_string(field.type):
+            values = [None if v is None else str(v) for v in values]
+        elif pa.types.is_floating(field.type):
+            values = [None if v is None else float(v) for v in values]
+        elif pa.types.is_integer(field.type):
+            values = [None if v is None else int(v) for v in values]
+        columns[field.name] = values
+    return pa.Table.from_pydict(columns, schema=schema)
+
+
+# -------------------------------------------------------------------
+# Writers
+# -------------------------------------------------------------------
+
+class RecordWriter:
+    """Base class for streaming writers; subclasses implement ``write_batch``."""
+
+    def __init__(self, path: Path, compression: Optional[str] = None) -> None:
+        self.path = path
+        self.compression = compression
+        self.rows_written = 0
+
+    def write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class CSVRecordWriter(RecordWriter):
+    """Writes an Excel-compatible CSV, emitting the header with the first batch."""
+
+    def __init__(self, path: Path, compression: Optional[str] = None) -> None:
+        super().__init__(path, compression)
+        self._sink = _open_sink(path, compression)
+        self._fieldnames: Optional[List[str]] = None
+
+    def write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        buffer = io.StringIO()
+        header = self._fieldnames is None
+        if header:
+            self._fieldnames = list(rows[0].keys())
+            buffer.write("\ufeff")  # BOM so Excel detects UTF-8
+        # "\n" line endings, as DataFrame.to_csv wrote them
+        writer = csv.DictWriter(buffer, fieldnames=self._fieldnames, extrasaction="ignore", lineterminator="\n")
+        if header:
+            writer.writeheader()
+        writer.writerows({k: _clean_value(v) for k, v in row.items()} for row in rows)
+        self._sink.write(buffer.getvalue().encode("utf-8"))
+        self.rows_written += len(rows)
+
+    def close(self) -> None:
+        self._sink.close()
+
+
+class NDJSONRecordWriter(RecordWriter):
+    """Writes one compact JSON object per line."""
+
+    def __init__(self, path: Path, compression: Optional[str] = None) -> None:
+        super().__init__(path, compression)
+        self._sink = _open_sink(path, compression)
+
+    def write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        lines = "".join(
+            json.dumps({k: _clean_value(v) for k, v in row.items()},
+                       ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+            for row in rows
+        )
+        self._sink.write(lines.encode("utf-8"))
+        self.rows_written += len(rows)
+
+    def close(self) -> None:
+        self._sink.close()
+
+
+class JSONRecordWriter(RecordWriter):
+    """Writes a compact JSON array incrementally."""
+
+    def __init__(self, path: Path, compression: Optional[str] = None) -> None:
+        super().__init__(path, compression)
+        self._sink = _open_sink(path, compression)
+        self._sink.write(b"[")
+
+    def write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        body = ",".join(
+            json.dumps({k: _clean_value(v) for k, v in row.items()},
+                       ensure_ascii=False, separators=(",", ":"), default=str)
+            for row in rows
+        )
+        prefix = "," if self.rows_written else ""
+        self._sink.write((prefix + body).encode("utf-8"))
+        self.rows_written += len(rows)
+
+    def close(self) -> None:
+        self._sink.write(b"]")
+        self._sink.close()
+
+
+class ParquetRecordWriter(RecordWriter):
+    """Writes one Parquet row group per batch."""
+
+    def __init__(self, path: Path, compression: Optional[str] = None) -> None:
+        super().__init__(path, compression)
+        self._writer: Any = None
+        self._schema: Optional[pa.Schema] = None
+
+    def write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        import pyarrow.parquet as pq
+
+        if self._schema is None:
+            self._schema = _columns_schema(rows)
+        table = _to_arrow_table(rows, self._schema)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(
+                str(self.path), self._schema, compression=self.compression or "snappy"
+            )
+        self._writer.write_table(table)
+        self.rows_written += len(rows)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+class ArrowRecordWriter(RecordWriter):
+    """Writes an Arrow IPC stream, one record batch per batch.
+
+    ``zstd`` uses Arrow's native buffer compression; ``gzip`` compresses the
+    whole stream since the IPC format does not support it per buffer.
+    """
+
+    def __init__(self, path: Path, compression: Optional[str] = None) -> None:
+        super().__init__(path, compression)
+        self._sink = _open_sink(path, "gzip" if compression == "gzip" else None)
+        self._writer: Any = None
+        self._schema: Optional[pa.Schema] = None
+
+    def write_batch(self, rows: List[Dict[str, Any]]) -> None:
+        if self._schema is None:
+            self._schema = _columns_schema(rows)
+        table = _to_arrow_table(rows, self._schema)
+        if self._writer is None:
+            options = pa.ipc.IpcWriteOptions(
+                compression="zstd" if self.compression == "zstd" else None
+            )
+            self._writer = pa.ipc.new_stream(self._sink, self._schema, options=options)
+        self._writer.write_table(table)
+        self.rows_written += len(rows)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._sink.close()
+
+
+WRITERS = {
+    "csv": CSVRecordWriter,
+    "json": JSONRecordWriter,
+    "ndjson": NDJSONRecordWriter,
+    "parquet": ParquetRecordWriter,
+    "arrow": ArrowRecordWriter,
+}
+
+
+# -------------------------------------------------------------------
+# Public API
+# -------------------------------------------------------------------
+
+def _validate(formats: Sequence[str], compression: Optional[str]) -> None:
+    unknown = [fmt for fmt in formats if fmt not in WRITERS]
+    if unknown:
+        raise ValueError(f"Unsupported export format(s): {', '.join(unknown)}")
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f"Unsupported compression: {compression}")
+
+
+def export_records(
+    records: Iterable[Any],
+    out_dir: Path,
+    base_name: str = "brsr_esg_metrics",
+    formats: Sequence[str] = DEFAULT_FORMATS,
+    compression: Optional[str] = None,
+    batch_size: int = 5000,
+    metrics: Optional[Any] = None,
+) -> Dict[str, Path]:
+    """Stream records into every requested format and return the written paths.
+
+    ``records`` may be any iterable (including a generator) of ESGRecord
+    instances or dicts; it is consumed once, ``batch_size`` rows at a time.
+    A writer that fails is dropped with a warning and the others continue.
+    If ``metrics`` (an ``ExtractorMetrics``) is given, time spent writing --
+    excluding time spent producing the records -- is recorded as the
+    ``export`` stage.
+    """
+    _validate(formats, compression)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    batches = iter_batches(records, batch_size)
+    first = next(batches, None)
+    if first is None:
+        logger.warning("No records to export")
+        return {}
+
+    writers: Dict[str, RecordWriter] = {}
+    for fmt in formats:
+        path = output_path(out_dir, base_name, fmt, compression)
+        try:
+            writers[fmt] = WRITERS[fmt](path, compression)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Could not export %s: %s", fmt, exc)
+
+    def _write(batch: List[Dict[str, Any]]) -> None:
+        for fmt, writer in list(writers.items()):
+            try:
+                writer.write_batch(batch)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Could not export %s: %s", fmt, exc)
+                try:
+                    writer.close()
+                except Exception:  # noqa: BLE001
+                    pass
+                writer.path.unlink(missing_ok=True)
+                del writers[fmt]
+
+    export_s = 0.0
+    for batch in itertools.chain([first], batches):
+        start = time.perf_counter()
+        _write(batch)
+        export_s += time.perf_counter() - start
+
+    written: Dict[str, Path] = {}
+    start = time.perf_counter()
+    for fmt, writer in writers.items():
+        writer.close()
+        written[fmt] = writer.path
+        logger.info("✓ Exported %s to %s (%d rows)", fmt.upper(), writer.path, writer.rows_written)
+    export_s += time.perf_counter() - start
+
+    if metrics is not None:
+        metrics.observe_stage("export", export_s)
+    return written
@@ -0,0 +1,277 @@
+"""
+Compact, column-oriented storage for the raw facts of one filing.
+
+Parsers used to emit one dict per fact, each repeating the namespace URI, a
+concatenated ``qname`` and the local name. ``FactTable`` instead keeps one
+interned copy of every namespace, local name, context id and unit in small
+symbol tables, and stores each fact as integer references into them
+(``array('i')`` columns) plus its value string.
+
+``MetricMapper`` and ``BRSRExtractor._transform_facts_to_records`` consume a
+``FactTable`` directly, mapping each distinct local name once per filing.
+The old dict shape is still available: iterating a table yields ``Fact``
+views that support ``fact["local_name"]`` / ``fact.get(...)``, and
+``FactTable.to_dicts()`` / ``FactTable.from_dicts()`` convert both ways.
+
+``ConceptFilter`` is the precompiled set of concepts the mapper can resolve;
+parsers consult it to skip elements that could never map before they are
+materialized.
+
+Contexts are described once per filing: ``periods`` holds each context's
+period end (or instant) and ``dimensions`` the sorted (axis, member) pairs of
+dimensional contexts, both keyed by context id.
+"""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+# Keys of the legacy per-fact dict, in their historical order.
+FACT_KEYS = ("qname", "local_name", "namespace", "value", "unit", "context_id")
+
+_NONE = -1
+
+
+class SymbolTable:
+    """Interns strings and hands out dense integer ids."""
+
+    __slots__ = ("symbols", "_ids")
+
+    def __init__(self) -> None:
+        self.symbols: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def intern(self, text: Optional[str]) -> int:
+        """Return the id for ``text`` (``-1`` for None), adding it if new."""
+        if text is None:
+            return _NONE
+        symbol_id = self._ids.get(text)
+        if symbol_id is None:
+            symbol_id = self._ids[text] = len(self.symbols)
+            self.symbols.append(sys.intern(text))
+        return symbol_id
+
+    def lookup(self, symbol_id: int) -> Optional[str]:
+        return None if symbol_id == _NONE else self.symbols[symbol_id]
+
+
+class Fact:
+    """Read-only view of one row of a ``FactTable`` with dict-style access."""
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: "FactTable", row: int) -> None:
+        self._table = table
+        self._row = row
+
+    @property
+    def namespace(self) -> str:
+        return self._table.namespaces.symbols[self._table.namespace_ids[self._row]]
+
+    @property
+    def local_name(self) -> str:
+        return self._table.local_names.symbols[self._table.local_name_ids[self._row]]
+
+    @property
+    def qname(self) -> str:
+        namespace = self.namespace
+        return f"{namespace}:{self.local_name}" if namespace else self.local_name
+
+    @property
+    def value(self) -> Optional[str]:
+        return self._table.values[self._row]
+
+    @property
+    def unit(self) -> Optional[str]:
+        return self._table.units.lookup(self._table.unit_ids[self._row])
+
+    @property
+    def context_id(self) -> Optional[str]:
+        return self._table.contexts.lookup(self._table.context_ids[self._row])
+
+    # -- dict adapter --------------------------------------------------
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in FACT_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in FACT_KEYS else default
+
+    def keys(self) -> Iterable[str]:
+        return FACT_KEYS
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in FACT_KEYS}
+
+    def __repr__(self) -> str:
+        return f"Fact({self.qname!r}, value={self.value!r}, context_id={self.context_id!r})"
+
+
+class FactTable:
+    """Array-backed facts of a single filing with shared symbol tables."""
+
+    __slots__ = (
+        "namespaces", "local_names", "contexts", "units",
+        "namespace_ids", "local_name_ids", "context_ids", "unit_ids", "values", "skipped",
+        "periods", "dimensions",
+    )
+
+    def __init__(self) -> None:
+        self.namespaces = SymbolTable()
+        self.local_names = SymbolTable()
+        self.contexts = SymbolTable()
+        self.units = SymbolTable()
+        self.namespace_ids = array("i")
+        self.local_name_ids = array("i")
+        self.context_ids = array("i")
+        self.unit_ids = array("i")
+        self.values: List[Optional[str]] = []
+        self.skipped = 0  # elements pruned by a ConceptFilter
+        self.periods: Dict[str, Optional[str]] = {}
+        self.dimensions: Dict[str, Tuple[Tuple[str, str], ...]] = {}
+
+    def append(
+        self,
+        namespace: Optional[str],
+        local_name: str,
+        value: Optional[str],
+        unit: Optional[str] = None,
+        context_id: Optional[str] = None,
+    ) -> None:
+        """Add one fact."""
+        self.namespace_ids.append(self.namespaces.intern(namespace or ""))
+        self.local_name_ids.append(self.local_names.intern(local_name or ""))
+        self.context_ids.append(self.contexts.intern(context_id))
+        self.unit_ids.append(self.units.intern(unit))
+        self.values.append(value)
+
+    def set_context(
+        self, context_id: str, period: Optional[str], dimensions: Iterable[Tuple[str, str]] = ()
+    ) -> None:
+        """Describe a context: its period end (or instant) and its (axis, member) pairs."""
+        self.periods[context_id] = period
+        dims = tuple(sorted(dimensions))
+        if dims:
+            self.dimensions[context_id] = dims
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, row: int) -> Fact:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("fact index out of range")
+        return Fact(self, row)
+
+    def __iter__(self) -> Iterator[Fact]:
+        for row in range(len(self)):
+            yield Fact(self, row)
+
+    # -- dict adapter --------------------------------------------------
+
+    @classmethod
+    def from_dicts(cls, facts: Iterable[Dict[str, Any]]) -> "FactTable":
+        """Build a table from legacy fact dicts (missing keys default to None)."""
+        table = cls()
+        for fact in facts:
+            value = fact.get("value")
+            table.append(
+                fact.get("namespace"),
+                fact.get("local_name", ""),
+                None if value is None else str(value),
+                fact.get("unit"),
+                fact.get("context_id"),
+            )
+        return table
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Return the facts in the legacy one-dict-per-fact shape."""
+        return [fact.to_dict() for fact in self]
+
+
+def as_fact_table(facts: Union[FactTable, Iterable[Dict[str, Any]]]) -> FactTable:
+    """Return ``facts`` as a ``FactTable``, converting legacy dicts if needed."""
+    return facts if isinstance(facts, FactTable) else FactTable.from_dicts(facts)
+
+
+# -------------------------------------------------------------------
+# Concepts of interest
+# -------------------------------------------------------------------
+
+_QGRAM = 3
+
+
+def _qgrams(text: str) -> List[str]:
+    return [text[i:i + _QGRAM] for i in range(len(text) - _QGRAM + 1)]
+
+
+class ConceptFilter:
+    """Decides, per local name, whether a fact could map to an indicator.
+
+    ``exact`` names are accepted as-is. ``partial`` names reproduce the
+    mapper's substring matching (either name containing the other,
+    case-insensitively). Because that scan is linear in the number of
+    partial names, it is guarded by a Bloom-style prefilter over their
+    character trigrams: a name can only lie inside a partial name if all of
+    its trigrams are in the Bloom bit set, and can only contain one if it
+    includes that name's leading trigram. Decisions are memoized, since
+    filings reuse the same concepts.
+    """
+
+    MEMO_LIMIT = 100_000
+
+    def __init__(self, exact: Iterable[str], partial: Iterable[str] = (), bloom_bits: int = 1 << 14) -> None:
+        self.exact: FrozenSet[str] = frozenset(exact)
+        names = sorted({name.lower() for name in partial if name})
+        self.partial = tuple(names)
+        self._short = tuple(name for name in names if len(name) < _QGRAM)
+        self._mask = bloom_bits - 1
+        self._bloom = bytearray(bloom_bits // 8)
+        self._anchors: Set[str] = set()
+        for name in names:
+            grams = _qgrams(name)
+            if grams:
+                self._anchors.add(grams[0])
+            for gram in grams:
+                for bit in self._bits(gram):
+                    self._bloom[bit >> 3] |= 1 << (bit & 7)
+        self._memo: Dict[str, bool] = {}
+
+    def _bits(self, gram: str) -> tuple:
+        h = hash(gram)
+        return h & self._mask, (h >> 16) & self._mask
+
+    def _in_bloom(self, gram: str) -> bool:
+        return all(self._bloom[bit >> 3] & (1 << (bit & 7)) for bit in self._bits(gram))
+
+    def accepts(self, local_name: str) -> bool:
+        """Return False only if no mapping step could resolve ``local_name``."""
+        decision = self._memo.get(local_name)
+        if decision is None:
+            decision = self._decide(local_name)
+            if len(self._memo) >= self.MEMO_LIMIT:
+                self._memo.clear()
+            self._memo[local_name] = decision
+        return decision
+
+    __contains__ = accepts
+
+    def _decide(self, local_name: str) -> bool:
+        if local_name in self.exact:
+            return True
+        if not self.partial:
+            return False
+        low = local_name.lower()
+        if len(low) >= _QGRAM and not any(short in low for short in self._short):
+            grams = _qgrams(low)
+            if not all(self._in_bloom(g) for g in grams) and not any(g in self._anchors for g in grams):
+                return False
+        return any(name in low or low in name for name in self.partial)
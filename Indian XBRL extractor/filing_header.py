@@ -0,0 +1,159 @@
+"""
+Fast header pre-scan of XBRL instance documents.
+
+``scan_header`` reads only the leading bytes of an instance (the root
+element's namespace declarations and the first few contexts) with an
+incremental parser and stops as soon as it has the entity identifier (CIN),
+the reporting period and the taxonomy namespace. The resulting
+``FilingHeader`` lets a bulk run skip filings it already stored, route each
+filing to its taxonomy release and order the work queue, without a full
+parse. Remote filings are pre-scanned with an HTTP range request (see
+``XbrlFetcher.fetch_head``).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Container, Iterable, List, Optional
+
+from company_registry import parse_filing_id
+from taxonomy_registry import SEBI_NAMESPACE_RE, taxonomy_version
+
+XBRLI = "{http://www.xbrl.org/2003/instance}"
+CHUNK_SIZE = 8192
+
+
+@dataclass(frozen=True)
+class FilingHeader:
+    """What a filing is, learned from its first few kilobytes."""
+    source: str
+    cin: Optional[str]
+    namespace: Optional[str]
+    period_start: Optional[str]
+    period_end: Optional[str]
+    bytes_scanned: int
+    content_length: Optional[int] = None  # Full size, when known
+    filing_timestamp: Optional[datetime] = None  # From a BRSR_<filing>_<timestamp> source name
+
+    @property
+    def taxonomy_version(self) -> Optional[str]:
+        return taxonomy_version(self.namespace)
+
+    @property
+    def reporting_year(self) -> Optional[int]:
+        try:
+            return int(self.period_end[:4]) if self.period_end else None
+        except ValueError:
+            return None
+
+    @property
+    def key(self) -> Optional[str]:
+        """Dedup key: one filing per company and reporting period."""
+        if not self.cin or not self.period_end:
+            return None
+        return f"{self.cin}:{self.period_end}"
+
+
+def scan_header(
+    content: bytes,
+    source: str = "",
+    max_bytes: int = 65536,
+    max_contexts: int = 4,
+    content_length: Optional[int] = None,
+) -> FilingHeader:
+    """Pre-scan the start of an instance document.
+
+    Reads at most ``max_bytes`` and stops after ``max_contexts`` complete
+    contexts. The reporting period is the latest end date seen (matching
+    the full parsers, which take the year from the period end). Malformed or
+    truncated input simply yields a header with missing fields.
+    """
+    from lxml import etree
+
+    parser = etree.XMLPullParser(events=("start", "end"), recover=True)
+    namespace: Optional[str] = None
+    cin: Optional[str] = None
+    period_start: Optional[str] = None
+    period_end: Optional[str] = None
+    contexts = 0
+    scanned = 0
+    done = False
+    limit = min(len(content), max_bytes)
+
+    while scanned < limit and not done:
+        chunk = content[scanned:min(scanned + CHUNK_SIZE, limit)]
+        scanned += len(chunk)
+        try:
+            parser.feed(chunk)
+            events = list(parser.read_events())
+        except etree.XMLSyntaxError:
+            break
+        for event, el in events:
+            if event == "start":
+                if namespace is None and el.getparent() is None:
+                    namespace = next(
+                        (uri for uri in (el.nsmap or {}).values() if SEBI_NAMESPACE_RE.match(uri or "")),
+                        None,
+                    )
+                continue
+            if el.tag != f"{XBRLI}context":
+                continue
+            ident = el.find(f".//{XBRLI}identifier")
+            if cin is None and ident is not None and ident.text:
+                cin = ident.text.strip()
+            end = el.find(f".//{XBRLI}endDate")
+            if end is None:
+                end = el.find(f".//{XBRLI}instant")
+            start = el.find(f".//{XBRLI}startDate")
+            if end is not None and end.text:
+                end_text = end.text.strip()
+                if period_end is None or end_text > period_end:
+                    period_end = end_text
+                    period_start = start.text.strip() if start is not None and start.text else None
+            contexts += 1
+            if contexts >= max_contexts and cin and period_end:
+                done = True
+                break
+
+    parsed = parse_filing_id(source)
+    return FilingHeader(
+        source=source,
+        cin=cin,
+        namespace=namespace,
+        period_start=period_start,
+        period_end=period_end,
+        bytes_scanned=scanned,
+        content_length=content_length if content_length is not None else (
+            len(content) if scanned >= len(content) else None),
+        filing_timestamp=parsed[2] if parsed else None,
+    )
+
+
+def plan_filings(headers: Iterable[FilingHeader], processed: Container[str] = ()) -> List[FilingHeader]:
+    """Order pre-scanned filings into a work queue.
+
+    Filings whose key is in ``processed`` are skipped; of several filings
+    for the same company and period only the newest (by filing timestamp,
+    else the last listed) is kept. The queue is grouped by taxonomy release,
+    so each compiled taxonomy stays hot in the registry's LRU, then ordered
+    by company and period.
+    """
+    latest = {}
+    unkeyed: List[FilingHeader] = []
+    for header in headers:
+        key = header.key
+        if key is None:
+            unkeyed.append(header)
+            continue
+        if key in processed:
+            continue
+        current = latest.get(key)
+        if (current is None or current.filing_timestamp is None or header.filing_timestamp is None
+                or header.filing_timestamp >= current.filing_timestamp):
+            latest[key] = header
+    queue = sorted(
+        latest.values(),
+        key=lambda h: (h.taxonomy_version or "", h.cin or "", h.period_end or ""),
+    )
+    return queue + unkeyed
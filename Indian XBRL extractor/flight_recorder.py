@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Slow-filing flight recorder.
+
+When enabled (``ParserConfig.profile_slow_filings``), every call to
+``BRSRExtractor.process_content`` runs under a low-overhead sampling profiler
+and, optionally, tracemalloc. Profiles are discarded unless the filing
+exceeds the latency or memory threshold, in which case they are written to
+``<profile_dir>/<run_id>/`` as:
+
+- ``<filing_id>.json``        summary: timings, peak memory, top functions/allocations
+- ``<filing_id>.folded``      collapsed stacks (flamegraph.pl / speedscope compatible)
+- ``<filing_id>.tracemalloc`` tracemalloc snapshot (``tracemalloc.Snapshot.load``)
+
+tracemalloc is process-wide, so a filing's memory peak includes whatever other
+filings allocate at the same time (``stream_lookahead`` > 1). The memory
+threshold only applies to filings that ran alone; overlapping filings are
+still recorded for latency, with ``memory_attributed`` false.
+
+Command line:
+    python flight_recorder.py list [--dir output/profiles] [--top 20]
+    python flight_recorder.py diff RUN_A RUN_B [--dir output/profiles]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from company_registry import parse_filing_id
+
+logger = logging.getLogger("brsr_parser")
+
+_UNSAFE_CHARS_RE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def filing_id_for(source_name: Optional[str]) -> str:
+    """Return the BRSR filing ID in a source name, else a file-system safe stem."""
+    parsed = parse_filing_id(source_name or "")
+    if parsed is not None:
+        return parsed[0]
+    stem = Path(source_name or "unknown").stem or "unknown"
+    return _UNSAFE_CHARS_RE.sub("_", stem)[:100]
+
+
+# -------------------------------------------------------------------
+# Sampling profiler
+# -------------------------------------------------------------------
+
+class SamplingProfiler:
+    """Samples one thread's Python stack at a fixed interval from a helper thread.
+
+    Stacks are aggregated as collapsed ``frame;frame;frame`` strings. The
+    helper thread can also capture a tracemalloc snapshot the first time
+    traced memory grows past ``memory_threshold`` bytes, so the snapshot
+    reflects the filing at its peak rather than after it has been freed.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.005,
+        memory_threshold: Optional[int] = None,
+        memory_baseline: int = 0,
+    ) -> None:
+        self.interval = interval
+        self.memory_threshold = memory_threshold
+        self.memory_baseline = memory_baseline
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="brsr-flight-recorder", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+            if (self.snapshot is None and self.memory_threshold is not None
+                    and tracemalloc.is_tracing()
+                    and tracemalloc.get_traced_memory()[0] - self.memory_baseline > self.memory_threshold):
+                self.snapshot = tracemalloc.take_snapshot()
+
+    def top_functions(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Leaf functions by self-sample count."""
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return [
+            {"function": name, "samples": n, "share": round(n / self.samples, 4)}
+            for name, n in leaves.most_common(limit)
+        ]
+
+    def folded(self) -> str:
+        """Collapsed stacks, one ``stack count`` line each."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+# -------------------------------------------------------------------
+# Flight recorder
+# -------------------------------------------------------------------
+
+class FlightRecorder:
+    """Profiles each filing and keeps the evidence only for slow or memory-heavy ones."""
+
+    def __init__(
+        self,
+        profile_dir: str,
+        latency_threshold: float = 10.0,
+        memory_threshold_mb: float = 256.0,
+        sample_interval: float = 0.005,
+        trace_memory: bool = True,
+        run_id: Optional[str] = None,
+    ) -> None:
+        self.latency_threshold = latency_threshold
+        self.memory_threshold = int(memory_threshold_mb * 1024 * 1024)
+        self.sample_interval = sample_interval
+        self.trace_memory = trace_memory
+        self.run_id = run_id or datetime.now().strftime("run_%Y%m%dT%H%M%S")
+        self.run_dir = Path(profile_dir) / self.run_id
+        self.recorded: List[Dict[str, Any]] = []
+        # tracemalloc is process-wide: a filing that overlaps another one in
+        # this process cannot be held to the memory threshold.
+        self._lock = threading.Lock()
+        self._tracing_users = 0
+        self._started_tracing = False
+        self._overlapped: Dict[object, bool] = {}  # In-flight filing -> overlapped another one
+
+    @contextmanager
+    def record(self, source_name: Optional[str], **context: Any) -> Iterator[None]:
+        """Profile the enclosed block as one filing."""
+        token = object()
+        with self._lock:
+            for other in self._overlapped:
+                self._overlapped[other] = True
+            self._overlapped[token] = bool(self._overlapped)
+            if self.trace_memory:
+                # Traced only while at least one filing is recording;
+                # tracemalloc slows every allocation while it is running.
+                if self._tracing_users == 0 and not tracemalloc.is_tracing():
+                    tracemalloc.start(25)
+                    self._started_tracing = True
+                self._tracing_users += 1
+            baseline = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+
+        profiler = SamplingProfiler(
+            self.sample_interval,
+            memory_threshold=self.memory_threshold if self.trace_memory else None,
+            memory_baseline=baseline,
+        )
+        start = time.perf_counter()
+        profiler.start()
+        error: Optional[str] = None
+        try:
+            yield
+        except BaseException as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            profiler.stop()
+            elapsed = time.perf_counter() - start
+            peak = 0
+            if tracemalloc.is_tracing():
+                peak = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+            reasons = []
+            if elapsed >= self.latency_threshold:
+                reasons.append("latency")
+            with self._lock:
+                overlapped = self._overlapped.pop(token)
+            if self.trace_memory and not overlapped and peak >= self.memory_threshold:
+                reasons.append("memory")
+            if reasons:
+                self._save(filing_id_for(source_name), source_name, elapsed, peak, reasons,
+                           profiler, error, context, memory_attributed=not overlapped)
+            if self.trace_memory:
+                with self._lock:
+                    self._tracing_users -= 1
+                    if self._tracing_users == 0 and self._started_tracing:
+                        tracemalloc.stop()
+                        self._started_tracing = False
+
+    def _save(
+        self,
+        filing_id: str,
+        source_name: Optional[str],
+        elapsed: float,
+        peak: int,
+        reasons: List[str],
+        profiler: SamplingProfiler,
+        error: Optional[str],
+        context: Dict[str, Any],
+        memory_attributed: bool = True,
+    ) -> None:
+        try:
+            self.run_dir.mkdir(parents=True, exist_ok=True)
+            snapshot = profiler.snapshot
+            if snapshot is None and tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+
+            top_allocations: List[Dict[str, Any]] = []
+            if snapshot is not None:
+                snapshot = snapshot.filter_traces([
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, __file__),
+                ])
+                snapshot.dump(str(self.run_dir / f"{filing_id}.tracemalloc"))
+                for stat in snapshot.statistics("lineno")[:20]:
+                    frame = stat.traceback[0]
+                    top_allocations.append({
+                        "location": f"{Path(frame.filename).name}:{frame.lineno}",
+                        "size_kb": round(stat.size / 1024, 1),
+                        "count": stat.count,
+                    })
+
+            (self.run_dir / f"{filing_id}.folded").write_text(profiler.folded(), encoding="utf-8")
+            summary = {
+                "filing_id": filing_id,
+                "source_name": source_name,
+                "run_id": self.run_id,
+                "recorded_at": datetime.now().isoformat(timespec="seconds"),
+                "elapsed_s": round(elapsed, 4),
+                "peak_memory_mb": round(peak / (1024 * 1024), 2),
+                "memory_attributed": memory_attributed,  # False: other filings ran concurrently
+                "reasons": reasons,
+                "thresholds": {
+                    "latency_s": self.latency_threshold,
+                    "memory_mb": round(self.memory_threshold / (1024 * 1024), 2),
+                },
+                "samples": profiler.samples,
+                "sample_interval_s": self.sample_interval,
+                "error": error,
+                "context": {k: v for k, v in context.items() if v is not None},
+                "top_functions": profiler.top_functions(),
+                "top_allocations": top_allocations,
+            }
+            with open(self.run_dir / f"{filing_id}.json", "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2, default=str)
+            self.recorded.append(summary)
+            logger.warning("Slow filing %s (%s): %.2fs, %.1f MB peak; profile saved to %s",
+                           filing_id, "+".join(reasons), elapsed, summary["peak_memory_mb"], self.run_dir)
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Failed to save flight recorder profile for %s: %s", filing_id, exc)
+
+
+# -------------------------------------------------------------------
+# Reporting
+# -------------------------------------------------------------------
+
+def load_profiles(profile_dir: str, run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Load saved profile summaries, optionally for a single run."""
+    root = Path(profile_dir)
+    pattern = f"{run_id}/*.json" if run_id else "*/*.json"
+    profiles = []
+    for path in sorted(root.glob(pattern)):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError) as exc:
+            logger.warning("Skipping unreadable profile %s: %s", path, exc)
+    return profiles
+
+
+def worst_offenders(profiles: List[Dict[str, Any]], top: int = 20, by: str = "elapsed_s") -> List[Dict[str, Any]]:
+    """Return the ``top`` profiles ranked by ``elapsed_s`` or ``peak_memory_mb``."""
+    return sorted(profiles, key=lambda p: p.get(by, 0), reverse=True)[:top]
+
+
+def diff_runs(profile_dir: str, run_a: str, run_b: str) -> List[Dict[str, Any]]:
+    """Compare filings recorded in two runs; filings missing from a run show None."""
+    a = {p["filing_id"]: p for p in load_profiles(profile_dir, run_a)}
+    b = {p["filing_id"]: p for p in load_profiles(profile_dir, run_b)}
+    rows = []
+    for filing_id in sorted(set(a) | set(b)):
+        pa, pb = a.get(filing_id), b.get(filing_id)
+        row = {
+            "filing_id": filing_id,
+            "elapsed_a": pa["elapsed_s"] if pa else None,
+            "elapsed_b": pb["elapsed_s"] if pb else None,
+            "peak_mb_a": pa["peak_memory_mb"] if pa else None,
+            "peak_mb_b": pb["peak_memory_mb"] if pb else None,
+        }
+        row["elapsed_delta"] = (round(row["elapsed_b"] - row["elapsed_a"], 4)
+                                if pa and pb else None)
+        rows.append(row)
+    rows.sort(key=lambda r: abs(r["elapsed_delta"] or 0), reverse=True)
+    return rows
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """List or diff slow-filing profiles across runs."""
+    parser = argparse.ArgumentParser(description="Inspect slow-filing flight recorder profiles.")
+    parser.add_argument("--dir", default=str(Path("output") / "profiles"), help="profile directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    list_cmd = sub.add_parser("list", help="list the worst offenders across runs")
+    list_cmd.add_argument("--run", help="restrict to one run ID")
+    list_cmd.add_argument("--top", type=int, default=20)
+    list_cmd.add_argument("--by", choices=("elapsed_s", "peak_memory_mb"), default="elapsed_s")
+
+    diff_cmd = sub.add_parser("diff", help="compare the filings recorded in two runs")
+    diff_cmd.add_argument("run_a")
+    diff_cmd.add_argument("run_b")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        rows = worst_offenders(load_profiles(args.dir, args.run), args.top, args.by)
+        if not rows:
+            print(f"No profiles found under {args.dir}")
+            return 0
+        print(f"{'filing_id':<32} {'run_id':<22} {'elapsed_s':>10} {'peak_mb':>9}  hottest function")
+        for p in rows:
+            hottest = p["top_functions"][0]["function"] if p.get("top_functions") else "-"
+            print(f"{p['filing_id']:<32} {p['run_id']:<22} {p['elapsed_s']:>10.2f} "
+                  f"{p['peak_memory_mb']:>9.1f}  {hottest}")
+    else:
+        rows = diff_runs(args.dir, args.run_a, args.run_b)
+        print(f"{'filing_id':<32} {'elapsed_a':>10} {'elapsed_b':>10} {'delta':>8} {'peak_a':>8} {'peak_b':>8}")
+        for r in rows:
+            print(f"{r['filing_id']:<32} {_fmt(r['elapsed_a']):>10} {_fmt(r['elapsed_b']):>10} "
+                  f"{_fmt(r['elapsed_delta']):>8} {_fmt(r['peak_mb_a']):>8} {_fmt(r['peak_mb_b']):>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
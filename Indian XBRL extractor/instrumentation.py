@@ -0,0 +1,238 @@
+"""
+Lightweight, dependency-free instrumentation for the extractor.
+
+``ExtractorMetrics`` keeps counters and fixed-bucket histograms keyed by
+name and labels. It renders the Prometheus text exposition format (served by
+``app.py`` at ``/metrics``) and a JSON-friendly summary (logged at the end of a
+CLI batch run).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Seconds; covers sub-millisecond mapping up to multi-minute Arelle loads.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+FACT_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000)
+
+# name -> (type, help, buckets)
+METRIC_DEFINITIONS: Dict[str, Tuple[str, str, Optional[Tuple[float, ...]]]] = {
+    "brsr_stage_seconds": ("histogram", "Time spent per extraction stage.", LATENCY_BUCKETS),
+    "brsr_facts_per_filing": ("histogram", "Raw facts extracted per filing.", FACT_BUCKETS),
+    "brsr_filings_total": ("counter", "Filings processed, by outcome.", None),
+    "brsr_records_total": ("counter", "ESG records produced.", None),
+    "brsr_facts_pruned_total": ("counter", "Facts skipped at parse time because no mapping could apply.", None),
+    "brsr_bytes_fetched_total": ("counter", "Bytes of XBRL content fetched.", None),
+    "brsr_fallbacks_total": ("counter", "Fallbacks taken, by kind.", None),
+    "brsr_calculation_inconsistencies_total": ("counter", "Reported totals that disagree with their calculation items.", None),
+    "brsr_unit_conversions_total": ("counter", "Values normalized to canonical units, by result.", None),
+    "brsr_queue_tasks_total": ("counter", "Work-queue tasks finished by this worker, by result.", None),
+    "brsr_filings_quarantined_total": ("counter", "Filings whose worker was killed for breaching a limit, by reason.", None),
+    "brsr_quality_flags_total": ("counter", "Values flagged by corpus-level quality checks, by flag.", None),
+    "brsr_cache_requests_total": ("counter", "Cache lookups, by cache and result.", None),
+    "brsr_text_facts_indexed_total": ("counter", "Text-valued facts written to the full-text index.", None),
+    "brsr_physical_risk_assessments_total": ("counter", "Physical risk assessments by how the company was located.", None),
+}
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    body = ",".join('{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in items)
+    return "{" + body + "}"
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket containing it (or the max)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for bound, n in zip(self.buckets, self.counts):
+            running += n
+            if running >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+class ExtractorMetrics:
+    """Thread-safe counters and histograms for the extraction pipeline."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+
+    def inc(self, name: str, amount: float = 1, **labels: Any) -> None:
+        """Increment a counter."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record a histogram observation."""
+        key = _label_key(labels)
+        buckets = METRIC_DEFINITIONS.get(name, ("histogram", "", LATENCY_BUCKETS))[2] or LATENCY_BUCKETS
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(buckets)
+            hist.observe(value)
+
+    def observe_stage(self, stage: str, seconds: float, **labels: Any) -> None:
+        """Record the latency of a pipeline stage."""
+        self.observe("brsr_stage_seconds", seconds, stage=stage, **labels)
+
+    @contextmanager
+    def time(self, stage: str, **labels: Any) -> Iterator[None]:
+        """Time a block as a pipeline stage (recorded even if the block raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start, **labels)
+
+    def counter_value(self, name: str, **labels: Any) -> float:
+        """Return a counter value; with no labels, the sum over all label sets."""
+        with self._lock:
+            series = self._counters.get(name, {})
+            if labels:
+                return series.get(_label_key(labels), 0)
+            return sum(series.values())
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def drain(self) -> Tuple[Dict[str, Dict[LabelKey, float]], Dict[str, Dict[LabelKey, _Histogram]]]:
+        """Return everything recorded so far (picklable) and reset; see ``merge``."""
+        with self._lock:
+            state = (self._counters, self._histograms)
+            self._counters, self._histograms = {}, {}
+        return state
+
+    def merge(self, state: Tuple[Dict[str, Dict[LabelKey, float]], Dict[str, Dict[LabelKey, _Histogram]]]) -> None:
+        """Add metrics drained from another instance (e.g. a worker process) to this one."""
+        counters, histograms = state
+        with self._lock:
+            for name, series in counters.items():
+                mine = self._counters.setdefault(name, {})
+                for key, value in series.items():
+                    mine[key] = mine.get(key, 0) + value
+            for name, series in histograms.items():
+                mine_h = self._histograms.setdefault(name, {})
+                for key, other in series.items():
+                    hist = mine_h.get(key)
+                    if hist is None:
+                        hist = mine_h[key] = _Histogram(other.buckets)
+                    hist.counts = [a + b for a, b in zip(hist.counts, other.counts)]
+                    hist.count += other.count
+                    hist.sum += other.sum
+                    hist.max = max(hist.max, other.max)
+
+    # -- exposition --------------------------------------------------
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            names = sorted(set(self._counters) | set(self._histograms))
+            for name in names:
+                kind, help_text, _ = METRIC_DEFINITIONS.get(name, ("untyped", "", None))
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in sorted(self._counters.get(name, {}).items()):
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+                for key, hist in sorted(self._histograms.get(name, {}).items()):
+                    running = 0
+                    for bound, n in zip(hist.buckets, hist.counts):
+                        running += n
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {running}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {hist.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Any]:
+        """Return a JSON-serializable summary of stage latencies, counters and rates."""
+        with self._lock:
+            stages: Dict[str, Any] = {}
+            for key, hist in self._histograms.get("brsr_stage_seconds", {}).items():
+                labels = dict(key)
+                label = labels.pop("stage", "") + "".join(f",{k}={v}" for k, v in sorted(labels.items()))
+                stages[label] = {
+                    "count": hist.count,
+                    "total_s": round(hist.sum, 6),
+                    "mean_s": round(hist.sum / hist.count, 6) if hist.count else 0.0,
+                    "p50_s": hist.quantile(0.5),
+                    "p95_s": hist.quantile(0.95),
+                    "max_s": round(hist.max, 6),
+                }
+            facts = _Histogram(FACT_BUCKETS)
+            for hist in self._histograms.get("brsr_facts_per_filing", {}).values():
+                facts.count += hist.count
+                facts.sum += hist.sum
+            counters = {
+                name: {",".join(f"{k}={v}" for k, v in key) or "total": value
+                       for key, value in series.items()}
+                for name, series in self._counters.items()
+            }
+            # Copy what the rates need so they are computed from one consistent view
+            cache_series = dict(self._counters.get("brsr_cache_requests_total", {}))
+            fallback_series = dict(self._counters.get("brsr_fallbacks_total", {}))
+            filings = sum(self._counters.get("brsr_filings_total", {}).values())
+            bytes_fetched = sum(self._counters.get("brsr_bytes_fetched_total", {}).values())
+
+        cache_rates: Dict[str, float] = {}
+        for key, value in cache_series.items():
+            labels = dict(key)
+            if labels.get("result") == "hit":
+                miss = cache_series.get(_label_key({"cache": labels["cache"], "result": "miss"}), 0)
+                total = value + miss
+                cache_rates[labels["cache"]] = round(value / total, 4) if total else 0.0
+        for key in cache_series:
+            cache_rates.setdefault(dict(key)["cache"], 0.0)
+
+        fallback_rates = {
+            dict(key).get("kind", ""): round(value / filings, 4) if filings else 0.0
+            for key, value in fallback_series.items()
+        }
+        return {
+            "stages": stages,
+            "counters": counters,
+            "facts_per_filing_mean": round(facts.sum / facts.count, 1) if facts.count else 0.0,
+            "bytes_fetched": bytes_fetched,
+            "cache_hit_rates": cache_rates,
+            "fallback_rates": fallback_rates,
+        }
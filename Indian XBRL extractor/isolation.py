@@ -0,0 +1,303 @@
+"""
+Per-filing resource isolation.
+
+``IsolatedExtractor`` runs filings in a pool of worker processes, one filing
+per worker at a time, and enforces per-filing limits from the parent:
+
+- wall clock (``filing_timeout`` seconds), and
+- resident memory (``filing_max_rss_mb``, read from ``/proc/<pid>/status``;
+  on platforms without ``/proc`` only the wall clock is enforced).
+
+A worker that breaches a limit, or dies (segfault, OOM killer), is killed and
+replaced, and its filing is appended to a quarantine file with diagnostics:
+reason, elapsed time, peak RSS, the pipeline stage it was in and the exit
+code. Quarantined filings are skipped by later runs until removed from the
+file, so one pathological instance costs at most one limit's worth of time.
+
+Workers build their own ``BRSRExtractor`` from the parent's config and call
+one of its methods per task (``process_url`` on URLs, ``process_local`` on
+``LocalFiling``s); tasks are keyed by ``str(task)``. Worker metrics are
+shipped back with every result and merged into the parent's.
+Ordinary extraction errors are not quarantined: they come back as errors,
+exactly as in-process runs report them.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing
+import os
+import time
+import traceback
+from dataclasses import asdict, dataclass, field
+from multiprocessing.connection import Connection, wait
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from instrumentation import ExtractorMetrics
+
+if TYPE_CHECKING:
+    from brsr_xbrl_extractor import ESGRecord, ParserConfig
+
+logger = logging.getLogger("brsr_parser")
+
+TIMEOUT, MEMORY, CRASHED = "timeout", "memory", "crashed"
+
+# (source, records or None, error or None)
+FilingResult = Tuple[str, Optional[List["ESGRecord"]], Optional[str]]
+
+
+def process_rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process in MiB, or None where ``/proc`` is unavailable."""
+    try:
+        with open(f"/proc/{pid}/status", "rb") as f:
+            for line in f:
+                if line.startswith(b"VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+# -------------------------------------------------------------------
+# Quarantine
+# -------------------------------------------------------------------
+
+@dataclass
+class QuarantineEntry:
+    """Diagnostics for one filing that took down its worker."""
+    source: str
+    reason: str
+    elapsed_s: float
+    peak_rss_mb: Optional[float] = None
+    stage: Optional[str] = None
+    exitcode: Optional[int] = None
+    worker_pid: Optional[int] = None
+    limits: Dict[str, Optional[float]] = field(default_factory=dict)
+    at: float = field(default_factory=time.time)
+
+
+class Quarantine:
+    """Append-only NDJSON record of quarantined filings."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self._entries: Dict[str, QuarantineEntry] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = QuarantineEntry(**json.loads(line))
+                    except (ValueError, TypeError):
+                        continue  # Torn or foreign line
+                    self._entries[entry.source] = entry
+
+    def add(self, entry: QuarantineEntry) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(asdict(entry)) + "\n")
+        self._entries[entry.source] = entry
+
+    def get(self, source: str) -> Optional[QuarantineEntry]:
+        return self._entries.get(source)
+
+    def entries(self) -> List[QuarantineEntry]:
+        return list(self._entries.values())
+
+    def __contains__(self, source: object) -> bool:
+        return source in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# -------------------------------------------------------------------
+# Worker process
+# -------------------------------------------------------------------
+
+class _StageReportingMetrics(ExtractorMetrics):
+    """Worker metrics that tell the parent which stage is running."""
+
+    def __init__(self, conn: Connection) -> None:
+        super().__init__()
+        self._conn = conn
+
+    def time(self, stage: str, **labels: Any) -> Any:
+        self._conn.send(("stage", stage))
+        return super().time(stage, **labels)
+
+
+def _worker_main(config: ParserConfig, conn: Connection, method: str) -> None:
+    """Worker loop: receive a task, run ``extractor.<method>(task)``, send back the records."""
+    from brsr_xbrl_extractor import BRSRExtractor
+
+    extractor = BRSRExtractor(config)
+    extractor.metrics = _StageReportingMetrics(conn)
+    while True:
+        try:
+            source = conn.recv()
+        except EOFError:
+            return
+        if source is None:
+            return
+        try:
+            records = getattr(extractor, method)(source)
+            conn.send(("done", records, None, extractor.metrics.drain()))
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("Worker error on %s:\n%s", source, traceback.format_exc())
+            conn.send(("done", None, f"{type(exc).__name__}: {exc}", extractor.metrics.drain()))
+
+
+@dataclass
+class _Worker:
+    process: Any
+    conn: Connection
+    source: Any = None
+    started: float = 0.0
+    stage: Optional[str] = None
+    peak_rss_mb: Optional[float] = None
+
+
+# -------------------------------------------------------------------
+# Supervisor
+# -------------------------------------------------------------------
+
+class IsolatedExtractor:
+    """Process pool that runs each filing under wall-clock and memory limits."""
+
+    def __init__(
+        self,
+        config: ParserConfig,
+        workers: int = 2,
+        timeout: Optional[float] = None,
+        max_rss_mb: Optional[float] = None,
+        quarantine: Optional[Quarantine] = None,
+        metrics: Optional[ExtractorMetrics] = None,
+        poll_interval: float = 0.1,
+        start_method: Optional[str] = None,
+    ) -> None:
+        self.config = config
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.max_rss_mb = max_rss_mb
+        self.quarantine = quarantine
+        self.metrics = metrics or ExtractorMetrics()
+        self.poll_interval = poll_interval
+        self._ctx = multiprocessing.get_context(start_method)
+        if max_rss_mb is not None and process_rss_mb(os.getpid()) is None:
+            logger.warning("RSS limit requested but /proc is unavailable; only the wall-clock limit applies")
+
+    def _spawn(self, method: str) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(target=_worker_main, args=(self.config, child_conn, method),
+                                    name="brsr-filing-worker", daemon=True)
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    @staticmethod
+    def _kill(worker: _Worker) -> None:
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join(5)
+        worker.conn.close()
+
+    def _breach(self, worker: _Worker, now: float) -> Optional[str]:
+        if not worker.process.is_alive():
+            return CRASHED
+        if self.timeout is not None and now - worker.started > self.timeout:
+            return TIMEOUT
+        if self.max_rss_mb is not None:
+            rss = process_rss_mb(worker.process.pid)
+            if rss is not None:
+                worker.peak_rss_mb = max(worker.peak_rss_mb or 0.0, rss)
+                if rss > self.max_rss_mb:
+                    return MEMORY
+        return None
+
+    def _quarantine(self, worker: _Worker, reason: str, now: float) -> str:
+        self._kill(worker)
+        entry = QuarantineEntry(
+            source=str(worker.source),
+            reason=reason,
+            elapsed_s=round(now - worker.started, 3),
+            peak_rss_mb=round(worker.peak_rss_mb, 1) if worker.peak_rss_mb is not None else None,
+            stage=worker.stage,
+            exitcode=worker.process.exitcode,
+            worker_pid=worker.process.pid,
+            limits={"timeout_s": self.timeout, "max_rss_mb": self.max_rss_mb},
+        )
+        logger.error("Quarantined %s (%s after %.1fs in stage %s, peak RSS %s MiB)",
+                     entry.source, reason, entry.elapsed_s, entry.stage or "?", entry.peak_rss_mb)
+        self.metrics.inc("brsr_filings_quarantined_total", reason=reason)
+        if self.quarantine is not None:
+            self.quarantine.add(entry)
+        return f"quarantined: {reason}"
+
+    def imap(self, sources: Iterable[Any], method: str = "process_url") -> Iterator[FilingResult]:
+        """Process sources with ``BRSRExtractor.<method>`` and yield results as filings finish.
+
+        Sources are pulled lazily, so at most one per worker is held at a time.
+        Sources already in the quarantine are skipped (yielded with an error).
+        """
+        source_iter = iter(sources)
+        pool: List[_Worker] = []
+        try:
+            while True:
+                # Keep every worker busy, pulling sources lazily
+                for worker in pool + [None] * (self.workers - len(pool)):
+                    if worker is not None and worker.source is not None:
+                        continue
+                    source = next(source_iter, None)
+                    while source is not None and self.quarantine is not None and str(source) in self.quarantine:
+                        logger.warning("Skipping quarantined filing %s", source)
+                        yield str(source), None, "quarantined"
+                        source = next(source_iter, None)
+                    if source is None:
+                        break
+                    if worker is None:
+                        worker = self._spawn(method)
+                        pool.append(worker)
+                    worker.source, worker.started, worker.stage, worker.peak_rss_mb = source, time.monotonic(), None, None
+                    worker.conn.send(source)
+
+                busy = [w for w in pool if w.source is not None]
+                if not busy:
+                    return
+                ready = set(wait([w.conn for w in busy], timeout=self.poll_interval))
+                now = time.monotonic()
+                for index, worker in enumerate(pool):
+                    if worker.source is None:
+                        continue
+                    if worker.conn in ready:
+                        try:
+                            while worker.conn.poll():
+                                message = worker.conn.recv()
+                                if message[0] == "stage":
+                                    worker.stage = message[1]
+                                    continue
+                                _, records, error, metrics = message
+                                self.metrics.merge(metrics)
+                                source, worker.source = worker.source, None
+                                yield str(source), records, error
+                                break
+                        except (EOFError, OSError):
+                            pass  # Worker died mid-message; handled as a crash below
+                        if worker.source is None:
+                            continue
+                    reason = self._breach(worker, now)
+                    if reason is not None:
+                        source = worker.source
+                        error = self._quarantine(worker, reason, now)
+                        pool[index] = self._spawn(method)
+                        yield str(source), None, error
+        finally:
+            for worker in pool:
+                if worker.source is None and worker.process.is_alive():
+                    try:
+                        worker.conn.send(None)
+                    except OSError:
+                        pass
+                    worker.process.join(1)
+                self._kill(worker)
@@ -0,0 +1,137 @@
+"""
+Local filing sources: directories, zip and tar archives of XBRL instances.
+
+``iter_local_filings(path)`` walks a directory tree (or takes a single file)
+and yields a ``LocalFiling`` per XBRL instance, descending into ``.zip``,
+``.tar`` and compressed tar bundles. ``LocalFiling.open()`` hands the parser
+a buffer without reading whole files into Python bytes where it can:
+
+- plain files are memory-mapped;
+- members stored uncompressed (``.tar``, ``ZIP_STORED``) are zero-copy views
+  into a memory-mapped archive;
+- deflated zip members are decompressed on open, in whichever process
+  parses them;
+- members of compressed tar streams (``.tar.gz``, ``.tgz``, ...) can only be
+  read sequentially, so they are decompressed while walking and carried as
+  bytes.
+
+Filing names are the file path, or ``<archive>!<member>`` for members, and
+are used as the record source name and checkpoint/quarantine key.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import tarfile
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple, Union
+
+XBRL_SUFFIXES: Tuple[str, ...] = (".xml", ".xbrl")
+_STREAM_TAR_SUFFIXES = (".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+_ZIP_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+Buffer = Union[bytes, mmap.mmap, memoryview]
+
+
+def _is_xbrl(name: str, suffixes: Tuple[str, ...]) -> bool:
+    return name.lower().endswith(suffixes) and not os.path.basename(name).startswith(".")
+
+
+def _archive_kind(path: str) -> Optional[str]:
+    lower = path.lower()
+    if lower.endswith(".zip"):
+        return "zip"
+    if lower.endswith(".tar"):
+        return "tar"
+    if lower.endswith(_STREAM_TAR_SUFFIXES):
+        return "tar_stream"
+    return None
+
+
+@dataclass
+class LocalFiling:
+    """One XBRL instance on local disk: a file, or a member of an archive."""
+    name: str
+    path: str
+    member: Optional[str] = None
+    offset: Optional[int] = None  # Start of uncompressed member data within ``path``
+    size: int = 0
+    content: Optional[bytes] = None  # Preloaded member of a compressed tar stream
+
+    def __str__(self) -> str:
+        return self.name
+
+    @contextmanager
+    def open(self) -> Iterator[Buffer]:
+        """Yield the filing's bytes as a buffer (memory-mapped where possible)."""
+        if self.content is not None:
+            yield self.content
+            return
+        if self.member is not None and self.offset is None:
+            with zipfile.ZipFile(self.path) as archive:
+                yield archive.read(self.member)
+            return
+        if self.size == 0:
+            yield b""
+            return
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if self.offset is None:
+                yield mapped
+                return
+            view = memoryview(mapped)[self.offset:self.offset + self.size]
+            try:
+                yield view
+            finally:
+                view.release()
+
+
+def _zip_members(path: str, suffixes: Tuple[str, ...]) -> Iterator[LocalFiling]:
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as raw:
+        for info in archive.infolist():
+            if info.is_dir() or not _is_xbrl(info.filename, suffixes):
+                continue
+            offset = None
+            if info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1:
+                raw.seek(info.header_offset)
+                header = _ZIP_LOCAL_HEADER.unpack(raw.read(_ZIP_LOCAL_HEADER.size))
+                offset = info.header_offset + _ZIP_LOCAL_HEADER.size + header[-2] + header[-1]
+            yield LocalFiling(f"{path}!{info.filename}", path, info.filename, offset, info.file_size)
+
+
+def _tar_members(path: str, suffixes: Tuple[str, ...]) -> Iterator[LocalFiling]:
+    with tarfile.open(path, "r:") as archive:
+        for member in archive:
+            if member.isfile() and not member.sparse and _is_xbrl(member.name, suffixes):
+                yield LocalFiling(f"{path}!{member.name}", path, member.name, member.offset_data, member.size)
+
+
+def _tar_stream_members(path: str, suffixes: Tuple[str, ...]) -> Iterator[LocalFiling]:
+    with tarfile.open(path, "r|*") as archive:
+        for member in archive:
+            if member.isfile() and _is_xbrl(member.name, suffixes):
+                extracted = archive.extractfile(member)
+                if extracted is not None:
+                    yield LocalFiling(f"{path}!{member.name}", path, member.name,
+                                      size=member.size, content=extracted.read())
+
+
+_ARCHIVE_READERS = {"zip": _zip_members, "tar": _tar_members, "tar_stream": _tar_stream_members}
+
+
+def iter_local_filings(path: str, suffixes: Tuple[str, ...] = XBRL_SUFFIXES) -> Iterator[LocalFiling]:
+    """Yield every XBRL instance under ``path`` (a directory, archive or single file), in name order."""
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                yield from iter_local_filings(os.path.join(root, name), suffixes)
+        return
+    kind = _archive_kind(path)
+    if kind is not None:
+        yield from _ARCHIVE_READERS[kind](path, suffixes)
+    elif _is_xbrl(path, suffixes):
+        yield LocalFiling(path, path, size=os.path.getsize(path))
@@ -0,0 +1,393 @@
+"""
+Company x year x indicator panels over extracted ESG records.
+
+``Panel.from_frame`` pivots long-format records (``brsr_esg_metrics.*``) once
+into a dense NumPy cube ``values[company, year, indicator]`` with a boolean
+``mask`` of observed cells; missing cells hold NaN. Numeric values are taken
+from ``canonical_value`` where present (see ``units.py``), else from
+``indicator_value``; of duplicate observations the one with the highest
+``data_quality_score`` wins.
+
+Queries are array slices (``series``, ``cross_section``, ``indicator``) and
+derived series are vectorized over the whole cube: year-over-year deltas
+(``yoy``), compound annual growth between each series' first and last
+observed year (``cagr``) and intensity ratios such as emissions per turnover
+(``intensity``). Derived arrays are memoized on the panel.
+
+Panels are cached by the version of their input data: ``PanelCache.get``
+hashes a DataFrame's contents, and ``load_panel`` keys an exported file by
+its path, size and modification time, so a repeated dashboard query neither
+re-reads the export nor re-pivots it. Cached panels are pickled under the
+cache directory and held in a small in-process LRU.
+
+Usage:
+    python panel.py output/brsr_esg_metrics.csv --indicator ghg_scope1_total
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger("brsr_parser")
+
+# Bump when the pickled layout changes so stale caches are rebuilt.
+PANEL_CACHE_VERSION = 1
+
+KEY_COLUMNS = ("company_id", "reporting_year", "indicator_name")
+
+
+@dataclass
+class Panel:
+    """Dense company x year x indicator cube with a mask of observed cells."""
+    companies: np.ndarray      # (C,) company ids, sorted
+    years: np.ndarray          # (Y,) reporting years, contiguous and ascending
+    indicators: np.ndarray     # (I,) indicator names, sorted
+    values: np.ndarray         # (C, Y, I) float64, NaN where missing
+    mask: np.ndarray           # (C, Y, I) True where observed
+    data_version: str = ""
+    version: int = PANEL_CACHE_VERSION
+    _derived: Dict[Tuple[Any, ...], Any] = field(default_factory=dict, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._company_index = {c: i for i, c in enumerate(self.companies)}
+        self._indicator_index = {name: i for i, name in enumerate(self.indicators)}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = dict(self.__dict__)
+        state.pop("_company_index", None)
+        state.pop("_indicator_index", None)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.__post_init__()
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return self.values.shape
+
+    # -- construction --------------------------------------------------
+
+    @classmethod
+    def from_frame(cls, df: "pd.DataFrame", data_version: str = "") -> "Panel":
+        """Pivot long-format records into a panel (non-numeric values are dropped)."""
+        import pandas as pd
+
+        if df.empty:
+            empty = np.empty(0, dtype=object)
+            return cls(empty, np.empty(0, dtype=np.int64), empty,
+                       np.empty((0, 0, 0)), np.empty((0, 0, 0), dtype=bool), data_version)
+
+        raw = df["indicator_value"]
+        numeric = pd.to_numeric(raw.where(~raw.map(lambda v: isinstance(v, bool))), errors="coerce")
+        if "canonical_value" in df:
+            canonical = pd.to_numeric(df["canonical_value"], errors="coerce")
+            numeric = canonical.where(canonical.notna(), numeric)
+        years = pd.to_numeric(df["reporting_year"], errors="coerce")
+        keep = numeric.notna().to_numpy() & years.notna().to_numpy()
+
+        frame = pd.DataFrame({
+            "company_id": df["company_id"].astype(str).to_numpy()[keep],
+            "reporting_year": years.to_numpy()[keep].astype(np.int64),
+            "indicator_name": df["indicator_name"].astype(str).to_numpy()[keep],
+            "value": numeric.to_numpy(dtype=float)[keep],
+            "score": (df["data_quality_score"].to_numpy()[keep]
+                      if "data_quality_score" in df else np.zeros(int(keep.sum()))),
+        })
+        # Highest quality observation per cell (later rows win ties)
+        frame = frame.sort_values("score", kind="stable").drop_duplicates(list(KEY_COLUMNS), keep="last")
+
+        company_codes, companies = pd.factorize(frame["company_id"], sort=True)
+        indicator_codes, indicators = pd.factorize(frame["indicator_name"], sort=True)
+        year_values = frame["reporting_year"].to_numpy()
+        first_year = int(year_values.min()) if len(year_values) else 0
+        n_years = int(year_values.max()) - first_year + 1 if len(year_values) else 0
+
+        shape = (len(companies), n_years, len(indicators))
+        values = np.full(shape, np.nan)
+        mask = np.zeros(shape, dtype=bool)
+        index = (company_codes, year_values - first_year, indicator_codes)
+        values[index] = frame["value"].to_numpy()
+        mask[index] = True
+        return cls(
+            companies=np.asarray(companies, dtype=object),
+            years=np.arange(first_year, first_year + n_years, dtype=np.int64),
+            indicators=np.asarray(indicators, dtype=object),
+            values=values,
+            mask=mask,
+            data_version=data_version,
+        )
+
+    # -- slices --------------------------------------------------------
+
+    def company_pos(self, company_id: str) -> int:
+        try:
+            return self._company_index[company_id]
+        except KeyError:
+            raise KeyError(f"Unknown company: {company_id}") from None
+
+    def indicator_pos(self, indicator: str) -> int:
+        try:
+            return self._indicator_index[indicator]
+        except KeyError:
+            raise KeyError(f"Unknown indicator: {indicator}") from None
+
+    def year_pos(self, year: int) -> int:
+        pos = int(year) - int(self.years[0]) if len(self.years) else -1
+        if not 0 <= pos < len(self.years):
+            raise KeyError(f"Year not in panel: {year}")
+        return pos
+
+    def indicator(self, indicator: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (values, mask) of one indicator as (companies, years) views."""
+        i = self.indicator_pos(indicator)
+        return self.values[:, :, i], self.mask[:, :, i]
+
+    def series(self, company_id: str, indicator: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (years, values, mask) of one company's indicator over time."""
+        c, i = self.company_pos(company_id), self.indicator_pos(indicator)
+        return self.years, self.values[c, :, i], self.mask[c, :, i]
+
+    def cross_section(self, year: int, indicator: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (companies, values, mask) of one indicator in one year."""
+        y, i = self.year_pos(year), self.indicator_pos(indicator)
+        return self.companies, self.values[:, y, i], self.mask[:, y, i]
+
+    # -- derived series ------------------------------------------------
+
+    def _memo(self, key: Tuple[Any, ...], compute: Any) -> Any:
+        result = self._derived.get(key)
+        if result is None:
+            result = self._derived[key] = compute()
+        return result
+
+    def yoy(self, relative: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Year-over-year change for every cell, as (C, Y, I) values and mask.
+
+        The first year, and years without an observation in both that year
+        and the previous one, are masked. ``relative`` gives the fractional
+        change (masked where the previous value is zero).
+        """
+        def compute() -> Tuple[np.ndarray, np.ndarray]:
+            delta = np.full(self.values.shape, np.nan)
+            mask = np.zeros(self.mask.shape, dtype=bool)
+            current, previous = self.values[:, 1:], self.values[:, :-1]
+            valid = self.mask[:, 1:] & self.mask[:, :-1]
+            if relative:
+                valid &= previous != 0
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    change = (current - previous) / np.abs(previous)
+            else:
+                change = current - previous
+            delta[:, 1:] = np.where(valid, change, np.nan)
+            mask[:, 1:] = valid
+            return delta, mask
+
+        return self._memo(("yoy", relative), compute)
+
+    def cagr(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Compound annual growth between each series' first and last observation.
+
+        Returns (C, I) values and mask; series with fewer than two
+        observations or non-positive endpoints are masked.
+        """
+        def compute() -> Tuple[np.ndarray, np.ndarray]:
+            n_years = len(self.years)
+            if n_years == 0:
+                # argmax has no answer over an empty year axis
+                shape = (len(self.companies), len(self.indicators))
+                return np.full(shape, np.nan), np.zeros(shape, dtype=bool)
+            observed = self.mask.any(axis=1)
+            first = np.argmax(self.mask, axis=1)
+            last = n_years - 1 - np.argmax(self.mask[:, ::-1, :], axis=1)
+            c, i = np.indices(first.shape)
+            start, end = self.values[c, first, i], self.values[c, last, i]
+            span = (last - first).astype(float)
+            valid = observed & (span > 0) & (start > 0) & (end > 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                growth = np.power(end / start, 1.0 / span) - 1.0
+            return np.where(valid, growth, np.nan), valid
+
+        return self._memo(("cagr",), compute)
+
+    def intensity(self, numerator: str, denominator: str, scale: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """Ratio of two indicators per company and year, e.g. emissions per turnover.
+
+        Returns (C, Y) values and mask; masked where either side is missing
+        or the denominator is zero.
+        """
+        def compute() -> Tuple[np.ndarray, np.ndarray]:
+            num, num_mask = self.indicator(numerator)
+            den, den_mask = self.indicator(denominator)
+            valid = num_mask & den_mask & (den != 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = scale * num / den
+            return np.where(valid, ratio, np.nan), valid
+
+        return self._memo(("intensity", numerator, denominator, scale), compute)
+
+    def to_frame(self) -> "pd.DataFrame":
+        """Return the observed cells in long format."""
+        import pandas as pd
+
+        c, y, i = np.nonzero(self.mask)
+        return pd.DataFrame({
+            "company_id": self.companies[c],
+            "reporting_year": self.years[y],
+            "indicator_name": self.indicators[i],
+            "value": self.values[c, y, i],
+        })
+
+
+# -------------------------------------------------------------------
+# Caching by data version
+# -------------------------------------------------------------------
+
+def data_version(df: "pd.DataFrame") -> str:
+    """Content hash of the columns a panel is built from."""
+    import pandas as pd
+
+    columns = [c for c in (*KEY_COLUMNS, "indicator_value", "canonical_value", "data_quality_score") if c in df]
+    hashed = pd.util.hash_pandas_object(df[columns].astype(str), index=False).to_numpy()
+    return hashlib.sha1(hashed.tobytes()).hexdigest()[:16]
+
+
+def file_version(path: Path) -> str:
+    """Version of an exported file: its resolved path, size and modification time."""
+    stat = path.stat()
+    key = f"{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def read_records(path: Path) -> "pd.DataFrame":
+    """Read an exported records file (CSV, Parquet, JSON or NDJSON)."""
+    import pandas as pd
+
+    suffixes = path.suffixes
+    if ".parquet" in suffixes:
+        return pd.read_parquet(path)
+    if ".ndjson" in suffixes:
+        return pd.read_json(path, lines=True)
+    if ".json" in suffixes:
+        return pd.read_json(path)
+    return pd.read_csv(path, encoding="utf-8-sig")
+
+
+class PanelCache:
+    """Materialized panels keyed by input data version (memory LRU over pickles)."""
+
+    def __init__(self, cache_dir: Optional[str] = ".cache", capacity: int = 8) -> None:
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.capacity = max(1, capacity)
+        self.builds = 0
+        self._lru: "OrderedDict[str, Panel]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, df: "pd.DataFrame") -> Panel:
+        """Return the panel for a records DataFrame."""
+        version = data_version(df)
+        return self._get(version, lambda: df)
+
+    def load(self, path: str) -> Panel:
+        """Return the panel for an exported records file, reading it only on a miss."""
+        source = Path(path)
+        return self._get(file_version(source), lambda: read_records(source))
+
+    def _get(self, version: str, frame: Any) -> Panel:
+        with self._lock:
+            panel = self._lru.get(version)
+            if panel is not None:
+                self._lru.move_to_end(version)
+                return panel
+            panel = self._read(version)
+            if panel is None:
+                panel = Panel.from_frame(frame(), data_version=version)
+                self.builds += 1
+                self._write(panel)
+                logger.info("Built panel %s: %d companies x %d years x %d indicators",
+                            version, *panel.shape)
+            self._lru[version] = panel
+            while len(self._lru) > self.capacity:
+                self._lru.popitem(last=False)
+            return panel
+
+    def _cache_path(self, version: str) -> Optional[Path]:
+        return self.cache_dir / f"panel_{version}.pkl" if self.cache_dir else None
+
+    def _read(self, version: str) -> Optional[Panel]:
+        cache_path = self._cache_path(version)
+        if cache_path is None or not cache_path.exists():
+            return None
+        try:
+            with open(cache_path, "rb") as f:
+                candidate = pickle.load(f)
+            if isinstance(candidate, Panel) and candidate.version == PANEL_CACHE_VERSION:
+                return candidate
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Ignoring unreadable panel cache %s: %s", cache_path, exc)
+        return None
+
+    def _write(self, panel: Panel) -> None:
+        cache_path = self._cache_path(panel.data_version)
+        if cache_path is None:
+            return
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(panel, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError as exc:
+            logger.warning("Could not write panel cache %s: %s", cache_path, exc)
+
+
+_DEFAULT_CACHES: Dict[str, PanelCache] = {}
+
+
+def load_panel(path: str, cache_dir: str = ".cache") -> Panel:
+    """Return the (cached) panel for an exported records file."""
+    cache = _DEFAULT_CACHES.get(cache_dir)
+    if cache is None:
+        cache = _DEFAULT_CACHES[cache_dir] = PanelCache(cache_dir)
+    return cache.load(path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Print an indicator's company x year table and growth from an export."""
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Company x year x indicator panels of ESG metrics")
+    parser.add_argument("path", help="exported records (CSV, Parquet, JSON or NDJSON)")
+    parser.add_argument("--indicator", required=True, help="indicator to show, e.g. ghg_scope1_total")
+    parser.add_argument("--per", help="denominator indicator for an intensity ratio")
+    parser.add_argument("--cache-dir", default=".cache")
+    args = parser.parse_args(argv)
+
+    panel = load_panel(args.path, args.cache_dir)
+    if args.per:
+        values, mask = panel.intensity(args.indicator, args.per)
+    else:
+        values, mask = panel.indicator(args.indicator)
+    table = pd.DataFrame(np.where(mask, values, np.nan), index=panel.companies, columns=panel.years)
+    growth, growth_mask = panel.cagr()
+    if not args.per:
+        table["cagr"] = np.where(growth_mask, growth, np.nan)[:, panel.indicator_pos(args.indicator)]
+    print(table.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Sector peer benchmarking from CIN industry codes.
+
+A Corporate Identification Number such as ``L46591MH1999PLC118476`` encodes
+the listing status (``L`` listed / ``U`` unlisted), the 5-digit NIC industry
+code, the state of registration, the year of incorporation, the ownership
+class (``PLC``, ``PTC``, ``GOI``, ...) and a registration number
+(``decode_cin``).
+
+``PeerIndex`` groups companies into peer groups at several levels:
+
+- ``industry``        NIC division (first two digits of the NIC code)
+- ``industry_state``  NIC division and state
+- ``industry_size``   NIC division and a size band from ``employees_total``
+
+and keeps, for every indicator, each company's latest value and its
+percentile rank within each of its peer groups. Records are folded in as
+filings arrive; only the peer groups they touch are re-ranked (one
+vectorized sort per group), so ``rank`` is a dictionary lookup rather than a
+corpus scan. The index is pickled under the cache directory.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import pickle
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from brsr_xbrl_extractor import ESGRecord
+
+logger = logging.getLogger("brsr_parser")
+
+# Bump when the pickled layout changes so stale indexes are rebuilt.
+PEER_INDEX_VERSION = 1
+
+CIN_RE = re.compile(r"^([LU])(\d{5})([A-Z]{2})(\d{4})([A-Z]{3})(\d{6})$")
+
+LEVELS = ("industry", "industry_state", "industry_size")
+
+# Size bands by total employees: (upper bound, band)
+SIZE_INDICATOR = "employees_total"
+SIZE_BANDS = ((250, "small"), (5000, "medium"), (float("inf"), "large"))
+UNKNOWN_SIZE = "unknown"
+
+
+@dataclass(frozen=True)
+class CINInfo:
+    """Fields decoded from a Corporate Identification Number."""
+    cin: str
+    listed: bool
+    nic_code: str
+    state: str
+    incorporation_year: int
+    ownership: str
+    registration_number: str
+
+    @property
+    def nic_division(self) -> str:
+        return self.nic_code[:2]
+
+
+def decode_cin(cin: Optional[str]) -> Optional[CINInfo]:
+    """Decode a CIN, or return None if it is not one."""
+    match = CIN_RE.match((cin or "").strip().upper())
+    if not match:
+        return None
+    listing, nic, state, year, ownership, number = match.groups()
+    return CINInfo(match.group(0), listing == "L", nic, state, int(year), ownership, number)
+
+
+def size_band(employees: Optional[float]) -> str:
+    if employees is None or not np.isfinite(employees) or employees < 0:
+        return UNKNOWN_SIZE
+    return next(band for bound, band in SIZE_BANDS if employees < bound)
+
+
+@dataclass(frozen=True)
+class PeerRank:
+    """A company's standing among its peers on one indicator."""
+    company_id: str
+    indicator: str
+    level: str
+    group: Tuple[str, ...]
+    value: float
+    percentile: float  # 0-100, ties share the midpoint
+    peer_count: int
+
+
+@dataclass
+class PeerIndex:
+    """Per-indicator percentile ranks of companies within their peer groups."""
+    companies: Dict[str, CINInfo] = field(default_factory=dict)
+    sizes: Dict[str, str] = field(default_factory=dict)
+    # company -> indicator -> (reporting year, value); the latest year is kept
+    latest: Dict[str, Dict[str, Tuple[int, float]]] = field(default_factory=dict)
+    # (level, group, indicator) -> company -> value
+    members: Dict[Tuple[str, Tuple[str, ...], str], Dict[str, float]] = field(default_factory=dict)
+    # (level, group, indicator) -> company -> percentile
+    ranks: Dict[Tuple[str, Tuple[str, ...], str], Dict[str, float]] = field(default_factory=dict)
+    version: int = PEER_INDEX_VERSION
+
+    def __len__(self) -> int:
+        return len(self.companies)
+
+    def group_of(self, company_id: str, level: str) -> Tuple[str, ...]:
+        info = self.companies[company_id]
+        if level == "industry":
+            return (info.nic_division,)
+        if level == "industry_state":
+            return (info.nic_division, info.state)
+        if level == "industry_size":
+            return (info.nic_division, self.sizes.get(company_id, UNKNOWN_SIZE))
+        raise ValueError(f"Unknown peer level: {level}")
+
+    # -- updates -------------------------------------------------------
+
+    def update(self, observations: Iterable[Tuple[str, int, str, Any]]) -> int:
+        """Fold in (company_id, year, indicator, value) observations.
+
+        Companies without a decodable CIN and non-numeric values are
+        ignored. Returns the number of observations applied.
+        """
+        dirty: Set[Tuple[str, Tuple[str, ...], str]] = set()
+        applied = 0
+        for company_id, year, indicator, value in observations:
+            info = self.companies.get(company_id) or decode_cin(company_id)
+            number = _to_float(value)
+            if info is None or number is None:
+                continue
+            self.companies[company_id] = info
+            company_values = self.latest.setdefault(company_id, {})
+            previous = company_values.get(indicator)
+            year = int(year or 0)
+            if previous is not None and previous[0] > year:
+                continue  # An older filing does not replace a newer value
+            company_values[indicator] = (year, number)
+            applied += 1
+            if indicator == SIZE_INDICATOR:
+                self._resize(company_id, size_band(number), dirty)
+            for level in LEVELS:
+                group_key = (level, self.group_of(company_id, level), indicator)
+                self.members.setdefault(group_key, {})[company_id] = number
+                dirty.add(group_key)
+        for group_key in dirty:
+            self._rerank(group_key)
+        return applied
+
+    def _resize(self, company_id: str, band: str, dirty: Set[Tuple[str, Tuple[str, ...], str]]) -> None:
+        """Move a company between size-band peer groups for all its indicators."""
+        old = self.sizes.get(company_id, UNKNOWN_SIZE)
+        if old == band:
+            return
+        division = self.companies[company_id].nic_division
+        for indicator, (_, value) in self.latest.get(company_id, {}).items():
+            old_key = ("industry_size", (division, old), indicator)
+            group = self.members.get(old_key)
+            if group is not None and group.pop(company_id, None) is not None:
+                dirty.add(old_key)
+            new_key = ("industry_size", (division, band), indicator)
+            self.members.setdefault(new_key, {})[company_id] = value
+            dirty.add(new_key)
+        self.sizes[company_id] = band
+
+    def _rerank(self, group_key: Tuple[str, Tuple[str, ...], str]) -> None:
+        group = self.members.get(group_key)
+        if not group:
+            self.members.pop(group_key, None)
+            self.ranks.pop(group_key, None)
+            return
+        companies = list(group)
+        values = np.fromiter(group.values(), dtype=float, count=len(companies))
+        ordered = np.sort(values)
+        below = np.searchsorted(ordered, values, side="left")
+        at_or_below = np.searchsorted(ordered, values, side="right")
+        percentiles = 100.0 * (below + 0.5 * (at_or_below - below)) / len(values)
+        self.ranks[group_key] = dict(zip(companies, percentiles.tolist()))
+
+    def update_frame(self, df: "pd.DataFrame") -> int:
+        """Fold in a records DataFrame (canonical values preferred where present)."""
+        if df.empty:
+            return 0
+        values = df["indicator_value"]
+        if "canonical_value" in df:
+            values = df["canonical_value"].astype(object).where(df["canonical_value"].notna(), values)
+        return self.update(zip(
+            df["company_id"].tolist(), df["reporting_year"].tolist(),
+            df["indicator_name"].tolist(), values.tolist(),
+        ))
+
+    def apply_records(self, records: Iterable["ESGRecord"], batch_size: int = 5000) -> Iterator["ESGRecord"]:
+        """Pass records through unchanged, folding them into the index in batches."""
+        batch: List["ESGRecord"] = []
+        for record in records:
+            batch.append(record)
+            yield record
+            if len(batch) >= batch_size:
+                self.update(_observations(batch))
+                batch.clear()
+        if batch:
+            self.update(_observations(batch))
+
+    # -- lookups -------------------------------------------------------
+
+    def rank(self, company_id: str, indicator: str, level: str = "industry") -> Optional[PeerRank]:
+        """Return a company's percentile among its peers, or None if it has no value."""
+        if company_id not in self.companies:
+            return None
+        group = self.group_of(company_id, level)
+        group_key = (level, group, indicator)
+        percentile = self.ranks.get(group_key, {}).get(company_id)
+        if percentile is None:
+            return None
+        return PeerRank(
+            company_id=company_id,
+            indicator=indicator,
+            level=level,
+            group=group,
+            value=self.members[group_key][company_id],
+            percentile=percentile,
+            peer_count=len(self.members[group_key]),
+        )
+
+    def peers(self, company_id: str, level: str = "industry") -> List[str]:
+        """Companies sharing a peer group with ``company_id`` (on any indicator)."""
+        if company_id not in self.companies:
+            return []
+        group = self.group_of(company_id, level)
+        found: Set[str] = set()
+        for (lvl, grp, _), members in self.members.items():
+            if lvl == level and grp == group:
+                found.update(members)
+        found.discard(company_id)
+        return sorted(found)
+
+    # -- persistence ---------------------------------------------------
+
+    def save(self, path: str) -> None:
+        target = Path(path)
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = target.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, target)
+        except OSError as exc:
+            logger.warning("Could not write peer index %s: %s", target, exc)
+
+    @classmethod
+    def load(cls, path: str) -> "PeerIndex":
+        """Load a saved index, or return an empty one if missing or stale."""
+        source = Path(path)
+        if source.exists():
+            try:
+                with open(source, "rb") as f:
+                    candidate = pickle.load(f)
+                if isinstance(candidate, PeerIndex) and candidate.version == PEER_INDEX_VERSION:
+                    return candidate
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Ignoring unreadable peer index %s: %s", source, exc)
+        return cls()
+
+
+def _observations(records: Iterable["ESGRecord"]) -> Iterator[Tuple[str, int, str, Any]]:
+    for r in records:
+        value = r.indicator_value if r.canonical_value is None else r.canonical_value
+        yield r.company_id, r.reporting_year, r.indicator_name, value
+
+
+def _to_float(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if np.isfinite(number) else None
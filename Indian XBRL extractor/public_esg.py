@@ -0,0 +1,260 @@
+"""
+Building blocks for the public ESG data fallback.
+
+- ``TickerIndex``: a locally maintained CIN / ISIN / company name -> NSE
+  symbol index (``ticker_index.csv``), so finding a ticker is a dict lookup
+  instead of guessing symbols over the network.
+- ``SustainabilityCache``: a TTL cache of sustainability payloads on disk,
+  including negative entries for tickers without data.
+- Providers that fetch payloads for many tickers at once:
+  ``YFinanceProvider`` (network) and ``StaticESGProvider`` (offline stub).
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("brsr_parser")
+
+INDEX_COLUMNS = ("cin", "isin", "symbol", "company_name")
+
+_NAME_SUFFIX_RE = re.compile(r"\b(limited|ltd|private|pvt|the)\b\.?")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_company_name(name: str) -> str:
+    """Normalize a company name for index lookups (case, punctuation, 'Limited')."""
+    text = _NAME_SUFFIX_RE.sub(" ", (name or "").lower())
+    return _NON_ALNUM_RE.sub(" ", text).strip()
+
+
+def yahoo_ticker(symbol: str) -> str:
+    """Return the Yahoo Finance ticker for an NSE symbol."""
+    return symbol if "." in symbol else f"{symbol}.NS"
+
+
+# -------------------------------------------------------------------
+# CIN / ISIN -> NSE symbol index
+# -------------------------------------------------------------------
+
+class TickerIndex:
+    """In-memory index over ``ticker_index.csv`` (cin, isin, symbol, company_name)."""
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path
+        self.rows: List[Dict[str, str]] = []
+        self._by_cin: Dict[str, str] = {}
+        self._by_isin: Dict[str, str] = {}
+        self._by_name: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def load(cls, path: str) -> "TickerIndex":
+        """Load the index from CSV; a missing file yields an empty index."""
+        index = cls(Path(path))
+        if not index.path.exists():
+            logger.info("Ticker index %s not found, starting empty", path)
+            return index
+        with open(index.path, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                index.add(
+                    symbol=row.get("symbol", ""),
+                    cin=row.get("cin") or None,
+                    isin=row.get("isin") or None,
+                    company_name=row.get("company_name") or None,
+                )
+        logger.info("Loaded %d ticker index entries from %s", len(index), path)
+        return index
+
+    def add(
+        self,
+        symbol: str,
+        cin: Optional[str] = None,
+        isin: Optional[str] = None,
+        company_name: Optional[str] = None,
+    ) -> None:
+        """Add or update an entry; keys are normalized for lookup."""
+        symbol = (symbol or "").strip().upper()
+        if not symbol:
+            return
+        row = {
+            "cin": (cin or "").strip().upper(),
+            "isin": (isin or "").strip().upper(),
+            "symbol": symbol,
+            "company_name": (company_name or "").strip(),
+        }
+        self.rows.append(row)
+        if row["cin"]:
+            self._by_cin[row["cin"]] = symbol
+        if row["isin"]:
+            self._by_isin[row["isin"]] = symbol
+        if row["company_name"]:
+            self._by_name[normalize_company_name(row["company_name"])] = symbol
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write the index back to CSV (last entry per symbol wins)."""
+        target = Path(path) if path else self.path
+        if target is None:
+            raise ValueError("No path given for ticker index")
+        latest: Dict[str, Dict[str, str]] = {}
+        for row in self.rows:
+            latest[row["symbol"]] = row
+        with open(target, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=INDEX_COLUMNS)
+            writer.writeheader()
+            writer.writerows(sorted(latest.values(), key=lambda r: r["symbol"]))
+
+    def resolve(
+        self,
+        cin: Optional[str] = None,
+        isin: Optional[str] = None,
+        company_name: Optional[str] = None,
+    ) -> Optional[str]:
+        """Return the NSE symbol for a CIN, ISIN or company name (in that order)."""
+        if cin and cin.upper() in self._by_cin:
+            return self._by_cin[cin.upper()]
+        if isin and isin.upper() in self._by_isin:
+            return self._by_isin[isin.upper()]
+        if company_name:
+            return self._by_name.get(normalize_company_name(company_name))
+        return None
+
+
+# -------------------------------------------------------------------
+# TTL cache of sustainability payloads
+# -------------------------------------------------------------------
+
+class SustainabilityCache:
+    """Per-ticker JSON files under ``cache_dir`` with a time-to-live.
+
+    An empty payload is cached too, so tickers without public data are not
+    re-queried until the entry expires.
+    """
+
+    def __init__(self, cache_dir: str, ttl_seconds: int = 7 * 24 * 3600) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self._memory: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, ticker: str) -> Path:
+        safe = re.sub(r"[^A-Za-z0-9._-]", "_", ticker)
+        return self.cache_dir / f"{safe}.json"
+
+    def get(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh cached payload, or None if missing or expired."""
+        entry = self._memory.get(ticker)
+        if entry is None:
+            path = self._path(ticker)
+            if path.exists():
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    entry = (float(data["fetched_at"]), data["payload"])
+                    self._memory[ticker] = entry
+                except (OSError, ValueError, KeyError) as exc:
+                    logger.warning("Ignoring unreadable cache entry %s: %s", path, exc)
+        if entry is None or time.time() - entry[0] > self.ttl_seconds:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def put(self, ticker: str, payload: Dict[str, Any]) -> None:
+        """Store a payload (possibly empty) for a ticker."""
+        fetched_at = time.time()
+        self._memory[ticker] = (fetched_at, payload)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self._path(ticker)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"ticker": ticker, "fetched_at": fetched_at, "payload": payload}, f,
+                          default=str)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.warning("Could not write sustainability cache for %s: %s", ticker, exc)
+
+
+# -------------------------------------------------------------------
+# Providers
+# -------------------------------------------------------------------
+
+class ESGDataProvider:
+    """Fetches sustainability payloads (metric name -> value) for tickers.
+
+    ``fetch_many`` leaves out tickers whose lookup failed, so they are not
+    cached; ``{}`` means the provider has no data for the ticker.
+    """
+
+    source = "public_api"
+
+    def fetch_many(self, tickers: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class StaticESGProvider(ESGDataProvider):
+    """Offline provider serving fixed payloads; used in tests and air-gapped runs."""
+
+    source = "static"
+
+    def __init__(self, payloads: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        self.payloads = payloads or {}
+        self.calls: List[List[str]] = []
+
+    def fetch_many(self, tickers: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        self.calls.append(list(tickers))
+        return {ticker: dict(self.payloads.get(ticker, {})) for ticker in tickers}
+
+
+class YFinanceProvider(ESGDataProvider):
+    """Yahoo Finance sustainability data, fetched concurrently for a batch of tickers."""
+
+    source = "yahoo_finance"
+
+    def __init__(self, max_workers: int = 8) -> None:
+        self.max_workers = max_workers
+
+    @staticmethod
+    def _fetch_one(ticker: str) -> Optional[Dict[str, Any]]:
+        """Payload for one ticker, or None if the lookup failed (network error, rate limit)."""
+        import yfinance as yf
+
+        try:
+            sustainability = yf.Ticker(ticker).sustainability
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Sustainability lookup failed for %s: %s", ticker, exc)
+            return None
+        if sustainability is None or sustainability.empty:
+            return {}
+        # Newer yfinance returns a one-column DataFrame indexed by metric name
+        series = sustainability.iloc[:, 0] if hasattr(sustainability, "columns") else sustainability
+        return {str(k): v for k, v in series.dropna().items()}
+
+    def fetch_many(self, tickers: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        if not tickers:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tickers))) as pool:
+            payloads = zip(tickers, pool.map(self._fetch_one, tickers))
+            return {ticker: payload for ticker, payload in payloads if payload is not None}
+
+
+def payload_to_facts(payload: Dict[str, Any], source: str) -> List[Dict[str, Any]]:
+    """Convert a sustainability payload into the fact dicts the mapper consumes."""
+    return [
+        {"local_name": str(name), "value": str(value), "unit": None, "source": source}
+        for name, value in payload.items()
+        if value is not None
+    ]
+
@@ -0,0 +1,428 @@
+"""
+Corpus-level plausibility checks for extracted ESG values.
+
+``DataQualityScorer`` rates a single value in isolation. This module keeps,
+per indicator and per (indicator, sector), a histogram of log10 values over
+every filing seen so far (``IndicatorDistributions``), persisted under the
+cache directory. ``CorpusQualityChecker`` scores a batch of records against
+those distributions with vectorized NumPy operations:
+
+- robust z-score from the median and MAD of the indicator's distribution;
+- percentile within the company's sector (NIC division from the CIN);
+- order-of-magnitude errors: a value sitting a whole power of ten away from
+  the median that matches a common scale slip (thousand, lakh, million,
+  crore, billion) is flagged as a unit error rather than a plain outlier.
+
+Each batch is added to the distributions before it is scored, so a fresh
+corpus is judged against itself and new filings are scored incrementally
+without recomputing the corpus. Observations are keyed by (company, year,
+indicator): re-running a filing replaces its earlier value instead of counting
+it twice. Flags are folded into ``data_quality_score`` by
+``DataQualityScorer.apply_penalties``.
+
+Usage:
+    python quality.py output/brsr_esg_metrics.csv [--out rescored.csv]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+from dataclasses import replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from brsr_xbrl_extractor import DataQualityScorer, ESGRecord
+    from instrumentation import ExtractorMetrics
+
+logger = logging.getLogger("brsr_parser")
+
+# log10 histogram: 1e-6 .. 1e16 in steps of 0.02 decades
+LOG_MIN = -6.0
+LOG_MAX = 16.0
+BIN_WIDTH = 0.02
+N_BINS = int(round((LOG_MAX - LOG_MIN) / BIN_WIDTH))
+BIN_CENTERS = LOG_MIN + BIN_WIDTH * (np.arange(N_BINS) + 0.5)
+
+# Scale slips seen in filings: thousand, lakh, million, crore, billion
+SCALE_EXPONENTS = np.array([3.0, 5.0, 6.0, 7.0, 9.0])
+
+MAD_TO_SIGMA = 1.4826
+ALL_SECTORS = ""
+
+# (company_id, reporting_year, indicator_name) of one stored observation
+ObservationKey = Tuple[str, str, str]
+
+
+def sector_of(company_id: str) -> str:
+    """Return the NIC division (2 digits) encoded in a CIN, or '' if not a CIN."""
+    cin = (company_id or "").strip().upper()
+    if len(cin) == 21 and cin[0] in "LU" and cin[1:3].isdigit():
+        return cin[1:3]
+    return ALL_SECTORS
+
+
+def _year_key(year: Any) -> str:
+    """Render a reporting year the same way whether it came from a record or a CSV float."""
+    try:
+        return str(int(year))
+    except (TypeError, ValueError):
+        return str(year)
+
+
+def _log_values(values: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (log10 values, mask of rows that are positive finite numbers)."""
+    import pandas as pd
+
+    numeric = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=float)
+    # Booleans coerce to 0/1 and are not magnitudes
+    is_bool = np.fromiter((isinstance(v, (bool, np.bool_)) for v in values), dtype=bool, count=len(numeric))
+    mask = np.isfinite(numeric) & (numeric > 0) & ~is_bool
+    logs = np.full(len(numeric), np.nan)
+    logs[mask] = np.log10(numeric[mask])
+    return logs, mask
+
+
+class IndicatorDistributions:
+    """Mergeable log10-value histograms keyed by (indicator, sector)."""
+
+    def __init__(self) -> None:
+        self.keys: Dict[Tuple[str, str], int] = {}
+        self.counts = np.zeros((0, N_BINS), dtype=np.int64)
+        # Keyed observation -> (corpus key id, sector key id or -1, bin) it contributes
+        self.observations: Dict[ObservationKey, Tuple[int, int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def key_ids(self, indicators: Iterable[str], sectors: Iterable[str], create: bool = False) -> np.ndarray:
+        """Map (indicator, sector) pairs to row ids (-1 for unknown keys unless ``create``)."""
+        ids = []
+        for key in zip(indicators, sectors):
+            key_id = self.keys.get(key)
+            if key_id is None and create:
+                key_id = self.keys[key] = len(self.keys)
+            ids.append(-1 if key_id is None else key_id)
+        if create and len(self.keys) > len(self.counts):
+            grow = np.zeros((len(self.keys) - len(self.counts), N_BINS), dtype=np.int64)
+            self.counts = np.vstack([self.counts, grow])
+        return np.asarray(ids, dtype=np.int64)
+
+    @staticmethod
+    def bins(logs: np.ndarray) -> np.ndarray:
+        return np.clip(((logs - LOG_MIN) / BIN_WIDTH).astype(np.int64), 0, N_BINS - 1)
+
+    def _add(self, corpus: np.ndarray, sector: np.ndarray, bins: np.ndarray, delta: int) -> None:
+        np.add.at(self.counts, (corpus, bins), delta)
+        has_sector = sector >= 0
+        np.add.at(self.counts, (sector[has_sector], bins[has_sector]), delta)
+
+    def update(self, indicators: np.ndarray, sectors: np.ndarray, logs: np.ndarray,
+               observation_keys: Optional[List[ObservationKey]] = None) -> None:
+        """Add observations (rows with finite ``logs``) to the corpus and sector histograms.
+
+        With ``observation_keys`` (one per row), a key seen before replaces
+        its earlier observation, and the last row wins within the batch.
+        """
+        valid = np.isfinite(logs)
+        if not valid.any():
+            return
+        indicators, sectors, bins = indicators[valid], sectors[valid], self.bins(logs[valid])
+        corpus = self.key_ids(indicators, [ALL_SECTORS] * len(indicators), create=True)
+        sector = np.full(len(indicators), -1, dtype=np.int64)
+        has_sector = sectors != ALL_SECTORS
+        if has_sector.any():
+            sector[has_sector] = self.key_ids(indicators[has_sector], sectors[has_sector], create=True)
+
+        if observation_keys is not None:
+            latest = {key: row for row, key in enumerate(k for k, v in zip(observation_keys, valid) if v)}
+            previous = [self.observations[key] for key in latest if key in self.observations]
+            if previous:
+                old = np.array(previous, dtype=np.int64)
+                self._add(old[:, 0], old[:, 1], old[:, 2], -1)
+            rows = np.fromiter(latest.values(), dtype=np.int64, count=len(latest))
+            corpus, sector, bins = corpus[rows], sector[rows], bins[rows]
+            for key, entry in zip(latest, zip(corpus.tolist(), sector.tolist(), bins.tolist())):
+                self.observations[key] = entry
+        self._add(corpus, sector, bins, 1)
+
+    def stats(self, key_ids: np.ndarray) -> Dict[str, np.ndarray]:
+        """Return n, median and MAD (in log10 units) for each key id (NaN for unknown keys)."""
+        n_keys = len(key_ids)
+        result = {"n": np.zeros(n_keys), "median": np.full(n_keys, np.nan), "mad": np.full(n_keys, np.nan)}
+        known = key_ids >= 0
+        if not known.any():
+            return result
+        counts = self.counts[key_ids[known]]
+        totals = counts.sum(axis=1)
+        cdf = counts.cumsum(axis=1)
+        median = BIN_CENTERS[(cdf >= (totals / 2)[:, None]).argmax(axis=1)]
+        # MAD: weighted median of |center - median| over the histogram
+        deviation = np.abs(BIN_CENTERS[None, :] - median[:, None])
+        order = deviation.argsort(axis=1)
+        dev_cdf = np.take_along_axis(counts, order, axis=1).cumsum(axis=1)
+        mad_pos = (dev_cdf >= (totals / 2)[:, None]).argmax(axis=1)
+        mad = np.take_along_axis(deviation, order, axis=1)[np.arange(len(order)), mad_pos]
+        result["n"][known] = totals
+        result["median"][known] = median
+        result["mad"][known] = mad
+        return result
+
+    def percentiles(self, key_ids: np.ndarray, logs: np.ndarray) -> np.ndarray:
+        """Return each value's percentile (0-100) within its key's distribution."""
+        out = np.full(len(key_ids), np.nan)
+        valid = (key_ids >= 0) & np.isfinite(logs)
+        if not valid.any():
+            return out
+        # One cumulative histogram per distinct key, indexed per row
+        unique_keys, rows = np.unique(key_ids[valid], return_inverse=True)
+        counts = self.counts[unique_keys]
+        cdf = counts.cumsum(axis=1)
+        totals = cdf[:, -1][rows]
+        bins = self.bins(logs[valid])
+        below = np.where(bins > 0, cdf[rows, np.maximum(bins - 1, 0)], 0)
+        at = counts[rows, bins]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[valid] = 100.0 * (below + 0.5 * at) / totals
+        return out
+
+    # -- persistence ---------------------------------------------------
+
+    def save(self, path: str) -> None:
+        """Write the histograms to an ``.npz`` file (atomically)."""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        keys = sorted(self.keys.items(), key=lambda item: item[1])
+        tmp_path = target.with_name(f"{target.stem}.{os.getpid()}.tmp.npz")
+        np.savez_compressed(
+            tmp_path,
+            counts=self.counts,
+            keys=np.array(json.dumps([list(key) for key, _ in keys])),
+            bins=np.array([LOG_MIN, LOG_MAX, BIN_WIDTH]),
+            observation_keys=np.array(list(self.observations), dtype=str).reshape(-1, 3),
+            observation_ids=np.array(list(self.observations.values()), dtype=np.int64).reshape(-1, 3),
+        )
+        os.replace(tmp_path, target)
+
+    @classmethod
+    def load(cls, path: str) -> "IndicatorDistributions":
+        """Load histograms saved by ``save``; a missing or incompatible file yields an empty set."""
+        distributions = cls()
+        if not Path(path).exists():
+            return distributions
+        try:
+            with np.load(path) as data:
+                if not np.allclose(data["bins"], [LOG_MIN, LOG_MAX, BIN_WIDTH]):
+                    logger.warning("Ignoring quality distributions with a different binning: %s", path)
+                    return distributions
+                if "observation_keys" not in data:
+                    # Unkeyed counts cannot be de-duplicated against re-runs
+                    logger.warning("Ignoring quality distributions without observation keys: %s", path)
+                    return distributions
+                keys = json.loads(str(data["keys"]))
+                distributions.counts = data["counts"].astype(np.int64)
+                observation_keys = data["observation_keys"].tolist()
+                observation_ids = data["observation_ids"].tolist()
+        except (OSError, KeyError, ValueError) as exc:
+            logger.warning("Ignoring unreadable quality distributions %s: %s", path, exc)
+            return cls()
+        distributions.keys = {(indicator, sector): i for i, (indicator, sector) in enumerate(keys)}
+        distributions.observations = {
+            tuple(key): tuple(ids) for key, ids in zip(observation_keys, observation_ids)
+        }
+        return distributions
+
+
+class CorpusQualityChecker:
+    """Scores record batches against the corpus distributions and updates them."""
+
+    def __init__(
+        self,
+        distributions: Optional[IndicatorDistributions] = None,
+        scorer: Optional["DataQualityScorer"] = None,
+        path: Optional[str] = None,
+        min_samples: int = 20,
+        z_threshold: float = 3.5,
+        sector_percentiles: Tuple[float, float] = (1.0, 99.0),
+        metrics: Optional["ExtractorMetrics"] = None,
+    ) -> None:
+        if scorer is None:
+            from brsr_xbrl_extractor import DataQualityScorer
+            scorer = DataQualityScorer()
+        self.path = path
+        self.distributions = distributions or (IndicatorDistributions.load(path) if path else IndicatorDistributions())
+        self.scorer = scorer
+        self.min_samples = min_samples
+        self.z_threshold = z_threshold
+        self.sector_percentiles = sector_percentiles
+        self.metrics = metrics
+
+    def _row_stats(self, key_ids: np.ndarray, *names: str) -> List[np.ndarray]:
+        """Statistics computed once per distinct key and broadcast back to rows."""
+        unique_keys, inverse = np.unique(key_ids, return_inverse=True)
+        stats = self.distributions.stats(unique_keys)
+        return [stats[name][inverse] for name in names]
+
+    def check(self, indicators: np.ndarray, company_ids: np.ndarray, values: Any) -> Dict[str, np.ndarray]:
+        """Compute plausibility columns for one batch (without updating the distributions)."""
+        logs, numeric = _log_values(values)
+        sectors = np.array([sector_of(c) for c in company_ids], dtype=object)
+        return self._check(indicators, sectors, logs, numeric)
+
+    def _check(self, indicators: np.ndarray, sectors: np.ndarray, logs: np.ndarray,
+               numeric: np.ndarray) -> Dict[str, np.ndarray]:
+        corpus_keys = self.distributions.key_ids(indicators, [ALL_SECTORS] * len(indicators))
+        n, median, mad = self._row_stats(corpus_keys, "n", "median", "mad")
+
+        enough = numeric & (n >= self.min_samples)
+        deviation = logs - median
+        sigma = np.maximum(MAD_TO_SIGMA * mad, BIN_WIDTH * 5)  # floor for near-constant indicators
+        robust_z = np.where(enough, deviation / sigma, np.nan)
+        outlier = enough & (np.abs(robust_z) > self.z_threshold)
+
+        # A deviation close to a known scale exponent is most likely a unit slip
+        nearest = np.abs(np.abs(deviation)[:, None] - SCALE_EXPONENTS[None, :])
+        scale = SCALE_EXPONENTS[nearest.argmin(axis=1)]
+        magnitude = outlier & (np.abs(deviation) >= 2.5) & (nearest.min(axis=1) < 0.3)
+        magnitude_factor = np.where(magnitude, np.sign(deviation) * scale, 0.0)
+
+        sector_keys = self.distributions.key_ids(indicators, sectors)
+        (sector_n,) = self._row_stats(sector_keys, "n")
+        sector_pct = self.distributions.percentiles(sector_keys, logs)
+        low, high = self.sector_percentiles
+        sector_outlier = (numeric & (sector_n >= self.min_samples) & ~outlier
+                          & ((sector_pct < low) | (sector_pct > high)))
+
+        return {
+            "logs": logs,
+            "sectors": sectors,
+            "robust_z": robust_z,
+            "sector_percentile": sector_pct,
+            "outlier": outlier & ~magnitude,
+            "sector_outlier": sector_outlier,
+            "magnitude": magnitude,
+            "magnitude_factor": magnitude_factor,
+        }
+
+    @staticmethod
+    def flag_labels(result: Dict[str, np.ndarray]) -> List[str]:
+        labels = []
+        for outlier, sector, magnitude, factor in zip(
+            result["outlier"], result["sector_outlier"], result["magnitude"], result["magnitude_factor"]
+        ):
+            flags = []
+            if magnitude:
+                flags.append(f"unit_scale_1e{int(factor):+d}")
+            if outlier:
+                flags.append("outlier")
+            if sector:
+                flags.append("sector_outlier")
+            labels.append(";".join(flags))
+        return labels
+
+    def _score_batch(self, indicators: np.ndarray, company_ids: np.ndarray, years: Iterable[Any],
+                     values: Any, scores: np.ndarray, update: bool) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        logs, numeric = _log_values(values)
+        sectors = np.array([sector_of(c) for c in company_ids], dtype=object)
+        if update:
+            # Add the batch first so a fresh corpus is scored against itself
+            keys = [(str(c), _year_key(y), str(i)) for c, y, i in zip(company_ids, years, indicators)]
+            self.distributions.update(indicators, sectors, logs, keys)
+        result = self._check(indicators, sectors, logs, numeric)
+        adjusted = self.scorer.apply_penalties(
+            scores, result["outlier"], result["sector_outlier"], result["magnitude"]
+        )
+        if self.metrics is not None:
+            for flag in ("outlier", "sector_outlier", "magnitude"):
+                count = int(result[flag].sum())
+                if count:
+                    self.metrics.inc("brsr_quality_flags_total", count, flag=flag)
+        return adjusted, result
+
+    def apply(self, df: "pd.DataFrame", update: bool = True) -> "pd.DataFrame":
+        """Score a records DataFrame; adds ``robust_z``, ``sector_percentile`` and ``quality_flags``."""
+        if df.empty:
+            return df
+        out = df.copy()
+        values = out["indicator_value"]
+        if "canonical_value" in out:
+            # Compare in canonical units (see units.UnitNormalizer) where known
+            values = out["canonical_value"].astype(object).where(out["canonical_value"].notna(), values)
+        years = out["reporting_year"].tolist() if "reporting_year" in out else [""] * len(out)
+        adjusted, result = self._score_batch(
+            out["indicator_name"].to_numpy(dtype=object),
+            out["company_id"].to_numpy(dtype=object),
+            years,
+            values.tolist(),
+            out["data_quality_score"].to_numpy(dtype=np.int64),
+            update,
+        )
+        out["data_quality_score"] = adjusted
+        out["robust_z"] = np.round(result["robust_z"], 3)
+        out["sector_percentile"] = np.round(result["sector_percentile"], 1)
+        out["quality_flags"] = self.flag_labels(result)
+        return out
+
+    def apply_records(self, records: Iterable["ESGRecord"], batch_size: int = 5000) -> Iterator["ESGRecord"]:
+        """Stream records through the checks in batches, adjusting their scores."""
+        batch: List["ESGRecord"] = []
+
+        def flush() -> Iterator["ESGRecord"]:
+            adjusted, _ = self._score_batch(
+                np.array([r.indicator_name for r in batch], dtype=object),
+                np.array([r.company_id for r in batch], dtype=object),
+                [r.reporting_year for r in batch],
+                [r.indicator_value if r.canonical_value is None else r.canonical_value for r in batch],
+                np.array([r.data_quality_score for r in batch], dtype=np.int64),
+                update=True,
+            )
+            for record, score in zip(batch, adjusted):
+                yield record if score == record.data_quality_score else replace(record, data_quality_score=int(score))
+            batch.clear()
+
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield from flush()
+        if batch:
+            yield from flush()
+
+    def save(self) -> None:
+        if self.path:
+            self.distributions.save(self.path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Re-score an exported CSV against (and into) the cached distributions."""
+    import pandas as pd
+
+    from brsr_xbrl_extractor import ParserConfig
+
+    parser = argparse.ArgumentParser(description="Corpus-level plausibility checks for ESG metrics")
+    parser.add_argument("csv", help="exported records (CSV)")
+    parser.add_argument("--out", help="where to write the re-scored CSV (default: <csv>_quality.csv)")
+    parser.add_argument("--stats", help="distribution file (default: <cache_dir>/quality_distributions.npz)")
+    parser.add_argument("--no-update", action="store_true", help="score only; do not add to the distributions")
+    args = parser.parse_args(argv)
+
+    config = ParserConfig()
+    stats_path = args.stats or config.quality_stats_path or str(Path(config.cache_dir) / "quality_distributions.npz")
+    checker = CorpusQualityChecker(path=stats_path, min_samples=config.quality_min_samples)
+    df = checker.apply(pd.read_csv(args.csv, encoding="utf-8-sig"), update=not args.no_update)
+    out = args.out or str(Path(args.csv).with_name(Path(args.csv).stem + "_quality.csv"))
+    df.to_csv(out, index=False, encoding="utf-8-sig")
+    if not args.no_update:
+        checker.save()
+    flagged = int((df["quality_flags"] != "").sum()) if "quality_flags" in df else 0
+    print(f"{len(df)} records, {flagged} flagged -> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+"""
+Country and state lookups with state GDP (GSDP) normalization.
+
+Compiles the CLIMADA region data once and answers lookups in bulk:
+
+- ``NatID_grid_0150as.nc``: a 2.5 arc-minute raster of ISIMIP country IDs,
+  resolved to ISO codes and CLIMADA regions through ``NatRegIDs.csv``. It is
+  cropped to the countries of interest (India by default) and stored as a
+  ``uint8`` array in ``<cache_dir>/regions/natid_<version>.npz``, so a
+  lat/lon lookup is one integer division and one fancy index.
+- ``GSDP/<ISO>_GSDP.xls``: gross state domestic product per state and fiscal
+  year (Rs. crore). The workbook is flattened to a long table and stored as
+  Parquet in ``<cache_dir>/regions/gsdp_<ISO>_<version>.parquet``.
+
+Cache names carry the version (path, size and mtime) of their source file,
+so editing a source rebuilds only what it feeds. Indian states are keyed by
+their CIN state code (see ``states.py``); GSDP years are fiscal-year ends
+("2013-14" is 2014), like ``reporting_year``.
+
+``normalize`` divides every numeric record of an exported corpus by the GSDP
+of the company's state (from its CIN, or a ``state`` column) in one
+vectorized pass. The GSDP used is the latest year at or before the
+reporting year. State GDP is not published for every year, so the
+``gsdp_year`` column says which year was used.
+
+Reading the NetCDF raster requires ``h5py`` (NetCDF-4 files are HDF5) and
+reading ``.xls`` workbooks requires ``xlrd``; the compiled caches need
+neither.
+
+Usage:
+    python regions.py output/brsr_esg_metrics.csv --indicator ghg_scope1_total
+    python regions.py --point 19.08 72.88 --point 13.08 80.27
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import logging
+import os
+import re
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from panel import file_version
+from peers import CIN_RE
+from states import STATES, state_in_text
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger("brsr_parser")
+
+# Bump when the compiled layouts change so stale caches are rebuilt.
+REGION_CACHE_VERSION = 1
+
+GSDP_COLUMN_RE = re.compile(r"GSDP.*?(\d{4})\s*-\s*(\d{2})\b", re.IGNORECASE)
+
+
+# -------------------------------------------------------------------
+# Country raster
+# -------------------------------------------------------------------
+
+@dataclass
+class RegionGrid:
+    """Country ID raster on a regular lat/lon grid; row 0 is the southern edge, 0 means no country."""
+    ids: np.ndarray  # (rows, cols) uint8 or uint16
+    lat0: float  # Southern edge of row 0
+    lon0: float  # Western edge of column 0
+    res: float  # Cell size in degrees
+
+    @classmethod
+    def from_arrays(
+        cls, values: Any, lat: Any, lon: Any, fill_value: Any = None, keep: Optional[Sequence[int]] = None
+    ) -> "RegionGrid":
+        """Compile a (lat, lon) raster of cell-centre values, cropped to the IDs in ``keep``."""
+        values = np.asarray(values)
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        res = float(abs(lat[1] - lat[0])) if lat.size > 1 else float(abs(lon[1] - lon[0]))
+        if lat.size > 1 and lat[1] < lat[0]:
+            values, lat = values[::-1], lat[::-1]
+        if lon.size > 1 and lon[1] < lon[0]:
+            values, lon = values[:, ::-1], lon[::-1]
+        valid = np.isfinite(values) & (values > 0)
+        if fill_value is not None:
+            valid &= values != fill_value
+        ids = np.where(valid, values, 0).astype(np.int64)
+        if keep is not None:
+            ids[~np.isin(ids, np.asarray(keep))] = 0
+        rows, cols = np.nonzero(ids.any(axis=1))[0], np.nonzero(ids.any(axis=0))[0]
+        if not rows.size:
+            return cls(np.zeros((0, 0), dtype=np.uint8), 0.0, 0.0, res)
+        ids = ids[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+        dtype = np.uint8 if ids.max() < 256 else np.uint16
+        return cls(ids.astype(dtype), float(lat[rows[0]] - res / 2), float(lon[cols[0]] - res / 2), res)
+
+    def lookup(self, lat: Any, lon: Any) -> np.ndarray:
+        """Country IDs at the given points (0 outside the grid or at sea)."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        row = np.floor((np.where(np.isfinite(lat), lat, -1e9) - self.lat0) / self.res).astype(np.int64)
+        col = np.floor((np.where(np.isfinite(lon), lon, -1e9) - self.lon0) / self.res).astype(np.int64)
+        rows, cols = self.ids.shape
+        inside = (row >= 0) & (row < rows) & (col >= 0) & (col < cols)
+        out = np.zeros(lat.shape, dtype=np.int64)
+        out[inside] = self.ids[row[inside], col[inside]]
+        return out
+
+    def save(self, path: str) -> None:
+        """Write the grid to an ``.npz`` file (atomically)."""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(f"{target.stem}.{os.getpid()}.tmp.npz")
+        np.savez_compressed(tmp_path, ids=self.ids, origin=np.array([self.lat0, self.lon0, self.res]),
+                            version=np.array(REGION_CACHE_VERSION))
+        os.replace(tmp_path, target)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["RegionGrid"]:
+        """Load a grid saved by ``save``, or None if missing, stale or unreadable."""
+        if not Path(path).exists():
+            return None
+        try:
+            with np.load(path) as data:
+                if int(data["version"]) != REGION_CACHE_VERSION:
+                    return None
+                lat0, lon0, res = (float(v) for v in data["origin"])
+                return cls(data["ids"], lat0, lon0, res)
+        except (OSError, KeyError, ValueError) as exc:
+            logger.warning("Ignoring unreadable region grid %s: %s", path, exc)
+            return None
+
+
+def read_natid_netcdf(path: str, variable: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Any]:
+    """(values, lat, lon, fill value) of a NetCDF-4 country ID raster."""
+    import h5py
+
+    with h5py.File(path, "r") as f:
+        lat, lon = f["lat"][:], f["lon"][:]
+        if variable is None:
+            variable = next(
+                name for name, item in f.items()
+                if isinstance(item, h5py.Dataset) and item.ndim >= 2 and item.shape[-2:] == (lat.size, lon.size)
+            )
+        dataset = f[variable]
+        values = dataset[:]
+        while values.ndim > 2:  # Drop a singleton time axis
+            values = values[0]
+        fill_value = dataset.attrs.get("_FillValue")
+        if fill_value is not None:
+            fill_value = np.asarray(fill_value).ravel()[0]
+    return values, lat, lon, fill_value
+
+
+def read_natreg_ids(path: str) -> Dict[int, Tuple[str, str]]:
+    """ISIMIP country ID -> (ISO3, CLIMADA region) from ``NatRegIDs.csv``."""
+    countries: Dict[int, Tuple[str, str]] = {}
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            countries[int(row["ID"])] = (row["ISO"], row["Reg_name"])
+    return countries
+
+
+# -------------------------------------------------------------------
+# State GDP
+# -------------------------------------------------------------------
+
+def state_code(name: Any) -> Optional[str]:
+    """CIN state code of an Indian state or union territory name."""
+    state = state_in_text(name) if isinstance(name, str) else None
+    return state.code if state is not None else None
+
+
+def gsdp_from_frame(df: "pd.DataFrame", iso: str = "IND") -> "pd.DataFrame":
+    """Long GSDP table (region, name, year, gsdp_inr_crore) from a ``<ISO>_GSDP`` worksheet.
+
+    Year columns are the ``GSDP ... (Rs. Crore) - 2013-14`` headers; the
+    state is the first column. Heading, subtotal and note rows (no state or
+    no figures) are dropped. Indian states are keyed by CIN state code,
+    other countries by name.
+    """
+    import pandas as pd
+
+    year_columns = {}
+    for column in df.columns:
+        match = GSDP_COLUMN_RE.search(str(column))
+        if match:
+            year_columns[column] = int(match.group(1)) + 1
+    if not year_columns:
+        raise ValueError("No 'GSDP ... - YYYY-YY' columns in GSDP worksheet")
+    names = df.iloc[:, 0].astype(str).str.strip()
+    regions = names.map(state_code) if iso == "IND" else names.where(df.iloc[:, 0].notna())
+    frames = []
+    for column, year in year_columns.items():
+        frames.append(pd.DataFrame({
+            "region": regions, "name": names, "year": year,
+            "gsdp_inr_crore": pd.to_numeric(df[column], errors="coerce"),
+        }))
+    table = pd.concat(frames, ignore_index=True).dropna(subset=["region", "gsdp_inr_crore"])
+    table = table.drop_duplicates(subset=["region", "year"], keep="first")
+    return table.sort_values(["region", "year"], ignore_index=True).astype({"year": "int64"})
+
+
+def read_gsdp_workbook(path: str, iso: str = "IND") -> "pd.DataFrame":
+    """Long GSDP table from the first worksheet of ``path`` that has GSDP year columns."""
+    import pandas as pd
+
+    for name, sheet in pd.read_excel(path, sheet_name=None).items():
+        try:
+            return gsdp_from_frame(sheet, iso)
+        except ValueError:
+            logger.debug("No GSDP columns in sheet %s of %s", name, path)
+    raise ValueError(f"No GSDP table found in {path}")
+
+
+@dataclass
+class GSDPTable:
+    """Dense region x year GSDP matrix, forward-filled so lookups are as-of the requested year."""
+    regions: np.ndarray  # (R,) sorted region codes
+    years: np.ndarray  # (Y,) ascending
+    values: np.ndarray  # (R, Y) Rs. crore, NaN before a region's first figure
+    source_years: np.ndarray  # (R, Y) year each value was published for, -1 where NaN
+
+    @classmethod
+    def from_frame(cls, table: "pd.DataFrame") -> "GSDPTable":
+        regions = np.array(sorted(table["region"].astype(str).unique()), dtype=str)
+        if not len(table):
+            return cls(regions, np.zeros(0, dtype=np.int64), np.zeros((0, 0)), np.zeros((0, 0), dtype=np.int64))
+        years = np.arange(int(table["year"].min()), int(table["year"].max()) + 1)
+        values = np.full((regions.size, years.size), np.nan)
+        r = np.searchsorted(regions, table["region"].astype(str).to_numpy())
+        values[r, table["year"].to_numpy(dtype=np.int64) - years[0]] = table["gsdp_inr_crore"].to_numpy(dtype=np.float64)
+        # Forward-fill along years, remembering which year each value came from
+        last = np.maximum.accumulate(np.where(np.isfinite(values), np.arange(years.size), -1), axis=1)
+        filled = np.take_along_axis(values, np.maximum(last, 0), axis=1)
+        filled[last < 0] = np.nan
+        return cls(regions, years, filled, np.where(last >= 0, years[np.maximum(last, 0)], -1))
+
+    def lookup(self, regions: Any, years: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """(GSDP in Rs. crore, year used) per (region, year); NaN and -1 where unknown."""
+        regions = np.asarray(regions, dtype=object).astype(str)
+        years = np.asarray(years, dtype=np.int64)
+        out = np.full(regions.shape, np.nan)
+        used = np.full(regions.shape, -1, dtype=np.int64)
+        if not self.regions.size:
+            return out, used
+        r = np.minimum(np.searchsorted(self.regions, regions), self.regions.size - 1)
+        y = np.minimum(years, self.years[-1]) - self.years[0]
+        ok = (self.regions[r] == regions) & (y >= 0)
+        out[ok] = self.values[r[ok], y[ok]]
+        used[ok] = self.source_years[r[ok], y[ok]]
+        return out, used
+
+
+def cin_states(company_ids: Any) -> np.ndarray:
+    """CIN state codes (canonical, e.g. TS -> TG) of company IDs; None where not a CIN."""
+    import pandas as pd
+
+    ids = pd.Series(company_ids, dtype=object).astype(str).str.strip().str.upper()
+    codes = ids.str[6:8].where(ids.str.match(CIN_RE.pattern))
+    codes = codes.map({code: state.code for code, state in STATES.items()}).to_numpy(dtype=object)
+    return np.where(pd.notna(codes), codes, None)
+
+
+def normalize(df: "pd.DataFrame", gsdp: GSDPTable) -> "pd.DataFrame":
+    """Records with ``state``, ``gsdp_inr_crore``, ``gsdp_year`` and ``value_per_gsdp_crore`` added.
+
+    Values are ``canonical_value`` where present, else numeric
+    ``indicator_value``. A ``state`` column, if given, overrides the CIN state.
+    """
+    import pandas as pd
+
+    out = df.copy()
+    states = cin_states(out["company_id"])
+    if "state" in out:
+        given = out["state"].map(lambda s: STATES[s].code if s in STATES else None).to_numpy(dtype=object)
+        states = np.where(pd.notna(given), given, states)
+    value = pd.to_numeric(out["indicator_value"], errors="coerce")
+    if "canonical_value" in out:
+        value = pd.to_numeric(out["canonical_value"], errors="coerce").fillna(value)
+    gsdp_values, gsdp_years = gsdp.lookup(states, out["reporting_year"].to_numpy(dtype=np.int64))
+    out["state"] = states
+    out["gsdp_inr_crore"] = gsdp_values
+    out["gsdp_year"] = pd.Series(gsdp_years, index=out.index).where(gsdp_years >= 0).astype("Int64")
+    out["value_per_gsdp_crore"] = value.to_numpy(dtype=np.float64) / gsdp_values
+    return out
+
+
+# -------------------------------------------------------------------
+# Region index
+# -------------------------------------------------------------------
+
+class RegionIndex:
+    """Compiled country raster and GSDP tables under a CLIMADA data directory, built on first use."""
+
+    def __init__(
+        self, data_dir: str = "../climada/data", cache_dir: Optional[str] = ".cache",
+        countries: Optional[Sequence[str]] = ("IND",),
+    ) -> None:
+        self.data_dir = Path(data_dir)
+        self.cache_dir = Path(cache_dir) / "regions" if cache_dir else None
+        self.countries = tuple(countries) if countries else None
+
+    def _cache_path(self, kind: str, source: Path, suffix: str, *extra: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        key = hashlib.sha1(":".join((file_version(source), *extra)).encode("utf-8")).hexdigest()[:16]
+        return self.cache_dir / f"{kind}_{key}{suffix}"
+
+    @cached_property
+    def natreg(self) -> Dict[int, Tuple[str, str]]:
+        return read_natreg_ids(str(self.data_dir / "NatRegIDs.csv"))
+
+    @cached_property
+    def iso_by_id(self) -> np.ndarray:
+        table = np.full(max(self.natreg, default=0) + 1, "", dtype=object)
+        for natid, (iso, _) in self.natreg.items():
+            table[natid] = iso
+        return table
+
+    @cached_property
+    def grid(self) -> RegionGrid:
+        """Country raster, cropped to ``countries``, from the cache or the NetCDF file."""
+        source = self.data_dir / "NatID_grid_0150as.nc"
+        cache_path = self._cache_path("natid", source, ".npz", ",".join(self.countries or ("all",)))
+        grid = RegionGrid.load(str(cache_path)) if cache_path else None
+        if grid is not None:
+            return grid
+        keep = None
+        if self.countries is not None:
+            keep = [natid for natid, (iso, _) in self.natreg.items() if iso in self.countries]
+        values, lat, lon, fill_value = read_natid_netcdf(str(source))
+        grid = RegionGrid.from_arrays(values, lat, lon, fill_value, keep)
+        logger.info("Compiled country raster %s: %dx%d cells", source, *grid.ids.shape)
+        if cache_path:
+            try:
+                grid.save(str(cache_path))
+            except OSError as exc:
+                logger.warning("Could not write region grid %s: %s", cache_path, exc)
+        return grid
+
+    def gsdp_frame(self, iso: str = "IND") -> "pd.DataFrame":
+        """Long GSDP table of a country, from the Parquet cache or the workbook."""
+        import pandas as pd
+
+        source = self.data_dir / "GSDP" / f"{iso}_GSDP.xls"
+        cache_path = self._cache_path(f"gsdp_{iso}", source, ".parquet", str(REGION_CACHE_VERSION))
+        if cache_path is not None and cache_path.exists():
+            return pd.read_parquet(cache_path)
+        table = read_gsdp_workbook(str(source), iso)
+        if cache_path is not None:
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = cache_path.with_name(f"{cache_path.stem}.{os.getpid()}.tmp.parquet")
+                table.to_parquet(tmp_path, index=False)
+                os.replace(tmp_path, cache_path)
+            except OSError as exc:
+                logger.warning("Could not write GSDP table %s: %s", cache_path, exc)
+        return table
+
+    @cached_property
+    def gsdp(self) -> GSDPTable:
+        """Indian state GDP by CIN state code and fiscal year."""
+        return GSDPTable.from_frame(self.gsdp_frame("IND"))
+
+    def country_ids(self, lat: Any, lon: Any) -> np.ndarray:
+        return self.grid.lookup(lat, lon)
+
+    def countries_at(self, lat: Any, lon: Any) -> np.ndarray:
+        """ISO3 codes at the given points ('' where unknown)."""
+        ids = self.country_ids(lat, lon)
+        known = ids < self.iso_by_id.size
+        return np.where(known, self.iso_by_id[np.where(known, ids, 0)], "")
+
+    def states_at(self, lat: Any, lon: Any) -> np.ndarray:
+        """Approximate Indian state codes at the given points; None outside India.
+
+        Points are assigned to the nearest state's representative point in
+        ``states.py``; there is no state boundary raster. Good enough to
+        group sites regionally, not to settle borderline cases.
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        states = list({state.code: state for state in STATES.values()}.values())
+        slat = np.array([s.lat for s in states])
+        slon = np.array([s.lon for s in states])
+        x = np.radians(lon[:, None] - slon[None, :]) * np.cos(np.radians(lat[:, None]))
+        nearest = np.argmin(np.hypot(x, np.radians(lat[:, None] - slat[None, :])), axis=1)
+        codes = np.array([s.code for s in states], dtype=object)[nearest]
+        return np.where(self.countries_at(lat, lon) == "IND", codes, None)
+
+    def normalize(self, df: "pd.DataFrame") -> "pd.DataFrame":
+        """``normalize`` against Indian state GDP."""
+        return normalize(df, self.gsdp)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Normalize exported records by state GDP, or look up points."""
+    from panel import read_records
+
+    parser = argparse.ArgumentParser(description="Country/state lookups and state GDP normalization")
+    parser.add_argument("path", nargs="?", help="exported records (CSV, Parquet, JSON or NDJSON)")
+    parser.add_argument("--indicator", help="only this indicator")
+    parser.add_argument("--point", nargs=2, type=float, action="append", metavar=("LAT", "LON"))
+    parser.add_argument("--data-dir", default="../climada/data")
+    parser.add_argument("--cache-dir", default=".cache")
+    args = parser.parse_args(argv)
+
+    index = RegionIndex(args.data_dir, args.cache_dir)
+    if args.point:
+        lat, lon = np.array(args.point).T
+        try:
+            index.grid
+        except ImportError as exc:
+            parser.error(f"compiling the country raster needs h5py ({exc})")
+        for point, iso, state in zip(args.point, index.countries_at(lat, lon), index.states_at(lat, lon)):
+            print(f"{point[0]:.4f},{point[1]:.4f}\t{iso or '-'}\t{state or '-'}")
+    if args.path:
+        df = read_records(Path(args.path))
+        if args.indicator:
+            df = df[df["indicator_name"] == args.indicator]
+        try:
+            index.gsdp
+        except ImportError as exc:
+            parser.error(f"reading the GSDP workbook needs xlrd ({exc})")
+        columns = ["company_id", "reporting_year", "indicator_name", "state", "gsdp_year", "value_per_gsdp_crore"]
+        print(index.normalize(df)[columns].to_string(index=False))
+    if not args.point and not args.path:
+        parser.error("give an export path and/or --point")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Fact-level diffs between two submissions of a filing.
+
+Companies revise BRSR filings, and revisions rename contexts and units
+freely, so facts are compared on a normalized key rather than on ids:
+
+- concept:  the local name (the namespace changes with the taxonomy release);
+- context:  period end plus sorted (axis, member) pairs, e.g.
+  ``2024-03-31 [GenderAxis=MaleMember]``;
+- unit:     the measure's local name (``iso4217:INR`` -> ``INR``).
+
+``digest_facts`` hashes each key and each normalized value (numbers compare
+by value, so ``1000.00`` equals ``1000``; text by collapsed whitespace) into
+a ``FactDigest``. ``diff_digests`` then classifies facts as added, removed or
+changed with one dictionary pass per side, so a diff is linear in the number
+of facts.
+
+Digests of processed filings can be kept in a ``FactHashStore`` (enable
+``store_fact_hashes``); a later diff against a stored filing loads its
+digest instead of fetching and parsing it again.
+
+Command line:
+    python revisions.py OLD NEW [--format text|json]
+
+OLD and NEW are instance files, URLs, or filing IDs in the fact hash store.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sys
+from dataclasses import asdict, dataclass, field
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from facts import FactTable
+
+logger = logging.getLogger("brsr_parser")
+
+FACT_HASH_VERSION = 1
+
+FactKey = Tuple[str, str, Optional[str]]  # (concept, context, unit)
+
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def normalize_value(value: Any) -> Optional[str]:
+    """Canonical text of a fact value: numbers by value, text with whitespace collapsed."""
+    if value is None:
+        return None
+    text = " ".join(str(value).split())
+    try:
+        number = Decimal(text.replace(",", ""))
+    except InvalidOperation:
+        return text
+    if not number.is_finite():
+        return text
+    return format(number.normalize(), "f") if number else "0"
+
+
+def context_key(period: Optional[str], dimensions: Tuple[Tuple[str, str], ...] = ()) -> str:
+    """Normalized context: period end plus its (axis, member) pairs."""
+    key = period or ""
+    if dimensions:
+        key += " [" + ", ".join(f"{axis}={member}" for axis, member in dimensions) + "]"
+    return key
+
+
+# -------------------------------------------------------------------
+# Digests
+# -------------------------------------------------------------------
+
+@dataclass
+class FactDigest:
+    """Hashed facts of one filing: key hash -> (key, value hash, normalized value)."""
+    source: str
+    facts: Dict[int, Tuple[FactKey, int, Optional[str]]] = field(default_factory=dict)
+    duplicates: int = 0  # Facts repeating a key already seen (the first one is kept)
+    version: int = FACT_HASH_VERSION
+
+    def __len__(self) -> int:
+        return len(self.facts)
+
+
+def digest_facts(facts: FactTable, source: str = "") -> FactDigest:
+    """Hash every fact of a filing on its normalized concept, context and unit."""
+    digest = FactDigest(source)
+    names = facts.local_names.symbols
+    units = facts.units.symbols
+    contexts = facts.contexts.symbols
+    context_keys: Dict[int, str] = {}
+    for name_id, unit_id, context_id, value in zip(
+        facts.local_name_ids, facts.unit_ids, facts.context_ids, facts.values
+    ):
+        context = context_keys.get(context_id)
+        if context is None:
+            context_ref = contexts[context_id] if context_id >= 0 else ""
+            if context_ref in facts.periods:
+                context = context_key(facts.periods[context_ref], facts.dimensions.get(context_ref, ()))
+            else:
+                context = context_ref  # Facts without context descriptions fall back to the id
+            context_keys[context_id] = context
+        unit = units[unit_id].rpartition(":")[2] if unit_id >= 0 and units[unit_id] else None
+        key = (names[name_id], context, unit)
+        key_hash = _hash("\x1f".join((key[0], key[1], unit or "")))
+        if key_hash in digest.facts:
+            digest.duplicates += 1
+            continue
+        normalized = normalize_value(value)
+        digest.facts[key_hash] = (key, _hash(normalized or ""), normalized)
+    return digest
+
+
+# -------------------------------------------------------------------
+# Diffs
+# -------------------------------------------------------------------
+
+@dataclass
+class FactChange:
+    """One fact that differs between two submissions."""
+    concept: str
+    context: str
+    unit: Optional[str]
+    old: Optional[str] = None
+    new: Optional[str] = None
+
+
+@dataclass
+class FilingDiff:
+    """Facts added, removed and changed from ``old_source`` to ``new_source``."""
+    old_source: str
+    new_source: str
+    added: List[FactChange] = field(default_factory=list)
+    removed: List[FactChange] = field(default_factory=list)
+    changed: List[FactChange] = field(default_factory=list)
+    unchanged: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def summary(self) -> Dict[str, int]:
+        return {"added": len(self.added), "removed": len(self.removed),
+                "changed": len(self.changed), "unchanged": self.unchanged}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "old_source": self.old_source,
+            "new_source": self.new_source,
+            "summary": self.summary(),
+            "added": [asdict(c) for c in self.added],
+            "removed": [asdict(c) for c in self.removed],
+            "changed": [asdict(c) for c in self.changed],
+        }
+
+
+def diff_digests(old: FactDigest, new: FactDigest) -> FilingDiff:
+    """Compare two digests in time linear in their sizes."""
+    diff = FilingDiff(old.source, new.source)
+    new_facts = new.facts
+    for key_hash, (key, value_hash, value) in old.facts.items():
+        match = new_facts.get(key_hash)
+        if match is None:
+            diff.removed.append(FactChange(*key, old=value))
+        elif match[1] != value_hash:
+            diff.changed.append(FactChange(*key, old=value, new=match[2]))
+        else:
+            diff.unchanged += 1
+    old_facts = old.facts
+    for key_hash, (key, _, value) in new_facts.items():
+        if key_hash not in old_facts:
+            diff.added.append(FactChange(*key, new=value))
+    return diff
+
+
+# -------------------------------------------------------------------
+# Store
+# -------------------------------------------------------------------
+
+class FactHashStore:
+    """Directory of pickled ``FactDigest``s, one per filing ID."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+
+    def _file(self, filing_id: str) -> Path:
+        return self.path / f"{filing_id}.pkl"
+
+    def put(self, filing_id: str, digest: FactDigest) -> None:
+        target = self._file(filing_id)
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = target.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(digest, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, target)
+        except OSError as exc:
+            logger.warning("Could not write fact hashes %s: %s", target, exc)
+
+    def get(self, filing_id: str) -> Optional[FactDigest]:
+        path = self._file(filing_id)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "rb") as f:
+                digest = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as exc:
+            logger.warning("Ignoring unreadable fact hashes %s: %s", path, exc)
+            return None
+        if not isinstance(digest, FactDigest) or digest.version != FACT_HASH_VERSION:
+            return None
+        return digest
+
+    def __contains__(self, filing_id: object) -> bool:
+        return isinstance(filing_id, str) and self._file(filing_id).exists()
+
+
+# -------------------------------------------------------------------
+# Command line
+# -------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from brsr_xbrl_extractor import BRSRExtractor, BRSRParserError, ParserConfig, setup_logging
+
+    parser = argparse.ArgumentParser(description="Show the facts that changed between two filing submissions")
+    parser.add_argument("old", help="original filing: instance file, URL or stored filing ID")
+    parser.add_argument("new", help="revised filing: instance file, URL or stored filing ID")
+    parser.add_argument("--format", choices=("text", "json"), default="text")
+    args = parser.parse_args(argv)
+    setup_logging("WARNING")
+
+    extractor = BRSRExtractor(ParserConfig())
+    try:
+        diff = extractor.diff_filings(args.old, args.new)
+    except BRSRParserError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    if args.format == "json":
+        json.dump(diff.to_dict(), sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return 0
+    print(f"{diff.old_source} -> {diff.new_source}")
+    print(", ".join(f"{count} {kind}" for kind, count in diff.summary().items()))
+    for kind, sign in (("removed", "-"), ("added", "+"), ("changed", "~")):
+        for change in getattr(diff, kind):
+            values = {"removed": change.old, "added": change.new, "changed": f"{change.old} -> {change.new}"}[kind]
+            unit = f" {change.unit}" if change.unit else ""
+            print(f"{sign} {change.concept} @ {change.context}{unit}: {values}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
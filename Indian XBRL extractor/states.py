@@ -0,0 +1,82 @@
+"""
+Indian states and union territories.
+
+Keyed by the two-letter state code used in CINs (``decode_cin(...).state``),
+with the state's name, common alternative spellings and a representative
+point (the capital, or the main commercial centre where most listed
+companies are registered). The point stands in for a company's location when
+nothing finer is known; it is not a centroid of the state's area.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class State:
+    code: str
+    name: str
+    lat: float
+    lon: float
+    aliases: Tuple[str, ...] = ()
+
+
+STATES: Dict[str, State] = {s.code: s for s in (
+    State("AN", "Andaman and Nicobar Islands", 11.62, 92.73, ("Andaman & Nicobar",)),
+    State("AP", "Andhra Pradesh", 16.51, 80.65),
+    State("AR", "Arunachal Pradesh", 27.08, 93.61),
+    State("AS", "Assam", 26.14, 91.74),
+    State("BR", "Bihar", 25.59, 85.14),
+    State("CH", "Chandigarh", 30.73, 76.78),
+    State("CT", "Chhattisgarh", 21.25, 81.63, ("Chattisgarh",)),
+    State("DD", "Daman and Diu", 20.40, 72.83, ("Daman & Diu",)),
+    State("DL", "Delhi", 28.61, 77.21, ("New Delhi", "NCT of Delhi")),
+    State("DN", "Dadra and Nagar Haveli", 20.27, 73.01, ("Dadra & Nagar Haveli", "Silvassa")),
+    State("GA", "Goa", 15.49, 73.83),
+    State("GJ", "Gujarat", 23.02, 72.57),
+    State("HP", "Himachal Pradesh", 31.10, 77.17),
+    State("HR", "Haryana", 28.46, 77.03, ("Gurgaon", "Gurugram")),
+    State("JH", "Jharkhand", 23.34, 85.31),
+    State("JK", "Jammu and Kashmir", 34.08, 74.80, ("Jammu & Kashmir",)),
+    State("KA", "Karnataka", 12.97, 77.59, ("Bangalore", "Bengaluru")),
+    State("KL", "Kerala", 8.52, 76.94),
+    State("LA", "Ladakh", 34.15, 77.58),
+    State("LD", "Lakshadweep", 10.57, 72.64),
+    State("MH", "Maharashtra", 19.08, 72.88, ("Mumbai", "Pune")),
+    State("ML", "Meghalaya", 25.58, 91.89),
+    State("MN", "Manipur", 24.82, 93.94),
+    State("MP", "Madhya Pradesh", 23.26, 77.41),
+    State("MZ", "Mizoram", 23.73, 92.72),
+    State("NL", "Nagaland", 25.67, 94.11),
+    State("OR", "Odisha", 20.30, 85.82, ("Orissa",)),
+    State("PB", "Punjab", 30.90, 75.85),
+    State("PY", "Puducherry", 11.94, 79.81, ("Pondicherry",)),
+    State("RJ", "Rajasthan", 26.91, 75.79),
+    State("SK", "Sikkim", 27.33, 88.61),
+    State("TG", "Telangana", 17.39, 78.49, ("Hyderabad",)),
+    State("TN", "Tamil Nadu", 13.08, 80.27, ("Chennai",)),
+    State("TR", "Tripura", 23.83, 91.28),
+    State("UP", "Uttar Pradesh", 26.85, 80.95, ("Noida",)),
+    State("UR", "Uttarakhand", 30.32, 78.03, ("Uttaranchal",)),
+    State("WB", "West Bengal", 22.57, 88.36, ("Kolkata", "Calcutta")),
+)}
+STATES["TS"] = STATES["TG"]  # Both codes appear in CINs
+STATES["UT"] = STATES["UR"]
+
+_NAMES = sorted(
+    ((name, state.code) for state in STATES.values() for name in (state.name, *state.aliases)),
+    key=lambda item: -len(item[0]),
+)
+_NAME_RE = re.compile(r"\b(" + "|".join(re.escape(name) for name, _ in _NAMES) + r")\b", re.IGNORECASE)
+_CODE_BY_NAME = {name.lower(): code for name, code in _NAMES}
+
+
+def state_in_text(text: Optional[str]) -> Optional[State]:
+    """The state named last in an address ('..., Andheri East, Mumbai, Maharashtra 400069')."""
+    matches = _NAME_RE.findall(text or "")
+    if not matches:
+        return None
+    return STATES[_CODE_BY_NAME[matches[-1].lower()]]
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+BRSR disclosure tables rebuilt from the definition and presentation linkbases.
+
+BRSR reports most quantities as dimensional facts (employees by category and
+gender, energy by source, ...), which the record export flattens into rows
+that differ only by context. This module restores the tables:
+
+- ``compile_tables`` reads the definition linkbase once per taxonomy release
+  and turns every hypercube into a ``TableTemplate``: its axes (with their
+  domain members in taxonomy order, or typed axes whose rows come from the
+  filing), its line items, its title and the BRSR section or principle it is
+  presented under (from the presentation linkbase and role definitions).
+  Templates are cached with the ``CompiledTaxonomy``.
+- ``TableSet.reconstruct`` slots a filing's facts into the templates with
+  dictionary lookups only: line item -> candidate tables, then each context's
+  (axis, member) pairs -> row key. Facts whose dimensions do not fit a table
+  (an axis it lacks, an unknown member) are left out of it.
+
+Command line:
+    python tables.py FILING.xml [--principle "Principle 6"] [--format text|json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Container, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from facts import FactTable
+
+XLINK = "{http://www.w3.org/1999/xlink}"
+LINK = "{http://www.xbrl.org/2003/linkbase}"
+XBRLDT = "{http://xbrl.org/2005/xbrldt}"
+_ARCROLE = "http://xbrl.org/int/dim/arcrole/"
+_ROLE_CODE_RE = re.compile(r"^\s*\[([^\]]+)\]\s*")
+_TYPED_AXIS_RE = re.compile(r'<xsd:element\b[^>]*\bname="([^"]+)"[^>]*\bxbrldt:typedDomainRef=')
+_LABEL_SUFFIX_RE = re.compile(r"\s*\[(Axis|Member|Domain|Table|Line Items|Abstract|Text block)\]$")
+
+RowKey = Tuple[Optional[str], ...]  # (period end, member per axis)
+
+
+def clean_label(label: str) -> str:
+    """Drop the '[Axis]' / '[Member]' style suffix of a taxonomy label."""
+    return _LABEL_SUFFIX_RE.sub("", label)
+
+
+def dimension_label(dimensions: Iterable[Tuple[str, str]], labels: Optional[Dict[str, str]] = None) -> str:
+    """Render a context's (axis, member) pairs, e.g. 'Gender=Male; Employees and workers=Permanent workers'."""
+    labels = labels or {}
+    return "; ".join(
+        f"{clean_label(labels.get(axis, axis))}={clean_label(labels.get(member, member))}"
+        for axis, member in dimensions
+    )
+
+
+# -------------------------------------------------------------------
+# Templates
+# -------------------------------------------------------------------
+
+@dataclass
+class Axis:
+    """One dimension of a table."""
+    name: str
+    members: List[str] = field(default_factory=list)  # Domain and members, depth-first in taxonomy order
+    default: Optional[str] = None
+    typed: bool = False  # Rows come from typed members in the filing
+    positions: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if not self.positions:
+            self.positions = {member: i for i, member in enumerate(self.members)}
+
+
+@dataclass
+class TableTemplate:
+    """Shape of one BRSR disclosure table (one hypercube of the definition linkbase)."""
+    role: str
+    code: str  # Role sort code, e.g. '1704'
+    title: str
+    principle: str  # Section or principle the table is presented under
+    hypercube: str
+    axes: List[Axis]
+    line_items: List[str]
+
+    @property
+    def axis_names(self) -> Tuple[str, ...]:
+        return tuple(axis.name for axis in self.axes)
+
+
+@dataclass
+class TableSet:
+    """Compiled templates of one taxonomy release plus the line item -> table index."""
+    templates: Dict[str, TableTemplate] = field(default_factory=dict)  # By role, in role code order
+    by_line_item: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def concepts(self) -> List[str]:
+        """Line items of every table (for concept filters)."""
+        return list(self.by_line_item)
+
+    def reconstruct(self, facts: FactTable) -> List["DisclosureTable"]:
+        """Slot a filing's facts into the templates; returns the non-empty tables in role order."""
+        cells: Dict[str, Dict[RowKey, Dict[str, Optional[str]]]] = {}
+        names = facts.local_names.symbols
+        contexts = facts.contexts.symbols
+        for name_id, context_id, value in zip(facts.local_name_ids, facts.context_ids, facts.values):
+            roles = self.by_line_item.get(names[name_id])
+            if not roles or context_id < 0:
+                continue
+            context = contexts[context_id]
+            dims = dict(facts.dimensions.get(context, ()))
+            for role in roles:
+                key = _row_key(self.templates[role], dims, facts.periods.get(context))
+                if key is not None:
+                    cells.setdefault(role, {}).setdefault(key, {})[names[name_id]] = value
+        return [DisclosureTable(self.templates[role], cells[role]) for role in self.templates if role in cells]
+
+
+def _row_key(template: TableTemplate, dims: Dict[str, str], period: Optional[str]) -> Optional[RowKey]:
+    if len(dims) > len(template.axes):
+        return None
+    key: List[Optional[str]] = [period]
+    matched = 0
+    for axis in template.axes:
+        member = dims.get(axis.name)
+        if member is None:
+            member = axis.default
+            if member is None:
+                return None
+        else:
+            matched += 1
+            if not axis.typed and member not in axis.positions:
+                return None
+        key.append(member)
+    return tuple(key) if matched == len(dims) else None
+
+
+@dataclass
+class DisclosureTable:
+    """A table template filled with one filing's values."""
+    template: TableTemplate
+    cells: Dict[RowKey, Dict[str, Optional[str]]]
+
+    @property
+    def title(self) -> str:
+        return self.template.title
+
+    @property
+    def principle(self) -> str:
+        return self.template.principle
+
+    def row_keys(self) -> List[RowKey]:
+        """Rows ordered by period (latest first), then by member order on each axis."""
+        axes = self.template.axes
+        typed_order = {key: i for i, key in enumerate(self.cells)}  # Typed rows keep filing order
+
+        def member_order(key: RowKey) -> Tuple[int, ...]:
+            return tuple(
+                typed_order[key] if axis.typed else axis.positions.get(member or "", -1)
+                for axis, member in zip(axes, key[1:])
+            )
+
+        keys = sorted(self.cells, key=member_order)
+        return sorted(keys, key=lambda key: key[0] or "", reverse=True)
+
+    def columns(self) -> List[str]:
+        """Line items that have at least one value, in template order."""
+        present = {name for row in self.cells.values() for name in row}
+        return [name for name in self.template.line_items if name in present]
+
+    def rows(self, labels: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """Rows as dicts keyed by (cleaned) axis and line item labels."""
+        labels = labels or {}
+        label = lambda name: clean_label(labels.get(name, name))  # noqa: E731
+        columns = self.columns()
+        out = []
+        for key in self.row_keys():
+            row: Dict[str, Any] = {"period": key[0]}
+            for axis, member in zip(self.template.axes, key[1:]):
+                row[label(axis.name)] = member if axis.typed else label(member or "")
+            values = self.cells[key]
+            for name in columns:
+                row[label(name)] = values.get(name)
+            out.append(row)
+        return out
+
+    def to_dict(self, labels: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        return {
+            "principle": self.principle,
+            "title": self.title,
+            "role": self.template.role,
+            "rows": self.rows(labels),
+        }
+
+    def to_frame(self, labels: Optional[Dict[str, str]] = None) -> Any:
+        import pandas as pd
+
+        return pd.DataFrame(self.rows(labels))
+
+
+# -------------------------------------------------------------------
+# Compilation
+# -------------------------------------------------------------------
+
+def _locators(link: Any) -> Dict[str, str]:
+    """Locator labels -> concept local names."""
+    return {
+        loc.get(f"{XLINK}label"): loc.get(f"{XLINK}href", "").split("#")[-1].replace("in-capmkt_", "")
+        for loc in link.iter(f"{LINK}loc")
+    }
+
+
+def _role_titles(linkbase_roots: Sequence[Any], linkbase_paths: Sequence[Path]) -> Dict[str, Tuple[str, str]]:
+    """Role URI -> (code, title) from the role schemas the linkbases reference."""
+    from lxml import etree
+
+    schemas = set()
+    for root, path in zip(linkbase_roots, linkbase_paths):
+        for ref in root.iter(f"{LINK}roleRef"):
+            href = ref.get(f"{XLINK}href", "").split("#")[0]
+            if href:
+                schemas.add((path.parent / href).resolve())
+    titles: Dict[str, Tuple[str, str]] = {}
+    for schema in sorted(schemas):
+        if not schema.exists():
+            continue
+        for role_type in etree.parse(str(schema)).getroot().iter(f"{LINK}roleType"):
+            definition = role_type.findtext(f"{LINK}definition") or ""
+            match = _ROLE_CODE_RE.match(definition)
+            code = match.group(1) if match else ""
+            titles[role_type.get("roleURI", "")] = (code, definition[match.end():] if match else definition)
+    return titles
+
+
+def _typed_axes(schema_path: Optional[Path]) -> set:
+    if schema_path is None or not schema_path.exists():
+        return set()
+    return set(_TYPED_AXIS_RE.findall(schema_path.read_text(encoding="utf-8-sig")))
+
+
+def _depth_first(root: str, children: Dict[str, List[Tuple[float, str]]]) -> List[str]:
+    order: List[str] = []
+    stack = [root]
+    seen = set()
+    while stack:
+        node = stack.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        order.append(node)
+        stack.extend(name for _, name in sorted(children.get(node, ()), reverse=True))
+    return order
+
+
+def compile_tables(
+    definition_paths: Sequence[Path],
+    presentation_paths: Sequence[Path] = (),
+    schema_path: Optional[Path] = None,
+    concrete: Optional[Container[str]] = None,
+) -> TableSet:
+    """Compile definition linkbases (plus presentation linkbases for grouping) into table templates.
+
+    ``concrete`` limits line items to reportable concepts; ``schema_path`` is
+    read for typed dimensions.
+    """
+    from lxml import etree
+
+    def_roots = [etree.parse(str(path)).getroot() for path in definition_paths]
+    pre_roots = [etree.parse(str(path)).getroot() for path in presentation_paths]
+    titles = _role_titles(def_roots + pre_roots, list(definition_paths) + list(presentation_paths))
+    typed = _typed_axes(schema_path)
+
+    # Presentation role each concept appears under (its section / principle)
+    presented_in: Dict[str, str] = {}
+    for root in pre_roots:
+        for link in root.iter(f"{LINK}presentationLink"):
+            principle = titles.get(link.get(f"{XLINK}role", ""), ("", ""))[1]
+            for name in _locators(link).values():
+                presented_in.setdefault(name, principle)
+
+    templates: List[TableTemplate] = []
+    for root in def_roots:
+        for link in root.iter(f"{LINK}definitionLink"):
+            role = link.get(f"{XLINK}role", "")
+            locs = _locators(link)
+            arcs: Dict[str, Dict[str, List[Tuple[float, str]]]] = {}
+            for arc in link.iter(f"{LINK}definitionArc"):
+                kind = arc.get(f"{XLINK}arcrole", "").replace(_ARCROLE, "")
+                source, target = locs.get(arc.get(f"{XLINK}from")), locs.get(arc.get(f"{XLINK}to"))
+                if source and target:
+                    arcs.setdefault(kind, {}).setdefault(source, []).append((float(arc.get("order", "0")), target))
+            members = arcs.get("domain-member", {})
+            defaults = {axis: targets[0][1] for axis, targets in arcs.get("dimension-default", {}).items()}
+            code, title = titles.get(role, ("", role.rsplit("/", 1)[-1]))
+            for primary, cubes in arcs.get("all", {}).items():
+                line_items = [
+                    name for name in _depth_first(primary, members)[1:]
+                    if concrete is None or name in concrete
+                ]
+                for _, hypercube in sorted(cubes):
+                    axes = []
+                    for _, axis_name in sorted(arcs.get("hypercube-dimension", {}).get(hypercube, ())):
+                        domains = sorted(arcs.get("dimension-domain", {}).get(axis_name, ()))
+                        axis_members = [m for _, domain in domains for m in _depth_first(domain, members)]
+                        axes.append(Axis(axis_name, axis_members, defaults.get(axis_name), axis_name in typed))
+                    templates.append(TableTemplate(
+                        role=role, code=code, title=title,
+                        principle=presented_in.get(hypercube) or presented_in.get(primary, ""),
+                        hypercube=hypercube, axes=axes, line_items=line_items,
+                    ))
+
+    templates.sort(key=lambda t: (t.code, t.role))
+    table_set = TableSet()
+    index: Dict[str, List[str]] = {}
+    for template in templates:
+        table_set.templates.setdefault(template.role, template)
+        for name in template.line_items:
+            roles = index.setdefault(name, [])
+            if template.role not in roles:
+                roles.append(template.role)
+    table_set.by_line_item = {name: tuple(roles) for name, roles in index.items()}
+    return table_set
+
+
+# -------------------------------------------------------------------
+# Command line
+# -------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from brsr_xbrl_extractor import BRSRExtractor, ParserConfig, setup_logging
+
+    parser = argparse.ArgumentParser(description="Print the BRSR disclosure tables of a filing")
+    parser.add_argument("filing", help="XBRL instance file")
+    parser.add_argument("--principle", default=None, help="only tables under this section/principle")
+    parser.add_argument("--format", choices=("text", "json"), default="text")
+    args = parser.parse_args(argv)
+    setup_logging("WARNING")
+
+    extractor = BRSRExtractor(ParserConfig())
+    content = Path(args.filing).read_bytes()
+    taxonomy = extractor.mapper.taxonomy_for(content)
+    labels = taxonomy.labels if taxonomy is not None else {}
+    tables = [
+        t for t in extractor.extract_tables(content, source_name=args.filing)
+        if args.principle is None or t.principle.lower() == args.principle.lower()
+    ]
+    if args.format == "json":
+        json.dump([t.to_dict(labels) for t in tables], sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return 0
+    for table in tables:
+        print(f"\n== {table.principle} / {table.title}")
+        print(table.to_frame(labels).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
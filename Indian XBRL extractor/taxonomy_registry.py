@@ -0,0 +1,322 @@
+"""
+Registry of SEBI in-capmkt taxonomy versions.
+
+Taxonomy folders (``Taxonomy_BRSR`` by default) are scanned for core schemas,
+whose ``targetNamespace`` carries the release date, e.g.
+``https://www.sebi.gov.in/xbrl/2023-06-30/in-capmkt``. Each release is compiled
+on first use into a ``CompiledTaxonomy`` (concept labels, concept data types,
+calculation networks, disclosure table templates and the version's mapping
+overrides), pickled under the
+cache directory and held in a small LRU, so a mixed-vintage corpus is
+processed in one run without re-reading linkbases per filing.
+
+Filings are dispatched by the namespace declared on their root element
+(``detect_namespace``). A namespace without a bundled release resolves to the
+closest older release (or the oldest one, if it predates them all).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import pickle
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from calculations import CalculationNetwork, compile_calculations
+from tables import TableSet, compile_tables
+
+if TYPE_CHECKING:
+    from instrumentation import ExtractorMetrics
+
+logger = logging.getLogger("brsr_parser")
+
+TAXONOMY_CACHE_VERSION = 3
+
+SEBI_NAMESPACE_RE = re.compile(r"^https?://www\.sebi\.gov\.in/xbrl/(\d{4}-\d{2}-\d{2})/in-capmkt$")
+_XMLNS_RE = re.compile(rb"""xmlns(?::[\w.-]+)?\s*=\s*["']([^"']+)["']""")
+_TARGET_NS_RE = re.compile(rb"""targetNamespace\s*=\s*["']([^"']+)["']""")
+_LOC_HREF_RE = re.compile(rb"""<link:loc\b[^>]*?xlink:href\s*=\s*["']([^"'#]+)#""")
+_ELEMENT_RE = re.compile(r"<xsd:element\b([^>]*)>")
+_ATTR_RE = re.compile(r'(\w+(?::\w+)?)="([^"]*)"')
+
+XLINK = "{http://www.w3.org/1999/xlink}"
+LINK_NS = {"link": "http://www.xbrl.org/2003/linkbase"}
+
+# XBRL item types -> the data types understood by MetricMapper.normalize_value
+_ITEM_TYPES = {
+    "monetaryItemType": "float",
+    "decimalItemType": "float",
+    "floatItemType": "float",
+    "doubleItemType": "float",
+    "percentItemType": "float",
+    "pureItemType": "float",
+    "sharesItemType": "float",
+    "integerItemType": "integer",
+    "nonNegativeIntegerItemType": "integer",
+    "positiveIntegerItemType": "integer",
+    "booleanItemType": "boolean",
+}
+
+
+def is_sebi_namespace(namespace: str) -> bool:
+    """Return True for any SEBI XBRL namespace (core, types, entry points)."""
+    return "sebi.gov.in/xbrl" in namespace
+
+
+def taxonomy_version(namespace: Optional[str]) -> Optional[str]:
+    """Return the release date of a SEBI core namespace, e.g. '2023-06-30'."""
+    match = SEBI_NAMESPACE_RE.match(namespace or "")
+    return match.group(1) if match else None
+
+
+def detect_namespace(content: bytes, head_bytes: int = 16384) -> Optional[str]:
+    """Return the SEBI core namespace declared at the top of an instance document."""
+    for match in _XMLNS_RE.finditer(content[:head_bytes]):
+        namespace = match.group(1).decode("utf-8", "replace")
+        if SEBI_NAMESPACE_RE.match(namespace):
+            return namespace
+    return None
+
+
+@dataclass
+class CompiledTaxonomy:
+    """Everything the mapper needs from one taxonomy release."""
+    version: str
+    namespace: str
+    labels: Dict[str, str] = field(default_factory=dict)
+    types: Dict[str, str] = field(default_factory=dict)
+    overrides: Dict[str, Any] = field(default_factory=dict)
+    calculations: Dict[str, CalculationNetwork] = field(default_factory=dict)  # By link role
+    tables: TableSet = field(default_factory=TableSet)
+    source_fingerprint: Tuple[Any, ...] = ()
+    cache_version: int = TAXONOMY_CACHE_VERSION
+
+    def data_type(self, local_name: str) -> str:
+        return self.types.get(local_name, "string")
+
+
+@dataclass(frozen=True)
+class _TaxonomySource:
+    version: str
+    namespace: str
+    schema_path: Path
+    label_paths: Tuple[Path, ...]
+    calculation_paths: Tuple[Path, ...] = ()
+    definition_paths: Tuple[Path, ...] = ()
+    presentation_paths: Tuple[Path, ...] = ()
+
+    def fingerprint(self) -> Tuple[Any, ...]:
+        parts: List[Any] = []
+        for path in (self.schema_path, *self.label_paths, *self.calculation_paths,
+                     *self.definition_paths, *self.presentation_paths):
+            stat = path.stat()
+            parts.append((str(path), stat.st_mtime_ns, stat.st_size))
+        return tuple(parts)
+
+
+# -------------------------------------------------------------------
+# Compilation
+# -------------------------------------------------------------------
+
+def _compile_labels(label_paths: Sequence[Path]) -> Dict[str, str]:
+    """Map concept local names to their labels from label linkbases."""
+    from lxml import etree
+
+    labels: Dict[str, str] = {}
+    for lab_path in label_paths:
+        root = etree.parse(str(lab_path)).getroot()
+        label_map = {}
+        for node in root.findall(".//link:label", LINK_NS):
+            label_id = node.get(f"{XLINK}label")
+            if label_id and node.text:
+                label_map[label_id] = node.text.strip()
+        arc_map = {}
+        for arc in root.findall(".//link:labelArc", LINK_NS):
+            frm, to = arc.get(f"{XLINK}from"), arc.get(f"{XLINK}to")
+            if frm and to:
+                arc_map[frm] = to
+        for loc in root.findall(".//link:loc", LINK_NS):
+            href = loc.get(f"{XLINK}href")
+            if not href or "#" not in href:
+                continue
+            # e.g. "in-capmkt.xsd#in-capmkt_ScripCode" -> "ScripCode"
+            local_name = href.split("#")[1].replace("in-capmkt_", "")
+            label_id = arc_map.get(loc.get(f"{XLINK}label"))
+            if label_id in label_map:
+                labels[local_name] = label_map[label_id]
+    return labels
+
+
+def _compile_types(schema_path: Path) -> Dict[str, str]:
+    """Map concept local names to mapper data types from the core schema."""
+    types: Dict[str, str] = {}
+    text = schema_path.read_text(encoding="utf-8-sig")
+    for match in _ELEMENT_RE.finditer(text):
+        attrs = dict(_ATTR_RE.findall(match.group(1)))
+        name, item_type = attrs.get("name"), attrs.get("type", "")
+        if name and attrs.get("abstract") != "true":
+            types[name] = _ITEM_TYPES.get(item_type.rsplit(":", 1)[-1], "string")
+    return types
+
+
+def _linked_schema(linkbase_path: Path) -> Optional[Path]:
+    """Return the schema a linkbase's locators point into (from its first locator)."""
+    head = b""
+    with open(linkbase_path, "rb") as f:
+        # The first locator follows the roleRefs, which can run to tens of KB
+        for chunk in iter(lambda: f.read(65536), b""):
+            head = head[-512:] + chunk
+            match = _LOC_HREF_RE.search(head)
+            if match:
+                return (linkbase_path.parent / match.group(1).decode("utf-8")).resolve()
+    return None
+
+
+def _discover(roots: Sequence[str]) -> Dict[str, _TaxonomySource]:
+    """Find core schemas (and their label, calculation, definition and presentation
+    linkbases) under the taxonomy roots."""
+    sources: Dict[str, _TaxonomySource] = {}
+    for root in roots:
+        root_path = Path(root)
+        if not root_path.is_dir():
+            logger.warning("Taxonomy folder not found: %s", root_path)
+            continue
+        for schema_path in sorted(root_path.rglob("*.xsd")):
+            with open(schema_path, "rb") as f:
+                match = _TARGET_NS_RE.search(f.read(4096))
+            namespace = match.group(1).decode("utf-8") if match else ""
+            version = taxonomy_version(namespace)
+            if version is None or version in sources:
+                continue
+            label_paths = tuple(sorted(schema_path.parent.glob("*-lab*.xml")))
+            linked = {
+                kind: tuple(
+                    path for path in sorted(root_path.rglob(f"*-{kind}*.xml"))
+                    if _linked_schema(path) == schema_path.resolve()
+                )
+                for kind in ("cal", "def", "pre")
+            }
+            sources[version] = _TaxonomySource(
+                version, namespace, schema_path, label_paths,
+                linked["cal"], linked["def"], linked["pre"],
+            )
+    return sources
+
+
+# -------------------------------------------------------------------
+# Registry
+# -------------------------------------------------------------------
+
+class TaxonomyRegistry:
+    """Compiled taxonomy releases by version, held in an LRU of ``capacity`` entries."""
+
+    def __init__(
+        self,
+        roots: Sequence[str] = ("Taxonomy_BRSR",),
+        cache_dir: Optional[str] = ".cache",
+        capacity: int = 4,
+        overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+        metrics: Optional["ExtractorMetrics"] = None,
+    ) -> None:
+        self.roots = tuple(roots)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.capacity = max(1, capacity)
+        self.overrides = overrides or {}
+        self.metrics = metrics
+        self.sources = _discover(self.roots)
+        self.compiles = 0
+        self._lru: "OrderedDict[str, CompiledTaxonomy]" = OrderedDict()
+        self._lock = threading.Lock()
+        logger.info("Found taxonomy versions: %s", ", ".join(self.versions) or "none")
+
+    @property
+    def versions(self) -> List[str]:
+        return sorted(self.sources)
+
+    def resolve_version(self, namespace_or_version: Optional[str]) -> Optional[str]:
+        """Return the bundled version to use for a namespace (or version string)."""
+        versions = self.versions
+        if not versions:
+            return None
+        wanted = taxonomy_version(namespace_or_version) or namespace_or_version
+        if wanted in self.sources:
+            return wanted
+        if not wanted or not re.match(r"^\d{4}-\d{2}-\d{2}$", wanted):
+            return versions[-1]
+        older = [v for v in versions if v <= wanted]
+        return older[-1] if older else versions[0]
+
+    def get(self, namespace_or_version: Optional[str]) -> Optional[CompiledTaxonomy]:
+        """Return the compiled taxonomy for a filing namespace, compiling it if needed."""
+        version = self.resolve_version(namespace_or_version)
+        if version is None:
+            return None
+        with self._lock:
+            taxonomy = self._lru.get(version)
+            if taxonomy is not None:
+                self._lru.move_to_end(version)
+                self._count("hit")
+                return taxonomy
+            self._count("miss")
+            taxonomy = self._load(self.sources[version])
+            self._lru[version] = taxonomy
+            while len(self._lru) > self.capacity:
+                self._lru.popitem(last=False)
+            return taxonomy
+
+    def _count(self, result: str) -> None:
+        if self.metrics is not None:
+            self.metrics.inc("brsr_cache_requests_total", cache="taxonomy", result=result)
+
+    def _cache_path(self, version: str) -> Optional[Path]:
+        return self.cache_dir / f"taxonomy_{version}.pkl" if self.cache_dir else None
+
+    def _load(self, source: _TaxonomySource) -> CompiledTaxonomy:
+        fingerprint = source.fingerprint()
+        cache_path = self._cache_path(source.version)
+        taxonomy: Optional[CompiledTaxonomy] = None
+        if cache_path is not None and cache_path.exists():
+            try:
+                with open(cache_path, "rb") as f:
+                    candidate = pickle.load(f)
+                if (isinstance(candidate, CompiledTaxonomy)
+                        and candidate.cache_version == TAXONOMY_CACHE_VERSION
+                        and candidate.source_fingerprint == fingerprint):
+                    taxonomy = candidate
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Ignoring unreadable taxonomy cache %s: %s", cache_path, exc)
+
+        if taxonomy is None:
+            types = _compile_types(source.schema_path)
+            taxonomy = CompiledTaxonomy(
+                version=source.version,
+                namespace=source.namespace,
+                labels=_compile_labels(source.label_paths),
+                types=types,
+                calculations=compile_calculations(source.calculation_paths),
+                tables=compile_tables(source.definition_paths, source.presentation_paths,
+                                      source.schema_path, concrete=types),
+                source_fingerprint=fingerprint,
+            )
+            self.compiles += 1
+            logger.info("Compiled taxonomy %s: %d labels, %d concepts, %d calculation networks, %d tables",
+                        source.version, len(taxonomy.labels), len(taxonomy.types),
+                        len(taxonomy.calculations), len(taxonomy.tables))
+            if cache_path is not None:
+                try:
+                    cache_path.parent.mkdir(parents=True, exist_ok=True)
+                    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+                    with open(tmp_path, "wb") as f:
+                        pickle.dump(taxonomy, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    os.replace(tmp_path, cache_path)
+                except OSError as exc:
+                    logger.warning("Could not write taxonomy cache %s: %s", cache_path, exc)
+
+        # Overrides come from the mapping JSON and are not part of the cached compile
+        taxonomy.overrides = dict(self.overrides.get(source.version, {}))
+        return taxonomy
@@ -2,6 +2,10 @@
 Integration tests for BRSRExtractor.
 """
 
+import subprocess
+import sys
+from pathlib import Path
+
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from brsr_xbrl_extractor import (
@@ -188,5 +192,59 @@ class TestBRSRExtractor:
             extractor.lxml_parser.extract_facts(invalid_xbrl)
 
 
+
+def url_record(url):
+    """Build one record whose timestamp field carries the source URL."""
+    return ESGRecord("TEST001", "Test Co", 2024, "ghg_scope1_total", 1.0, "tCO2e", 95, "xbrl", url)
+
+
+class TestRecordStreaming:
+    """Test suite for the streaming record API."""
+
+    def test_iter_records_is_lazy_and_ordered(self, extractor):
+        """Test filings are processed only a bounded distance ahead of the consumer."""
+        calls = []
+
+        def process_url(url):
+            calls.append(url)
+            if url == "u3":
+                raise RuntimeError("boom")
+            return [url_record(url), url_record(url)]
+
+        extractor.process_url = process_url
+        urls = (f"u{i}" for i in range(100))
+        records = extractor.iter_records(urls, lookahead=2, transform=False)
+        assert next(records).extraction_timestamp == "u0"
+        assert len(calls) <= 4
+        rest = [r.extraction_timestamp for r in records]
+        assert rest[:6] == ["u0", "u1", "u1", "u2", "u2", "u4"]  # u3 failed and is skipped
+        assert len(rest) == 197
+        assert len(calls) == 100
+
+    def test_batches(self, extractor):
+        """Test batches have a fixed size except the last."""
+        extractor.process_url = lambda url: [url_record(url)] * 3
+        batches = list(extractor.iter_record_batches(["a", "b", "c"], batch_size=4, transform=False))
+        assert [len(b) for b in batches] == [4, 4, 1]
+
+    def test_transform_applies_record_stages(self, extractor):
+        """Test transformed streams carry canonical units."""
+        extractor.process_url = lambda url: [url_record(url)]
+        record = next(extractor.iter_records(["a"]))
+        assert record.canonical_unit == "tCO2e" and record.canonical_value == 1.0
+
+
+class TestDeferredImports:
+    """Test suite for import-time cost."""
+
+    def test_import_loads_no_heavy_dependencies(self):
+        """Importing the module in a fresh interpreter pulls in none of the heavy dependencies."""
+        heavy = ("numpy", "pandas", "requests", "lxml", "pyarrow", "arelle", "yfinance")
+        code = f"import sys, brsr_xbrl_extractor; print(','.join(m for m in {heavy!r} if m in sys.modules))"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                cwd=Path(__file__).resolve().parents[1])
+        assert result.stdout.strip() == ""
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,125 @@
+"""
+Unit tests for calculation-linkbase consistency checks.
+"""
+
+import pytest
+
+from brsr_xbrl_extractor import BRSRExtractor, DataQualityScorer, ParserConfig
+from calculations import check_calculations, compile_calculations
+from facts import FactTable
+from taxonomy_registry import TaxonomyRegistry
+
+ROLE = "https://www.sebi.gov.in/xbrl/BRSR/role/in-capmkt-roles/Principle6"
+
+CALCULATIONS = """<?xml version="1.0" encoding="UTF-8"?>
+<link:linkbase xmlns:link="http://www.xbrl.org/2003/linkbase" xmlns:xlink="http://www.w3.org/1999/xlink">
+  <link:calculationLink xlink:type="extended" xlink:role="{role}">
+    <link:loc xlink:type="locator" xlink:href="../core/in-capmkt.xsd#in-capmkt_Total" xlink:label="Total" />
+    <link:loc xlink:type="locator" xlink:href="../core/in-capmkt.xsd#in-capmkt_PartA" xlink:label="PartA" />
+    <link:loc xlink:type="locator" xlink:href="../core/in-capmkt.xsd#in-capmkt_PartB" xlink:label="PartB" />
+    <link:loc xlink:type="locator" xlink:href="../core/in-capmkt.xsd#in-capmkt_Net" xlink:label="Net" />
+    <link:loc xlink:type="locator" xlink:href="../core/in-capmkt.xsd#in-capmkt_Returns" xlink:label="Returns" />
+    <link:calculationArc xlink:type="arc" xlink:arcrole="http://www.xbrl.org/2003/arcrole/summation-item" xlink:from="Total" xlink:to="PartA" weight="1" />
+    <link:calculationArc xlink:type="arc" xlink:arcrole="http://www.xbrl.org/2003/arcrole/summation-item" xlink:from="Total" xlink:to="PartB" weight="1" />
+    <link:calculationArc xlink:type="arc" xlink:arcrole="http://www.xbrl.org/2003/arcrole/summation-item" xlink:from="Net" xlink:to="Total" weight="1" />
+    <link:calculationArc xlink:type="arc" xlink:arcrole="http://www.xbrl.org/2003/arcrole/summation-item" xlink:from="Net" xlink:to="Returns" weight="-1" />
+  </link:calculationLink>
+</link:linkbase>
+"""
+
+SCHEMA = """<?xml version="1.0" encoding="UTF-8"?>
+<xsd:schema targetNamespace="https://www.sebi.gov.in/xbrl/2023-06-30/in-capmkt"
+    xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:xbrli="http://www.xbrl.org/2003/instance">
+  <xsd:element name="Total" id="in-capmkt_Total" type="xbrli:decimalItemType" abstract="false" />
+</xsd:schema>
+"""
+
+
+@pytest.fixture
+def linkbase(tmp_path):
+    """Write a calculation linkbase next to a core schema."""
+    (tmp_path / "core").mkdir()
+    (tmp_path / "core" / "in-capmkt.xsd").write_text(SCHEMA, encoding="utf-8")
+    (tmp_path / "BRSR").mkdir()
+    path = tmp_path / "BRSR" / "in-capmkt-cal-2023-06-30.xml"
+    path.write_text(CALCULATIONS.format(role=ROLE), encoding="utf-8")
+    return path
+
+
+def facts(*rows):
+    """Build a fact table from (local_name, value, context_id) rows."""
+    table = FactTable()
+    for name, value, context in rows:
+        table.append("in-capmkt", name, value, "GJ", context)
+    return table
+
+
+class TestCalculationChecks:
+    """Test suite for compiled calculation networks."""
+
+    def test_compile_to_csr(self, linkbase):
+        """Test arcs compile into one CSR row per total."""
+        network = compile_calculations([linkbase])[ROLE]
+        assert [network.concepts[c] for c in network.totals] == ["Total", "Net"]
+        assert network.indptr.tolist() == [0, 2, 4]
+        assert network.weights.tolist() == [1.0, 1.0, 1.0, -1.0]
+
+    def test_consistent_and_inconsistent_totals(self, linkbase):
+        """Test only totals off by more than the tolerance are reported, per context."""
+        networks = compile_calculations([linkbase])
+        table = facts(
+            ("Total", "100", "FY24"), ("PartA", "60", "FY24"), ("PartB", "40", "FY24"),
+            ("Total", "100", "FY23"), ("PartA", "60", "FY23"), ("PartB", "10", "FY23"),
+            ("Net", "95", "FY24"), ("Returns", "5", "FY24"),
+        )
+        found = check_calculations(table, networks, tolerance=0.01)
+        assert [(i.concept, i.context_id, i.reported, i.computed) for i in found] == [
+            ("Total", "FY23", 100.0, 70.0)
+        ]
+
+    def test_missing_items_and_rounding(self, linkbase):
+        """Test totals without items are skipped and small rounding differences pass."""
+        networks = compile_calculations([linkbase])
+        table = facts(
+            ("Total", "100", "FY24"),
+            ("Net", "1,000.4", "FY23"), ("Total", "1000", "FY23"),
+            ("PartA", "n/a", "FY22"), ("Total", "5", "FY22"),
+        )
+        assert check_calculations(table, networks, tolerance=0.01) == []
+
+    def test_registry_compiles_bundled_linkbase(self, tmp_path):
+        """Test the bundled 2023 release carries its calculation networks."""
+        taxonomy = TaxonomyRegistry(cache_dir=str(tmp_path)).get(None)
+        assert len(taxonomy.calculations) == 2
+        energy = next(n for r, n in taxonomy.calculations.items() if r.endswith("Principle6"))
+        assert "TotalEnergyConsumption" in energy.concepts
+
+    def test_extractor_penalizes_inconsistent_total(self, tmp_path):
+        """Test an inconsistent total is logged, counted and scored lower."""
+        config = ParserConfig(enable_arelle=False, cache_dir=str(tmp_path))
+        extractor = BRSRExtractor(config)
+        ns = "https://www.sebi.gov.in/xbrl/2023-06-30/in-capmkt"
+        content = f"""<?xml version="1.0" encoding="UTF-8"?>
+<xbrl xmlns="http://www.xbrl.org/2003/instance" xmlns:xbrli="http://www.xbrl.org/2003/instance"
+      xmlns:in-capmkt="{ns}">
+    <xbrli:context id="c1">
+        <xbrli:entity><xbrli:identifier scheme="CIN">L12345MH2000PLC123456</xbrli:identifier></xbrli:entity>
+        <xbrli:period><xbrli:endDate>2024-03-31</xbrli:endDate></xbrli:period>
+    </xbrli:context>
+    <in-capmkt:TotalEnergyConsumption contextRef="c1" unitRef="GJ">500</in-capmkt:TotalEnergyConsumption>
+    <in-capmkt:TotalElectricityConsumption contextRef="c1" unitRef="GJ">100</in-capmkt:TotalElectricityConsumption>
+    <in-capmkt:TotalFuelConsumption contextRef="c1" unitRef="GJ">100</in-capmkt:TotalFuelConsumption>
+</xbrl>""".encode()
+        records = extractor._process_content(content, "test.xml")
+        assert extractor.metrics.counter_value("brsr_calculation_inconsistencies_total") == 1
+        checked = {r.indicator_name: r.data_quality_score for r in records}
+
+        config.calculation_checks = False
+        records = BRSRExtractor(config)._process_content(content, "test.xml")
+        unchecked = {r.indicator_name: r.data_quality_score for r in records}
+        assert checked["energy_total"] == unchecked["energy_total"] - DataQualityScorer.CALCULATION_PENALTY
+        assert checked["Total fuel consumption"] == unchecked["Total fuel consumption"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
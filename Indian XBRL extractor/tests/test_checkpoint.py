@@ -0,0 +1,102 @@
+"""
+Unit tests for resumable run checkpoints.
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from brsr_xbrl_extractor import BRSRExtractor, ESGRecord, ParserConfig
+from checkpoint import MANIFEST, RunCheckpoint
+
+
+def record(indicator="ghg_scope1_total", value=1.0):
+    return ESGRecord("L46591MH1999PLC118476", "A", 2024, indicator, value, "tCO2e", 90, "xbrl", "")
+
+
+class TestRunCheckpoint:
+    """Test suite for RunCheckpoint."""
+
+    def test_commit_and_resume(self, tmp_path):
+        """Test outcomes and records survive a reopen and failures are retried."""
+        with RunCheckpoint(str(tmp_path / "ck")) as checkpoint:
+            checkpoint.commit("a", [record(), record("water_total", 2.5)])
+            checkpoint.commit("b", [])
+            checkpoint.fail("c", "timeout")
+        with RunCheckpoint(str(tmp_path / "ck"), resume=True) as checkpoint:
+            assert checkpoint.completed() == {"a"}
+            assert checkpoint.outcomes() == {"ok": 1, "empty": 1, "error": 1}
+            checkpoint.commit("c", [record("energy_total", 3)])
+            records = list(checkpoint.iter_records())
+        assert [r["indicator_name"] for r in records] == ["ghg_scope1_total", "water_total", "energy_total"]
+        assert records[1]["indicator_value"] == 2.5
+        assert len(list(tmp_path.joinpath("ck").glob("shard-*.ndjson"))) == 2
+
+    def test_processed_keys(self, tmp_path):
+        """Header keys of committed filings survive a reopen; empty filings don't count."""
+        with RunCheckpoint(str(tmp_path / "ck")) as checkpoint:
+            checkpoint.commit("a", [record()], key="L46591MH1999PLC118476:2024-03-31")
+            checkpoint.commit("b", [], key="L18209GJ1985PLC157787:2024-03-31")
+            checkpoint.commit("c", [record()])
+        with RunCheckpoint(str(tmp_path / "ck"), resume=True) as checkpoint:
+            assert checkpoint.processed_keys() == {"L46591MH1999PLC118476:2024-03-31"}
+
+    def test_fresh_run_discards_checkpoint(self, tmp_path):
+        """Test resume=False starts from an empty checkpoint."""
+        with RunCheckpoint(str(tmp_path)) as checkpoint:
+            checkpoint.commit("a", [record()])
+        with RunCheckpoint(str(tmp_path), resume=False) as checkpoint:
+            assert len(checkpoint) == 0
+            assert list(checkpoint.iter_records()) == []
+
+    def test_fresh_run_keeps_other_files(self, tmp_path):
+        """Test a reset removes only checkpoint files and refuses unrelated directories."""
+        (tmp_path / "brsr_esg_metrics.csv").write_text("keep")
+        with pytest.raises(ValueError):
+            RunCheckpoint(str(tmp_path), resume=False)
+        assert (tmp_path / "brsr_esg_metrics.csv").read_text() == "keep"
+
+        checkpoint_dir = tmp_path / "ck"
+        with RunCheckpoint(str(checkpoint_dir)) as checkpoint:
+            checkpoint.commit("a", [record()])
+        (checkpoint_dir / "notes.txt").write_text("keep")
+        with RunCheckpoint(str(checkpoint_dir), resume=False) as checkpoint:
+            assert len(checkpoint) == 0
+        assert sorted(p.name for p in checkpoint_dir.iterdir()) == ["manifest.ndjson", "notes.txt"]
+
+    def test_crash_leftovers_are_ignored(self, tmp_path):
+        """Test a torn manifest line and unreferenced shard bytes do not leak into results."""
+        with RunCheckpoint(str(tmp_path)) as checkpoint:
+            checkpoint.commit("a", [record()])
+        with open(tmp_path / "shard-00001.ndjson", "ab") as f:
+            f.write(b'{"indicator_name": "orphan"}\n')
+        with open(tmp_path / MANIFEST, "ab") as f:
+            f.write(b'{"source": "b", "outco')
+        with RunCheckpoint(str(tmp_path)) as checkpoint:
+            assert checkpoint.completed() == {"a"}
+            checkpoint.commit("b", [record("water_total")])
+        with RunCheckpoint(str(tmp_path)) as checkpoint:
+            assert checkpoint.completed() == {"a", "b"}
+            assert [r["indicator_name"] for r in checkpoint.iter_records()] == ["ghg_scope1_total", "water_total"]
+
+
+class TestResumableProcessUrls:
+    """Test suite for checkpointed BRSRExtractor.process_urls."""
+
+    def test_resume_skips_checkpointed_filings(self, tmp_path):
+        """Test a resumed run re-processes only filings that did not finish."""
+        config = ParserConfig(enable_arelle=False, cache_dir=str(tmp_path / "cache"),
+                              checkpoint_dir=str(tmp_path / "ck"))
+        extractor = BRSRExtractor(config)
+        extractor.process_url = MagicMock(side_effect=[[record()], RuntimeError("network down")])
+        first = extractor.process_urls(["u1", "u2"])
+        assert len(first) == 1
+
+        extractor.process_url = MagicMock(return_value=[record("water_total")])
+        df = extractor.process_urls(["u1", "u2"], resume=True)
+        extractor.process_url.assert_called_once_with("u2")
+        assert sorted(df["indicator_name"]) == ["ghg_scope1_total", "water_total"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,194 @@
+"""
+Unit tests for the CLIMADA physical climate-risk overlay.
+"""
+
+import importlib.util
+
+import numpy as np
+import pytest
+
+import brsr_xbrl_extractor
+from brsr_xbrl_extractor import BRSRExtractor, ParserConfig
+from climate_risk import (
+    V_THRESH,
+    CentroidIndex,
+    HazardFile,
+    HazardStats,
+    PhysicalRiskOverlay,
+    emanuel_mdr,
+    hazard_stats,
+    load_v_half,
+)
+from states import STATES, state_in_text
+
+H5PY_AVAILABLE = importlib.util.find_spec("h5py") is not None
+
+# Intensity (m/s) of three events at four centroids
+DENSE = np.array([
+    [0.0, 30.0, 60.0, 0.0],
+    [20.0, 0.0, 80.0, 45.0],
+    [0.0, 0.0, 26.0, 0.0],
+])
+FREQUENCY = np.array([0.5, 0.1, 0.25])
+# Mumbai, Chennai, Kolkata, and a point far outside the coverage
+CENTROID_LAT = np.array([19.08, 13.08, 22.57, -40.0])
+CENTROID_LON = np.array([72.88, 80.27, 88.36, 10.0])
+
+
+def csr(dense):
+    rows, cols = np.nonzero(dense)
+    indptr = np.r_[0, np.cumsum(np.bincount(rows, minlength=dense.shape[0]))]
+    return indptr, cols, dense[rows, cols]
+
+
+@pytest.fixture
+def impf_csv(tmp_path):
+    path = tmp_path / "impf.csv"
+    path.write_text("cal_region2,v_half,RMSF\nNA1,59.6,9.8\nNI,60.0,4.1\n")
+    return str(path)
+
+
+@pytest.fixture
+def seeded_overlay(tmp_path, impf_csv):
+    """Overlay whose statistics cache is already built for a (placeholder) hazard file."""
+    hazard = tmp_path / "hazard.hdf5"
+    hazard.write_bytes(b"placeholder")
+    cache = tmp_path / "cache"
+    overlay = PhysicalRiskOverlay(str(hazard), impf_csv, cache_dir=str(cache))
+    expected, peak, exceedance = hazard_stats(*csr(DENSE), FREQUENCY, DENSE.shape[1], V_THRESH, 60.0)
+    HazardStats(CENTROID_LAT, CENTROID_LON, expected, peak, exceedance).save(
+        str(cache / "climate_risk_hazard.npz"), overlay._fingerprint())
+    return overlay
+
+
+class TestDamageFunction:
+    """Test suite for the impact function and its calibration."""
+
+    def test_emanuel_curve(self):
+        mdr = emanuel_mdr([0.0, V_THRESH, 60.0, 500.0], V_THRESH, 60.0)
+        assert mdr[0] == mdr[1] == 0.0
+        assert mdr[2] == pytest.approx(0.5)
+        assert 0.99 < mdr[3] < 1.0
+
+    def test_load_v_half(self, impf_csv):
+        assert load_v_half(impf_csv, "NI") == 60.0
+        with pytest.raises(ValueError):
+            load_v_half(impf_csv, "XX")
+
+
+class TestHazardStats:
+    """Test suite for the streaming per-centroid statistics."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 100])
+    def test_matches_dense_computation(self, chunk_size):
+        """Chunked CSR reduction equals the dense event x centroid computation."""
+        expected, peak, exceedance = hazard_stats(
+            *csr(DENSE), FREQUENCY, DENSE.shape[1], V_THRESH, 60.0, chunk_size=chunk_size)
+        np.testing.assert_allclose(expected, FREQUENCY @ emanuel_mdr(DENSE, V_THRESH, 60.0))
+        np.testing.assert_allclose(peak, DENSE.max(axis=0))
+        np.testing.assert_allclose(exceedance, FREQUENCY @ (DENSE > V_THRESH))
+
+    def test_cache_round_trip(self, tmp_path):
+        stats = HazardStats(CENTROID_LAT, CENTROID_LON, np.ones(4), np.ones(4), np.ones(4))
+        path = str(tmp_path / "stats.npz")
+        stats.save(path, {"v_half": 60.0})
+        loaded = HazardStats.load(path, {"v_half": 60.0})
+        np.testing.assert_array_equal(loaded.lat, CENTROID_LAT)
+        assert HazardStats.load(path, {"v_half": 61.0}) is None
+
+    @pytest.mark.skipif(not H5PY_AVAILABLE, reason="h5py not installed")
+    def test_reads_climada_hdf5(self, tmp_path):
+        import h5py
+
+        path = str(tmp_path / "tc.hdf5")
+        indptr, indices, data = csr(DENSE)
+        with h5py.File(path, "w") as hf:
+            hf["frequency"] = FREQUENCY
+            group = hf.create_group("intensity")
+            group["indptr"], group["indices"], group["data"] = indptr, indices, data
+            hf.create_group("centroids")
+            hf["centroids/lat"], hf["centroids/lon"] = CENTROID_LAT, CENTROID_LON
+        stats = HazardFile(path).stats(V_THRESH, 60.0)
+        np.testing.assert_allclose(stats.max_intensity, DENSE.max(axis=0))
+        np.testing.assert_array_equal(stats.lon, CENTROID_LON)
+
+
+class TestLocations:
+    """Test suite for locating companies and snapping to centroids."""
+
+    def test_nearest_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        lat, lon = rng.uniform(8, 30, 2000), rng.uniform(68, 90, 2000)
+        qlat, qlon = rng.uniform(8, 30, 300), rng.uniform(68, 90, 300)
+        index = CentroidIndex(lat, lon, max_km=60.0)
+        found, km = index.nearest(qlat, qlon)
+        for i in range(qlat.size):
+            x = np.radians(lon - qlon[i]) * np.cos(np.radians((lat + qlat[i]) / 2))
+            d = 6371.0 * np.hypot(x, np.radians(lat - qlat[i]))
+            if d.min() <= 60.0:
+                assert found[i] == d.argmin() and km[i] == pytest.approx(d.min())
+            else:
+                assert found[i] == -1
+
+    def test_state_in_text(self):
+        assert state_in_text("Andheri East, Mumbai, Maharashtra 400069").code == "MH"
+        assert state_in_text("12 Park Street, Kolkata").code == "WB"
+        assert state_in_text("Plot 4, TAMIL NADU").code == "TN"
+        assert state_in_text("Registered office: unknown") is None
+        assert STATES["TS"] is STATES["TG"]
+
+    def test_assess_prefers_address_over_cin(self, seeded_overlay):
+        """An address names Tamil Nadu while the CIN says Maharashtra: the address wins."""
+        by_address = seeded_overlay.assess("L11111MH2000PLC111111", ["Guindy, Chennai, Tamil Nadu"])
+        assert by_address.location_source == "address"
+        assert by_address.max_wind_speed == DENSE[:, 1].max()
+        by_cin = seeded_overlay.assess("L11111MH2000PLC111111")
+        assert by_cin.location_source == "cin"
+        assert by_cin.max_wind_speed == DENSE[:, 0].max()
+        assert seeded_overlay.assess("UNKNOWN") is None
+
+    def test_site_coordinates_are_weighted(self, tmp_path, impf_csv, seeded_overlay):
+        sites = tmp_path / "sites.csv"
+        sites.write_text("company_id,lat,lon,weight\nX1,19.1,72.9,3\nX1,22.6,88.3,1\nX1,-10,-10,5\n")
+        overlay = PhysicalRiskOverlay(seeded_overlay.hazard_path, impf_csv, cache_dir=seeded_overlay.cache_dir,
+                                      locations_path=str(sites))
+        result = overlay.assess("x1")
+        stats = overlay.stats
+        assert result.location_source == "coordinates" and result.locations == 2
+        assert result.expected_damage_ratio == pytest.approx(
+            0.75 * stats.expected_damage_ratio[0] + 0.25 * stats.expected_damage_ratio[2])
+
+
+class TestExtractionOverlay:
+    """Test suite for physical risk records during extraction."""
+
+    def test_process_content_adds_indicators(self, tmp_path, impf_csv, seeded_overlay, monkeypatch):
+        """The registered office address locates the company; the statistics come from the cache."""
+        monkeypatch.setattr(brsr_xbrl_extractor, "H5PY_AVAILABLE", True)
+        config = ParserConfig(cache_dir=seeded_overlay.cache_dir, output_dir=str(tmp_path / "out"),
+                              enable_public_data_fallback=False, physical_risk=True,
+                              hazard_path=seeded_overlay.hazard_path, impact_function_path=impf_csv)
+        extractor = BRSRExtractor(config)
+        content = b"""<?xml version="1.0" encoding="UTF-8"?>
+<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance"
+      xmlns:in-capmkt="https://www.sebi.gov.in/xbrl/2023-06-30/in-capmkt">
+    <xbrli:context id="c1">
+        <xbrli:entity><xbrli:identifier scheme="CIN">L11111MH2000PLC111111</xbrli:identifier></xbrli:entity>
+        <xbrli:period><xbrli:startDate>2023-04-01</xbrli:startDate><xbrli:endDate>2024-03-31</xbrli:endDate></xbrli:period>
+    </xbrli:context>
+    <in-capmkt:AddressOfRegisteredOfficeOfCompany contextRef="c1">Salt Lake, Kolkata, West Bengal</in-capmkt:AddressOfRegisteredOfficeOfCompany>
+    <in-capmkt:TotalEnergyConsumption contextRef="c1">1000</in-capmkt:TotalEnergyConsumption>
+</xbrli:xbrl>"""
+        records = extractor.process_content(content, source_name="a.xml")
+        risk = {r.indicator_name: r for r in records if r.data_source.startswith("climada")}
+        assert set(risk) == {"tc_expected_annual_damage_ratio", "tc_max_wind_speed", "tc_damaging_event_frequency"}
+        assert risk["tc_max_wind_speed"].indicator_value == DENSE[:, 2].max()
+        assert risk["tc_max_wind_speed"].data_source == "climada (address)"
+        assert extractor.metrics.counter_value("brsr_physical_risk_assessments_total", outcome="address") == 1
+
+    def test_disabled_by_default(self, tmp_path):
+        assert BRSRExtractor(ParserConfig(cache_dir=str(tmp_path))).physical_risk is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,137 @@
+"""
+Unit tests for CompanyRegistry.
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+import company_registry
+from company_registry import CompanyRegistry, load_company_registry, parse_filing_id
+
+
+CSV_TEXT = """COMPANY,FROM YEAR,YEAR,ATTACHMENT,XBRL,ORIGINAL SUBMISSION DATE,Company ID,CIN
+Alpha Limited,2024,2025,https://nsearchives.nseindia.com/corporate/ALPHA_17062025191638_SE_BRSR.pdf,https://nsearchives.nseindia.com/corporate/xbrl/BRSR_1467735_17062025071711_WEB.xml,17-Jun-25,BRSR_1467735_17062025071711,L46591MH1999PLC118476
+Alpha Limited,2024,2025,https://nsearchives.nseindia.com/corporate/ALPHA_17062025191638_SE_BRSR.pdf,https://nsearchives.nseindia.com/corporate/xbrl/BRSR_1467735_17062025071711_WEB.xml,17-Jun-25,BRSR_1467735_17062025071711,L46591MH1999PLC118476
+Beta Limited,2023,2024,https://nsearchives.nseindia.com/corporate/someuser_21082024101010_BRSR.pdf,https://nsearchives.nseindia.com/corporate/xbrl/BRSR_1200001_21082024101010_WEB.xml,########,BRSR_1200001_21082024101010,
+"""
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    """Write a small company database to a temporary CSV."""
+    path = tmp_path / "companies.csv"
+    path.write_text(CSV_TEXT, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def registry(csv_path):
+    """Build a registry directly from the temporary CSV."""
+    return CompanyRegistry.from_csv(csv_path)
+
+
+class TestCompanyRegistry:
+    """Test suite for CompanyRegistry."""
+
+    def test_parse_filing_id(self):
+        """Test parsing of BRSR filing ID components from a URL."""
+        filing_id, number, timestamp = parse_filing_id(
+            "https://x/corporate/xbrl/BRSR_1467735_17062025071711_WEB.xml"
+        )
+        assert filing_id == "BRSR_1467735_17062025071711"
+        assert number == "1467735"
+        assert timestamp == datetime(2025, 6, 17, 7, 17, 11)
+        assert parse_filing_id("no id here") is None
+
+    def test_duplicates_removed(self, registry):
+        """Test that repeated filing rows are de-duplicated."""
+        assert len(registry) == 2
+
+    def test_lookup_url(self, registry):
+        """Test exact XBRL URL lookup."""
+        entry = registry.lookup_url(
+            "https://nsearchives.nseindia.com/corporate/xbrl/BRSR_1467735_17062025071711_WEB.xml"
+        )
+        assert entry.company_name == "Alpha Limited"
+
+    def test_lookup_source_with_suffix(self, registry):
+        """Test lookup of a file name carrying extra tags around the filing ID."""
+        entry = registry.lookup_source("uploads/BRSR_1200001_21082024101010_WEB_copy.xml")
+        assert entry.company_name == "Beta Limited"
+
+    def test_lookup_filing_number(self, registry):
+        """Test lookup by the numeric filing component."""
+        assert registry.lookup_filing_number("1467735").company_name == "Alpha Limited"
+
+    def test_lookup_cin_and_symbol(self, registry):
+        """Test CIN and NSE symbol indexes."""
+        assert registry.lookup_cin("l46591mh1999plc118476")[0].company_name == "Alpha Limited"
+        assert registry.lookup_symbol("ALPHA")[0].filing_number == "1467735"
+        # Lower-case attachment prefixes are user names, not symbols
+        assert registry.lookup_url(
+            "https://nsearchives.nseindia.com/corporate/xbrl/BRSR_1200001_21082024101010_WEB.xml"
+        ).symbol is None
+
+    def test_record_cin(self, registry):
+        """Test that CINs reported by parsed filings fill the CIN index."""
+        assert registry.lookup_cin("U12345KA2010PTC054321") == []
+        assert registry.record_cin("BRSR_1200001_21082024101010_WEB.xml", "not-a-cin") is None
+        entry = registry.record_cin("BRSR_1200001_21082024101010_WEB.xml", "u12345ka2010ptc054321")
+        assert entry.cin == "U12345KA2010PTC054321"
+        assert registry.lookup_cin("U12345KA2010PTC054321")[0].company_name == "Beta Limited"
+        assert registry.lookup_filing_number("1200001").cin == "U12345KA2010PTC054321"
+        # A CIN from the CSV is not overwritten, and repeats do not duplicate the index
+        assert registry.record_cin("BRSR_1467735_17062025071711", "U12345KA2010PTC054321").cin == "L46591MH1999PLC118476"
+        registry.record_cin("BRSR_1200001_21082024101010", "U12345KA2010PTC054321")
+        assert len(registry.lookup_cin("U12345KA2010PTC054321")) == 1
+        assert registry.record_cin("BRSR_9_01012024000000", "U12345KA2010PTC054321") is None
+
+    def test_process_content_records_cin(self, csv_path, tmp_path):
+        """Test that extraction indexes the listed filing under its entity identifier."""
+        from brsr_xbrl_extractor import BRSRExtractor, ParserConfig
+
+        extractor = BRSRExtractor(ParserConfig(
+            cache_dir=str(tmp_path / "cache"), company_db_path=str(csv_path),
+            enable_public_data_fallback=False, enable_arelle=False))
+        content = b"""<?xml version="1.0" encoding="UTF-8"?>
+<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance"
+      xmlns:in-capmkt="https://www.sebi.gov.in/xbrl/2023-06-30/in-capmkt">
+    <xbrli:context id="c1">
+        <xbrli:entity><xbrli:identifier scheme="CIN">U12345KA2010PTC054321</xbrli:identifier></xbrli:entity>
+        <xbrli:period><xbrli:startDate>2023-04-01</xbrli:startDate><xbrli:endDate>2024-03-31</xbrli:endDate></xbrli:period>
+    </xbrli:context>
+    <in-capmkt:TotalEnergyConsumption contextRef="c1">1000</in-capmkt:TotalEnergyConsumption>
+</xbrli:xbrl>"""
+        extractor.process_content(content, source_name="BRSR_1200001_21082024101010_WEB.xml")
+        assert extractor.company_registry.lookup_cin("U12345KA2010PTC054321")[0].company_name == "Beta Limited"
+
+    def test_scheduling_metadata(self, registry):
+        """Test year and submission-date metadata."""
+        assert registry.years() == [2024, 2025]
+        assert [e.company_name for e in registry.filings_for_year(2024)] == ["Beta Limited"]
+        schedule = list(registry.iter_schedule(newest_first=True))
+        assert schedule[0].submission_date == date(2025, 6, 17)
+        assert schedule[-1].submission_date is None
+
+    def test_disk_cache_reused(self, csv_path, tmp_path, monkeypatch):
+        """Test that a second load in a fresh process reads the pickle instead of the CSV."""
+        cache_dir = tmp_path / "cache"
+        first = load_company_registry(str(csv_path), str(cache_dir))
+        assert any(cache_dir.iterdir())
+
+        monkeypatch.setattr(company_registry, "_PROCESS_CACHE", {})
+        monkeypatch.setattr(CompanyRegistry, "from_csv",
+                            classmethod(lambda cls, path: pytest.fail("CSV re-read")))
+        second = load_company_registry(str(csv_path), str(cache_dir))
+        assert len(second) == len(first)
+
+    def test_missing_csv(self, tmp_path):
+        """Test that a missing CSV yields an empty registry."""
+        registry = load_company_registry(str(tmp_path / "missing.csv"), str(tmp_path))
+        assert len(registry) == 0
+        assert registry.lookup_source("BRSR_1_01012024000000") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,149 @@
+"""
+Unit tests for the streaming exporters.
+"""
+
+import gzip
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from brsr_xbrl_extractor import ESGRecord, export_outputs
+from exporters import export_records, output_path
+
+
+def _records(n=3):
+    """Build a mixed-type set of ESG records."""
+    values = [5000.5, 1000, "Policy text", True]
+    return [
+        ESGRecord(
+            company_id="L12345MH2000PLC123456",
+            company_name="Test Company",
+            reporting_year=2024,
+            indicator_name=f"indicator_{i}",
+            indicator_value=values[i % len(values)],
+            value_unit="tCO2e" if i % 2 == 0 else None,
+            data_quality_score=90,
+            data_source="xbrl",
+            extraction_timestamp="2024-01-01T00:00:00",
+        )
+        for i in range(n)
+    ]
+
+
+class TestExporters:
+    """Test suite for export_records and export_outputs."""
+
+    def test_ndjson_streams_generator(self, tmp_path):
+        """Test that a generator is consumed in batches into NDJSON."""
+        records = (r for r in _records(5))
+        written = export_records(records, tmp_path, formats=("ndjson",), batch_size=2)
+
+        lines = written["ndjson"].read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 5
+        assert json.loads(lines[0])["indicator_value"] == 5000.5
+
+    def test_json_is_compact_array(self, tmp_path):
+        """Test that JSON output is a valid, compact array across batches."""
+        written = export_records(_records(5), tmp_path, formats=("json",), batch_size=2)
+
+        text = written["json"].read_text(encoding="utf-8")
+        assert "\n" not in text
+        assert len(json.loads(text)) == 5
+
+    def test_csv_has_bom_and_single_header(self, tmp_path):
+        """Test that CSV keeps the Excel BOM and writes the header once."""
+        written = export_records(_records(5), tmp_path, formats=("csv",), batch_size=2)
+
+        raw = written["csv"].read_bytes()
+        assert raw.startswith(b"\xef\xbb\xbf")
+        df = pd.read_csv(written["csv"], encoding="utf-8-sig")
+        assert len(df) == 5
+
+    def test_csv_line_endings(self, tmp_path):
+        """Test that CSV rows end with "\\n" like DataFrame.to_csv."""
+        written = export_records(_records(3), tmp_path, formats=("csv",), batch_size=2)
+
+        raw = written["csv"].read_bytes()
+        assert b"\r\n" not in raw
+        assert raw.count(b"\n") == 4
+
+    @pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+    def test_columnar_schema_from_record_fields(self, tmp_path, fmt):
+        """Test columns empty or differently typed in the first batch do not break later batches."""
+        rows = [r.__dict__.copy() for r in _records(4)]
+        rows[0]["value_unit"], rows[1]["value_unit"], rows[3]["value_unit"] = None, None, 1000
+        rows[3]["canonical_value"], rows[3]["dimensions"] = 1.5, "Gender=Male"
+        for i, row in enumerate(rows):
+            row["robust_z"] = None if i < 2 else 0.5  # quality column of a DataFrame export
+            row["peer_percentile"] = None if i < 2 else 42.0  # unknown extra column
+        written = export_records(rows, tmp_path, formats=(fmt,), batch_size=2)
+
+        assert fmt in written
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(written[fmt])
+        else:
+            table = pa.ipc.open_stream(str(written[fmt])).read_all()
+        assert table.num_rows == 4
+        assert table.schema.field("reporting_year").type == pa.int64()
+        assert table.schema.field("canonical_value").type == pa.float64()
+        assert table.column("value_unit").to_pylist() == [None, None, "tCO2e", "1000"]
+        assert table.column("dimensions").to_pylist() == [None, None, None, "Gender=Male"]
+        assert table.column("robust_z").to_pylist() == [None, None, 0.5, 0.5]
+        assert table.column("peer_percentile").to_pylist() == [None, None, "42.0", "42.0"]
+
+    def test_gzip_compression(self, tmp_path):
+        """Test gzip-compressed NDJSON output."""
+        written = export_records(_records(3), tmp_path, formats=("ndjson",), compression="gzip")
+
+        assert written["ndjson"].name.endswith(".ndjson.gz")
+        with gzip.open(written["ndjson"], "rt", encoding="utf-8") as f:
+            assert len(f.readlines()) == 3
+
+    @pytest.mark.parametrize("compression", [None, "zstd", "gzip"])
+    def test_arrow_ipc_stream(self, tmp_path, compression):
+        """Test Arrow IPC output with mixed-type indicator values."""
+        written = export_records(
+            _records(5), tmp_path, formats=("arrow",), compression=compression, batch_size=2
+        )
+
+        if compression == "gzip":
+            assert written["arrow"].name.endswith(".arrow.gz")
+            table = pa.ipc.open_stream(pa.input_stream(str(written["arrow"]), compression="gzip")).read_all()
+        else:
+            # zstd is Arrow buffer compression inside a plain IPC stream
+            assert written["arrow"].name.endswith(".arrow")
+            table = pa.ipc.open_stream(str(written["arrow"])).read_all()
+        assert table.num_rows == 5
+        assert table.schema.field("indicator_value").type == pa.string()
+
+    def test_parquet_mixed_values(self, tmp_path):
+        """Test Parquet output with mixed-type indicator values."""
+        written = export_records(_records(5), tmp_path, formats=("parquet",), batch_size=2)
+
+        assert len(pd.read_parquet(written["parquet"])) == 5
+
+    def test_empty_records_writes_nothing(self, tmp_path):
+        """Test that an empty iterable produces no files."""
+        assert export_records([], tmp_path) == {}
+        assert list(tmp_path.iterdir()) == []
+
+    def test_invalid_format(self, tmp_path):
+        """Test that unknown formats are rejected."""
+        with pytest.raises(ValueError):
+            export_records(_records(), tmp_path, formats=("xlsx",))
+
+    def test_export_outputs_defaults(self, tmp_path):
+        """Test DataFrame export keeps the CSV, Parquet and JSON defaults."""
+        df = pd.DataFrame([r.__dict__ for r in _records(4)])
+        written = export_outputs(df, tmp_path)
+
+        assert set(written) == {"csv", "parquet", "json"}
+        assert written["json"] == output_path(tmp_path, "brsr_esg_metrics", "json")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,172 @@
+"""
+Unit tests for the compact FactTable representation.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from brsr_xbrl_extractor import BRSRExtractor, ParserConfig
+from facts import ConceptFilter, FactTable, as_fact_table
+
+FIXTURE = Path(__file__).parent / "fixtures" / "sample_brsr.xml"
+SEBI_NS = "http://www.sebi.gov.in/xbrl/2023-06-30/in-capmkt"
+
+
+@pytest.fixture
+def table():
+    """Create a small fact table with repeated symbols."""
+    facts = FactTable()
+    facts.append(SEBI_NS, "TotalEmployees", "1000", None, "ctx_2024")
+    facts.append(SEBI_NS, "GreenhouseGasEmissionsScope1", "5000.5", "tCO2e", "ctx_2024")
+    facts.append(SEBI_NS, "TotalEmployees", "900", None, "ctx_2023")
+    return facts
+
+
+class TestFactTable:
+    """Test suite for FactTable."""
+
+    def test_symbols_are_shared(self, table):
+        """Test that namespaces, names and contexts are stored once."""
+        assert len(table) == 3
+        assert table.namespaces.symbols == [SEBI_NS]
+        assert table.local_names.symbols == ["TotalEmployees", "GreenhouseGasEmissionsScope1"]
+        assert list(table.local_name_ids) == [0, 1, 0]
+        assert list(table.unit_ids) == [-1, 0, -1]
+        assert len(table.contexts) == 2
+
+    def test_fact_view_dict_access(self, table):
+        """Test that Fact views behave like the legacy dicts."""
+        fact = table[1]
+        assert fact["local_name"] == "GreenhouseGasEmissionsScope1"
+        assert fact["qname"] == f"{SEBI_NS}:GreenhouseGasEmissionsScope1"
+        assert fact.get("unit") == "tCO2e"
+        assert fact.get("missing", "x") == "x"
+        assert table[-1].context_id == "ctx_2023"
+        with pytest.raises(KeyError):
+            fact["missing"]
+
+    def test_dict_roundtrip(self, table):
+        """Test conversion to and from the legacy dict shape."""
+        dicts = table.to_dicts()
+        assert dicts[0] == {
+            "qname": f"{SEBI_NS}:TotalEmployees",
+            "local_name": "TotalEmployees",
+            "namespace": SEBI_NS,
+            "value": "1000",
+            "unit": None,
+            "context_id": "ctx_2024",
+        }
+        assert FactTable.from_dicts(dicts).to_dicts() == dicts
+        assert as_fact_table(table) is table
+
+    def test_from_partial_dicts(self):
+        """Test that dicts without namespace (e.g. public data facts) convert."""
+        facts = as_fact_table([{"local_name": "totalEsg", "value": 21.5, "source": "static"}])
+        assert facts[0].qname == "totalEsg"
+        assert facts[0].value == "21.5"
+
+
+class TestTransformFactTable:
+    """Test that the extractor consumes FactTable and legacy dicts alike."""
+
+    def test_table_and_dicts_give_same_records(self, table):
+        """Test record equivalence between both input shapes."""
+        extractor = BRSRExtractor(ParserConfig(enable_arelle=False))
+        args = ("L12345MH2000PLC123456", "Test Company", 2024, "xbrl")
+        from_table = extractor._transform_facts_to_records(table, *args)
+        from_dicts = extractor._transform_facts_to_records(table.to_dicts(), *args)
+
+        def key(r):
+            return (r.indicator_name, r.indicator_value, r.value_unit, r.data_quality_score)
+
+        assert from_table
+        assert [key(r) for r in from_table] == [key(r) for r in from_dicts]
+
+
+class TestConceptFilter:
+    """Test suite for ConceptFilter."""
+
+    @pytest.fixture
+    def concepts(self):
+        """Create a filter with a few exact and partial names."""
+        return ConceptFilter(
+            exact=["TotalEmployees", "GreenhouseGasEmissionsScope1"],
+            partial=["GreenhouseGasEmissionsScope1", "WaterWithdrawal"],
+        )
+
+    def test_exact_and_partial_matches(self, concepts):
+        """Test names that the mapper could resolve are accepted."""
+        assert concepts.accepts("TotalEmployees")
+        assert concepts.accepts("TotalWaterWithdrawalFromSurface")  # contains a partial name
+        assert concepts.accepts("Scope1")  # contained in a partial name
+        assert "greenhousegas" in concepts
+
+    def test_unmappable_names_rejected(self, concepts):
+        """Test names no mapping step could resolve are rejected."""
+        assert not concepts.accepts("NameOfTheCompany")
+        assert not concepts.accepts("XyzQpr")
+
+    def test_agrees_with_mapper(self):
+        """Test the filter never rejects a name the mapper maps."""
+        extractor = BRSRExtractor(ParserConfig(enable_arelle=False))
+        mapper = extractor.mapper
+        names = list(mapper.mapping) + list(mapper.alternative_names) + [
+            "TotalScope1Emissions", "NumberOfEmployees", "DateOfStartOfFinancialYear",
+            "WhetherCompanyIsListed", "FooBarBaz",
+        ]
+        for name in names:
+            if mapper.map_local_name(name) is not None:
+                assert mapper.concept_filter.accepts(name), name
+
+    def test_curated_only_prunes_during_parse(self):
+        """Test that curated-only runs skip irrelevant facts at parse time."""
+        content = f"""<?xml version="1.0" encoding="UTF-8"?>
+<xbrl xmlns="http://www.xbrl.org/2003/instance"
+      xmlns:xbrli="http://www.xbrl.org/2003/instance"
+      xmlns:sebi="{SEBI_NS}">
+    <xbrli:context id="ctx_2024">
+        <xbrli:entity><xbrli:identifier scheme="CIN">L12345MH2000PLC123456</xbrli:identifier></xbrli:entity>
+        <xbrli:period><xbrli:endDate>2024-03-31</xbrli:endDate></xbrli:period>
+    </xbrli:context>
+    <sebi:NameOfTheCompany contextRef="ctx_2024">Test Co</sebi:NameOfTheCompany>
+    <sebi:AddressOfRegisteredOffice contextRef="ctx_2024">Mumbai</sebi:AddressOfRegisteredOffice>
+    <sebi:GreenhouseGasEmissionsScope1 contextRef="ctx_2024">5000.5</sebi:GreenhouseGasEmissionsScope1>
+</xbrl>""".encode()
+        extractor = BRSRExtractor(ParserConfig(enable_arelle=False, mapping_sources=("curated",)))
+        _, _, _, facts = extractor.lxml_parser.extract_facts(content, extractor.mapper.concept_filter)
+        assert [f.local_name for f in facts] == ["GreenhouseGasEmissionsScope1"]
+        assert facts.skipped == 2
+
+        records = extractor.process_content(content, source_name="test.xml")
+        assert [r.indicator_name for r in records] == ["ghg_scope1_total"]
+        assert extractor.metrics.counter_value("brsr_facts_pruned_total") == 2
+
+    def test_sample_fixture_pruned_without_taxonomy_labels(self):
+        """Test pruning skips facts of the sample filing without changing its records."""
+        content = FIXTURE.read_bytes()
+        sources = ("curated", "partial")
+        pruned = BRSRExtractor(ParserConfig(enable_arelle=False, mapping_sources=sources,
+                                            enable_public_data_fallback=False))
+        _, _, _, facts = pruned.lxml_parser.extract_facts(content, pruned.mapper.concept_filter)
+        assert facts.skipped > 0
+
+        full = BRSRExtractor(ParserConfig(enable_arelle=False, mapping_sources=sources,
+                                          enable_public_data_fallback=False, prune_unmapped_facts=False))
+        def values(extractor):
+            return [(r.indicator_name, r.indicator_value, r.dimensions)
+                    for r in extractor.process_content(content, source_name="s.xml")]
+
+        assert values(pruned) == values(full)
+
+    def test_taxonomy_labels_keep_every_concept(self):
+        """Test the "taxonomy" source accepts every labelled concept, so pruning keeps them all."""
+        mapper = BRSRExtractor(ParserConfig(enable_arelle=False)).mapper
+        taxonomy = mapper.default_taxonomy
+        if taxonomy is None:
+            pytest.skip("taxonomy not available")
+        assert all(mapper.concept_filter.accepts(name) for name in taxonomy.labels)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,156 @@
+"""
+Unit tests for the filing header pre-scan.
+"""
+
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+
+from brsr_xbrl_extractor import BRSRExtractor, ParserConfig
+from filing_header import FilingHeader, plan_filings, scan_header
+
+FIXTURE = Path(__file__).parent / "fixtures" / "sample_brsr.xml"
+NS_2023 = "https://www.sebi.gov.in/xbrl/2023-06-30/in-capmkt"
+NS_2025 = "https://www.sebi.gov.in/xbrl/2025-05-31/in-capmkt"
+
+
+def big_instance(n_facts=50000):
+    """Build a large instance whose header sits in the first few hundred bytes."""
+    facts = "".join(f'<in-capmkt:Fact{i % 100} contextRef="c1">{i}</in-capmkt:Fact{i % 100}>'
+                    for i in range(n_facts))
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<xbrl xmlns="http://www.xbrl.org/2003/instance" xmlns:xbrli="http://www.xbrl.org/2003/instance"
+      xmlns:in-capmkt="{NS_2023}">
+    <xbrli:context id="c1">
+        <xbrli:entity><xbrli:identifier scheme="CIN">L46591MH1999PLC118476</xbrli:identifier></xbrli:entity>
+        <xbrli:period><xbrli:startDate>2022-04-01</xbrli:startDate><xbrli:endDate>2023-03-31</xbrli:endDate></xbrli:period>
+    </xbrli:context>
+    <xbrli:context id="c2">
+        <xbrli:entity><xbrli:identifier scheme="CIN">L46591MH1999PLC118476</xbrli:identifier></xbrli:entity>
+        <xbrli:period><xbrli:instant>2023-03-31</xbrli:instant></xbrli:period>
+    </xbrli:context>
+    {facts}
+</xbrl>""".encode()
+
+
+def header(source, cin, period_end, namespace=NS_2023):
+    """Build a FilingHeader for planning tests."""
+    from company_registry import parse_filing_id
+    parsed = parse_filing_id(source)
+    return FilingHeader(source, cin, namespace, None, period_end, 0,
+                        filing_timestamp=parsed[2] if parsed else None)
+
+
+class TestScanHeader:
+    """Test suite for scan_header."""
+
+    def test_fixture_header(self):
+        """Test CIN, period and namespace are read from the sample filing."""
+        h = scan_header(FIXTURE.read_bytes(), source="sample_brsr.xml")
+        assert h.cin == "L12345MH2000PLC123456"
+        assert (h.period_start, h.period_end, h.reporting_year) == ("2023-04-01", "2024-03-31", 2024)
+        assert h.namespace == NS_2025 and h.taxonomy_version == "2025-05-31"
+        assert h.key == "L12345MH2000PLC123456:2024-03-31"
+
+    def test_reads_only_leading_bytes(self):
+        """Test a large filing is scanned without reading it all."""
+        content = big_instance()
+        h = scan_header(content, max_contexts=2)
+        assert h.cin == "L46591MH1999PLC118476"
+        assert h.period_end == "2023-03-31"
+        assert h.bytes_scanned <= 8192 < len(content)
+        assert h.content_length is None
+
+    def test_malformed_input(self):
+        """Test garbage or truncated input yields an empty header."""
+        h = scan_header(b"not xml at all")
+        assert h.cin is None and h.key is None
+        assert scan_header(FIXTURE.read_bytes()[:300]).cin is None
+
+
+class TestPlanFilings:
+    """Test suite for plan_filings."""
+
+    def test_skip_dedup_and_grouping(self):
+        """Test processed filings are skipped, revisions deduplicated and queue grouped by taxonomy."""
+        headers = [
+            header("BRSR_2_17062025071711_WEB.xml", "B", "2024-03-31", NS_2025),
+            header("BRSR_1_01062025000000_WEB.xml", "A", "2024-03-31"),
+            header("BRSR_3_20062025000000_WEB.xml", "A", "2024-03-31"),  # revision of filing 1
+            header("BRSR_4_01062025000000_WEB.xml", "C", "2023-03-31"),
+            header("unknown.xml", None, None),
+        ]
+        queue = plan_filings(headers, processed={"C:2023-03-31"})
+        assert [h.source for h in queue] == [
+            "BRSR_3_20062025000000_WEB.xml",
+            "BRSR_2_17062025071711_WEB.xml",
+            "unknown.xml",
+        ]
+
+
+class TestRangeRequests:
+    """Test remote pre-scan through HTTP range requests."""
+
+    @patch('brsr_xbrl_extractor.requests.get')
+    def test_fetch_head_uses_range(self, mock_get):
+        """Test only the requested prefix is read and the full size is reported."""
+        content = big_instance()
+        response = Mock(status_code=206, headers={"Content-Range": f"bytes 0-4095/{len(content)}"})
+        response.iter_content.return_value = iter([content[:4096]])
+        mock_get.return_value = response
+
+        extractor = BRSRExtractor(ParserConfig(enable_arelle=False, header_scan_bytes=4096))
+        url = "https://nsearchives.nseindia.com/corporate/xbrl/BRSR_1_17062025071711_WEB.xml"
+        h = extractor.scan_header(url)
+
+        assert mock_get.call_args.kwargs["headers"]["Range"] == "bytes=0-4095"
+        assert mock_get.call_args.kwargs["stream"] is True
+        assert h.cin == "L46591MH1999PLC118476"
+        assert h.content_length == len(content)
+        response.close.assert_called_once()
+
+    @patch('brsr_xbrl_extractor.requests.get')
+    def test_fetch_head_without_range_support(self, mock_get):
+        """Test a server ignoring Range is read only up to the limit."""
+        content = big_instance()
+        chunks = [content[i:i + 8192] for i in range(0, len(content), 8192)]
+        response = Mock(status_code=200, headers={"Content-Length": str(len(content))})
+        response.iter_content.return_value = iter(chunks)
+        mock_get.return_value = response
+
+        extractor = BRSRExtractor(ParserConfig(enable_arelle=False))
+        head, total = extractor.fetcher.fetch_head(
+            "https://nsearchives.nseindia.com/corporate/xbrl/x.xml", max_bytes=10000)
+        assert len(head) == 10000 and total == len(content)
+
+
+class TestPlannedRuns:
+    """Test suite for ``plan_filings`` in batch runs."""
+
+    def test_planned_batches_skip_stored_and_superseded(self, tmp_path):
+        """Superseded revisions are dropped and a resumed run skips filings already checkpointed."""
+        from brsr_xbrl_extractor import ESGRecord
+
+        base = "https://nsearchives.nseindia.com/corporate/xbrl/"
+        old, revised = base + "BRSR_1_01062025000000_WEB.xml", base + "BRSR_2_20062025000000_WEB.xml"
+        extractor = BRSRExtractor(ParserConfig(
+            enable_arelle=False, cache_dir=str(tmp_path / "cache"), plan_filings=True,
+            checkpoint_dir=str(tmp_path / "checkpoint"), isolation_workers=0))
+        extractor.fetcher.fetch_head = Mock(return_value=(big_instance(10), None))
+        record = ESGRecord("L46591MH1999PLC118476", "A", 2023, "ghg_scope1_total", 1.0, "tCO2e", 90, "xbrl", "")
+        extractor.process_url = Mock(return_value=[record])
+
+        extractor.process_urls([old, revised])
+        assert [c.args[0] for c in extractor.process_url.call_args_list] == [revised]
+
+        # A later re-listing of the same company and period (new URL) is skipped on resume
+        relisted = base + "BRSR_3_25062025000000_WEB.xml"
+        extractor.process_url.reset_mock()
+        df = extractor.process_urls([relisted], resume=True)
+        extractor.process_url.assert_not_called()
+        assert len(df) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,130 @@
+"""
+Unit tests for the slow-filing flight recorder.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import flight_recorder
+from brsr_xbrl_extractor import BRSRExtractor, ParserConfig
+from flight_recorder import FlightRecorder, diff_runs, filing_id_for, load_profiles, worst_offenders
+
+
+FIXTURE = Path(__file__).parent / "fixtures" / "sample_brsr.xml"
+
+
+def _busy(seconds):
+    """Spin the CPU so the sampler has frames to collect."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestFlightRecorder:
+    """Test suite for FlightRecorder."""
+
+    def test_filing_id_for(self):
+        """Test filing ID extraction from URLs and arbitrary names."""
+        assert filing_id_for("https://x/BRSR_1467735_17062025071711_WEB.xml") == "BRSR_1467735_17062025071711"
+        assert filing_id_for("my upload (1).xml") == "my_upload_1_"
+
+    def test_fast_filing_not_saved(self, tmp_path):
+        """Test that filings under both thresholds leave no files."""
+        recorder = FlightRecorder(str(tmp_path), latency_threshold=60, memory_threshold_mb=1024,
+                                  trace_memory=False)
+        with recorder.record("BRSR_1_01012024000000.xml"):
+            pass
+        assert recorder.recorded == []
+        assert not recorder.run_dir.exists()
+
+    def test_slow_filing_saved(self, tmp_path):
+        """Test that a slow filing writes a summary, folded stacks and a snapshot."""
+        recorder = FlightRecorder(str(tmp_path), latency_threshold=0.05, memory_threshold_mb=1024,
+                                  sample_interval=0.001, run_id="run_a")
+        with recorder.record("BRSR_1_01012024000000.xml", url="http://localhost/x.xml"):
+            _busy(0.1)
+
+        summary = json.loads((tmp_path / "run_a" / "BRSR_1_01012024000000.json").read_text())
+        assert summary["reasons"] == ["latency"]
+        assert summary["samples"] > 0
+        assert any("_busy" in f["function"] for f in summary["top_functions"])
+        assert (tmp_path / "run_a" / "BRSR_1_01012024000000.folded").stat().st_size > 0
+        assert (tmp_path / "run_a" / "BRSR_1_01012024000000.tracemalloc").exists()
+
+    def test_memory_threshold(self, tmp_path):
+        """Test that a memory-heavy filing is captured by the memory threshold."""
+        recorder = FlightRecorder(str(tmp_path), latency_threshold=60, memory_threshold_mb=1,
+                                  sample_interval=0.001, run_id="run_m")
+        with recorder.record("big.xml"):
+            blob = [bytes(1024) for _ in range(4096)]
+            _busy(0.02)
+            del blob
+        assert recorder.recorded[0]["reasons"] == ["memory"]
+        assert recorder.recorded[0]["top_allocations"]
+
+    def test_memory_threshold_off_for_overlapping_filings(self, tmp_path):
+        """Test that overlapping filings are not blamed for each other's allocations."""
+        recorder = FlightRecorder(str(tmp_path), latency_threshold=60, memory_threshold_mb=1,
+                                  sample_interval=0.001, run_id="run_o")
+        started, release = threading.Event(), threading.Event()
+
+        def other():
+            with recorder.record("small.xml"):
+                started.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=other)
+        thread.start()
+        started.wait(5)
+        with recorder.record("big.xml"):
+            blob = [bytes(1024) for _ in range(4096)]
+            del blob
+        release.set()
+        thread.join()
+        assert recorder.recorded == []
+
+        recorder.latency_threshold = 0.0
+        with recorder.record("alone.xml"):
+            pass
+        with recorder.record("a.xml"), recorder.record("b.xml"):
+            pass
+        assert [r["memory_attributed"] for r in recorder.recorded] == [True, False, False]
+
+    def test_list_and_diff(self, tmp_path, capsys):
+        """Test ranking and diffing saved profiles across runs."""
+        for run_id, seconds in (("run_a", 0.03), ("run_b", 0.08)):
+            recorder = FlightRecorder(str(tmp_path), latency_threshold=0.0, trace_memory=False,
+                                      run_id=run_id)
+            with recorder.record("BRSR_1_01012024000000.xml"):
+                _busy(seconds)
+
+        ranked = worst_offenders(load_profiles(str(tmp_path)))
+        assert ranked[0]["run_id"] == "run_b"
+        rows = diff_runs(str(tmp_path), "run_a", "run_b")
+        assert rows[0]["elapsed_delta"] > 0
+
+        assert flight_recorder.main(["--dir", str(tmp_path), "list"]) == 0
+        assert "BRSR_1_01012024000000" in capsys.readouterr().out
+
+    def test_extractor_hook(self, tmp_path):
+        """Test that the opt-in hook wraps process_content."""
+        config = ParserConfig(enable_arelle=False, enable_public_data_fallback=False,
+                              profile_slow_filings=True, profile_latency_threshold=0.0,
+                              profile_trace_memory=False, profile_dir=str(tmp_path))
+        extractor = BRSRExtractor(config)
+        records = extractor.process_content(FIXTURE.read_bytes(), source_name="sample_brsr.xml")
+
+        assert records
+        assert extractor.flight_recorder.recorded[0]["filing_id"] == "sample_brsr"
+
+    def test_disabled_by_default(self):
+        """Test that the recorder is off unless enabled."""
+        assert BRSRExtractor(ParserConfig(enable_arelle=False)).flight_recorder is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,99 @@
+"""
+Unit tests for ExtractorMetrics and extractor instrumentation.
+"""
+
+import threading
+from pathlib import Path
+
+import pytest
+
+from brsr_xbrl_extractor import BRSRExtractor, ParserConfig
+from instrumentation import ExtractorMetrics
+
+
+FIXTURE = Path(__file__).parent / "fixtures" / "sample_brsr.xml"
+
+
+@pytest.fixture
+def metrics():
+    """Create an empty metrics registry."""
+    return ExtractorMetrics()
+
+
+class TestExtractorMetrics:
+    """Test suite for ExtractorMetrics."""
+
+    def test_counter_and_histogram_render(self, metrics):
+        """Test Prometheus text rendering of counters and histograms."""
+        metrics.inc("brsr_filings_total", outcome="ok")
+        metrics.inc("brsr_filings_total", outcome="ok")
+        metrics.observe_stage("parse", 0.02, parser="lxml")
+
+        text = metrics.render_prometheus()
+        assert "# TYPE brsr_filings_total counter" in text
+        assert 'brsr_filings_total{outcome="ok"} 2' in text
+        assert 'brsr_stage_seconds_bucket{parser="lxml",stage="parse",le="0.025"} 1' in text
+        assert 'brsr_stage_seconds_bucket{parser="lxml",stage="parse",le="+Inf"} 1' in text
+        assert 'brsr_stage_seconds_count{parser="lxml",stage="parse"} 1' in text
+
+    def test_timer_records_on_exception(self, metrics):
+        """Test that a failing stage is still timed."""
+        with pytest.raises(RuntimeError):
+            with metrics.time("fetch"):
+                raise RuntimeError("boom")
+        assert metrics.summary()["stages"]["fetch"]["count"] == 1
+
+    def test_summary_rates(self, metrics):
+        """Test cache hit and fallback rates in the summary."""
+        for _ in range(4):
+            metrics.inc("brsr_filings_total", outcome="ok")
+        metrics.inc("brsr_fallbacks_total", kind="lxml")
+        metrics.inc("brsr_cache_requests_total", cache="public_esg", result="hit")
+        metrics.inc("brsr_cache_requests_total", cache="public_esg", result="hit")
+        metrics.inc("brsr_cache_requests_total", cache="public_esg", result="miss")
+        metrics.inc("brsr_cache_requests_total", cache="company_registry", result="miss")
+
+        summary = metrics.summary()
+        assert summary["fallback_rates"] == {"lxml": 0.25}
+        assert summary["cache_hit_rates"] == {"public_esg": 0.6667, "company_registry": 0.0}
+
+    def test_summary_while_recording(self, metrics):
+        """Test that summary is safe while workers add new label sets."""
+        def record():
+            for i in range(5000):
+                metrics.inc("brsr_cache_requests_total", cache=f"c{i}", result="hit")
+                metrics.inc("brsr_fallbacks_total", kind=f"k{i}")
+
+        worker = threading.Thread(target=record)
+        worker.start()
+        while worker.is_alive():
+            metrics.summary()
+        worker.join()
+        assert len(metrics.summary()["cache_hit_rates"]) == 5000
+
+
+class TestExtractorInstrumentation:
+    """Test that the extractor records per-stage metrics."""
+
+    def test_process_content_records_stages(self):
+        """Test parse/map/normalize/score timings and counters for one filing."""
+        extractor = BRSRExtractor(ParserConfig(enable_arelle=False,
+                                               enable_public_data_fallback=False))
+        records = extractor.process_content(FIXTURE.read_bytes(), source_name="sample_brsr.xml")
+
+        summary = extractor.metrics.summary()
+        assert {"parse,parser=lxml", "map", "normalize", "score"} <= set(summary["stages"])
+        assert summary["counters"]["brsr_filings_total"] == {"outcome=ok": 1}
+        assert extractor.metrics.counter_value("brsr_records_total") == len(records)
+        assert summary["facts_per_filing_mean"] > 0
+
+    def test_parse_failure_counts(self):
+        """Test that unparseable content is counted as a failed filing."""
+        extractor = BRSRExtractor(ParserConfig(enable_arelle=False,
+                                               enable_public_data_fallback=False))
+        assert extractor.process_content(b"not xml", source_name="bad.xml") == []
+        assert extractor.metrics.counter_value("brsr_filings_total", outcome="failed") == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
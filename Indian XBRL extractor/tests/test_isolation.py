@@ -0,0 +1,78 @@
+"""
+Unit tests for per-filing worker isolation.
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+from brsr_xbrl_extractor import BRSRExtractor, ESGRecord, ParserConfig
+from instrumentation import ExtractorMetrics
+from isolation import CRASHED, MEMORY, TIMEOUT, IsolatedExtractor, Quarantine
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="needs fork and /proc")
+
+
+def fake_process_url(self, url):
+    """Stand-in for BRSRExtractor.process_url whose behaviour depends on the URL."""
+    with self.metrics.time("parse"):
+        if url == "hang":
+            time.sleep(60)
+        elif url == "hog":
+            ballast = bytearray(400 << 20)
+            ballast[::4096] = b"x" * len(ballast[::4096])
+            time.sleep(60)
+        elif url == "crash":
+            os._exit(3)
+        elif url == "boom":
+            raise ValueError("bad filing")
+    self.metrics.inc("brsr_filings_total", outcome="ok")
+    return [ESGRecord("C1", "A", 2024, "water_total", 1.0, "KL", 90, "xbrl", url)]
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    """Create a two-worker pool with a 1.5 s timeout and a 300 MiB cap."""
+    monkeypatch.setattr(BRSRExtractor, "process_url", fake_process_url)
+    config = ParserConfig(enable_arelle=False, cache_dir=str(tmp_path))
+    return IsolatedExtractor(config, workers=2, timeout=1.5, max_rss_mb=300,
+                             quarantine=Quarantine(str(tmp_path / "quarantine.ndjson")),
+                             metrics=ExtractorMetrics(), start_method="fork")
+
+
+class TestIsolatedExtractor:
+    """Test suite for IsolatedExtractor."""
+
+    def test_breaches_are_quarantined_and_workers_replaced(self, pool):
+        """Test hung, bloated and crashing filings are killed while the rest complete."""
+        urls = ["ok1", "hang", "hog", "boom", "crash", "ok2", "ok3"]
+        start = time.monotonic()
+        results = {url: (records, error) for url, records, error in pool.imap(urls)}
+        assert time.monotonic() - start < 20
+        assert set(results) == set(urls)
+        for url in ("ok1", "ok2", "ok3"):
+            assert results[url][0][0].extraction_timestamp == url
+        assert results["boom"] == (None, "ValueError: bad filing")
+        assert results["hang"][1] == f"quarantined: {TIMEOUT}"
+        assert results["hog"][1] == f"quarantined: {MEMORY}"
+        assert results["crash"][1] == f"quarantined: {CRASHED}"
+
+        entry = pool.quarantine.get("hang")
+        assert entry.stage == "parse" and entry.elapsed_s >= 1.5
+        assert pool.quarantine.get("hog").peak_rss_mb > 300
+        assert "boom" not in pool.quarantine
+        assert pool.metrics.counter_value("brsr_filings_total", outcome="ok") == 3
+        assert pool.metrics.counter_value("brsr_filings_quarantined_total") == 3
+
+    def test_quarantined_filings_are_skipped(self, pool, tmp_path):
+        """Test a reloaded quarantine keeps known-bad filings out of later runs."""
+        list(pool.imap(["crash"]))
+        pool.quarantine = Quarantine(str(tmp_path / "quarantine.ndjson"))
+        assert list(pool.imap(["crash", "ok1"]))[0] == ("crash", None, "quarantined")
+        assert len(pool.quarantine) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,87 @@
+"""
+Unit tests for local directory and archive ingestion.
+"""
+
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from brsr_xbrl_extractor import BRSRExtractor, ParserConfig
+from local_filings import iter_local_filings
+
+FIXTURE = Path(__file__).parent / "fixtures" / "sample_brsr.xml"
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """Lay out the sample filing as a plain file, zip members and tar members."""
+    content = FIXTURE.read_bytes()
+    root = tmp_path / "mirror"
+    (root / "2024").mkdir(parents=True)
+    (root / "2024" / "BRSR_1_plain.xml").write_bytes(content)
+    (root / "notes.txt").write_text("not xbrl")
+    with zipfile.ZipFile(root / "bundle.zip", "w") as archive:
+        archive.writestr("BRSR_2_stored.xml", content, compress_type=zipfile.ZIP_STORED)
+        archive.writestr("nested/BRSR_3_deflated.xml", content, compress_type=zipfile.ZIP_DEFLATED)
+        archive.writestr("readme.md", "skip me")
+    for name, mode in (("bundle.tar", "w"), ("bundle.tar.gz", "w:gz")):
+        with tarfile.open(root / name, mode) as archive:
+            info = tarfile.TarInfo(f"BRSR_4_{name.replace('.', '_')}.xml")
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    return root
+
+
+class TestIterLocalFilings:
+    """Test suite for iter_local_filings."""
+
+    def test_walks_directories_and_archives(self, corpus):
+        """Test every XBRL instance is found, in name order, and reads back intact."""
+        filings = list(iter_local_filings(str(corpus)))
+        names = [f.name.replace(str(corpus), "") for f in filings]
+        assert names == [
+            "/bundle.tar!BRSR_4_bundle_tar.xml",
+            "/bundle.tar.gz!BRSR_4_bundle_tar_gz.xml",
+            "/bundle.zip!BRSR_2_stored.xml",
+            "/bundle.zip!nested/BRSR_3_deflated.xml",
+            "/2024/BRSR_1_plain.xml",
+        ]
+        expected = FIXTURE.read_bytes()
+        for filing in filings:
+            with filing.open() as content:
+                assert bytes(content) == expected
+
+    def test_uncompressed_members_are_mapped(self, corpus):
+        """Test plain files and stored members are read through memory maps, not copied."""
+        mapped = {f.name.rsplit("/", 1)[-1]: f for f in iter_local_filings(str(corpus))}
+        with mapped["bundle.tar!BRSR_4_bundle_tar.xml"].open() as content:
+            assert isinstance(content, memoryview)
+        with mapped["bundle.zip!BRSR_2_stored.xml"].open() as content:
+            assert isinstance(content, memoryview)
+        with mapped["BRSR_1_plain.xml"].open() as content:
+            assert not isinstance(content, bytes)
+        assert mapped["bundle.tar.gz!BRSR_4_bundle_tar_gz.xml"].content is not None
+
+
+class TestProcessPath:
+    """Test suite for BRSRExtractor.process_path."""
+
+    def test_parallel_matches_in_process(self, corpus, tmp_path):
+        """Test parallel workers produce one combined result equal to a serial run."""
+        extractor = BRSRExtractor(ParserConfig(enable_arelle=False, cache_dir=str(tmp_path / "cache"),
+                                               enable_public_data_fallback=False))
+        serial = extractor.process_path(str(corpus), workers=0)
+        parallel = extractor.process_path(str(corpus), workers=2)
+        single = extractor.process_content(FIXTURE.read_bytes(), source_name="sample_brsr.xml")
+        assert len(serial) == len(parallel) == 5 * len(single) > 0
+        columns = ["company_id", "indicator_name", "data_quality_score"]
+        key = lambda df: sorted(map(tuple, df[columns].astype(str).values.tolist()))
+        assert key(serial) == key(parallel)
+        assert extractor.metrics.counter_value("brsr_bytes_fetched_total", kind="local") > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,131 @@
+"""
+Unit tests for company x year x indicator panels.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from panel import Panel, PanelCache, data_version
+
+
+def records():
+    """Build long-format records for two companies over three years."""
+    rows = [
+        ("C1", 2022, "ghg_scope1_total", 100.0, 90),
+        ("C1", 2023, "ghg_scope1_total", 110.0, 90),
+        ("C1", 2024, "ghg_scope1_total", 121.0, 90),
+        ("C1", 2023, "turnover", 1000.0, 90),
+        ("C1", 2024, "turnover", 0.0, 90),
+        ("C2", 2022, "ghg_scope1_total", 50.0, 90),
+        ("C2", 2024, "ghg_scope1_total", 40.0, 70),
+        ("C2", 2024, "ghg_scope1_total", 45.0, 95),  # Higher quality duplicate wins
+        ("C2", 2024, "turnover", 500.0, 90),
+        ("C2", 2024, "board_meetings", "n/a", 90),
+    ]
+    return pd.DataFrame(rows, columns=[
+        "company_id", "reporting_year", "indicator_name", "indicator_value", "data_quality_score",
+    ])
+
+
+@pytest.fixture
+def panel():
+    """Build a panel from the sample records."""
+    return Panel.from_frame(records())
+
+
+class TestPanel:
+    """Test suite for Panel."""
+
+    def test_cube_and_mask(self, panel):
+        """Test records pivot into a dense cube with missing cells masked."""
+        assert panel.shape == (2, 3, 2)
+        assert panel.years.tolist() == [2022, 2023, 2024]
+        assert panel.indicators.tolist() == ["ghg_scope1_total", "turnover"]
+        years, values, mask = panel.series("C2", "ghg_scope1_total")
+        assert mask.tolist() == [True, False, True]
+        assert values[mask].tolist() == [50.0, 45.0]
+        companies, values, mask = panel.cross_section(2024, "turnover")
+        assert values[mask].tolist() == [0.0, 500.0]
+        with pytest.raises(KeyError):
+            panel.series("C3", "turnover")
+
+    def test_canonical_values_preferred(self):
+        """Test canonical values are used where present."""
+        df = records()
+        df["canonical_value"] = np.where(df["company_id"] == "C1", df["indicator_value"].where(
+            df["indicator_name"] != "turnover", 1.0), np.nan)
+        values, mask = Panel.from_frame(df).indicator("turnover")
+        assert values[0, 1] == 1.0 and values[1, 2] == 500.0
+
+    def test_yoy(self, panel):
+        """Test absolute and relative year-over-year changes need both years observed."""
+        delta, mask = panel.yoy()
+        assert delta[0, 1:, 0].tolist() == [10.0, 11.0]
+        assert not mask[:, 0].any()
+        assert not mask[1, :, 0].any()  # C2 skips 2023
+        relative, _ = panel.yoy(relative=True)
+        assert relative[0, 2, 0] == pytest.approx(0.1)
+        assert panel.yoy() is panel.yoy()  # Memoized
+
+    def test_cagr(self, panel):
+        """Test CAGR spans each series' first and last observed years."""
+        growth, mask = panel.cagr()
+        assert growth[0, 0] == pytest.approx(0.1)
+        assert growth[1, 0] == pytest.approx((45 / 50) ** 0.5 - 1)
+        assert mask.tolist() == [[True, False], [True, False]]
+
+    def test_empty_panel(self):
+        """Test derived measures on a panel built from no records."""
+        empty = Panel.from_frame(records().iloc[:0])
+        growth, mask = empty.cagr()
+        assert growth.shape == mask.shape == (0, 0)
+        delta, mask = empty.yoy()
+        assert delta.shape == mask.shape == (0, 0, 0)
+
+    def test_intensity(self, panel):
+        """Test intensity ratios mask zero or missing denominators."""
+        ratio, mask = panel.intensity("ghg_scope1_total", "turnover", scale=1000)
+        assert mask.tolist() == [[False, True, False], [False, False, True]]
+        assert ratio[0, 1] == pytest.approx(110.0)
+        assert ratio[1, 2] == pytest.approx(90.0)
+
+    def test_to_frame_round_trip(self, panel):
+        """Test observed cells convert back to long format."""
+        frame = panel.to_frame()
+        assert len(frame) == int(panel.mask.sum()) == 8
+
+
+class TestPanelCache:
+    """Test suite for PanelCache."""
+
+    def test_keyed_by_data_version(self, tmp_path):
+        """Test equal data reuses a panel and changed data builds a new one."""
+        cache = PanelCache(str(tmp_path))
+        df = records()
+        first = cache.get(df)
+        assert cache.get(df.copy()) is first
+        assert cache.builds == 1
+
+        changed = df.copy()
+        changed.loc[0, "indicator_value"] = 99.0
+        assert data_version(changed) != data_version(df)
+        assert cache.get(changed) is not first
+        assert cache.builds == 2
+
+    def test_file_panels_survive_restart(self, tmp_path):
+        """Test an export is pivoted once and reloaded from the pickle."""
+        path = tmp_path / "brsr_esg_metrics.csv"
+        records().to_csv(path, index=False, encoding="utf-8-sig")
+        cache = PanelCache(str(tmp_path / "cache"))
+        panel = cache.load(str(path))
+        assert cache.builds == 1
+
+        reloaded = PanelCache(str(tmp_path / "cache")).load(str(path))
+        assert reloaded.data_version == panel.data_version
+        assert np.array_equal(reloaded.mask, panel.mask)
+        assert reloaded.series("C1", "turnover")[1][1] == 1000.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
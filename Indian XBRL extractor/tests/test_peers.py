@@ -0,0 +1,113 @@
+"""
+Unit tests for CIN decoding and the peer benchmarking index.
+"""
+
+import pandas as pd
+import pytest
+
+from brsr_xbrl_extractor import ESGRecord
+from peers import PeerIndex, decode_cin, size_band
+
+# NIC division 46 (wholesale trade) in MH and KA, division 24 (basic metals) in MH
+WHOLESALE_MH = ["L46591MH1999PLC000001", "L46591MH2001PLC000002", "U46100MH2010PTC000003"]
+WHOLESALE_KA = "L46900KA2005PLC000004"
+METALS_MH = "L24100MH1990PLC000005"
+
+
+@pytest.fixture
+def index():
+    """Build an index with scope 1 emissions for five companies."""
+    peer_index = PeerIndex()
+    peer_index.update([
+        (WHOLESALE_MH[0], 2024, "ghg_scope1_total", 100.0),
+        (WHOLESALE_MH[1], 2024, "ghg_scope1_total", 300.0),
+        (WHOLESALE_MH[2], 2024, "ghg_scope1_total", 200.0),
+        (WHOLESALE_KA, 2024, "ghg_scope1_total", 400.0),
+        (METALS_MH, 2024, "ghg_scope1_total", 1e6),
+        ("NOT-A-CIN", 2024, "ghg_scope1_total", 5.0),
+        (METALS_MH, 2024, "board_meetings", "n/a"),
+    ])
+    return peer_index
+
+
+class TestDecodeCIN:
+    """Test suite for decode_cin."""
+
+    def test_decode(self):
+        """Test every field of a CIN is decoded."""
+        info = decode_cin("l46591mh1999plc118476")
+        assert info.listed is True
+        assert info.nic_code == "46591" and info.nic_division == "46"
+        assert info.state == "MH"
+        assert info.incorporation_year == 1999
+        assert info.ownership == "PLC"
+        assert info.registration_number == "118476"
+
+    @pytest.mark.parametrize("value", [None, "", "TEST001", "X46591MH1999PLC118476", "L46591MH1999PLC11847"])
+    def test_rejects_non_cins(self, value):
+        """Test malformed identifiers are not decoded."""
+        assert decode_cin(value) is None
+
+    def test_size_band(self):
+        """Test employee counts map to size bands."""
+        assert [size_band(v) for v in (10, 250, 10000, None)] == ["small", "medium", "large", "unknown"]
+
+
+class TestPeerIndex:
+    """Test suite for PeerIndex."""
+
+    def test_rank_within_industry_and_state(self, index):
+        """Test percentiles are computed within each peer level."""
+        rank = index.rank(WHOLESALE_MH[1], "ghg_scope1_total")
+        assert rank.group == ("46",)
+        assert rank.peer_count == 4
+        assert rank.percentile == pytest.approx(62.5)  # 3rd of 4
+        state_rank = index.rank(WHOLESALE_MH[1], "ghg_scope1_total", level="industry_state")
+        assert state_rank.peer_count == 3
+        assert state_rank.percentile == pytest.approx(100 * 2.5 / 3)
+        assert index.rank(METALS_MH, "ghg_scope1_total").peer_count == 1
+        assert index.rank(METALS_MH, "board_meetings") is None
+        assert index.rank("NOT-A-CIN", "ghg_scope1_total") is None
+        assert index.peers(WHOLESALE_KA) == sorted(WHOLESALE_MH)
+        with pytest.raises(ValueError):
+            index.rank(WHOLESALE_KA, "ghg_scope1_total", level="planet")
+
+    def test_incremental_update(self, index):
+        """Test new filings re-rank only their groups and older years do not overwrite."""
+        index.update([(WHOLESALE_MH[0], 2025, "ghg_scope1_total", 500.0)])
+        assert index.rank(WHOLESALE_MH[0], "ghg_scope1_total").percentile == pytest.approx(87.5)
+        assert index.rank(WHOLESALE_MH[1], "ghg_scope1_total").percentile == pytest.approx(37.5)
+        assert index.update([(WHOLESALE_MH[0], 2023, "ghg_scope1_total", 1.0)]) == 0
+        assert index.rank(WHOLESALE_MH[0], "ghg_scope1_total").value == 500.0
+
+    def test_size_groups_follow_employees(self, index):
+        """Test a company moves between size-band groups as its headcount changes."""
+        index.update([(WHOLESALE_MH[0], 2024, "employees_total", 100), (WHOLESALE_MH[1], 2024, "employees_total", 120)])
+        rank = index.rank(WHOLESALE_MH[0], "ghg_scope1_total", level="industry_size")
+        assert rank.group == ("46", "small") and rank.peer_count == 2
+        index.update([(WHOLESALE_MH[0], 2025, "employees_total", 9000)])
+        rank = index.rank(WHOLESALE_MH[0], "ghg_scope1_total", level="industry_size")
+        assert rank.group == ("46", "large") and rank.peer_count == 1
+        assert index.rank(WHOLESALE_MH[1], "ghg_scope1_total", level="industry_size").peer_count == 1
+
+    def test_records_frames_and_persistence(self, tmp_path):
+        """Test records and DataFrames feed the index and it survives a reload."""
+        records = [
+            ESGRecord(cin, "X", 2024, "water_total", value, "KL", 90, "xbrl", "", canonical_value=value * 1.0)
+            for cin, value in zip(WHOLESALE_MH, (1, 2, 3))
+        ]
+        index = PeerIndex()
+        assert list(index.apply_records(records, batch_size=2)) == records
+        index.update_frame(pd.DataFrame({
+            "company_id": [WHOLESALE_KA], "reporting_year": [2024], "indicator_name": ["water_total"],
+            "indicator_value": ["4"], "canonical_value": [None],
+        }))
+        path = tmp_path / "peer_index.pkl"
+        index.save(str(path))
+        loaded = PeerIndex.load(str(path))
+        assert loaded.rank(WHOLESALE_KA, "water_total").percentile == pytest.approx(87.5)
+        assert len(PeerIndex.load(str(tmp_path / "missing.pkl"))) == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,139 @@
+"""
+Unit tests for the public ESG data fallback (offline stub provider only).
+"""
+
+import sys
+import types
+
+import pytest
+
+from brsr_xbrl_extractor import BRSRExtractor, ParserConfig, PublicESGDataFetcher
+from public_esg import StaticESGProvider, SustainabilityCache, TickerIndex, YFinanceProvider
+
+
+PAYLOADS = {
+    "IGIINDIA.NS": {"totalEsg": 21.5, "environmentScore": 3.2},
+    "SANGHIIND.NS": {},
+}
+
+
+@pytest.fixture
+def ticker_index():
+    """Create a small in-memory ticker index."""
+    index = TickerIndex()
+    index.add("IGIINDIA", cin="L46591MH1999PLC118476",
+              company_name="International Gemmological Institute (India) Limited")
+    index.add("SANGHIIND", cin="L18209GJ1985PLC157787", isin="INE999A01010")
+    return index
+
+
+@pytest.fixture
+def fetcher(tmp_path, ticker_index):
+    """Create a fetcher backed by the offline stub provider."""
+    config = ParserConfig(cache_dir=str(tmp_path))
+    return PublicESGDataFetcher(
+        config,
+        provider=StaticESGProvider(PAYLOADS),
+        ticker_index=ticker_index,
+        cache=SustainabilityCache(str(tmp_path / "public_esg"), ttl_seconds=3600),
+    )
+
+
+class TestTickerIndex:
+    """Test suite for TickerIndex."""
+
+    def test_resolve_by_cin_isin_and_name(self, ticker_index):
+        """Test symbol lookup by each key."""
+        assert ticker_index.resolve(cin="l46591mh1999plc118476") == "IGIINDIA"
+        assert ticker_index.resolve(isin="INE999A01010") == "SANGHIIND"
+        assert ticker_index.resolve(
+            company_name="INTERNATIONAL GEMMOLOGICAL INSTITUTE (INDIA) LTD."
+        ) == "IGIINDIA"
+        assert ticker_index.resolve(cin="UNKNOWN") is None
+
+    def test_save_and_load_roundtrip(self, ticker_index, tmp_path):
+        """Test that the index persists to CSV."""
+        path = tmp_path / "ticker_index.csv"
+        ticker_index.save(str(path))
+        loaded = TickerIndex.load(str(path))
+        assert loaded.resolve(cin="L18209GJ1985PLC157787") == "SANGHIIND"
+
+
+class TestPublicESGDataFetcher:
+    """Test suite for PublicESGDataFetcher."""
+
+    def test_fetch_uses_index_and_stub(self, fetcher):
+        """Test a single lookup goes through the index and provider."""
+        facts = fetcher.fetch_esg_data("L46591MH1999PLC118476")
+        assert {f["local_name"] for f in facts} == {"totalEsg", "environmentScore"}
+        assert facts[0]["source"] == "static"
+
+    def test_unknown_company_makes_no_provider_call(self, fetcher):
+        """Test that an unresolvable company never reaches the provider."""
+        assert fetcher.fetch_esg_data("UNKNOWN", "Nobody Ltd") == []
+        assert fetcher.provider.calls == []
+
+    def test_batched_lookup_single_provider_call(self, fetcher):
+        """Test that many companies are fetched in one provider call."""
+        results = fetcher.fetch_many([
+            ("L46591MH1999PLC118476", "", None, None),
+            ("L18209GJ1985PLC157787", "", None, None),
+            ("X", "", "IGIINDIA", None),
+        ])
+        assert len(results["L46591MH1999PLC118476"]) == 2
+        assert results["L18209GJ1985PLC157787"] == []
+        assert len(results["X"]) == 2
+        assert fetcher.provider.calls == [["IGIINDIA.NS", "SANGHIIND.NS"]]
+
+    def test_cache_hits_including_empty_payloads(self, fetcher):
+        """Test that repeat lookups (even without data) are served from cache."""
+        fetcher.fetch_many([("L46591MH1999PLC118476", "", None, None),
+                            ("L18209GJ1985PLC157787", "", None, None)])
+        fetcher.fetch_many([("L46591MH1999PLC118476", "", None, None),
+                            ("L18209GJ1985PLC157787", "", None, None)])
+        assert len(fetcher.provider.calls) == 1
+        assert fetcher.cache.hits == 2
+
+    def test_provider_errors_are_not_cached(self, tmp_path, ticker_index, monkeypatch):
+        """A failed lookup (network error, rate limit) is retried next time, not cached as empty."""
+        def failing_ticker(symbol):
+            raise ConnectionError("429 Too Many Requests")
+
+        monkeypatch.setitem(sys.modules, "yfinance", types.SimpleNamespace(Ticker=failing_ticker))
+        fetcher = PublicESGDataFetcher(
+            ParserConfig(cache_dir=str(tmp_path)),
+            provider=YFinanceProvider(),
+            ticker_index=ticker_index,
+            cache=SustainabilityCache(str(tmp_path / "public_esg"), ttl_seconds=3600),
+        )
+        assert fetcher.fetch_esg_data("L46591MH1999PLC118476") == []
+        assert fetcher.cache.get("IGIINDIA.NS") is None
+        assert not list((tmp_path / "public_esg").glob("*.json"))
+
+    def test_cache_persists_and_expires(self, tmp_path):
+        """Test the on-disk cache survives restarts and honours the TTL."""
+        cache_dir = str(tmp_path / "esg")
+        SustainabilityCache(cache_dir).put("ABC.NS", {"totalEsg": 10})
+        assert SustainabilityCache(cache_dir).get("ABC.NS") == {"totalEsg": 10}
+        assert SustainabilityCache(cache_dir, ttl_seconds=-1).get("ABC.NS") is None
+
+
+class TestPublicDataFallback:
+    """Test the extractor fallback path end to end with the stub provider."""
+
+    def test_fallback_uses_registry_identity(self, fetcher):
+        """Test that the fallback resolves the company from the filing registry."""
+        config = ParserConfig(enable_arelle=False)
+        extractor = BRSRExtractor(config)
+        extractor.public_data_fetcher = fetcher
+
+        url = "https://nsearchives.nseindia.com/corporate/xbrl/BRSR_1467735_17062025071711_WEB.xml"
+        records = extractor._fallback_to_public_data(url)
+
+        assert fetcher.provider.calls == [["IGIINDIA.NS"]]
+        assert all(r.company_name.startswith("International Gemmological") for r in records)
+        assert all(r.company_id != "UNKNOWN" for r in records)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,135 @@
+"""
+Unit tests for the corpus-level quality checks.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from brsr_xbrl_extractor import DataQualityScorer, ESGRecord
+from quality import CorpusQualityChecker, IndicatorDistributions, sector_of
+
+
+def corpus(n=200, seed=0):
+    """Build a plausible corpus: Scope 1 emissions around 1e4 tCO2e."""
+    rng = np.random.default_rng(seed)
+    values = 10 ** rng.normal(4.0, 0.3, n)
+    sectors = ["24", "46"]
+    return pd.DataFrame({
+        "company_id": [f"L{sectors[i % 2]}591MH1999PLC{i:06d}" for i in range(n)],
+        "indicator_name": "ghg_scope1_total",
+        "indicator_value": values,
+        "data_quality_score": 100,
+    })
+
+
+@pytest.fixture
+def checker():
+    """Create a checker primed with the corpus."""
+    checker = CorpusQualityChecker()
+    checker.apply(corpus())
+    return checker
+
+
+class TestIndicatorDistributions:
+    """Test suite for IndicatorDistributions."""
+
+    def test_median_and_mad(self):
+        """Test histogram statistics approximate the true median and MAD."""
+        df = corpus(n=2000)
+        logs = np.log10(df["indicator_value"].to_numpy())
+        dist = IndicatorDistributions()
+        dist.update(df["indicator_name"].to_numpy(dtype=object), np.array([""] * len(df), dtype=object), logs)
+        stats = dist.stats(dist.key_ids(["ghg_scope1_total"], [""]))
+        assert stats["n"][0] == 2000
+        assert stats["median"][0] == pytest.approx(np.median(logs), abs=0.03)
+        assert stats["mad"][0] == pytest.approx(np.median(np.abs(logs - np.median(logs))), abs=0.03)
+
+    def test_save_and_load(self, checker, tmp_path):
+        """Test distributions persist for incremental runs."""
+        path = str(tmp_path / "dist.npz")
+        checker.distributions.save(path)
+        loaded = IndicatorDistributions.load(path)
+        assert loaded.keys == checker.distributions.keys
+        assert np.array_equal(loaded.counts, checker.distributions.counts)
+        assert loaded.observations == checker.distributions.observations
+
+
+class TestCorpusQualityChecker:
+    """Test suite for CorpusQualityChecker."""
+
+    def test_flags_and_penalties(self, checker):
+        """Test outliers and unit-scale slips are flagged and penalized."""
+        batch = pd.DataFrame({
+            "company_id": ["L24591MH1999PLC900001", "L24591MH1999PLC900002", "L24591MH1999PLC900003",
+                           "L24591MH1999PLC900004"],
+            "indicator_name": ["ghg_scope1_total"] * 3 + ["new_indicator"],
+            "indicator_value": [12000.0, 12000.0 * 1000, 12000.0 * 30, 5.0],
+            "data_quality_score": [100, 100, 100, 100],
+        })
+        out = checker.apply(batch, update=False)
+        assert out["quality_flags"].tolist() == ["", "unit_scale_1e+3", "outlier", ""]
+        assert out["data_quality_score"].tolist() == [
+            100,
+            100 - DataQualityScorer.MAGNITUDE_PENALTY,
+            100 - DataQualityScorer.OUTLIER_PENALTY,
+            100,
+        ]
+        assert np.isnan(out["robust_z"].iloc[3])  # too few samples to judge
+
+    def test_non_numeric_values_untouched(self, checker):
+        """Test text, booleans and zeros are not checked."""
+        batch = pd.DataFrame({
+            "company_id": ["X"] * 3,
+            "indicator_name": ["ghg_scope1_total"] * 3,
+            "indicator_value": ["Yes", True, 0],
+            "data_quality_score": [80, 90, 90],
+        })
+        out = checker.apply(batch)
+        assert out["quality_flags"].tolist() == ["", "", ""]
+        assert out["data_quality_score"].tolist() == [80, 90, 90]
+
+    def test_fresh_corpus_scored_against_itself(self):
+        """Test a single run on an unseen corpus flags the outliers planted in it."""
+        df = corpus()
+        df.loc[[7, 8], "indicator_value"] = [10 ** 4 * 1e5, 10 ** 4 * 30]
+        out = CorpusQualityChecker().apply(df)
+        assert out["quality_flags"][7] == "unit_scale_1e+5"
+        assert out["quality_flags"][8] == "outlier"
+        # Elsewhere only the natural sector tails are flagged
+        assert set(out["quality_flags"].drop([7, 8])) <= {"", "sector_outlier"}
+
+    def test_incremental_updates(self, checker):
+        """Test new observations are added and re-runs replace earlier ones."""
+        key = checker.distributions.key_ids(["ghg_scope1_total"], [""])
+        before = checker.distributions.stats(key)["n"][0]
+        counts = checker.distributions.counts.copy()
+        checker.apply(corpus())
+        assert np.array_equal(checker.distributions.counts, counts)
+
+        batch = corpus(n=10, seed=1).assign(reporting_year=2025)
+        checker.apply(batch)
+        assert checker.distributions.stats(key)["n"][0] == before + 10
+        sector_key = checker.distributions.key_ids(["ghg_scope1_total"], ["24"])
+        assert checker.distributions.stats(sector_key)["n"][0] == 105
+        # A restated value moves the observation rather than adding one
+        checker.apply(batch.assign(indicator_value=batch["indicator_value"] * 2))
+        assert checker.distributions.stats(key)["n"][0] == before + 10
+
+    def test_apply_records_streams(self, checker):
+        """Test records are re-scored in streaming batches."""
+        records = [
+            ESGRecord("L24591MH1999PLC900001", "A", 2024, "ghg_scope1_total", value, "tCO2e", 100, "xbrl", "")
+            for value in (11000.0, 11000.0 * 1e5)
+        ]
+        scores = [r.data_quality_score for r in checker.apply_records(iter(records), batch_size=1)]
+        assert scores == [100, 100 - DataQualityScorer.MAGNITUDE_PENALTY]
+
+    def test_sector_of(self):
+        """Test the NIC division is read from a CIN."""
+        assert sector_of("L46591MH1999PLC118476") == "46"
+        assert sector_of("UNKNOWN") == ""
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,103 @@
+"""
+Unit tests for the region index and state GDP normalization.
+"""
+
+import importlib.util
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from regions import GSDPTable, RegionGrid, RegionIndex, cin_states, gsdp_from_frame, normalize
+
+H5PY_AVAILABLE = importlib.util.find_spec("h5py") is not None
+
+# The layout of climada/data/GSDP/IND_GSDP.xls: headings mixed in with states
+WORKSHEET = pd.DataFrame({
+    "Category": ["Special Category States (SCS)", "Uttarakhand", "General Category States (GCS)",
+                 "Maharashtra", "Tamil Nadu", "Telangana", "Source: https://data.gov.in/"],
+    "GSDP As on 01.03.2014 (Rs. Crore) - 2011-12": [None, 115328, None, 1199548, 751485, None, None],
+    "GSDP As on 01.03.2014 (Rs. Crore) - 2012-13": [None, 130835, None, 1372644, 854825, 380000, None],
+    "Population (In Crore) - 2012-13": [None, 0.1, None, 11.4, 7.2, 3.5, None],
+})
+
+
+@pytest.fixture
+def gsdp():
+    return GSDPTable.from_frame(gsdp_from_frame(WORKSHEET))
+
+
+class TestRegionGrid:
+    """Test suite for the compiled country raster."""
+
+    def grid(self):
+        # Centres at lat 10.5..13.5 (descending, as NetCDF often stores it) and lon 70.5..72.5
+        lat, lon = np.array([13.5, 12.5, 11.5, 10.5]), np.array([70.5, 71.5, 72.5])
+        values = np.array([
+            [-9999.0, 94, 94],
+            [94, 94, 7],
+            [np.nan, 7, 7],
+            [-9999.0, -9999.0, -9999.0],
+        ])
+        return RegionGrid.from_arrays(values, lat, lon, fill_value=-9999.0, keep=[94])
+
+    def test_crop_and_lookup(self):
+        grid = self.grid()
+        assert grid.ids.dtype == np.uint8 and grid.ids.shape == (2, 3)
+        ids = grid.lookup([13.2, 13.9, 12.1, 11.5, 40.0, np.nan], [71.7, 70.2, 72.9, 71.5, 71.0, 71.0])
+        assert ids.tolist() == [94, 0, 0, 0, 0, 0]
+        assert grid.lookup([12.5], [70.5]).tolist() == [94]
+
+    def test_cache_round_trip(self, tmp_path):
+        grid = self.grid()
+        grid.save(str(tmp_path / "natid.npz"))
+        loaded = RegionGrid.load(str(tmp_path / "natid.npz"))
+        np.testing.assert_array_equal(loaded.ids, grid.ids)
+        assert (loaded.lat0, loaded.lon0, loaded.res) == (grid.lat0, grid.lon0, grid.res)
+
+    @pytest.mark.skipif(not H5PY_AVAILABLE, reason="h5py not installed")
+    def test_bundled_natid_grid(self, tmp_path):
+        index = RegionIndex("../climada/data", str(tmp_path))
+        isos = index.countries_at([19.08, 28.61, 51.5], [72.88, 77.21, -0.12])
+        assert isos.tolist() == ["IND", "IND", ""]
+        assert index.states_at([19.08], [72.88]).tolist() == ["MH"]
+
+
+class TestGSDP:
+    """Test suite for GSDP tables and normalization."""
+
+    def test_worksheet_to_long_table(self):
+        table = gsdp_from_frame(WORKSHEET)
+        assert set(table["region"]) == {"UR", "MH", "TN", "TG"}
+        assert table.loc[(table.region == "MH") & (table.year == 2013), "gsdp_inr_crore"].item() == 1372644
+        assert len(table) == 7
+
+    def test_lookup_is_as_of_reporting_year(self, gsdp):
+        values, used = gsdp.lookup(["MH", "MH", "TG", "TG", "XX", "MH"], [2012, 2024, 2012, 2013, 2013, 2010])
+        np.testing.assert_array_equal(values[:2], [1199548, 1372644])
+        assert np.isnan(values[2]) and values[3] == 380000
+        assert used.tolist() == [2012, 2013, -1, 2013, -1, -1]
+
+    def test_cin_states(self):
+        codes = cin_states(["L11111MH2000PLC111111", "u22222ts2000ptc222222", "BRSR_1_20240101000000"])
+        assert codes.tolist() == ["MH", "TG", None]
+
+    def test_normalize(self, gsdp):
+        """One pass over a corpus; a ``state`` column overrides the CIN state."""
+        records = pd.DataFrame({
+            "company_id": ["L11111MH2000PLC111111", "L22222MH2000PLC222222", "UNKNOWN"],
+            "reporting_year": [2024, 2024, 2024],
+            "indicator_name": ["energy", "energy", "energy"],
+            "indicator_value": ["1372644", "854825", "5"],
+            "canonical_value": [None, None, None],
+            "state": [None, "TN", None],
+        })
+        out = normalize(records, gsdp)
+        assert out["state"].tolist()[:2] == ["MH", "TN"] and pd.isna(out["state"].iloc[2])
+        assert out["value_per_gsdp_crore"].tolist()[:2] == [1.0, 1.0]
+        assert np.isnan(out["value_per_gsdp_crore"].iloc[2])
+        assert out["gsdp_year"].tolist()[:2] == [2013, 2013] and out["gsdp_year"].isna().iloc[2]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
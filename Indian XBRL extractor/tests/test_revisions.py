@@ -0,0 +1,145 @@
+"""
+Unit tests for fact-level revision diffs.
+"""
+
+import pytest
+
+from brsr_xbrl_extractor import BRSRExtractor, ParserConfig, ValidationError
+from facts import FactTable
+from revisions import FactHashStore, diff_digests, digest_facts, normalize_value
+
+
+def instance(facts, context_id="c1", unit_id="u1"):
+    """Build an instance with one plain and one dimensional context; ``facts`` are (name, value, dimensional)."""
+    body = "".join(
+        f'<in-capmkt:{name} contextRef="{context_id + ("_m" if dimensional else "")}" unitRef="{unit_id}">'
+        f"{value}</in-capmkt:{name}>"
+        for name, value, dimensional in facts
+    )
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:xbrldi="http://xbrl.org/2006/xbrldi"
+      xmlns:in-capmkt="https://www.sebi.gov.in/xbrl/2023-06-30/in-capmkt">
+    <xbrli:context id="{context_id}">
+        <xbrli:entity><xbrli:identifier scheme="CIN">L12345MH2000PLC123456</xbrli:identifier></xbrli:entity>
+        <xbrli:period><xbrli:startDate>2023-04-01</xbrli:startDate><xbrli:endDate>2024-03-31</xbrli:endDate></xbrli:period>
+    </xbrli:context>
+    <xbrli:context id="{context_id}_m">
+        <xbrli:entity><xbrli:identifier scheme="CIN">L12345MH2000PLC123456</xbrli:identifier>
+          <xbrli:segment><xbrldi:explicitMember dimension="in-capmkt:GenderAxis">in-capmkt:MaleMember</xbrldi:explicitMember></xbrli:segment>
+        </xbrli:entity>
+        <xbrli:period><xbrli:startDate>2023-04-01</xbrli:startDate><xbrli:endDate>2024-03-31</xbrli:endDate></xbrli:period>
+    </xbrli:context>
+    <xbrli:unit id="{unit_id}"><xbrli:measure>xbrli:pure</xbrli:measure></xbrli:unit>
+    {body}
+</xbrli:xbrl>""".encode()
+
+
+ORIGINAL = [("TotalEnergyConsumption", "1000.00", False), ("TurnoverRate", "0.08", True),
+            ("WaterWithdrawal", "50", False)]
+REVISED = [("TotalEnergyConsumption", "1,000", False), ("TurnoverRate", "0.09", True),
+           ("TotalScope1Emissions", "12", False)]
+
+
+@pytest.fixture
+def extractor(tmp_path):
+    config = ParserConfig(cache_dir=str(tmp_path / "cache"), output_dir=str(tmp_path / "out"),
+                          enable_public_data_fallback=False, store_fact_hashes=True)
+    return BRSRExtractor(config)
+
+
+def table(*rows):
+    """Fact table from (name, value, unit, context, period, dimensions) rows."""
+    facts = FactTable()
+    for name, value, unit, context, period, dims in rows:
+        facts.append("in-capmkt", name, value, unit, context)
+        facts.set_context(context, period, dims)
+    return facts
+
+
+class TestDigests:
+    """Test suite for fact hashing and digest diffs."""
+
+    def test_normalize_value(self):
+        assert normalize_value("1,000.00") == normalize_value("1000") == "1000"
+        assert normalize_value("  Yes\n  we do ") == "Yes we do"
+        assert normalize_value("0.0") == "0"
+        assert normalize_value(None) is None
+
+    def test_keys_ignore_context_and_unit_ids(self):
+        """Renamed contexts and prefixed units hash to the same key."""
+        old = digest_facts(table(("A", "1", "iso4217:INR", "c1", "2024-03-31", [("GenderAxis", "MaleMember")])))
+        new = digest_facts(table(("A", "1.0", "INR", "ctx_99", "2024-03-31", [("GenderAxis", "MaleMember")])))
+        diff = diff_digests(old, new)
+        assert not diff
+        assert diff.unchanged == 1
+
+    def test_diff(self):
+        old = digest_facts(table(("A", "1", None, "c1", "2024-03-31", ()),
+                                 ("B", "2", None, "c1", "2024-03-31", ()),
+                                 ("A", "3", None, "c2", "2023-03-31", ())), "old")
+        new = digest_facts(table(("A", "1", None, "d1", "2024-03-31", ()),
+                                 ("B", "5", None, "d1", "2024-03-31", ()),
+                                 ("C", "7", None, "d1", "2024-03-31", ())), "new")
+        diff = diff_digests(old, new)
+
+        assert diff.summary() == {"added": 1, "removed": 1, "changed": 1, "unchanged": 1}
+        assert (diff.changed[0].concept, diff.changed[0].old, diff.changed[0].new) == ("B", "2", "5")
+        assert (diff.removed[0].context, diff.removed[0].old) == ("2023-03-31", "3")
+        assert diff.added[0].concept == "C"
+
+    def test_duplicates_keep_first(self):
+        digest = digest_facts(table(("A", "1", None, "c1", "2024-03-31", ()),
+                                    ("A", "2", None, "c1", "2024-03-31", ())))
+        assert len(digest) == 1
+        assert digest.duplicates == 1
+
+    def test_store_round_trip(self, tmp_path):
+        store = FactHashStore(str(tmp_path / "hashes"))
+        digest = digest_facts(table(("A", "1", None, "c1", "2024-03-31", ())), "x.xml")
+        store.put("x", digest)
+        assert "x" in store
+        assert store.get("x") == digest
+        assert store.get("missing") is None
+
+
+class TestFilingDiff:
+    """Test suite for diffs between filings."""
+
+    def test_diff_files(self, extractor, tmp_path):
+        """Revisions that only rename contexts and units show only real changes."""
+        old, new = tmp_path / "old.xml", tmp_path / "new.xml"
+        old.write_bytes(instance(ORIGINAL))
+        new.write_bytes(instance(REVISED, context_id="ctx_new", unit_id="pure"))
+
+        diff = extractor.diff_filings(str(old), str(new))
+        assert diff.summary() == {"added": 1, "removed": 1, "changed": 1, "unchanged": 1}
+        assert [c.concept for c in diff.added] == ["TotalScope1Emissions"]
+        assert [c.concept for c in diff.removed] == ["WaterWithdrawal"]
+        change = diff.changed[0]
+        assert (change.concept, change.context, change.old, change.new) == \
+            ("TurnoverRate", "2024-03-31 [GenderAxis=MaleMember]", "0.08", "0.09")
+
+    def test_stored_filing(self, extractor, tmp_path):
+        """Processed filings are stored and diffed by ID without being parsed again."""
+        extractor.process_content(instance(ORIGINAL), source_name="BRSR_1234_20062024123000.xml")
+        assert "BRSR_1234_20062024123000" in extractor.fact_hashes
+
+        new = tmp_path / "new.xml"
+        new.write_bytes(instance(REVISED))
+        stored = extractor.fact_digest("BRSR_1234_20062024123000")
+        assert stored.source == "BRSR_1234_20062024123000.xml"
+
+        parsed = []
+        digest_content = extractor.digest_content
+        extractor.digest_content = lambda content, name: parsed.append(name) or digest_content(content, name)
+        diff = extractor.diff_filings("BRSR_1234_20062024123000", str(new))
+        assert parsed == [str(new)]  # Only the new filing is parsed
+        assert diff.summary()["changed"] == 1
+
+    def test_unknown_source(self, extractor):
+        with pytest.raises(ValidationError):
+            extractor.fact_digest("no-such-filing")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
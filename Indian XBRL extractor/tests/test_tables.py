@@ -0,0 +1,145 @@
+"""
+Unit tests for disclosure table reconstruction.
+"""
+
+import json
+
+import pytest
+
+from brsr_xbrl_extractor import BRSRExtractor, ParserConfig
+from facts import FactTable
+from tables import dimension_label
+
+TURNOVER_ROLE = (
+    "https://www.sebi.gov.in/xbrl/BRSR/role/in-capmkt-roles/"
+    "DetailsOfTurnoverRateForPermanentEmployeesAndWorkers"
+)
+
+CONTEXT = """
+    <xbrli:context id="{id}">
+        <xbrli:entity><xbrli:identifier scheme="CIN">L12345MH2000PLC123456</xbrli:identifier>{segment}</xbrli:entity>
+        <xbrli:period><xbrli:startDate>2023-04-01</xbrli:startDate><xbrli:endDate>2024-03-31</xbrli:endDate></xbrli:period>
+    </xbrli:context>"""
+
+MEMBER = '<xbrldi:explicitMember dimension="in-capmkt:{axis}">in-capmkt:{member}</xbrldi:explicitMember>'
+
+
+def turnover_instance():
+    """Instance with turnover rates by employee category and gender (listed out of taxonomy order)."""
+    contexts = [CONTEXT.format(id="D", segment="")]
+    facts = []
+    rows = [("PermanentWorkersMember", "MaleMember", "0.20"),
+            ("PermanentEmployeesMember", "FemaleMember", "0.12"),
+            ("PermanentEmployeesMember", "MaleMember", "0.08")]
+    for i, (category, gender, rate) in enumerate(rows):
+        segment = "<xbrli:segment>{}{}</xbrli:segment>".format(
+            MEMBER.format(axis="PermanentEmployeesAndWorkersAxis", member=category),
+            MEMBER.format(axis="GenderAxis", member=gender),
+        )
+        contexts.append(CONTEXT.format(id=f"D{i}", segment=segment))
+        facts.append(f'<in-capmkt:TurnoverRate contextRef="D{i}" unitRef="pure" decimals="2">{rate}</in-capmkt:TurnoverRate>')
+    # Same line item under an axis the table does not have: must stay out of the table
+    contexts.append(CONTEXT.format(id="X", segment="<xbrli:segment>{}</xbrli:segment>".format(
+        MEMBER.format(axis="SomeOtherAxis", member="OtherMember"))))
+    facts.append('<in-capmkt:TurnoverRate contextRef="X" unitRef="pure" decimals="2">0.99</in-capmkt:TurnoverRate>')
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance" xmlns:xbrldi="http://xbrl.org/2006/xbrldi"
+      xmlns:in-capmkt="https://www.sebi.gov.in/xbrl/2023-06-30/in-capmkt">
+    {"".join(contexts)}
+    <xbrli:unit id="pure"><xbrli:measure>xbrli:pure</xbrli:measure></xbrli:unit>
+    {"".join(facts)}
+</xbrli:xbrl>""".encode()
+
+
+@pytest.fixture
+def extractor(tmp_path):
+    config = ParserConfig(cache_dir=str(tmp_path / "cache"), output_dir=str(tmp_path / "out"),
+                          enable_public_data_fallback=False)
+    return BRSRExtractor(config)
+
+
+class TestTableTemplates:
+    """Test suite for templates compiled from the bundled taxonomy."""
+
+    def test_turnover_template(self, extractor):
+        """The turnover table has the category and gender axes in taxonomy order."""
+        taxonomy = extractor.mapper.taxonomies.get("2023-06-30")
+        template = taxonomy.tables.templates[TURNOVER_ROLE]
+
+        assert template.axis_names == ("PermanentEmployeesAndWorkersAxis", "GenderAxis")
+        assert template.line_items == ["TurnoverRate"]
+        assert template.principle == "Section A general disclosures"
+        assert template.axes[1].members.index("MaleMember") < template.axes[1].members.index("FemaleMember")
+        assert TURNOVER_ROLE in taxonomy.tables.by_line_item["TurnoverRate"]
+
+    def test_typed_axes(self, extractor):
+        """Axes with a typed domain take their rows from the filing."""
+        taxonomy = extractor.mapper.taxonomies.get("2023-06-30")
+        typed = [axis for t in taxonomy.tables.templates.values() for axis in t.axes if axis.typed]
+        assert typed
+        assert all(not axis.members for axis in typed)
+
+
+class TestReconstruction:
+    """Test suite for slotting filing facts into tables."""
+
+    def test_extract_tables(self, extractor):
+        """Rows follow member order and facts on foreign axes are left out."""
+        tables = extractor.extract_tables(turnover_instance())
+        (table,) = [t for t in tables if t.template.role == TURNOVER_ROLE]
+
+        rows = table.rows()
+        assert [(r["PermanentEmployeesAndWorkersAxis"], r["GenderAxis"]) for r in rows] == [
+            ("PermanentEmployeesMember", "MaleMember"),
+            ("PermanentEmployeesMember", "FemaleMember"),
+            ("PermanentWorkersMember", "MaleMember"),
+        ]
+        assert [r["TurnoverRate"] for r in rows] == ["0.08", "0.12", "0.20"]
+        assert all(r["period"] == "2024-03-31" for r in rows)
+
+    def test_labelled_rows(self, extractor):
+        """Labels drop their [Axis] / [Member] suffixes."""
+        taxonomy = extractor.mapper.taxonomies.get("2023-06-30")
+        (table,) = [t for t in extractor.extract_tables(turnover_instance()) if t.template.role == TURNOVER_ROLE]
+        row = table.rows(taxonomy.labels)[0]
+        assert row["Gender"] == "Male"
+        assert row["Turnover rate"] == "0.08"
+
+    def test_missing_axis_without_default(self, extractor):
+        """A fact lacking an axis that has no default does not fit the table."""
+        taxonomy = extractor.mapper.taxonomies.get("2023-06-30")
+        facts = FactTable()
+        facts.append("in-capmkt", "TurnoverRate", "0.5", "pure", "c1")
+        facts.set_context("c1", "2024-03-31", [("GenderAxis", "MaleMember")])
+        assert not [t for t in taxonomy.tables.reconstruct(facts) if t.template.role == TURNOVER_ROLE]
+
+    def test_records_carry_dimensions(self, extractor):
+        """Dimensional records are told apart by their dimension labels."""
+        records = extractor.process_content(turnover_instance(), source_name="turnover.xml")
+        dims = {r.dimensions for r in records if r.indicator_name == "turnover_rate"}
+        assert "Gender=Female; Permanent employees and workers=Permanent employees" in dims
+        assert len(dims) == 4
+
+    def test_reconstruct_tables_writes_json(self, tmp_path):
+        """reconstruct_tables writes one JSON file of tables per filing."""
+        config = ParserConfig(cache_dir=str(tmp_path / "cache"), output_dir=str(tmp_path / "out"),
+                              enable_public_data_fallback=False, reconstruct_tables=True)
+        BRSRExtractor(config).process_content(turnover_instance(), source_name="turnover.xml")
+
+        tables = json.loads((tmp_path / "out" / "tables" / "turnover.json").read_text(encoding="utf-8"))
+        (table,) = [t for t in tables if t["role"] == TURNOVER_ROLE]
+        assert table["title"] == "Details of turnover rate for permanent employees and workers"
+        assert len(table["rows"]) == 3
+
+
+class TestDimensionLabel:
+    """Test suite for dimension labels."""
+
+    def test_label(self):
+        labels = {"GenderAxis": "Gender [Axis]", "MaleMember": "Male [Member]"}
+        assert dimension_label([("GenderAxis", "MaleMember"), ("RegionAxis", "North")], labels) == \
+            "Gender=Male; RegionAxis=North"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,129 @@
+"""
+Unit tests for the multi-version taxonomy registry.
+"""
+
+import pytest
+
+from brsr_xbrl_extractor import BRSRExtractor, ParserConfig
+from taxonomy_registry import TaxonomyRegistry, detect_namespace, taxonomy_version
+
+SCHEMA = """<?xml version="1.0" encoding="UTF-8"?>
+<xsd:schema targetNamespace="https://www.sebi.gov.in/xbrl/{version}/in-capmkt"
+    xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:xbrli="http://www.xbrl.org/2003/instance">
+  <xsd:element name="{name}" id="in-capmkt_{name}" type="xbrli:monetaryItemType" abstract="false" />
+  <xsd:element name="SomeAbstract" id="in-capmkt_SomeAbstract" type="xbrli:stringItemType" abstract="true" />
+</xsd:schema>
+"""
+
+LABELS = """<?xml version="1.0" encoding="UTF-8"?>
+<link:linkbase xmlns:link="http://www.xbrl.org/2003/linkbase" xmlns:xlink="http://www.w3.org/1999/xlink">
+  <link:labelLink xlink:type="extended">
+    <link:loc xlink:type="locator" xlink:href="in-capmkt.xsd#in-capmkt_{name}" xlink:label="{name}" />
+    <link:label xlink:type="resource" xlink:label="label_{name}">{label}</link:label>
+    <link:labelArc xlink:type="arc" xlink:from="{name}" xlink:to="label_{name}" />
+  </link:labelLink>
+</link:linkbase>
+"""
+
+
+def instance(version, name, value="10"):
+    """Build a minimal instance document in the given taxonomy version."""
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<xbrl xmlns="http://www.xbrl.org/2003/instance" xmlns:xbrli="http://www.xbrl.org/2003/instance"
+      xmlns:in-capmkt="https://www.sebi.gov.in/xbrl/{version}/in-capmkt">
+    <xbrli:context id="c1">
+        <xbrli:entity><xbrli:identifier scheme="CIN">L12345MH2000PLC123456</xbrli:identifier></xbrli:entity>
+        <xbrli:period><xbrli:endDate>2024-03-31</xbrli:endDate></xbrli:period>
+    </xbrli:context>
+    <in-capmkt:{name} contextRef="c1">{value}</in-capmkt:{name}>
+</xbrl>""".encode()
+
+
+@pytest.fixture
+def taxonomy_root(tmp_path):
+    """Create two taxonomy releases with a renamed concept."""
+    for version, name, label in [
+        ("2023-06-30", "TotalScope1Emissions", "Total Scope 1 emissions"),
+        ("2025-05-31", "GrossScope1Emissions", "Gross Scope 1 emissions"),
+    ]:
+        core = tmp_path / "taxonomies" / version / "core"
+        core.mkdir(parents=True)
+        (core / "in-capmkt.xsd").write_text(SCHEMA.format(version=version, name=name), encoding="utf-8")
+        (core / "in-capmkt-lab.xml").write_text(LABELS.format(name=name, label=label), encoding="utf-8")
+    return tmp_path / "taxonomies"
+
+
+class TestTaxonomyRegistry:
+    """Test suite for TaxonomyRegistry."""
+
+    def test_discovery_and_resolution(self, taxonomy_root, tmp_path):
+        """Test versions are discovered and unknown ones resolve to the closest older release."""
+        registry = TaxonomyRegistry([str(taxonomy_root)], cache_dir=str(tmp_path / "cache"))
+        assert registry.versions == ["2023-06-30", "2025-05-31"]
+        assert registry.resolve_version("https://www.sebi.gov.in/xbrl/2024-03-31/in-capmkt") == "2023-06-30"
+        assert registry.resolve_version("2022-01-01") == "2023-06-30"
+        assert registry.resolve_version(None) == "2025-05-31"
+
+    def test_compiled_labels_and_types(self, taxonomy_root, tmp_path):
+        """Test labels and concept data types are compiled per version."""
+        registry = TaxonomyRegistry([str(taxonomy_root)], cache_dir=str(tmp_path / "cache"))
+        taxonomy = registry.get("2025-05-31")
+        assert taxonomy.labels == {"GrossScope1Emissions": "Gross Scope 1 emissions"}
+        assert taxonomy.data_type("GrossScope1Emissions") == "float"
+        assert "SomeAbstract" not in taxonomy.types
+
+    def test_lru_and_disk_cache(self, taxonomy_root, tmp_path):
+        """Test versions are compiled once, evicted by LRU and reloaded from disk."""
+        cache_dir = str(tmp_path / "cache")
+        registry = TaxonomyRegistry([str(taxonomy_root)], cache_dir=cache_dir, capacity=1)
+        first = registry.get("2023-06-30")
+        assert registry.get("2023-06-30") is first
+        registry.get("2025-05-31")
+        assert list(registry._lru) == ["2025-05-31"]
+        assert registry.compiles == 2
+
+        reloaded = TaxonomyRegistry([str(taxonomy_root)], cache_dir=cache_dir)
+        assert reloaded.get("2023-06-30").labels == first.labels
+        assert reloaded.compiles == 0
+
+    def test_detect_namespace(self):
+        """Test the SEBI core namespace is read from the root element."""
+        content = instance("2023-06-30", "TotalScope1Emissions")
+        assert detect_namespace(content) == "https://www.sebi.gov.in/xbrl/2023-06-30/in-capmkt"
+        assert taxonomy_version(detect_namespace(content)) == "2023-06-30"
+        assert detect_namespace(b"<xbrl xmlns='http://www.xbrl.org/2003/instance'/>") is None
+
+
+class TestMixedVintageDispatch:
+    """Test filings of different releases are processed in one run."""
+
+    def test_filings_dispatch_to_their_version(self, taxonomy_root, tmp_path):
+        """Test each filing maps with its own release's labels and overrides."""
+        config = ParserConfig(
+            enable_arelle=False,
+            taxonomy_dirs=(str(taxonomy_root),),
+            cache_dir=str(tmp_path / "cache"),
+        )
+        extractor = BRSRExtractor(config)
+        extractor.mapper.taxonomies.overrides["2023-06-30"] = {
+            "TotalScope1Emissions": "GreenhouseGasEmissionsScope1",
+        }
+
+        old = extractor.process_content(instance("2023-06-30", "TotalScope1Emissions"), "old.xml")
+        new = extractor.process_content(instance("2025-05-31", "GrossScope1Emissions"), "new.xml")
+        again = extractor.process_content(instance("2023-06-30", "TotalScope1Emissions"), "old2.xml")
+
+        assert [r.indicator_name for r in old] == ["ghg_scope1_total"]
+        assert [(r.indicator_name, r.indicator_value) for r in new] == [("Gross Scope 1 emissions", 10.0)]
+        assert [r.indicator_name for r in again] == ["ghg_scope1_total"]
+        assert extractor.mapper.taxonomies.compiles == 2
+
+    def test_bundled_overrides(self):
+        """Test the bundled 2023-06-30 release maps renamed concepts to curated indicators."""
+        extractor = BRSRExtractor(ParserConfig(enable_arelle=False))
+        records = extractor.process_content(instance("2023-06-30", "TotalEnergyConsumption", "1200"), "x.xml")
+        assert [(r.indicator_name, r.indicator_value) for r in records] == [("energy_total", 1200.0)]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,131 @@
+"""
+Unit tests for the full-text index of narrative disclosures.
+"""
+
+import pytest
+
+from brsr_xbrl_extractor import BRSRExtractor, ParserConfig
+from text_index import TextIndex, is_narrative, plain_text
+
+TEXT_BLOCK = "DetailsOfMechanismAvailableToReceiveAndRedressGrievancesForPermanentEmployeesExplanatoryTextBlock"
+GRIEVANCE = "Complaints are received through the grievance redressal portal and resolved within 30 days."
+POLICY = "The human rights policy covers employees, suppliers and contractors."
+
+
+def instance(cin, year, facts):
+    """Instance with one annual context; ``facts`` are (name, value) pairs."""
+    body = "".join(f'<in-capmkt:{name} contextRef="c1">{value}</in-capmkt:{name}>' for name, value in facts)
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<xbrli:xbrl xmlns:xbrli="http://www.xbrl.org/2003/instance"
+      xmlns:in-capmkt="https://www.sebi.gov.in/xbrl/2023-06-30/in-capmkt">
+    <xbrli:context id="c1">
+        <xbrli:entity><xbrli:identifier scheme="CIN">{cin}</xbrli:identifier></xbrli:entity>
+        <xbrli:period><xbrli:startDate>{year - 1}-04-01</xbrli:startDate><xbrli:endDate>{year}-03-31</xbrli:endDate></xbrli:period>
+    </xbrli:context>
+    {body}
+</xbrli:xbrl>""".encode()
+
+
+@pytest.fixture
+def index(tmp_path):
+    with TextIndex(str(tmp_path / "text.sqlite")) as idx:
+        yield idx
+
+
+@pytest.fixture
+def extractor(tmp_path):
+    config = ParserConfig(cache_dir=str(tmp_path / "cache"), output_dir=str(tmp_path / "out"),
+                          enable_public_data_fallback=False, text_index=True)
+    return BRSRExtractor(config)
+
+
+class TestTextIndex:
+    """Test suite for the FTS5 index."""
+
+    def test_plain_text(self):
+        assert plain_text("<p>Zero&nbsp;waste   <b>policy</b></p>") == "Zero waste policy"
+        assert not is_narrative("1,234.50", 5)
+        assert not is_narrative("Yes", 20)
+        assert is_narrative(POLICY, 20)
+
+    def test_ranked_search(self, index):
+        """Stemmed matches are found and the better match ranks first."""
+        index.add([
+            ("C1", "Alpha Ltd", 2024, "DetailsOfGrievance", "", "Grievance mechanism", GRIEVANCE),
+            ("C2", "Beta Ltd", 2024, "DetailsOfGrievance", "", "Grievance mechanism",
+             "Grievances and grievance redressal are handled by the grievance committee."),
+            ("C2", "Beta Ltd", 2024, "HumanRightsPolicy", "", None, POLICY),
+        ])
+        hits = index.search("grievances")
+        assert [h.company_id for h in hits] == ["C2", "C1"]
+        assert "[grievance]" in hits[1].snippet.lower()
+        assert [h.concept for h in index.search('"human rights"')] == ["HumanRightsPolicy"]
+
+    def test_filters(self, index):
+        index.add([("C1", "Alpha", 2023, "X", "", None, GRIEVANCE),
+                   ("C1", "Alpha", 2024, "X", "", None, GRIEVANCE),
+                   ("C2", "Beta", 2024, "X", "", None, GRIEVANCE)])
+        assert len(index.search("grievance", year=2024)) == 2
+        assert [h.year for h in index.search("grievance", company_id="C1", year=2023)] == [2023]
+
+    def test_reindex_replaces(self, index):
+        """Re-processing a filing replaces its text instead of adding rows."""
+        index.add([("C1", "Alpha", 2024, "X", "", None, GRIEVANCE)])
+        assert index.add([("C1", "Alpha", 2024, "X", "", None, GRIEVANCE)]) == 0
+        index.add([("C1", "Alpha", 2024, "X", "", None, POLICY)])
+        assert len(index) == 1
+        assert not index.search("grievance")
+        assert index.search("policy")
+
+    def test_bad_syntax_falls_back_to_terms(self, index):
+        index.add([("C1", "Alpha", 2024, "X", "", None, GRIEVANCE)])
+        assert len(index.search('grievance AND (portal')) == 1
+        assert index.search("((") == []
+
+
+class TestExtractionIndexing:
+    """Test suite for indexing during extraction."""
+
+    def test_process_content_indexes_text(self, extractor):
+        """Narrative facts are indexed per company and year; numbers and short strings are not."""
+        extractor.process_content(instance("L11111MH2000PLC111111", 2024, [
+            (TEXT_BLOCK, GRIEVANCE),
+            ("GrievanceRedressalMechanismInPlace", "Yes"),
+            ("TotalEnergyConsumption", "1000"),
+        ]), source_name="a.xml")
+        extractor.process_content(instance("L22222MH2000PLC222222", 2023, [
+            (TEXT_BLOCK, "&lt;p&gt;Grievance committee meets monthly.&lt;/p&gt;"),
+        ]), source_name="b.xml")
+
+        index = extractor.text_index
+        assert len(index) == 2
+        hits = index.search("grievance")
+        assert {(h.company_id, h.year) for h in hits} == {("L11111MH2000PLC111111", 2024),
+                                                          ("L22222MH2000PLC222222", 2023)}
+        assert extractor.metrics.counter_value("brsr_text_facts_indexed_total") == 2
+
+    def test_prior_year_comparatives_skipped(self, extractor):
+        """A prior-year fact for the same concept does not overwrite the current-year text."""
+        # The comparative context is declared first, its fact comes after the current one
+        prior_context = """<xbrli:context id="c0">
+        <xbrli:entity><xbrli:identifier scheme="CIN">L11111MH2000PLC111111</xbrli:identifier></xbrli:entity>
+        <xbrli:period><xbrli:startDate>2022-04-01</xbrli:startDate><xbrli:endDate>2023-03-31</xbrli:endDate></xbrli:period>
+    </xbrli:context>
+    <xbrli:context id="c1">"""
+        prior_fact = f'<in-capmkt:{TEXT_BLOCK} contextRef="c0">{POLICY}</in-capmkt:{TEXT_BLOCK}></xbrli:xbrl>'
+        content = (instance("L11111MH2000PLC111111", 2024, [(TEXT_BLOCK, GRIEVANCE)])
+                   .replace(b'<xbrli:context id="c1">', prior_context.encode())
+                   .replace(b"</xbrli:xbrl>", prior_fact.encode()))
+        extractor.process_content(content, source_name="a.xml")
+
+        index = extractor.text_index
+        assert len(index) == 1
+        assert [(h.year, h.concept) for h in index.search("grievance")] == [(2024, TEXT_BLOCK)]
+        assert not index.search("policy")
+
+    def test_disabled_by_default(self, tmp_path):
+        assert BRSRExtractor(ParserConfig(cache_dir=str(tmp_path))).text_index is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
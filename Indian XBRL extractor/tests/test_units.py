@@ -0,0 +1,102 @@
+"""
+Unit tests for the unit registry and batch unit normalization.
+"""
+
+import math
+
+import pandas as pd
+import pytest
+
+from brsr_xbrl_extractor import ESGRecord
+from instrumentation import ExtractorMetrics
+from units import UnitNormalizer, UnitRegistry
+
+
+@pytest.fixture
+def registry():
+    """Create the default unit registry."""
+    return UnitRegistry()
+
+
+@pytest.fixture
+def normalizer(registry):
+    """Create a normalizer with curated units for a few indicators."""
+    return UnitNormalizer(
+        registry,
+        expected_units={"energy_total": "GJ", "water_withdrawal_total": "KL", "csr_spend": "INR"},
+        metrics=ExtractorMetrics(),
+    )
+
+
+class TestUnitRegistry:
+    """Test suite for UnitRegistry."""
+
+    @pytest.mark.parametrize("unit, dimension, factor", [
+        ("MWh", "energy", 3.6),
+        ("GJ", "energy", 1.0),
+        ("KL", "volume", 1.0),
+        ("Kilolitres", "volume", 1.0),
+        ("iso4217:INR", "currency", 1.0),
+        ("Rs. in Lakhs", "currency", 1e5),
+        ("INR Crore", "currency", 1e7),
+        ("MT", "mass", 1.0),
+        ("kgCO2e", "emissions", 1e-3),
+    ])
+    def test_lookup(self, registry, unit, dimension, factor):
+        """Test spellings, prefixes and word order resolve to the right unit."""
+        resolved = registry.lookup(unit)
+        assert resolved.dimension == dimension
+        assert resolved.factor == pytest.approx(factor)
+
+    def test_ratio_units(self, registry):
+        """Test ratios combine the dimensions and factors of their parts."""
+        resolved = registry.lookup("tCO2e per INR crore")
+        assert resolved.dimension == "emissions/currency"
+        assert resolved.canonical == "tCO2e/INR"
+        assert resolved.factor == pytest.approx(1e-7)
+
+    def test_convert_and_dimension_check(self, registry):
+        """Test scalar conversion and rejection of incompatible units."""
+        assert registry.convert(2.5, "crore", "lakh") == pytest.approx(250)
+        assert registry.convert(1000, "kWh", "MWh") == pytest.approx(1)
+        with pytest.raises(ValueError, match="Cannot convert"):
+            registry.convert(1, "KL", "GJ")
+        with pytest.raises(ValueError, match="Unknown unit"):
+            registry.convert(1, "furlong", "GJ")
+
+
+class TestUnitNormalizer:
+    """Test suite for UnitNormalizer."""
+
+    def test_apply_adds_canonical_columns(self, normalizer):
+        """Test a DataFrame keeps its original columns and gains canonical ones."""
+        df = pd.DataFrame({
+            "indicator_name": ["energy_total", "energy_total", "csr_spend", "water_withdrawal_total", "energy_total"],
+            "indicator_value": [10.0, "2000", "1.5", 40.0, "n/a"],
+            "value_unit": ["MWh", "GJ", "INR crore", "GJ", "GJ"],
+        })
+        out = normalizer.apply(df)
+        assert out["indicator_value"].tolist() == df["indicator_value"].tolist()
+        assert out["value_unit"].tolist() == df["value_unit"].tolist()
+        assert out["canonical_value"].iloc[:3].tolist() == pytest.approx([36.0, 2000.0, 1.5e7])
+        assert out["canonical_unit"].iloc[:3].tolist() == ["GJ", "GJ", "INR"]
+        # Energy unit on a water indicator, and a non-numeric value, are not converted
+        assert math.isnan(out["canonical_value"].iloc[3]) and pd.isna(out["canonical_unit"].iloc[3])
+        assert math.isnan(out["canonical_value"].iloc[4])
+        assert normalizer.metrics.counter_value("brsr_unit_conversions_total", result="converted") == 3
+        assert normalizer.metrics.counter_value("brsr_unit_conversions_total", result="mismatch") == 1
+
+    def test_apply_records_in_batches(self, normalizer):
+        """Test streamed records gain canonical values across batch boundaries."""
+        records = [
+            ESGRecord("L1", "A", 2024, "water_withdrawal_total", value, unit, 90, "xbrl", "")
+            for value, unit in [(5, "ML"), (True, "KL"), (7, "furlongs")]
+        ]
+        out = list(normalizer.apply_records(records, batch_size=2))
+        assert [r.canonical_value for r in out] == [5000.0, None, None]
+        assert [r.canonical_unit for r in out] == ["m3", None, None]
+        assert [r.indicator_value for r in out] == [5, True, 7]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,144 @@
+"""
+Unit tests for the distributed work queue.
+"""
+
+from dataclasses import asdict
+from unittest.mock import MagicMock
+
+import pytest
+
+from brsr_xbrl_extractor import BRSRExtractor, ESGRecord, FetchError, ParserConfig
+from work_queue import DONE, FAILED, LEASED, QUEUED, QueueWorker, SQLiteQueueBackend, main, open_backend
+
+
+class FakeClock:
+    """Manually advanced clock for lease expiry."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def backend(tmp_path, clock):
+    """Create a SQLite queue with three filings."""
+    queue = SQLiteQueueBackend(str(tmp_path / "queue.db"), max_attempts=2, clock=clock)
+    queue.enqueue([(f"F{i}", f"https://example.com/BRSR_{i}.xml") for i in range(3)])
+    return queue
+
+
+def record(company_id="L46591MH1999PLC118476"):
+    return ESGRecord(company_id, "A", 2024, "ghg_scope1_total", 1.0, "tCO2e", 90, "xbrl", "")
+
+
+class TestSQLiteQueueBackend:
+    """Test suite for SQLiteQueueBackend."""
+
+    def test_enqueue_is_idempotent(self, backend):
+        """Test re-enqueueing known task ids adds nothing."""
+        assert backend.enqueue([("F0", "x"), ("F3", "y")]) == 1
+        assert backend.counts()[QUEUED] == 4
+
+    def test_leases_are_exclusive(self, backend):
+        """Test leased tasks are hidden from other workers until they expire."""
+        first = backend.lease("w1", limit=2, visibility_timeout=60)
+        second = backend.lease("w2", limit=5, visibility_timeout=60)
+        assert [l.task_id for l in first] == ["F0", "F1"]
+        assert [l.task_id for l in second] == ["F2"]
+        assert backend.lease("w3") == []
+        assert backend.counts()[LEASED] == 3
+
+    def test_expired_lease_is_requeued_and_commit_is_idempotent(self, backend, clock):
+        """Test a lost lease is re-leased and only the first commit counts."""
+        lost = backend.lease("crashed", visibility_timeout=60)[0]
+        clock.now += 61
+        retry = backend.lease("w2", visibility_timeout=60)[0]
+        assert retry.task_id == lost.task_id and retry.attempts == 2
+        assert backend.renew(lost) is None
+
+        assert backend.complete(retry, [{"company_id": "A"}]) is True
+        assert backend.complete(lost, [{"company_id": "B"}]) is False
+        assert list(backend.iter_results()) == [{"company_id": "A"}]
+        assert backend.counts()[DONE] == 1
+
+    def test_attempts_are_capped(self, backend, clock):
+        """Test a task that keeps failing or expiring ends up failed."""
+        lease = backend.lease("w1")[0]
+        backend.fail(lease, "boom")
+        assert backend.counts()[QUEUED] == 3
+        backend.lease("w1", visibility_timeout=10)
+        clock.now += 11
+        assert backend.requeue_expired() == 1
+        assert backend.failures() == [("F0", "https://example.com/BRSR_0.xml", 2, "boom")]
+        assert backend.counts()[FAILED] == 1
+
+    def test_open_backend(self, tmp_path):
+        """Test queue URLs select the backend."""
+        assert isinstance(open_backend(f"sqlite:///{tmp_path}/q.db"), SQLiteQueueBackend)
+        assert isinstance(open_backend(str(tmp_path / "plain.db")), SQLiteQueueBackend)
+        with pytest.raises(ValueError):
+            open_backend("redis://localhost")
+
+
+class TestQueueWorker:
+    """Test suite for QueueWorker."""
+
+    def test_worker_drains_queue(self, backend, tmp_path):
+        """Test workers commit results and send failures back to the queue."""
+        extractor = BRSRExtractor(ParserConfig(enable_arelle=False, cache_dir=str(tmp_path)))
+        extractor.process_url = MagicMock(side_effect=[[record()], RuntimeError("parser hung"), [], [record()]])
+        worker = QueueWorker(extractor, backend, worker_id="w1", visibility_timeout=60)
+        assert worker.run() == 3
+        assert backend.counts() == {QUEUED: 0, LEASED: 0, DONE: 3, FAILED: 0}
+        assert len(list(backend.iter_results())) == 2
+        assert extractor.metrics.counter_value("brsr_queue_tasks_total", result="failed") == 1
+
+    def test_fetch_failures_are_retried_then_failed(self, backend, clock, tmp_path):
+        """A failing fetch is not committed as an empty result; it is retried up to max_attempts."""
+        extractor = BRSRExtractor(ParserConfig(enable_arelle=False, cache_dir=str(tmp_path),
+                                               enable_public_data_fallback=False))
+        extractor.fetcher.fetch = MagicMock(side_effect=FetchError("503"))
+        worker = QueueWorker(extractor, backend, worker_id="w1", visibility_timeout=60)
+        assert worker.run() == 0
+        assert backend.counts() == {QUEUED: 0, LEASED: 0, DONE: 0, FAILED: 3}
+        assert extractor.fetcher.fetch.call_count == 6
+        assert list(backend.iter_results()) == []
+
+    def test_parse_failures_are_retried(self, backend, tmp_path):
+        extractor = BRSRExtractor(ParserConfig(enable_arelle=False, cache_dir=str(tmp_path),
+                                               enable_public_data_fallback=False))
+        extractor.fetcher.fetch = MagicMock(return_value=b"<not-xbrl/>")
+        worker = QueueWorker(extractor, backend, worker_id="w1", visibility_timeout=60)
+        assert worker.run() == 0
+        assert backend.counts()[FAILED] == 3
+
+
+class TestExportCommand:
+    """Test suite for the ``export`` command."""
+
+    def test_export_applies_record_stages(self, backend, tmp_path, monkeypatch):
+        """Queue results go through the same record-stream stages as a batch run."""
+        backend.complete(backend.lease("w1")[0], [asdict(record())])
+        seen = []
+
+        def transform(self, records):
+            for r in records:
+                seen.append(r)
+                yield r
+
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(BRSRExtractor, "transform_records", transform)
+        main(["export", "--queue", str(tmp_path / "queue.db"), "--out", str(tmp_path / "out")])
+        assert seen == [record()]
+        assert (tmp_path / "out" / "brsr_esg_metrics.csv").read_text(encoding="utf-8-sig").count("\n") == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
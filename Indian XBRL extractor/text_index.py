@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Full-text index over narrative BRSR disclosures.
+
+Many BRSR concepts are text blocks and free-text strings (policies,
+grievance mechanisms, descriptions of initiatives). With ``text_index``
+enabled, every processed filing's text-valued facts are written to an
+SQLite database with an FTS5 index, so they can be searched across the
+corpus in milliseconds:
+
+- ``text_facts`` holds one row per (company, year, concept, dimensions),
+  replaced when a filing is re-processed, so the index is built
+  incrementally as filings are extracted (only facts of the filing's
+  reporting period are indexed, not prior-year comparatives);
+- ``text_fts`` is an external-content FTS5 table over ``text_facts.text``
+  (Porter-stemmed ``unicode61`` tokens), kept in sync by triggers.
+
+Search results are ranked by BM25 and carry a highlighted snippet. Queries
+use FTS5 syntax (``grievance AND redressal``, ``"human rights"``,
+``polic*``); a query FTS5 cannot parse is searched as plain terms.
+
+Command line:
+    python text_index.py "grievance redressal" [--company CIN] [--year 2024] [--limit 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import html
+import json
+import logging
+import re
+import sqlite3
+import sys
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("brsr_parser")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS text_facts (
+    id INTEGER PRIMARY KEY,
+    company_id TEXT NOT NULL,
+    company_name TEXT,
+    year INTEGER NOT NULL,
+    concept TEXT NOT NULL,
+    dimensions TEXT NOT NULL DEFAULT '',
+    label TEXT,
+    source TEXT,
+    text TEXT NOT NULL,
+    UNIQUE (company_id, year, concept, dimensions)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS text_fts USING fts5(
+    text, content='text_facts', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS text_facts_ai AFTER INSERT ON text_facts BEGIN
+    INSERT INTO text_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS text_facts_ad AFTER DELETE ON text_facts BEGIN
+    INSERT INTO text_fts(text_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS text_facts_au AFTER UPDATE ON text_facts BEGIN
+    INSERT INTO text_fts(text_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    INSERT INTO text_fts(rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+_UPSERT = """
+INSERT INTO text_facts (company_id, company_name, year, concept, dimensions, label, source, text)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (company_id, year, concept, dimensions) DO UPDATE SET
+    company_name = excluded.company_name, label = excluded.label,
+    source = excluded.source, text = excluded.text
+WHERE text_facts.text IS NOT excluded.text OR text_facts.source IS NOT excluded.source
+"""
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_NUMERIC_RE = re.compile(r"^[-+]?[\d,]*\.?\d+(?:[eE][-+]?\d+)?%?$")
+
+
+def plain_text(value: Any) -> str:
+    """Text of a fact value with markup stripped and whitespace collapsed (text blocks hold XHTML)."""
+    text = str(value)
+    if "<" in text or "&" in text:
+        text = html.unescape(_TAG_RE.sub(" ", text))
+    return " ".join(text.split())
+
+
+def is_narrative(text: str, min_chars: int) -> bool:
+    return len(text) >= min_chars and not _NUMERIC_RE.match(text)
+
+
+# (company_id, company_name, year, concept, dimensions, label, text)
+TextFact = Tuple[str, str, int, str, str, Optional[str], str]
+
+
+@dataclass
+class TextHit:
+    """One search result."""
+    company_id: str
+    company_name: Optional[str]
+    year: int
+    concept: str
+    label: Optional[str]
+    dimensions: str
+    snippet: str
+    score: float  # BM25; lower is better
+
+
+class TextIndex:
+    """SQLite FTS5 index of text-valued facts, safe to share between threads."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Worker processes may write to the same index: WAL plus a busy timeout
+        self._conn = sqlite3.connect(str(self.path), timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def add(self, facts: Iterable[TextFact], source: str = "") -> int:
+        """Insert or replace facts; returns the number of rows written."""
+        rows = [(cid, name, year, concept, dims or "", label, source, text)
+                for cid, name, year, concept, dims, label, text in facts]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            return self._conn.executemany(_UPSERT, rows).rowcount
+
+    def search(
+        self,
+        query: str,
+        company_id: Optional[str] = None,
+        year: Optional[int] = None,
+        concept: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[TextHit]:
+        """Facts matching an FTS5 query, best first, optionally filtered."""
+        sql = ["SELECT f.company_id, f.company_name, f.year, f.concept, f.label, f.dimensions,",
+               "snippet(text_fts, 0, '[', ']', ' ... ', 24), bm25(text_fts)",
+               "FROM text_fts JOIN text_facts f ON f.id = text_fts.rowid WHERE text_fts MATCH ?"]
+        params: List[Any] = [query]
+        for column, value in (("company_id", company_id), ("year", year), ("concept", concept)):
+            if value is not None:
+                sql.append(f"AND f.{column} = ?")
+                params.append(value)
+        sql.append("ORDER BY bm25(text_fts) LIMIT ?")
+        params.append(limit)
+        statement = " ".join(sql)
+        with self._lock:
+            try:
+                rows = self._conn.execute(statement, params).fetchall()
+            except sqlite3.OperationalError:
+                # Not valid FTS5 syntax: search the words as plain terms
+                terms = re.findall(r"\w+", query)
+                if not terms:
+                    return []
+                params[0] = " ".join(f'"{term}"' for term in terms)
+                rows = self._conn.execute(statement, params).fetchall()
+        return [TextHit(*row) for row in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM text_facts").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "TextIndex":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+# -------------------------------------------------------------------
+# Command line
+# -------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from brsr_xbrl_extractor import ParserConfig
+
+    parser = argparse.ArgumentParser(description="Search narrative BRSR disclosures")
+    parser.add_argument("query", help='FTS5 query, e.g. "grievance AND redressal"')
+    parser.add_argument("--company", default=None, help="company ID (CIN)")
+    parser.add_argument("--year", type=int, default=None)
+    parser.add_argument("--concept", default=None, help="concept local name")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--index", default=None, help="index path (default: <cache_dir>/text_index.sqlite)")
+    parser.add_argument("--format", choices=("text", "json"), default="text")
+    args = parser.parse_args(argv)
+
+    config = ParserConfig()
+    path = Path(args.index or config.text_index_path or Path(config.cache_dir) / "text_index.sqlite")
+    if not path.exists():
+        print(f"error: no text index at {path} (enable text_index and extract some filings)", file=sys.stderr)
+        return 2
+    with TextIndex(str(path)) as index:
+        hits = index.search(args.query, args.company, args.year, args.concept, args.limit)
+    if args.format == "json":
+        json.dump([asdict(hit) for hit in hits], sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return 0
+    for hit in hits:
+        dims = f" [{hit.dimensions}]" if hit.dimensions else ""
+        print(f"{hit.company_id} {hit.company_name or ''} {hit.year}  {hit.label or hit.concept}{dims}")
+        print(f"    {hit.snippet}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
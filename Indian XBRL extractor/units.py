@@ -0,0 +1,258 @@
+"""
+Unit registry and vectorized normalization of ESG quantities.
+
+Units reach records either from the filing's XBRL ``unit`` measures or from
+the curated ``unit`` of an indicator in ``brsr_taxonomy_mapping.json``, and
+filings mix scales (MWh and GJ, KL and litres, rupees, lakh and crore).
+``UnitRegistry`` knows, for every unit spelling it recognises, its dimension
+and the factor to that dimension's canonical unit:
+
+=========  ==========  ===========================================
+dimension  canonical   examples
+=========  ==========  ===========================================
+energy     GJ          MJ, TJ, kWh, MWh, GWh
+volume     m3          KL, kilolitre, litre, ML (megalitre)
+mass       t           MT, tonne, kg
+emissions  tCO2e       tCO2, kgCO2e, MTCO2e (metric tonne)
+currency   INR         Rs, thousand, lakh, crore, million, billion
+=========  ==========  ===========================================
+
+Ratios such as ``GJ/INR`` are resolved part by part. ``UnitNormalizer``
+converts whole record batches at once: each distinct unit and indicator is
+resolved once, then values are scaled with NumPy. The result is written to
+``canonical_value`` / ``canonical_unit`` next to the original
+``indicator_value`` / ``value_unit``. A value is left unconverted (NaN) when
+its unit is unknown or its dimension differs from the indicator's curated
+unit, e.g. a volume reported for an energy indicator.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from brsr_xbrl_extractor import ESGRecord
+    from instrumentation import ExtractorMetrics
+
+
+@dataclass(frozen=True)
+class Unit:
+    """A recognised unit: its dimension, canonical unit and conversion factor."""
+    dimension: str
+    canonical: str
+    factor: float  # canonical value = value * factor
+
+
+# dimension -> (canonical unit, {spelling: factor})
+UNIT_DEFINITIONS: Dict[str, Tuple[str, Dict[str, float]]] = {
+    "energy": ("GJ", {
+        "GJ": 1.0, "gigajoule": 1.0, "gigajoules": 1.0,
+        "J": 1e-9, "kJ": 1e-6, "MJ": 1e-3, "TJ": 1e3, "PJ": 1e6,
+        "kWh": 0.0036, "MWh": 3.6, "GWh": 3600.0, "TWh": 3.6e6,
+    }),
+    "volume": ("m3", {
+        "m3": 1.0, "cubic metre": 1.0, "cubic meter": 1.0, "cubic metres": 1.0,
+        "KL": 1.0, "kilolitre": 1.0, "kilolitres": 1.0, "kiloliter": 1.0, "kiloliters": 1.0,
+        "L": 1e-3, "litre": 1e-3, "litres": 1e-3, "liter": 1e-3, "liters": 1e-3,
+        "ML": 1e3, "megalitre": 1e3, "megalitres": 1e3, "megaliter": 1e3, "megaliters": 1e3,
+    }),
+    "mass": ("t", {
+        "t": 1.0, "MT": 1.0, "tonne": 1.0, "tonnes": 1.0, "metric tonne": 1.0, "metric tonnes": 1.0,
+        "ton": 1.0, "tons": 1.0, "kg": 1e-3, "kilogram": 1e-3, "kilograms": 1e-3,
+        "thousand tonnes": 1e3, "million tonnes": 1e6,
+    }),
+    "emissions": ("tCO2e", {
+        "tCO2e": 1.0, "tCO2": 1.0, "MTCO2e": 1.0, "tonnes CO2e": 1.0, "tonne CO2e": 1.0,
+        "kgCO2e": 1e-3, "kg CO2e": 1e-3, "million tCO2e": 1e6,
+    }),
+    "currency": ("INR", {
+        "INR": 1.0, "Rs": 1.0, "Rupees": 1.0, "₹": 1.0,
+        "INR thousand": 1e3, "thousand": 1e3, "Rs thousand": 1e3,
+        "INR lakh": 1e5, "INR lakhs": 1e5, "lakh": 1e5, "lakhs": 1e5, "Rs lakh": 1e5, "Rs lakhs": 1e5,
+        "INR million": 1e6, "million": 1e6, "Rs million": 1e6,
+        "INR crore": 1e7, "INR crores": 1e7, "crore": 1e7, "crores": 1e7, "Rs crore": 1e7, "Rs crores": 1e7,
+        "INR billion": 1e9, "billion": 1e9,
+    }),
+    "percentage": ("percentage", {"percentage": 1.0, "percent": 1.0, "%": 1.0}),
+    "pure": ("pure", {"pure": 1.0}),
+    "count": ("count", {"count": 1.0, "number": 1.0, "nos": 1.0, "no": 1.0, "shares": 1.0}),
+    "time": ("hours", {"hours": 1.0, "hour": 1.0, "hrs": 1.0, "h": 1.0, "days": 24.0, "day": 24.0}),
+}
+
+# Words that carry no unit information, as in "Rs. in Lakhs"
+_FILLER = {"in", "of"}
+_SEPARATORS_RE = re.compile(r"[\s_\-.]+")
+_RATIO_RE = re.compile(r"\s*/\s*|\s+per\s+", re.IGNORECASE)
+
+
+def unit_key(unit: str) -> str:
+    """Normalize a unit spelling for lookup.
+
+    Drops an XBRL prefix (``iso4217:INR``), case, punctuation and filler
+    words, and ignores word order, so "Rs. in Lakhs" and "lakhs rs" match.
+    """
+    text = unit.strip().rsplit(":", 1)[-1]
+    words = [w for w in _SEPARATORS_RE.split(text.lower()) if w and w not in _FILLER]
+    return " ".join(sorted(words))
+
+
+class UnitRegistry:
+    """Looks up units by (case-insensitive) spelling, including ``a/b`` ratios."""
+
+    def __init__(self, definitions: Optional[Dict[str, Tuple[str, Dict[str, float]]]] = None) -> None:
+        self._units: Dict[str, Unit] = {}
+        for dimension, (canonical, spellings) in (definitions or UNIT_DEFINITIONS).items():
+            for spelling, factor in spellings.items():
+                self._units[unit_key(spelling)] = Unit(dimension, canonical, factor)
+        self._cache: Dict[Optional[str], Optional[Unit]] = {}
+
+    def lookup(self, unit: Optional[str]) -> Optional[Unit]:
+        """Return the ``Unit`` for a spelling, or None if it is not recognised."""
+        if unit in self._cache:
+            return self._cache[unit]
+        resolved = self._resolve(unit) if unit else None
+        self._cache[unit] = resolved
+        return resolved
+
+    def _resolve(self, unit: str) -> Optional[Unit]:
+        parts = _RATIO_RE.split(unit.strip())
+        if len(parts) == 1:
+            return self._units.get(unit_key(unit))
+        if len(parts) != 2:
+            return None
+        numerator, denominator = (self._units.get(unit_key(part)) for part in parts)
+        if numerator is None or denominator is None:
+            return None
+        return Unit(
+            f"{numerator.dimension}/{denominator.dimension}",
+            f"{numerator.canonical}/{denominator.canonical}",
+            numerator.factor / denominator.factor,
+        )
+
+    def dimension(self, unit: Optional[str]) -> Optional[str]:
+        resolved = self.lookup(unit)
+        return resolved.dimension if resolved else None
+
+    def convert(self, value: float, from_unit: str, to_unit: str) -> float:
+        """Convert a single value; raises ValueError for unknown or incompatible units."""
+        source, target = self.lookup(from_unit), self.lookup(to_unit)
+        if source is None or target is None:
+            raise ValueError(f"Unknown unit: {from_unit if source is None else to_unit}")
+        if source.dimension != target.dimension:
+            raise ValueError(f"Cannot convert {source.dimension} ({from_unit}) to {target.dimension} ({to_unit})")
+        return value * source.factor / target.factor
+
+
+# -------------------------------------------------------------------
+# Batch normalization
+# -------------------------------------------------------------------
+
+CONVERTED, UNKNOWN, MISMATCH, NON_NUMERIC = "converted", "unknown", "mismatch", "non_numeric"
+
+
+class UnitNormalizer:
+    """Adds canonical value/unit columns to record batches.
+
+    ``expected_units`` maps indicator names to their curated unit; a record
+    whose unit has a different dimension is not converted.
+    """
+
+    def __init__(
+        self,
+        registry: Optional[UnitRegistry] = None,
+        expected_units: Optional[Dict[str, Optional[str]]] = None,
+        metrics: Optional["ExtractorMetrics"] = None,
+    ) -> None:
+        self.registry = registry or UnitRegistry()
+        self.expected_dimensions = {
+            indicator: self.registry.dimension(unit) for indicator, unit in (expected_units or {}).items()
+        }
+        self.metrics = metrics
+
+    def normalize(
+        self, values: Any, units: Iterable[Optional[str]], indicators: Iterable[str]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (canonical values, canonical units, status) arrays for a batch."""
+        import pandas as pd
+
+        numeric = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=float, copy=True)
+        is_bool = np.fromiter((isinstance(v, (bool, np.bool_)) for v in values), dtype=bool, count=len(numeric))
+        numeric[is_bool] = np.nan
+
+        # Resolve each distinct unit and indicator once, then broadcast by code
+        unit_codes, unit_uniques = pd.factorize(pd.Series(list(units), dtype=object), use_na_sentinel=False)
+        indicator_codes, indicator_uniques = pd.factorize(pd.Series(list(indicators), dtype=object))
+        resolved = [self.registry.lookup(u if isinstance(u, str) else None) for u in unit_uniques]
+        factors = np.array([u.factor if u else np.nan for u in resolved], dtype=float)
+        canonical = np.array([u.canonical if u else None for u in resolved], dtype=object)
+        dimensions = np.array([u.dimension if u else None for u in resolved], dtype=object)
+        expected = np.array([self.expected_dimensions.get(i) for i in indicator_uniques], dtype=object)
+
+        row_dimensions = dimensions[unit_codes]
+        row_expected = expected[indicator_codes] if len(expected) else np.full(len(numeric), None, dtype=object)
+        known = np.not_equal(row_dimensions, None)
+        mismatch = known & np.not_equal(row_expected, None) & (row_dimensions != row_expected)
+        finite = np.isfinite(numeric)
+        ok = known & ~mismatch & finite
+
+        canonical_values = np.where(ok, numeric * factors[unit_codes], np.nan)
+        canonical_units = np.where(ok, canonical[unit_codes], None)
+        status = np.full(len(numeric), NON_NUMERIC, dtype=object)
+        status[finite & ~known] = UNKNOWN
+        status[finite & mismatch] = MISMATCH
+        status[ok] = CONVERTED
+        self._count(status)
+        return canonical_values, canonical_units, status
+
+    def _count(self, status: np.ndarray) -> None:
+        if self.metrics is None:
+            return
+        for result in (CONVERTED, UNKNOWN, MISMATCH):
+            count = int((status == result).sum())
+            if count:
+                self.metrics.inc("brsr_unit_conversions_total", count, result=result)
+
+    def apply(self, df: "pd.DataFrame") -> "pd.DataFrame":
+        """Add ``canonical_value`` and ``canonical_unit`` columns to a records DataFrame."""
+        if df.empty:
+            return df
+        out = df.copy()
+        values, units, _ = self.normalize(
+            out["indicator_value"].tolist(),
+            out["value_unit"].tolist(),
+            out["indicator_name"].tolist(),
+        )
+        out["canonical_value"] = values
+        out["canonical_unit"] = units
+        return out
+
+    def apply_records(self, records: Iterable["ESGRecord"], batch_size: int = 5000) -> Iterator["ESGRecord"]:
+        """Stream records through the normalizer in batches."""
+        batch: List["ESGRecord"] = []
+
+        def flush() -> Iterator["ESGRecord"]:
+            values, units, _ = self.normalize(
+                [r.indicator_value for r in batch],
+                [r.value_unit for r in batch],
+                [r.indicator_name for r in batch],
+            )
+            for record, value, unit in zip(batch, values, units):
+                yield replace(
+                    record,
+                    canonical_value=None if np.isnan(value) else float(value),
+                    canonical_unit=unit,
+                )
+            batch.clear()
+
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield from flush()
+        if batch:
+            yield from flush()
@@ -0,0 +1,438 @@
+"""
+Distributed work queue for corpus runs.
+
+A coordinator enqueues filings (by default every XBRL URL in
+``Insider_Trading.csv``) into a shared queue store; any number of workers,
+on one machine or several sharing the store, lease filings, run
+fetch -> parse -> map through ``BRSRExtractor`` and commit the resulting
+records.
+
+Queue semantics follow the visibility-timeout model: a lease hides a task
+for ``visibility_timeout`` seconds. A worker that crashes simply stops
+renewing, its lease expires and the task becomes leasable again (counted
+as another attempt, up to ``max_attempts``). Commits are idempotent: results
+are keyed by task id and a task's first committed result wins, so a worker
+whose lease expired mid-filing cannot overwrite or duplicate the result of
+the worker that took the task over.
+
+Backends implement ``QueueBackend``; ``SQLiteQueueBackend`` keeps tasks and
+results in one SQLite database (WAL mode, ``BEGIN IMMEDIATE`` leasing).
+Use a local disk or a file system with working POSIX locks for the
+database.
+
+Usage:
+    python work_queue.py enqueue --queue sqlite:///queue.db [--csv Insider_Trading.csv]
+    python work_queue.py work    --queue sqlite:///queue.db [--worker-id node1]
+    python work_queue.py status  --queue sqlite:///queue.db
+    python work_queue.py export  --queue sqlite:///queue.db [--out output]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from brsr_xbrl_extractor import BRSRExtractor
+
+logger = logging.getLogger("brsr_parser")
+
+QUEUED, LEASED, DONE, FAILED = "queued", "leased", "done", "failed"
+
+
+@dataclass(frozen=True)
+class Lease:
+    """A task handed to one worker until ``expires_at``."""
+    task_id: str
+    url: str
+    token: str
+    attempts: int
+    expires_at: float
+
+
+class QueueBackend(ABC):
+    """Storage and leasing semantics of a work queue."""
+
+    @abstractmethod
+    def enqueue(self, tasks: Iterable[Tuple[str, str]]) -> int:
+        """Add (task_id, url) pairs; existing task ids are left alone. Returns the number added."""
+
+    @abstractmethod
+    def lease(self, worker_id: str, limit: int = 1, visibility_timeout: float = 600.0) -> List[Lease]:
+        """Lease up to ``limit`` queued (or expired) tasks."""
+
+    @abstractmethod
+    def renew(self, lease: Lease, visibility_timeout: float = 600.0) -> Optional[Lease]:
+        """Extend a lease, or return None if it was lost."""
+
+    @abstractmethod
+    def complete(self, lease: Lease, records: List[Dict[str, Any]]) -> bool:
+        """Commit a task's records. Returns False if a result was already committed."""
+
+    @abstractmethod
+    def fail(self, lease: Lease, error: str) -> None:
+        """Release a lease after an error; the task is retried until ``max_attempts``."""
+
+    @abstractmethod
+    def requeue_expired(self) -> int:
+        """Return tasks whose lease expired to the queue. Returns the number re-queued."""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Number of tasks per status."""
+
+    @abstractmethod
+    def iter_results(self) -> Iterator[Dict[str, Any]]:
+        """Yield every committed record."""
+
+
+# -------------------------------------------------------------------
+# SQLite backend
+# -------------------------------------------------------------------
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id       TEXT PRIMARY KEY,
+    url           TEXT NOT NULL,
+    status        TEXT NOT NULL DEFAULT 'queued',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    lease_owner   TEXT,
+    lease_token   TEXT,
+    lease_expires REAL,
+    error         TEXT,
+    updated_at    REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+CREATE TABLE IF NOT EXISTS results (
+    task_id      TEXT PRIMARY KEY,
+    lease_token  TEXT,
+    records      TEXT NOT NULL,
+    committed_at REAL
+);
+"""
+
+
+class SQLiteQueueBackend(QueueBackend):
+    """Work queue in a SQLite database shared by all workers."""
+
+    def __init__(self, path: str, max_attempts: int = 3, clock: Callable[[], float] = time.time) -> None:
+        self.path = path
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.path != ":memory:":
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self._connect())
+
+    def enqueue(self, tasks: Iterable[Tuple[str, str]]) -> int:
+        now = self.clock()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO tasks (task_id, url, updated_at) VALUES (?, ?, ?)",
+                ((task_id, url, now) for task_id, url in tasks),
+            )
+            return conn.total_changes - before
+
+    def lease(self, worker_id: str, limit: int = 1, visibility_timeout: float = 600.0) -> List[Lease]:
+        now = self.clock()
+        expires = now + visibility_timeout
+        with self._transaction() as conn:
+            self._requeue_expired(conn, now)
+            rows = conn.execute(
+                "SELECT task_id, url, attempts FROM tasks WHERE status = ? ORDER BY rowid LIMIT ?",
+                (QUEUED, limit),
+            ).fetchall()
+            leases = []
+            for task_id, url, attempts in rows:
+                token = uuid.uuid4().hex
+                conn.execute(
+                    "UPDATE tasks SET status = ?, attempts = attempts + 1, lease_owner = ?, "
+                    "lease_token = ?, lease_expires = ?, updated_at = ? WHERE task_id = ?",
+                    (LEASED, worker_id, token, expires, now, task_id),
+                )
+                leases.append(Lease(task_id, url, token, attempts + 1, expires))
+            return leases
+
+    def renew(self, lease: Lease, visibility_timeout: float = 600.0) -> Optional[Lease]:
+        now = self.clock()
+        expires = now + visibility_timeout
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? "
+                "WHERE task_id = ? AND lease_token = ? AND status = ?",
+                (expires, now, lease.task_id, lease.token, LEASED),
+            )
+            if cursor.rowcount == 0:
+                return None
+        return Lease(lease.task_id, lease.url, lease.token, lease.attempts, expires)
+
+    def complete(self, lease: Lease, records: List[Dict[str, Any]]) -> bool:
+        now = self.clock()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO results (task_id, lease_token, records, committed_at) VALUES (?, ?, ?, ?)",
+                (lease.task_id, lease.token, json.dumps(records, default=str), now),
+            )
+            committed = cursor.rowcount == 1
+            # Whoever commits first finishes the task, even on an expired lease
+            conn.execute(
+                "UPDATE tasks SET status = ?, lease_token = NULL, lease_expires = NULL, error = NULL, "
+                "updated_at = ? WHERE task_id = ?",
+                (DONE, now, lease.task_id),
+            )
+            return committed
+
+    def fail(self, lease: Lease, error: str) -> None:
+        now = self.clock()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "lease_token = NULL, lease_expires = NULL, error = ?, updated_at = ? "
+                "WHERE task_id = ? AND lease_token = ?",
+                (self.max_attempts, FAILED, QUEUED, error[:2000], now, lease.task_id, lease.token),
+            )
+
+    def requeue_expired(self) -> int:
+        with self._transaction() as conn:
+            return self._requeue_expired(conn, self.clock())
+
+    def _requeue_expired(self, conn: sqlite3.Connection, now: float) -> int:
+        cursor = conn.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+            "error = COALESCE(error, 'lease expired'), lease_token = NULL, lease_expires = NULL, "
+            "updated_at = ? WHERE status = ? AND lease_expires < ?",
+            (self.max_attempts, FAILED, QUEUED, now, LEASED, now),
+        )
+        if cursor.rowcount:
+            logger.info("Re-queued %d tasks with expired leases", cursor.rowcount)
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        counts = {status: 0 for status in (QUEUED, LEASED, DONE, FAILED)}
+        counts.update(dict(rows))
+        return counts
+
+    def iter_results(self) -> Iterator[Dict[str, Any]]:
+        cursor = self._connect().execute("SELECT records FROM results ORDER BY rowid")
+        for (payload,) in cursor:
+            yield from json.loads(payload)
+
+    def failures(self) -> List[Tuple[str, str, int, Optional[str]]]:
+        """(task_id, url, attempts, error) of tasks that ran out of attempts."""
+        return self._connect().execute(
+            "SELECT task_id, url, attempts, error FROM tasks WHERE status = ? ORDER BY rowid", (FAILED,)
+        ).fetchall()
+
+
+class _Transaction:
+    """``BEGIN IMMEDIATE`` ... ``COMMIT`` / ``ROLLBACK`` on an autocommit connection."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+BACKENDS: Dict[str, Callable[..., QueueBackend]] = {
+    "sqlite": SQLiteQueueBackend,
+}
+
+
+def open_backend(url: str, **options: Any) -> QueueBackend:
+    """Open a queue backend from a URL such as ``sqlite:///queue.db``.
+
+    A plain path is treated as a SQLite database.
+    """
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        scheme, rest = "sqlite", url
+    elif scheme == "sqlite":
+        rest = rest[1:] if rest.startswith("/") else rest  # sqlite:///rel.db, sqlite:////abs.db
+    factory = BACKENDS.get(scheme)
+    if factory is None:
+        raise ValueError(f"Unknown queue backend: {scheme}")
+    return factory(rest, **options)
+
+
+# -------------------------------------------------------------------
+# Coordinator and worker
+# -------------------------------------------------------------------
+
+def enqueue_registry(
+    backend: QueueBackend,
+    csv_path: str = "Insider_Trading.csv",
+    cache_dir: str = ".cache",
+    planner: Optional["BRSRExtractor"] = None,
+) -> int:
+    """Enqueue every filing with an XBRL URL from the company database.
+
+    With a ``planner``, filing headers are pre-scanned first (``plan_urls``):
+    only the latest revision per company and period is enqueued, grouped by
+    taxonomy release.
+    """
+    from company_registry import load_company_registry
+
+    registry = load_company_registry(csv_path, cache_dir)
+    tasks = [(entry.filing_id or entry.xbrl_url, entry.xbrl_url)
+             for entry in registry.iter_schedule() if entry.xbrl_url]
+    if planner is not None:
+        task_ids = {url: task_id for task_id, url in tasks}
+        tasks = [(task_ids[url], url) for url in planner.plan_urls(task_ids)]
+    added = backend.enqueue(tasks)
+    logger.info("Enqueued %d filings from %s", added, csv_path)
+    return added
+
+
+class _Heartbeat:
+    """Renews a lease in the background while its filing is being processed."""
+
+    def __init__(self, backend: QueueBackend, lease: Lease, visibility_timeout: float) -> None:
+        self.backend = backend
+        self.lease = lease
+        self.visibility_timeout = visibility_timeout
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.visibility_timeout / 3):
+            if self.backend.renew(self.lease, self.visibility_timeout) is None:
+                logger.warning("Lost lease on %s", self.lease.task_id)
+                return
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class QueueWorker:
+    """Leases filings from a queue and commits their ESG records."""
+
+    def __init__(
+        self,
+        extractor: "BRSRExtractor",
+        backend: QueueBackend,
+        worker_id: Optional[str] = None,
+        visibility_timeout: Optional[float] = None,
+    ) -> None:
+        self.extractor = extractor
+        self.backend = backend
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.visibility_timeout = visibility_timeout or extractor.config.queue_visibility_timeout
+
+    def run_one(self, lease: Lease) -> bool:
+        """Process one leased filing; returns True if its result was committed."""
+        try:
+            with _Heartbeat(self.backend, lease, self.visibility_timeout):
+                # Fetch and parse failures raise so the lease is retried, not committed empty
+                records = self.extractor.process_url(lease.url, raise_errors=True)
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Worker %s failed on %s: %s", self.worker_id, lease.url, exc, exc_info=True)
+            self.backend.fail(lease, f"{type(exc).__name__}: {exc}")
+            self.extractor.metrics.inc("brsr_queue_tasks_total", result="failed")
+            return False
+        committed = self.backend.complete(lease, [asdict(r) for r in records])
+        self.extractor.metrics.inc("brsr_queue_tasks_total", result="committed" if committed else "duplicate")
+        if not committed:
+            logger.info("Result for %s was already committed by another worker", lease.task_id)
+        return committed
+
+    def run(self, max_tasks: Optional[int] = None, idle_timeout: float = 0.0, poll_interval: float = 5.0) -> int:
+        """Work until the queue is drained (waiting up to ``idle_timeout`` for new tasks).
+
+        Returns the number of filings committed by this worker.
+        """
+        committed = 0
+        processed = 0
+        idle_since: Optional[float] = None
+        while max_tasks is None or processed < max_tasks:
+            leases = self.backend.lease(self.worker_id, 1, self.visibility_timeout)
+            if not leases:
+                now = time.monotonic()
+                idle_since = idle_since or now
+                if now - idle_since >= idle_timeout:
+                    break
+                time.sleep(poll_interval)
+                continue
+            idle_since = None
+            processed += 1
+            committed += self.run_one(leases[0])
+        return committed
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Coordinator / worker command line."""
+    from brsr_xbrl_extractor import (
+        BRSRExtractor, ESGRecord, ParserConfig, _export_stream, _finish_run, setup_logging,
+    )
+
+    parser = argparse.ArgumentParser(description="Distributed BRSR extraction queue")
+    parser.add_argument("command", choices=("enqueue", "work", "status", "export"))
+    parser.add_argument("--queue", default="sqlite:///queue.db", help="queue URL (default: sqlite:///queue.db)")
+    parser.add_argument("--csv", default=None, help="company database to enqueue (default: company_db_path)")
+    parser.add_argument("--worker-id", default=None)
+    parser.add_argument("--max-tasks", type=int, default=None)
+    parser.add_argument("--idle-timeout", type=float, default=0.0, help="seconds to wait for new tasks")
+    parser.add_argument("--out", default=None, help="export directory (default: output_dir)")
+    parser.add_argument("--plan", action="store_true",
+                        help="enqueue: pre-scan headers and keep only the latest revision per company and period")
+    args = parser.parse_args(argv)
+
+    setup_logging("INFO")
+    config = ParserConfig()
+    backend = open_backend(args.queue, max_attempts=config.queue_max_attempts)
+
+    if args.command == "enqueue":
+        planner = BRSRExtractor(config) if args.plan else None
+        enqueue_registry(backend, args.csv or config.company_db_path, config.cache_dir, planner)
+    elif args.command == "work":
+        worker = QueueWorker(BRSRExtractor(config), backend, worker_id=args.worker_id)
+        committed = worker.run(max_tasks=args.max_tasks, idle_timeout=args.idle_timeout)
+        logger.info("Worker %s committed %d filings", worker.worker_id, committed)
+    elif args.command == "export":
+        # Same record-stream stages and streaming writers as a batch run
+        if args.out:
+            config.output_dir = args.out
+        extractor = BRSRExtractor(config)
+        records = (ESGRecord(**record) for record in backend.iter_results())
+        _finish_run(extractor, _export_stream(extractor, records))
+    backend.requeue_expired()
+    print(json.dumps(backend.counts()))
+
+
+if __name__ == "__main__":
+    main()